@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+"""Crawls a local synthetic site (see benchmarks.synthetic_site) and reports the throughput and resources used as
+JSON, so results can be compared between commits.
+
+The site is served from a separate process so its CPU time and memory aren't counted against the crawler. Each run
+reports the pages crawled a second, the wall clock and CPU time of the crawl, and the cumulative seconds spent in each
+stage of fetching a page across every worker thread:
+
+* request: Sending the request until the response headers arrive
+* download: Reading the body
+* decode: Decoding the body to text
+* parse: Extracting the links
+* site_map: Adding the page to the site map
+
+With --metrics the crawl also records its own crawler.metrics.CrawlMetrics, to measure what they cost.
+
+--transport picks the crawler.pages.transports transport the pages are fetched with, give it more than once to compare
+them: their runs are interleaved so they see the same conditions, and the median of each is reported as well as the
+median of the first, which stays under median_pages_per_second so results of one transport compare between commits.
+By default the site is served over plain HTTP, so the httpx transport speaks HTTP/1.1 to it (HTTP/2 is only negotiated
+over TLS) and its runs measure the cost of the client rather than what multiplexing saves. With --tls it is served over
+HTTPS, speaking HTTP/2 to the httpx transport and HTTP/1.1 to the others, which needs the optional h2 package.
+
+Peak RSS is the high water mark of the whole benchmark process, so with --runs it only ever rises.
+
+Usage: python -m benchmarks.crawl [--workers N] [--runs N] [--warmup-runs N] [--metrics] [--transport NAME ...]
+                                  [--tls] [--output FILE] [site options]
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from unittest.mock import patch
+
+from benchmarks import synthetic_site
+from benchmarks.synthetic_site import SyntheticSiteServer, add_site_arguments, site_from_arguments
+from crawler.crawler import Crawler
+from crawler.metrics import CrawlMetrics
+from crawler.pages.page_fetcher import PageFetcher
+from crawler.pages.transports import TRANSPORTS, HttpxTransport
+from crawler.site_map import SiteMap
+
+
+class StageTimer:
+    """Adds up the time spent in each stage, from any thread
+    """
+    STAGES = ("request", "download", "decode", "parse", "site_map")
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(StageTimer.STAGES, 0.0)
+        self._lock = threading.Lock()
+
+    def wrap(self, stage, function):
+        """Wrap a function so the time spent in it is added to a stage
+
+            Args:
+                stage (string): The stage
+                function (callable): The function
+
+            Returns:
+                callable: The wrapped function
+        """
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.seconds[stage] += elapsed
+
+        return timed
+
+
+def serve(site, connection, tls=False):
+    """Serve the site until the benchmark finishes, run in its own process
+
+        Args:
+            site (benchmarks.synthetic_site.SyntheticSite): The site
+            connection (multiprocessing.connection.Connection): The url of the site is sent on it once the server is
+                listening, anything sent back stops the server
+            tls (bool): Serve it over HTTPS, speaking HTTP/2 to clients which can
+    """
+    server = synthetic_site.SyntheticSiteTLSServer(site) if tls else SyntheticSiteServer(site)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    connection.send(server.url)
+    connection.recv()
+    server.shutdown()
+    server.server_close()
+
+
+def crawl(url, workers, metrics=False, transport="requests"):
+    """Crawl the site once
+
+        Args:
+            url (string): The url of the site
+            workers (int): How many pages to fetch concurrently
+            metrics (bool): Have the crawler record its metrics
+            transport (string): The name of the transport to fetch the pages with, a key of TRANSPORTS
+
+        Returns:
+            dict: The results of the run
+    """
+    stage_timer = StageTimer()
+    crawl_metrics = CrawlMetrics() if metrics else None
+    page_fetcher = PageFetcher(
+        transport=TRANSPORTS[transport],
+        max_connections_per_host=workers,
+        metrics=crawl_metrics,
+        verify=synthetic_site.CERTIFICATE,
+    )
+    page_fetcher.transport.get = stage_timer.wrap("request", page_fetcher.transport.get)
+    page_fetcher._read_body = stage_timer.wrap("download", page_fetcher._read_body)
+    page_fetcher._parse_page = stage_timer.wrap("parse", page_fetcher._parse_page)
+    site_map = SiteMap()
+    site_map.add_page = stage_timer.wrap("site_map", site_map.add_page)
+
+    with page_fetcher, patch.object(PageFetcher, "_decode", stage_timer.wrap("decode", PageFetcher._decode)):
+        crawler = Crawler(url, workers=workers, page_fetcher=page_fetcher, site_map=site_map, metrics=crawl_metrics)
+        usage_before = resource.getrusage(resource.RUSAGE_SELF)
+        start = time.perf_counter()
+        crawler.crawl()
+        wall_seconds = time.perf_counter() - start
+        usage_after = resource.getrusage(resource.RUSAGE_SELF)
+
+    return {
+        "transport": transport,
+        "pages": len(site_map),
+        "wall_seconds": wall_seconds,
+        "pages_per_second": len(site_map) / wall_seconds,
+        "cpu_user_seconds": usage_after.ru_utime - usage_before.ru_utime,
+        "cpu_system_seconds": usage_after.ru_stime - usage_before.ru_stime,
+        # ru_maxrss is in KiB on Linux but bytes on macOS
+        "peak_rss_bytes": usage_after.ru_maxrss * (1 if sys.platform == "darwin" else 1024),
+        "stage_seconds": stage_timer.seconds,
+    }
+
+
+def git_commit():
+    """Get the commit being benchmarked
+
+        Returns:
+            string: The commit hash, None if it isn't a git checkout
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure crawl throughput against a local synthetic site")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--warmup-runs",
+        type=int,
+        default=1,
+        help="Crawls to run first without reporting them, so the server has generated its pages (default: 1)",
+    )
+    parser.add_argument("--metrics", action="store_true", help="Have the crawler record its metrics")
+    parser.add_argument(
+        "--transport",
+        dest="transports",
+        action="append",
+        choices=sorted(TRANSPORTS),
+        help="The transport to fetch pages with, give it more than once to compare them (default: requests)",
+    )
+    parser.add_argument(
+        "--tls",
+        action="store_true",
+        help="Serve the site over HTTPS, speaking HTTP/2 to the httpx transport and HTTP/1.1 to the others",
+    )
+    parser.add_argument("-o", "--output", metavar="FILE", help="Write the JSON results to FILE instead of stdout")
+    add_site_arguments(parser)
+    args = parser.parse_args()
+    transports = list(dict.fromkeys(args.transports or ["requests"]))
+    if "httpx" in transports and not HttpxTransport.is_available():
+        parser.error("--transport httpx needs httpx with HTTP/2 support, pip install 'httpx[http2]'")
+    if args.tls and synthetic_site.h2 is None:
+        parser.error("--tls needs h2 to serve HTTP/2, pip install h2")
+
+    site = site_from_arguments(args)
+    connection, server_connection = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve, args=(site, server_connection, args.tls), daemon=True)
+    server.start()
+    url = connection.recv()
+
+    try:
+        for _ in range(args.warmup_runs):
+            for transport in transports:
+                crawl(url, args.workers, args.metrics, transport)
+        runs = [
+            crawl(url, args.workers, args.metrics, transport) for _ in range(args.runs) for transport in transports
+        ]
+    finally:
+        connection.send(None)
+        server.join()
+
+    for run in runs:
+        if run["pages"] != site.pages:
+            raise RuntimeError("Crawled {} pages of the {} on the site".format(run["pages"], site.pages))
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "site": site.parameters(),
+        "crawler": {"workers": args.workers, "metrics": args.metrics, "transports": transports, "tls": args.tls},
+        "warmup_runs": args.warmup_runs,
+        "median_pages_per_second": statistics.median(
+            run["pages_per_second"] for run in runs if run["transport"] == transports[0]
+        ),
+        "median_pages_per_second_by_transport": {
+            transport: statistics.median(run["pages_per_second"] for run in runs if run["transport"] == transport)
+            for transport in transports
+        },
+        "runs": runs,
+    }
+
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+            output.write("\n")
+
+
+if __name__ == "__main__":
+    main()
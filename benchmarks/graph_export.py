@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""Compares loading a crawl from the text output with loading it from a CrawlGraphFile.
+
+Writes the same synthetic crawl both ways, then reports the size of each file and how long it takes to load: parsing
+the text back into a dict of url to out link urls, opening the graph file (which only maps it), and reading every
+page and out link back out of the graph file.
+
+Usage: python -m benchmarks.graph_export [--pages N] [--links-per-page N]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from crawler.graph_file import CrawlGraphFile
+from crawler.graph_site_map import GraphSiteMap
+from crawler.links.link import BasePage, Link
+from crawler.page_writers import TextPageWriter
+from crawler.pages.page import Page
+
+
+def build_site_map(page_count, links_per_page):
+    """Build a synthetic crawl
+
+    Args:
+        page_count (int): How many pages to crawl
+        links_per_page (int): How many out links each page has, to random other pages
+
+    Returns:
+        crawler.graph_site_map.GraphSiteMap: The crawl
+    """
+    random.seed(0)
+    site_map = GraphSiteMap()
+    for i in range(page_count):
+        base_page = BasePage("http://www.example.com/{}/page-{}.html".format(i % 1000, i))
+        out_links = [
+            Link(base_page, "/{}/page-{}.html".format(j % 1000, j))
+            for j in random.sample(range(page_count), links_per_page)
+        ]
+        page = Page(Link(base_page, base_page.url), None, out_links=out_links)
+        page.status_code = 200
+        page.body_size = random.randrange(1000, 100000)
+        page.fetch_time = random.random()
+        site_map.add_page(page)
+
+    return site_map
+
+
+def load_text(path):
+    """Parse the text output back into the graph
+
+    Args:
+        path (string): The text file
+
+    Returns:
+        dict: list of out link urls keyed on page url
+    """
+    pages = dict()
+    out_links = None
+    with open(path) as text_file:
+        for line in text_file:
+            if line.startswith("Page: "):
+                out_links = pages[line[6:-1]] = []
+            elif line.startswith("        "):
+                out_links.append(line[8:-1])
+
+    return pages
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare loading the text output with a crawl graph file")
+    parser.add_argument("--pages", type=int, default=100000)
+    parser.add_argument("--links-per-page", type=int, default=20)
+    args = parser.parse_args()
+
+    site_map = build_site_map(args.pages, args.links_per_page)
+
+    with tempfile.TemporaryDirectory() as directory:
+        text_path = os.path.join(directory, "crawl.txt")
+        graph_path = os.path.join(directory, "crawl.graph")
+
+        with open(text_path, "w") as text_file:
+            writer = TextPageWriter(text_file)
+            for page in site_map.all_pages():
+                writer.write(page)
+        _, write_time = timed(CrawlGraphFile.write, site_map, graph_path)
+
+        _, text_time = timed(load_text, text_path)
+        graph, open_time = timed(CrawlGraphFile, graph_path)
+        _, pages_time = timed(lambda: sum(len(out_link_urls) for _, out_link_urls in graph.pages()))
+        _, edges_time = timed(lambda: sum(1 for _ in graph.out_links))
+        graph.close()
+
+        print("{:,} pages, {:,} links".format(args.pages, args.pages * args.links_per_page))
+        print("Text output:")
+        print("    size:                      {:,} bytes".format(os.path.getsize(text_path)))
+        print("    load:                      {:.3f}s".format(text_time))
+        print("Graph file:")
+        print("    size:                      {:,} bytes".format(os.path.getsize(graph_path)))
+        print("    write:                     {:.3f}s".format(write_time))
+        print("    open (mmap):               {:.6f}s".format(open_time))
+        print("    scan every edge id:        {:.3f}s".format(edges_time))
+        print("    rebuild every url:         {:.3f}s".format(pages_time))
+
+
+if __name__ == "__main__":
+    main()
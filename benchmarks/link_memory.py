@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""Measures how much memory each crawler.links.link.Link keeps alive.
+
+Builds the out-links of a number of pages the same way LinkExtractor does (every link on a page shares one BasePage
+for the crawled page) and reports the bytes allocated per link, as measured by tracemalloc. The same links are also
+built as UnslottedLink, the Link from before it had slots and a shared BasePage, as the baseline to compare with.
+
+Usage: python -m benchmarks.link_memory [--pages N] [--links-per-page N]
+"""
+import argparse
+import gc
+import tracemalloc
+
+from urllib.parse import urlparse
+
+from crawler.links.link import BasePage, Link
+
+
+class UnslottedLink:
+    """The baseline: Link as it was before it had slots, parsing the crawled page's url again for every link and
+       keeping every part of both in its __dict__, as well as the url
+    """
+    def __init__(self, crawled_page, href):
+        self._raw_crawled_page = crawled_page
+        self._raw_href = href
+
+        self.crawled_scheme, self.crawled_netloc, self.crawled_path, _, _, _ = urlparse(crawled_page)
+        self.scheme, self.netloc, self.path, _, _, _ = urlparse(href)
+
+        self._raw_scheme = self.scheme
+        if self.scheme == "":
+            self.scheme = self.crawled_scheme
+
+        self._raw_netloc = self.netloc
+        if self.netloc == "":
+            self.netloc = self.crawled_netloc
+
+        self.crawled_domain, self.crawled_port = Link._parse_netloc(self.crawled_netloc, self.crawled_scheme)
+        self.domain, self.port = Link._parse_netloc(self.netloc, self.scheme)
+
+        self.crawled_subdir = Link._parse_subdir(self.crawled_path)
+        self.subdir = Link._parse_subdir(self.path)
+
+        if Link._is_relative_path(href, self._raw_netloc):
+            self.absolute_path = Link._join_paths(self.crawled_subdir, self.path)
+        else:
+            self.absolute_path = self.path
+
+        self.normalised_netloc_and_path = Link._join_netloc_and_path(self.netloc, self.absolute_path)
+        self.url = Link._construct_url(self.scheme, self.normalised_netloc_and_path)
+
+
+def build_links(pages, links_per_page, baseline=False):
+    """Build the out-links for a synthetic site
+
+    Args:
+        pages (int): How many crawled pages to build links for
+        links_per_page (int): How many links are on each page
+        baseline (bool): Build UnslottedLink instances from the crawled page's url instead
+
+    Returns:
+        list: The crawler.links.link.Link (or UnslottedLink) instances
+    """
+    links = []
+    for page_number in range(pages):
+        url = "http://www.example.com/section-{}/page-{}.html".format(page_number % 50, page_number)
+        base_page = url if baseline else BasePage(url)
+        for link_number in range(links_per_page):
+            if link_number % 3 == 0:
+                href = "/section-{}/page-{}.html".format(link_number % 50, link_number)
+            elif link_number % 3 == 1:
+                href = "page-{}.html".format(link_number)
+            else:
+                href = "http://www.example.net/external/{}.html".format(link_number)
+            links.append(UnslottedLink(base_page, href) if baseline else Link(base_page, href))
+
+    return links
+
+
+def bytes_per_link(pages, links_per_page, baseline=False):
+    """Measure the memory kept alive by each link of a synthetic site
+
+    Args:
+        pages (int): How many crawled pages to build links for
+        links_per_page (int): How many links are on each page
+        baseline (bool): Measure UnslottedLink instead of Link
+
+    Returns:
+        tuple(links: int, bytes_per_link: float): How many links were built and the bytes allocated for each
+    """
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+
+    links = build_links(pages, links_per_page, baseline=baseline)
+
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # The list holding the links isn't part of their cost
+    list_size = links.__sizeof__()
+
+    return len(links), (after - before - list_size) / len(links)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the memory used by each Link")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--links-per-page", type=int, default=100)
+    args = parser.parse_args()
+
+    baseline_links, baseline_bytes = bytes_per_link(args.pages, args.links_per_page, baseline=True)
+    links, link_bytes = bytes_per_link(args.pages, args.links_per_page)
+
+    print("links: {}".format(links))
+    print("bytes per link (baseline, unslotted): {:.1f}".format(baseline_bytes))
+    print("bytes per link: {:.1f}".format(link_bytes))
+    print("saved: {:.1%}".format(1 - link_bytes / baseline_bytes))
+
+
+if __name__ == "__main__":
+    main()
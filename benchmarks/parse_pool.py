@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""Measures how many pages a second can have their links extracted on the calling thread, and in a ParsePool of
+1, 2, 4, ... worker processes up to the number of cores.
+
+The pages are handed to the pool from a thread per process, as the crawler's fetching threads would, so the figures
+include sending the text to the workers and rebuilding the links from what comes back.
+
+Usage: python -m benchmarks.parse_pool [--pages N] [--links-per-page N] [--max-processes N]
+"""
+import argparse
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from crawler.links.link import Link
+from crawler.links.link_extractor import LinkExtractor
+from crawler.pages.parse_pool import ParsePool
+
+
+def build_pages(page_count, links_per_page):
+    """Build synthetic pages
+
+    Args:
+        page_count (int): How many pages to build
+        links_per_page (int): How many links each page has
+
+    Returns:
+        list: tuple(link: crawler.links.link.Link, page_text: str)
+    """
+    pages = []
+    for i in range(page_count):
+        anchors = "\n".join(
+            '<li><a href="{}page-{}.html" class="nav">Page {}</a></li>'.format("../" * (j % 3), i + j, j)
+            for j in range(links_per_page)
+        )
+        page_text = "<html><head><title>Page {}</title></head><body><p>{}</p><ul>{}</ul></body></html>".format(
+            i,
+            "Some text. " * 200,
+            anchors,
+        )
+        pages.append((Link("http://www.example.com", "/a/b/c/page-{}.html".format(i)), page_text))
+
+    return pages
+
+
+def pages_per_second(parse, pages, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        link_count = sum(len(links) for links in executor.map(lambda page: parse(*page), pages))
+
+    return len(pages) / (time.perf_counter() - start), link_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure link extraction throughput with a ParsePool")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--links-per-page", type=int, default=200)
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    pages = build_pages(args.pages, args.links_per_page)
+
+    rate, expected_link_count = pages_per_second(lambda link, text: LinkExtractor.extract(link.url, text), pages, 1)
+    print("{:,} pages of {} links".format(args.pages, args.links_per_page))
+    print("    calling thread:            {:,.0f} pages/sec".format(rate))
+
+    processes = 1
+    while processes <= args.max_processes:
+        with ParsePool(processes=processes) as parse_pool:
+            # Start the workers before timing
+            parse_pool.parse(*pages[0])
+            rate, link_count = pages_per_second(parse_pool.parse, pages, processes * 2)
+
+        assert link_count == expected_link_count
+        print("    pool of {:>2} processes:     {:,.0f} pages/sec".format(processes, rate))
+        processes *= 2
+
+
+if __name__ == "__main__":
+    main()
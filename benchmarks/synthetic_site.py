@@ -0,0 +1,527 @@
+#!/usr/bin/env python
+"""A deterministic synthetic website, served locally so the crawler can be measured without touching a real site.
+
+The pages are numbered 0 to pages - 1 and split into depth levels, page 0 (the home page, /) is the only page on
+level 0 and every other level holds an equal share of the rest. Page n on level l lives at
+/level-l/section-(n % 10)/page-n.html and links to its children on the next level (every page on a level is the child
+of one page on the level above), then to random pages no deeper than the next level until it has fan_out links. So a
+crawl from / finds every page and takes exactly depth levels.
+
+The same seed always gives the same site: the same links, in the same order, written the same way.
+
+With --tls the site is served over HTTPS, with the self-signed certificate in this directory (localhost.crt, for
+localhost and 127.0.0.1), speaking HTTP/2 to clients which offer it and HTTP/1.1 to the rest. HTTP/2 needs the
+optional h2 package.
+
+Usage: python -m benchmarks.synthetic_site [--port N] [--tls] [site options]
+"""
+import argparse
+import heapq
+import http.server
+import os
+import random
+import re
+import select
+import ssl
+import time
+
+from functools import lru_cache
+
+# h2 is optional, only serving HTTP/2 needs it
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.exceptions
+except ImportError:
+    h2 = None
+
+# The self-signed certificate SyntheticSiteTLSServer serves, clients check it with CERTIFICATE as the CA
+CERTIFICATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "localhost.crt")
+PRIVATE_KEY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "localhost.key")
+
+
+class SyntheticSite:
+    """Generates the pages of a synthetic site
+
+        Attributes:
+            pages (int): How many pages there are
+            fan_out (int): How many links each page has, at least (pages with more children have more)
+            page_size (int): Roughly how many bytes each page is, padded out with text
+            depth (int): How many levels of links there are, the home page is level 0
+            duplicate_ratio (float): The fraction of a page's links which repeat one already on the page
+            relative_ratio (float): The fraction of hrefs written relative to the page (e.g. ../../level-2/...),
+                the rest are absolute paths (e.g. /level-2/...)
+            latency (float): The seconds each page takes to serve
+            jitter (float): The most seconds each page's latency varies by, either way
+            seed (int): The seed of the site, the same seed always gives the same site
+    """
+    PAGE_PATH = re.compile(r"^/level-(\d+)/section-(\d+)/page-(\d+)\.html$")
+    SECTIONS = 10
+    # Filler for padding the pages out to page_size
+    WORDS = (
+        "crawler", "link", "page", "site", "graph", "fetch", "parse", "anchor", "domain", "path", "level", "section",
+        "the", "of", "and", "to", "in", "is", "for", "on", "with", "as", "by", "at", "from", "it", "that", "this",
+    )
+
+    def __init__(self, pages=1000, fan_out=20, page_size=20000, depth=5, duplicate_ratio=0.2, relative_ratio=0.5,
+                 latency=0.0, jitter=0.0, seed=0):
+        """Initialiser, see the attributes
+        """
+        if pages < 1:
+            raise ValueError("pages must be at least 1, got {}".format(pages))
+        if depth < 1 or pages < depth or (depth == 1 and pages > 1):
+            raise ValueError("depth must be between 2 and pages (or 1 for a single page), got {}".format(depth))
+
+        self.pages = pages
+        self.fan_out = fan_out
+        self.page_size = page_size
+        self.depth = depth
+        self.duplicate_ratio = duplicate_ratio
+        self.relative_ratio = relative_ratio
+        self.latency = latency
+        self.jitter = jitter
+        self.seed = seed
+
+        # The first page of each level, and one past the last page of the last
+        self._level_starts = [0, 1]
+        per_level, extra = divmod(pages - 1, max(depth - 1, 1))
+        for level in range(1, depth):
+            self._level_starts.append(self._level_starts[-1] + per_level + (1 if level <= extra else 0))
+
+    def parameters(self):
+        """Get the parameters of the site, for reporting alongside results
+
+            Returns:
+                dict: The attributes of the site
+        """
+        return {
+            "pages": self.pages,
+            "fan_out": self.fan_out,
+            "page_size": self.page_size,
+            "depth": self.depth,
+            "duplicate_ratio": self.duplicate_ratio,
+            "relative_ratio": self.relative_ratio,
+            "latency": self.latency,
+            "jitter": self.jitter,
+            "seed": self.seed,
+        }
+
+    def level(self, page):
+        """Get the level of a page
+
+            Args:
+                page (int): The page number
+
+            Returns:
+                int: The level, 0 for the home page
+        """
+        level = 0
+        while self._level_starts[level + 1] <= page:
+            level += 1
+
+        return level
+
+    def path(self, page):
+        """Get the path of a page
+
+            Args:
+                page (int): The page number
+
+            Returns:
+                string: The path
+        """
+        if page == 0:
+            return "/"
+
+        return "/level-{}/section-{}/page-{}.html".format(self.level(page), page % SyntheticSite.SECTIONS, page)
+
+    def page_for_path(self, path):
+        """Get the page number at a path
+
+            Args:
+                path (string): The path of the request
+
+            Returns:
+                int: The page number, None if there is no page at the path
+        """
+        if path == "/":
+            return 0
+
+        match = SyntheticSite.PAGE_PATH.match(path)
+        if match is None:
+            return None
+
+        page = int(match.group(3))
+        if page >= self.pages or self.path(page) != path:
+            return None
+
+        return page
+
+    def latency_for(self, page):
+        """Get how long serving a page takes
+
+            Args:
+                page (int): The page number
+
+            Returns:
+                float: The seconds to wait before responding
+        """
+        if self.jitter == 0:
+            return self.latency
+
+        return max(0.0, self.latency + self._random(page, "latency").uniform(-self.jitter, self.jitter))
+
+    def out_links(self, page):
+        """Get the pages a page links to
+
+            Args:
+                page (int): The page number
+
+            Returns:
+                list: The page numbers, in the order they are linked, including duplicates
+        """
+        rng = self._random(page, "links")
+        level = self.level(page)
+
+        children = []
+        if level + 1 < self.depth:
+            parents = self._level_starts[level + 1] - self._level_starts[level]
+            first_child = self._level_starts[level + 1] + (page - self._level_starts[level])
+            children = list(range(first_child, self._level_starts[level + 2], parents))
+
+        deepest = self._level_starts[min(level + 2, self.depth)]
+        links = list(children)
+        while len(links) < self.fan_out:
+            if links and rng.random() < self.duplicate_ratio:
+                links.append(rng.choice(links))
+            else:
+                links.append(rng.randrange(deepest))
+
+        rng.shuffle(links)
+
+        return links
+
+    def text(self, page):
+        """Get the HTML of a page
+
+            Args:
+                page (int): The page number
+
+            Returns:
+                string: The HTML
+        """
+        rng = self._random(page, "text")
+        base = self.path(page)
+        anchors = "\n".join(
+            '<li><a href="{}" class="nav">Page {}</a></li>'.format(
+                self._href(base, self.path(linked), rng.random() < self.relative_ratio),
+                linked,
+            )
+            for linked in self.out_links(page)
+        )
+        head = "<html><head><title>Page {}</title></head><body><h1>Page {}</h1><ul>\n{}\n</ul>\n".format(
+            page,
+            page,
+            anchors,
+        )
+        padding = []
+        size = len(head)
+        while size < self.page_size:
+            paragraph = "<p>{}</p>\n".format(" ".join(rng.choice(SyntheticSite.WORDS) for _ in range(60)))
+            padding.append(paragraph)
+            size += len(paragraph)
+
+        return "{}{}</body></html>\n".format(head, "".join(padding))
+
+    def _href(self, base, path, relative):
+        """Write the href of a link, either as an absolute path or relative to the page it's on
+        """
+        if not relative or path == "/":
+            return path
+
+        base_directories = base.split("/")[1:-1]
+        directories = path.split("/")[1:-1]
+        common = 0
+        while common < min(len(base_directories), len(directories)) and \
+                base_directories[common] == directories[common]:
+            common += 1
+
+        return "../" * (len(base_directories) - common) + "/".join(directories[common:] + [path.split("/")[-1]])
+
+    def _random(self, page, purpose):
+        return random.Random("{}:{}:{}".format(self.seed, purpose, page))
+
+
+class SyntheticSiteServer(http.server.ThreadingHTTPServer):
+    """Serves a SyntheticSite over HTTP, each request on its own thread so latency overlaps as it would on a real site
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, site, address=("127.0.0.1", 0)):
+        """Initialiser, binds the address
+
+            Args:
+                site (SyntheticSite): The site to serve
+                address (tuple(host: str, port: int)): Where to listen, by default any free local port
+        """
+        self.site = site
+        self.body = lru_cache(maxsize=4096)(lambda page: site.text(page).encode("utf-8"))
+        super().__init__(address, SyntheticSiteRequestHandler)
+
+    @property
+    def url(self):
+        """The url of the home page
+        """
+        return "http://{}:{}".format(*self.server_address[:2])
+
+
+class SyntheticSiteTLSServer(SyntheticSiteServer):
+    """Serves a SyntheticSite over HTTPS, speaking HTTP/2 to clients which offer it during the TLS handshake (ALPN)
+       and HTTP/1.1 to the rest. Each connection is served on its own thread, the requests multiplexed over an HTTP/2
+       connection are answered in the order their latency is up rather than the order they came in.
+    """
+    def __init__(self, site, address=("127.0.0.1", 0), certificate=CERTIFICATE, private_key=PRIVATE_KEY,
+                 http2=True):
+        """Initialiser, binds the address
+
+            Args:
+                site (SyntheticSite): The site to serve
+                address (tuple(host: str, port: int)): Where to listen, by default any free local port
+                certificate (string): The path of the certificate to serve
+                private_key (string): The path of the certificate's private key
+                http2 (bool): Speak HTTP/2 to clients which offer it
+
+            Raises:
+                ImportError: If http2 and h2 isn't installed
+        """
+        if http2 and h2 is None:
+            raise ImportError("Serving HTTP/2 needs h2, pip install h2")
+
+        self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.ssl_context.load_cert_chain(certificate, private_key)
+        self.ssl_context.set_alpn_protocols(["h2", "http/1.1"] if http2 else ["http/1.1"])
+        super().__init__(site, address)
+
+    @property
+    def url(self):
+        """The url of the home page
+        """
+        return "https://{}:{}".format(*self.server_address[:2])
+
+    def get_request(self):
+        connection, address = super().get_request()
+        # The handshake is done on the connection's own thread, not the one accepting connections
+        return self.ssl_context.wrap_socket(connection, server_side=True, do_handshake_on_connect=False), address
+
+    def finish_request(self, request, client_address):
+        try:
+            request.do_handshake()
+        except (ssl.SSLError, OSError):
+            return
+
+        if request.selected_alpn_protocol() == "h2":
+            SyntheticSiteH2Connection(self, request).serve()
+        else:
+            super().finish_request(request, client_address)
+
+
+class SyntheticSiteH2Connection:
+    """Serves the requests on one HTTP/2 connection to a SyntheticSiteTLSServer. Everything is done on the
+       connection's thread: it waits for a request to arrive or for the latency of one to be up, whichever is sooner,
+       and sends each body as fast as the client's flow control window allows.
+    """
+    def __init__(self, server, connection):
+        """Initialiser
+
+            Args:
+                server (SyntheticSiteTLSServer): The server the connection was made to
+                connection (ssl.SSLSocket): The connection, once the handshake is done
+        """
+        self._server = server
+        self._socket = connection
+        self._connection = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False, header_encoding="utf-8"),
+        )
+        # tuple(ready: float, stream_id: int, status: int, body: bytes) for each response waiting on its latency
+        self._waiting = []
+        # The rest of the body still to send on each stream
+        self._sending = dict()
+
+    def serve(self):
+        """Serve requests until the client closes the connection
+        """
+        self._connection.initiate_connection()
+        self._socket.sendall(self._connection.data_to_send())
+        try:
+            while self._receive():
+                now = time.monotonic()
+                while self._waiting and self._waiting[0][0] <= now:
+                    _, stream_id, status, body = heapq.heappop(self._waiting)
+                    self._respond(stream_id, status, body)
+                self._send_bodies()
+                self._socket.sendall(self._connection.data_to_send())
+        except (OSError, h2.exceptions.ProtocolError):
+            pass
+
+    def _receive(self):
+        """Wait for data from the client, until the next response is ready at the latest, and handle it
+
+            Returns:
+                bool: False once the connection is closed
+        """
+        # The TLS layer may already hold data read from the socket, which select wouldn't see
+        if not self._socket.pending():
+            timeout = max(0.0, self._waiting[0][0] - time.monotonic()) if self._waiting else None
+            readable, _, _ = select.select([self._socket], [], [], timeout)
+            if not readable:
+                return True
+
+        data = self._socket.recv(65536)
+        if not data:
+            return False
+
+        for event in self._connection.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                self._request_received(event.stream_id, dict(event.headers)[":path"])
+            elif isinstance(event, h2.events.StreamReset):
+                self._sending.pop(event.stream_id, None)
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                return False
+
+        return True
+
+    def _request_received(self, stream_id, path):
+        page = self._server.site.page_for_path(path)
+        if page is None:
+            heapq.heappush(self._waiting, (time.monotonic(), stream_id, 404, b""))
+            return
+
+        latency = self._server.site.latency_for(page)
+        heapq.heappush(self._waiting, (time.monotonic() + latency, stream_id, 200, self._server.body(page)))
+
+    def _respond(self, stream_id, status, body):
+        """Send the headers of a response, and queue its body to be sent
+        """
+        try:
+            self._connection.send_headers(stream_id, [
+                (":status", str(status)),
+                ("content-type", "text/html; charset=utf-8"),
+                ("content-length", str(len(body))),
+            ], end_stream=not body)
+        except h2.exceptions.StreamClosedError:
+            # The client gave up on the request while it waited
+            return
+
+        if body:
+            self._sending[stream_id] = body
+
+    def _send_bodies(self):
+        """Send as much of each body still to send as the flow control windows allow
+        """
+        for stream_id, body in list(self._sending.items()):
+            while body:
+                size = min(
+                    len(body),
+                    self._connection.local_flow_control_window(stream_id),
+                    self._connection.max_outbound_frame_size,
+                )
+                if size <= 0:
+                    break
+                self._connection.send_data(stream_id, body[:size], end_stream=size == len(body))
+                body = body[size:]
+
+            if body:
+                self._sending[stream_id] = body
+            else:
+                del self._sending[stream_id]
+
+
+class SyntheticSiteRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # The headers and body are written separately, with Nagle's algorithm the body waits for the headers to be acked
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        page = self.server.site.page_for_path(self.path)
+        if page is None:
+            self.send_error(404)
+            return
+
+        body = self.server.body(page)
+        latency = self.server.site.latency_for(page)
+        if latency > 0:
+            time.sleep(latency)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def add_site_arguments(parser):
+    """Add the options of a SyntheticSite to an argument parser
+
+        Args:
+            parser (argparse.ArgumentParser): The parser
+    """
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--fan-out", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=20000, metavar="BYTES")
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2)
+    parser.add_argument("--relative-ratio", type=float, default=0.5)
+    parser.add_argument("--latency", type=float, default=0.0, metavar="SECONDS")
+    parser.add_argument("--jitter", type=float, default=0.0, metavar="SECONDS")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def site_from_arguments(args):
+    """Build the SyntheticSite described by parsed arguments
+
+        Args:
+            args (argparse.Namespace): Arguments parsed with the options from add_site_arguments
+
+        Returns:
+            SyntheticSite: The site
+    """
+    return SyntheticSite(
+        pages=args.pages,
+        fan_out=args.fan_out,
+        page_size=args.page_size,
+        depth=args.depth,
+        duplicate_ratio=args.duplicate_ratio,
+        relative_ratio=args.relative_ratio,
+        latency=args.latency,
+        jitter=args.jitter,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic website to crawl")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--tls", action="store_true", help="Serve over HTTPS, speaking HTTP/2 to clients which can")
+    add_site_arguments(parser)
+    args = parser.parse_args()
+    if args.tls and h2 is None:
+        parser.error("--tls needs h2 to serve HTTP/2, pip install h2")
+
+    server_class = SyntheticSiteTLSServer if args.tls else SyntheticSiteServer
+    server = server_class(site_from_arguments(args), ("127.0.0.1", args.port))
+    print("Serving {:,} pages at {}".format(args.pages, server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
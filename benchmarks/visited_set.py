@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""Compares tracking the visited links in a SiteMap (a dict of Link to Page) with a BloomFilter.
+
+Reports the memory used per url, as measured by tracemalloc, and how many lookups a second each can do for urls
+which have been added and urls which haven't.
+
+This measures the visited sets on their own. In a crawl the filter only replaces the set of links waiting to be
+fetched, the site map of crawled pages is kept either way, so a crawl's peak RSS falls by far less.
+
+Usage: python -m benchmarks.visited_set [--urls N] [--false-positive-rate P]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from crawler.bloom_filter import BloomFilter
+from crawler.links.link import BasePage, Link
+from crawler.pages.page import Page
+from crawler.site_map import SiteMap
+
+
+def build_links(count, section):
+    """Build distinct links
+
+    Args:
+        count (int): How many links to build
+        section (string): Path prefix, so different calls build different links
+
+    Returns:
+        list: crawler.links.link.Link instances
+    """
+    base_page = BasePage("http://www.example.com/")
+    return [Link(base_page, "/{}/{}/page-{}.html".format(section, i % 1000, i)) for i in range(count)]
+
+
+def measure(name, build, lookup, visited_links, unvisited_links):
+    """Measure the memory of a visited set and its lookup throughput
+
+    Args:
+        name (string): What is being measured
+        build (callable): Given the visited links, builds and returns the visited set
+        lookup (callable): Given the visited set and a link, returns whether the link was visited
+        visited_links (list): The links to add
+        unvisited_links (list): Links which are never added
+    """
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    visited_set = build(visited_links)
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for link in visited_links:
+        lookup(visited_set, link)
+    hit_rate = len(visited_links) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    false_positives = sum(lookup(visited_set, link) for link in unvisited_links)
+    miss_rate = len(unvisited_links) / (time.perf_counter() - start)
+
+    print("{}:".format(name))
+    print("    bytes per url:             {:.1f}".format((after - before) / len(visited_links)))
+    print("    visited lookups/sec:       {:,.0f}".format(hit_rate))
+    print("    unvisited lookups/sec:     {:,.0f}".format(miss_rate))
+    print("    false positive rate:       {:.4%}".format(false_positives / len(unvisited_links)))
+
+    return visited_set
+
+
+def build_site_map(links):
+    site_map = SiteMap()
+    for link in links:
+        site_map.add_page(Page(link, None, out_links=[]))
+
+    return site_map
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the SiteMap and BloomFilter visited sets")
+    parser.add_argument("--urls", type=int, default=200000)
+    parser.add_argument("--false-positive-rate", type=float, default=0.001)
+    args = parser.parse_args()
+
+    visited_links = build_links(args.urls, "visited")
+    unvisited_links = build_links(args.urls, "unvisited")
+
+    # The site map keeps the links (and a Page for each) alive, the filter only needs their keys while adding them
+    measure(
+        "SiteMap",
+        build_site_map,
+        lambda site_map, link: site_map.link_already_visited(link),
+        visited_links,
+        unvisited_links,
+    )
+
+    def build_bloom_filter(links):
+        bloom_filter = BloomFilter(args.urls, false_positive_rate=args.false_positive_rate)
+        for link in links:
+            bloom_filter.add(link.normalised_netloc_and_path)
+
+        return bloom_filter
+
+    bloom_filter = measure(
+        "BloomFilter",
+        build_bloom_filter,
+        lambda bloom_filter, link: link.normalised_netloc_and_path in bloom_filter,
+        visited_links,
+        unvisited_links,
+    )
+    print("    fill ratio:                {:.1%}".format(bloom_filter.fill_ratio()))
+    print("    estimated false positives: {:.4%}".format(bloom_filter.estimated_false_positive_rate()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+
+import aiohttp
+
+from crawler.site_map import SiteMap
+from crawler.links.link import Link
+from crawler.pages.async_page_fetcher import AsyncPageFetcher
+from crawler.pages.page import Page
+
+
+class AsyncCrawler:
+    """Crawls the given domain from a single thread, using an asyncio event loop to keep many requests in flight at
+       once.
+
+       Unlike crawler.crawler.Crawler, redirects are followed by aiohttp: a page which redirects is kept under the
+       link it was fetched for, without any aliases, so a page reached through several links appears once for each.
+
+        Attributes:
+            site_map: The site map of the crawled domain.
+            seen_filter: The filter of links already seen, if the crawler was given one
+    """
+    site_map = None
+    seen_filter = None
+
+    def __init__(self, start_domain, concurrency=100, parse_in_executor=False, max_connections_per_host=0,
+                 keep_alive=True, headers=None, stream_links=False, link_resolver=None, site_map=None,
+                 seen_filter=None, seeder=None, on_page=None, parse_pool=None):
+        """Initialiser
+
+            Args:
+                start_domain (string): The domain to start crawling
+                concurrency (int): The maximum number of requests in flight at once
+                parse_in_executor (bool): Parse the fetched pages in a thread pool rather than on the event loop
+                max_connections_per_host (int): How many connections to open to each host, 0 is only limited by
+                    concurrency
+                keep_alive (bool): Keep connections open between requests
+                headers (dict): Headers to send with every request
+                stream_links (bool): Extract the links from each page while it downloads
+                link_resolver (crawler.links.link_resolver.LinkResolver): Cache to build the out links through
+                site_map: The site map to add the crawled pages to, by default a crawler.site_map.SiteMap
+                seen_filter (crawler.bloom_filter.BloomFilter): Track the links already seen in this probabilistic
+                    filter rather than a set of every link scheduled, but (at the filter's false positive rate)
+                    skipping some pages which haven't been visited. The site map still keeps every page crawled.
+                seeder (crawler.sitemap_seeder.SitemapSeeder): Find pages to visit from the site's sitemaps before
+                    crawling, they are fetched in a thread so the event loop isn't blocked
+                on_page (callable): Called on the event loop with each page as soon as it has been added to the site
+                    map
+                parse_pool (crawler.pages.parse_pool.ParsePool): Extract the links in these worker processes
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1, got {}".format(concurrency))
+
+        self._start_link = Link(start_domain, "/")
+        self.site_map = site_map if site_map is not None else SiteMap()
+        self._concurrency = concurrency
+        self._parse_in_executor = parse_in_executor
+        self._max_connections_per_host = max_connections_per_host
+        self._keep_alive = keep_alive
+        self._headers = headers
+        self._stream_links = stream_links
+        self._link_resolver = link_resolver
+        self._links_to_visit = []
+        self._scheduled_links = set()
+        self.seen_filter = seen_filter
+        self._seeder = seeder
+        self._on_page = on_page
+        self._parse_pool = parse_pool
+
+    def crawl(self):
+        """Crawl the domain, blocking until the crawl is complete
+        """
+        asyncio.run(self.crawl_async())
+
+    async def crawl_async(self):
+        """Crawl the domain from an already running event loop
+        """
+        connector = aiohttp.TCPConnector(
+            limit=self._concurrency,
+            limit_per_host=self._max_connections_per_host,
+            force_close=not self._keep_alive,
+        )
+
+        async with aiohttp.ClientSession(connector=connector, headers=self._headers) as session:
+            page_fetcher = AsyncPageFetcher(
+                session,
+                parse_in_executor=self._parse_in_executor,
+                stream_links=self._stream_links,
+                link_resolver=self._link_resolver,
+                parse_pool=self._parse_pool,
+            )
+            await self._crawl(page_fetcher)
+
+    async def _crawl(self, page_fetcher):
+        """Keep up to concurrency pages in flight until there are no links left to visit
+
+            Note: Unlike crawler.crawler.Crawler this does not wait for a whole level of links to be fetched before
+                  starting on the next, a new fetch is started as soon as another one finishes.
+
+            Args:
+                page_fetcher (crawler.pages.async_page_fetcher.AsyncPageFetcher): The fetcher to get the pages with
+        """
+        self._links_to_visit = [self._start_link]
+        self._scheduled_links = {self._start_link}
+        if self.seen_filter is not None:
+            self._scheduled_links = set()
+            self.seen_filter.add(self._start_link.normalised_netloc_and_path)
+        if self._seeder is not None:
+            seed_links = await asyncio.get_running_loop().run_in_executor(
+                None,
+                list,
+                self._seeder.seed_links(self._start_link),
+            )
+            self._schedule_links(seed_links)
+            logging.info("Seeded {} links from {} sitemaps".format(
+                len(self._links_to_visit) - 1,
+                self._seeder.sitemaps_fetched,
+            ))
+        in_flight = set()
+
+        while self._links_to_visit or in_flight:
+            while self._links_to_visit and len(in_flight) < self._concurrency:
+                in_flight.add(asyncio.ensure_future(self._fetch_page(page_fetcher, self._links_to_visit.pop())))
+
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+            for fetch in done:
+                page = fetch.result()
+                self.site_map.add_page(page)
+                if self._on_page is not None:
+                    self._on_page(page)
+                self._schedule_links_to_visit(page)
+
+    async def _fetch_page(self, page_fetcher, link):
+        """Fetch a single page
+
+            Args:
+                page_fetcher (crawler.pages.async_page_fetcher.AsyncPageFetcher): The fetcher to get the page with
+                link (crawler.links.link.Link): The link to fetch
+
+            Returns:
+                crawler.pages.page.Page: The fetched page, without any out links if it couldn't be fetched
+        """
+        logging.info("Fetching: {}".format(link))
+        try:
+            return await page_fetcher.get(link)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            # One bad link mustn't end the crawl, the pages in flight would be lost with it
+            logging.warning("Can't fetch {}: {!r}".format(link, error))
+            return Page(link, None, out_links=[])
+
+    def _schedule_links_to_visit(self, page):
+        """Queue up the links from the page we haven't yet visited, or already queued
+
+            Args:
+                page (crawler.pages.page.Page): The page to extract the links from
+        """
+        self._schedule_links(page.out_links)
+
+    def _schedule_links(self, links):
+        """Queue up the links we haven't yet visited, or already queued
+
+            Args:
+                links (iterable): The crawler.links.link.Link instances
+        """
+        for link in links:
+            if not link.in_crawled_domain():
+                continue
+
+            if self.seen_filter is None:
+                if link not in self._scheduled_links:
+                    self._scheduled_links.add(link)
+                    self._links_to_visit.append(link)
+            elif self.seen_filter.add(link.normalised_netloc_and_path):
+                self._links_to_visit.append(link)
@@ -0,0 +1,103 @@
+import hashlib
+import math
+import struct
+
+
+class BloomFilter:
+    """Probabilistic set of strings, using a fixed amount of memory no matter how many are added.
+
+       Membership tests never give a false negative, but may give a false positive (say a string was added when it
+       wasn't) with a probability that grows as the filter fills up. It is sized from the number of strings expected
+       and the false positive rate wanted once they have all been added.
+
+        Attributes:
+            size_in_bits (int): The number of bits in the filter
+            hash_count (int): The number of bits set for each string
+            count (int): How many distinct strings have been added (strings mistaken as already added aren't counted)
+    """
+    size_in_bits = None
+    hash_count = None
+    count = 0
+
+    def __init__(self, expected_items, false_positive_rate=0.001):
+        """Initialiser
+
+            Args:
+                expected_items (int): How many strings are expected to be added
+                false_positive_rate (float): The rate of false positives wanted once they have all been added
+        """
+        if expected_items < 1:
+            raise ValueError("expected_items must be at least 1, got {}".format(expected_items))
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("false_positive_rate must be between 0 and 1, got {}".format(false_positive_rate))
+
+        # The standard optimal sizing, m = -n ln(p) / ln(2)^2 bits and k = (m / n) ln(2) hashes
+        self.size_in_bits = max(8, math.ceil(-expected_items * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size_in_bits / expected_items * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size_in_bits + 7) // 8)
+        self._bits_set = 0
+
+    def add(self, item):
+        """Add a string to the filter
+
+            Args:
+                item (string): The string to add
+
+            Returns:
+                bool: True if the string was not in the filter before (it can't be a false positive)
+        """
+        added = False
+        for position in self._positions(item):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not self._bits[byte] & mask:
+                self._bits[byte] |= mask
+                self._bits_set += 1
+                added = True
+
+        if added:
+            self.count += 1
+
+        return added
+
+    def __contains__(self, item):
+        bits = self._bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+
+        return True
+
+    def __len__(self):
+        return self.count
+
+    def fill_ratio(self):
+        """The fraction of the bits which are set
+
+            Returns:
+                float: The fill ratio, between 0 and 1
+        """
+        return self._bits_set / self.size_in_bits
+
+    def estimated_false_positive_rate(self):
+        """The chance a string which hasn't been added will be reported as added, given how full the filter is now
+
+            Returns:
+                float: The false positive rate, between 0 and 1
+        """
+        return self.fill_ratio() ** self.hash_count
+
+    def _positions(self, item):
+        """The bits for a string, using the two halves of one digest to simulate hash_count hashes (Kirsch and
+           Mitzenmacher's double hashing)
+
+            Args:
+                item (string): The string
+
+            Returns:
+                list: int bit positions
+        """
+        first_hash, second_hash = struct.unpack("<QQ", hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest())
+        size_in_bits = self.size_in_bits
+
+        return [(first_hash + i * second_hash) % size_in_bits for i in range(self.hash_count)]
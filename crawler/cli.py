@@ -1,42 +1,797 @@
 import argparse
 import logging
 
+import sys
+
+from crawler.async_crawler import AsyncCrawler
+from crawler.bloom_filter import BloomFilter
+from crawler.crawl_snapshot import CrawlSnapshot
+from crawler.crawl_store import CrawlStore, CrawlStoreError
 from crawler.crawler import Crawler
+from crawler.distributed.coordinator import Coordinator
+from crawler.distributed.worker import Worker
+from crawler.frontier import Frontier
+from crawler.graph_file import CrawlGraphFile
+from crawler.graph_site_map import GraphSiteMap
+from crawler.host_scheduler import HostScheduler
+from crawler.links.link_resolver import LinkResolver
+from crawler.metrics import CrawlMetrics, MetricsReporter, MetricsServer
+from crawler.pages.near_duplicates import NearDuplicateDetector
+from crawler.page_writers import PAGE_WRITERS
+from crawler.pages.page_fetcher import PageFetcher
+from crawler.pages.parse_pool import ParsePool
+from crawler.pages.transports import TRANSPORTS, HttpxTransport
+from crawler.pages.validation_cache import ValidationCache
+from crawler.profiling import CrawlProfiler
+from crawler.site_map import SiteMap
+from crawler.sitemap_seeder import SitemapSeeder
 
 
 class CLI:
     """Coordinating class to run the CLI
     """
+    OUTPUT_BUFFER_SIZE = 65536
+    COORDINATOR_PORT = 8700
+
     def run():
         """Execute the cli action
 
         Returns:
             None
         """
+        args = CLI._parse_args()
+
+        if args.verbose:
+            logging.basicConfig(level=logging.INFO)
+
+        link_resolver = None
+        if args.link_cache_size > 0:
+            link_resolver = LinkResolver(max_size=args.link_cache_size)
+
+        seen_filter = None
+        if args.expected_urls is not None:
+            seen_filter = BloomFilter(args.expected_urls, false_positive_rate=args.false_positive_rate)
+
+        validation_cache = None
+        if args.http_cache is not None:
+            validation_cache = ValidationCache(args.http_cache, max_entries=args.http_cache_size)
+
+        parse_pool = None
+        if args.parse_processes > 0:
+            parse_pool = ParsePool(args.parse_processes)
+
+        snapshot = None
+        if args.incremental is not None:
+            snapshot = CrawlSnapshot(args.incremental, resume=args.resume)
+
+        near_duplicates = None
+        if args.near_duplicates:
+            near_duplicates = NearDuplicateDetector(max_distance=args.near_duplicate_distance)
+
+        scheduler = None
+        if args.adaptive:
+            scheduler = HostScheduler(
+                floor=args.host_concurrency_floor,
+                ceiling=args.host_concurrency_ceiling or args.workers,
+            )
+
+        frontier = None
+        if args.max_depth is not None or args.max_pages is not None or args.prefix_budgets is not None:
+            frontier = Frontier(
+                max_depth=args.max_depth,
+                max_pages=args.max_pages,
+                prefix_budgets=dict(args.prefix_budgets or []),
+            )
+
+        crawl_store = None
+        site_map = None
+        if args.state is not None:
+            crawl_store = CLI._open_crawl_store(args)
+        elif args.site_map == "graph":
+            site_map = GraphSiteMap()
+        else:
+            site_map = SiteMap()
+
+        metrics = None
+        metrics_reporter = None
+        metrics_server = None
+        if args.metrics_file is not None or args.metrics_address is not None or args.progress:
+            metrics = CrawlMetrics()
+        if args.metrics_file is not None or args.progress:
+            metrics_reporter = MetricsReporter(
+                metrics,
+                interval=args.metrics_interval,
+                textfile=args.metrics_file,
+                progress=sys.stderr if args.progress else None,
+            )
+            metrics_reporter.start()
+        if args.metrics_address is not None:
+            metrics_server = MetricsServer(metrics, args.metrics_address)
+            metrics_server.start()
+
+        profiler = None
+        if args.profile_wall is not None or args.profile_memory is not None:
+            profiler = CrawlProfiler(
+                wall_path=args.profile_wall,
+                memory_path=args.profile_memory,
+                sample_interval=args.profile_sample_interval,
+                memory_every_pages=args.profile_memory_every,
+            )
+
+        output = CLI._open_output(args)
+        page_writer = PAGE_WRITERS[args.format](output)
+
+        if crawl_store is not None:
+            # Pages crawled before resuming were written last time, but the output may not have been kept
+            for page in crawl_store.all_pages():
+                page_writer.write(page)
+
+        if args.coordinate is not None:
+            crawler = Coordinator(args.domain, args.coordinate, site_map=site_map, on_page=page_writer.write)
+            crawler.listen(*args.listen)
+            crawler.crawl()
+        elif args.engine == "async":
+            crawler = AsyncCrawler(
+                args.domain,
+                concurrency=args.concurrency,
+                parse_in_executor=args.parse_in_executor,
+                max_connections_per_host=args.max_connections_per_host or 0,
+                keep_alive=args.keep_alive,
+                headers=args.headers,
+                stream_links=args.stream_links,
+                link_resolver=link_resolver,
+                site_map=site_map,
+                seen_filter=seen_filter,
+                seeder=SitemapSeeder(headers=args.headers) if args.sitemaps else None,
+                on_page=page_writer.write,
+                parse_pool=parse_pool,
+            )
+            crawler.crawl()
+        else:
+            page_fetcher = PageFetcher(
+                transport=TRANSPORTS[args.transport],
+                max_connections_per_host=args.max_connections_per_host or args.workers,
+                keep_alive=args.keep_alive,
+                headers=args.headers,
+                stream_links=args.stream_links,
+                link_resolver=link_resolver,
+                validation_cache=validation_cache,
+                snapshot=snapshot,
+                scheduler=scheduler,
+                html_only=not args.all_content_types,
+                max_body_size=args.max_page_size,
+                skip_extensions=PageFetcher.BINARY_EXTENSIONS if args.skip_binary_extensions else None,
+                parse_pool=parse_pool,
+                metrics=metrics,
+                near_duplicates=near_duplicates,
+            )
+            with page_fetcher:
+                if args.join is not None:
+                    worker = Worker(args.join, workers=args.workers, page_fetcher=page_fetcher)
+                    worker.run()
+                    logging.info("Crawled {} pages as shard {} of {}".format(
+                        worker.pages_crawled,
+                        worker.shard,
+                        worker.shard_count,
+                    ))
+                else:
+                    crawler = Crawler(
+                        args.domain,
+                        workers=args.workers,
+                        page_fetcher=page_fetcher,
+                        site_map=site_map,
+                        crawl_store=crawl_store,
+                        seen_filter=seen_filter,
+                        snapshot=snapshot,
+                        seeder=SitemapSeeder(
+                            page_fetcher.session,
+                            headers=args.headers,
+                            timeout=page_fetcher.timeout,
+                        ) if args.sitemaps else None,
+                        on_page=page_writer.write,
+                        metrics=metrics,
+                        profiler=profiler,
+                        frontier=frontier,
+                        resolve_redirects=args.resolve_redirects,
+                    )
+                    crawler.crawl()
+                    if args.resolve_redirects:
+                        logging.info("Redirects: {} links are aliases of the pages they redirect to".format(
+                            len(crawler.site_map.aliases()),
+                        ))
+
+        if metrics_reporter is not None:
+            metrics_reporter.stop()
+        if metrics_server is not None:
+            metrics_server.close()
+        if link_resolver is not None:
+            logging.info("Link cache: {} hits, {} misses".format(link_resolver.hits, link_resolver.misses))
+        if validation_cache is not None:
+            logging.info("HTTP cache: {} of {} pages not modified ({:.1%})".format(
+                validation_cache.hits,
+                validation_cache.lookups,
+                validation_cache.hit_rate(),
+            ))
+        if snapshot is not None:
+            logging.info("Incremental crawl: {} unchanged pages not parsed; {}".format(
+                snapshot.reused,
+                crawler.crawl_diff,
+            ))
+            if args.diff_output is not None:
+                with open(args.diff_output, "w") as diff_output:
+                    crawler.crawl_diff.write(diff_output)
+        if near_duplicates is not None:
+            logging.info("Near duplicates: {} of {} pages not parsed".format(
+                near_duplicates.near_duplicates,
+                near_duplicates.pages,
+            ))
+        if scheduler is not None:
+            for (domain, port), host_state in scheduler.host_states().items():
+                logging.info("Host {}:{}: {}".format(domain, port, host_state))
+        if frontier is not None:
+            logging.info("Frontier: {} links left, {} dropped for being too deep or over a prefix budget".format(
+                len(frontier),
+                frontier.dropped,
+            ))
+        if seen_filter is not None:
+            logging.info("Seen filter: {} urls, {:.1%} full, estimated false positive rate {:.4%}".format(
+                len(seen_filter),
+                seen_filter.fill_ratio(),
+                seen_filter.estimated_false_positive_rate(),
+            ))
+
+        if args.export_graph is not None:
+            node_count, page_count, edge_count = CrawlGraphFile.write(crawler.site_map, args.export_graph)
+            logging.info("Exported {} pages, {} urls and {} links to {}".format(
+                page_count,
+                node_count,
+                edge_count,
+                args.export_graph,
+            ))
+
+        if output is sys.stdout:
+            output.flush()
+        else:
+            output.close()
+
+        if crawl_store is not None:
+            crawl_store.close()
+        if validation_cache is not None:
+            validation_cache.close()
+        if snapshot is not None:
+            snapshot.close()
+        if parse_pool is not None:
+            parse_pool.close()
+
+    def _open_output(args):
+        """Open the file to write the pages to
+
+        Args:
+            args (argparse.Namespace): The parsed arguments
+
+        Returns:
+            file: The text file, stdout if no --output was given
+        """
+        if args.output is None:
+            return sys.stdout
+
+        return open(
+            args.output,
+            "w",
+            buffering=CLI.OUTPUT_BUFFER_SIZE,
+            newline="" if args.format == "csv" else None,
+        )
+
+    def _open_crawl_store(args):
+        """Open the crawl store, only carrying on with a crawl already in it if we were asked to resume
+
+        Args:
+            args (argparse.Namespace): The parsed arguments
+
+        Returns:
+            crawler.crawl_store.CrawlStore: The store
+        """
+        try:
+            crawl_store = CrawlStore(args.state, args.domain)
+        except CrawlStoreError as error:
+            sys.exit("Can't use --state: {}".format(error))
+
+        if not args.resume and not crawl_store.is_empty():
+            crawl_store.close()
+            sys.exit("{} already holds a crawl, use --resume to carry it on or remove it to start again".format(
+                args.state,
+            ))
+
+        return crawl_store
+
+    def _parse_args():
+        """Parse and validate the command line arguments
+
+        Returns:
+            argparse.Namespace: The parsed arguments
+        """
         parser = argparse.ArgumentParser(description="Simple one domain web crawler by Jonathan Harden")
 
         parser.add_argument(
             "domain",
-            help="Domain to crawl (will not leave the subdomain specified and will ignore any path part)",
+            nargs="?",
+            help="Domain to crawl (will not leave the subdomain specified and will ignore any path part), not given "
+                 "with --join",
         )
         parser.add_argument(
             "-v", "--verbose",
             action="store_true",
             help="Verbose, print INFO level logging",
         )
+        parser.add_argument(
+            "--format",
+            choices=sorted(PAGE_WRITERS),
+            default="text",
+            help="How to write each page and its links, they are written as soon as each page is crawled (default: "
+                 "text)",
+        )
+        parser.add_argument(
+            "-o", "--output",
+            metavar="FILE",
+            help="Write the pages to FILE instead of stdout",
+        )
+        parser.add_argument(
+            "--export-graph",
+            metavar="FILE",
+            help="Once the crawl has finished write the pages, their links and how they were fetched to FILE in a "
+                 "compact binary format which can be memory mapped (see crawler.graph_file.CrawlGraphFile)",
+        )
+        parser.add_argument(
+            "-w", "--workers",
+            type=int,
+            default=1,
+            help="Number of pages to fetch concurrently with the sync engine (default: 1, fetch one page at a time)",
+        )
+        parser.add_argument(
+            "--engine",
+            choices=["sync", "async"],
+            default="sync",
+            help="Crawl with worker threads (sync) or a single threaded asyncio event loop (async) (default: sync)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=100,
+            help="Maximum number of requests in flight at once with the async engine (default: 100)",
+        )
+        parser.add_argument(
+            "--parse-in-executor",
+            action="store_true",
+            help="Parse the pages in a thread pool rather than on the event loop, so a slow page doesn't hold up the "
+                 "requests in flight (async engine only)",
+        )
+        parser.add_argument(
+            "--max-depth",
+            type=int,
+            metavar="N",
+            help="Don't fetch pages more than N links from the start page (sync engine only)",
+        )
+        parser.add_argument(
+            "--max-pages",
+            type=int,
+            metavar="N",
+            help="Stop once N pages have been fetched, the shallowest first (sync engine only)",
+        )
+        parser.add_argument(
+            "--prefix-budget",
+            dest="prefix_budgets",
+            action="append",
+            type=CLI._parse_prefix_budget,
+            metavar="PREFIX=N",
+            help="Fetch at most N pages whose path is PREFIX or below it, e.g. /blog=1000, the longest PREFIX a path "
+                 "is under applies (may be given more than once, sync engine only)",
+        )
+        parser.add_argument(
+            "--adaptive",
+            action="store_true",
+            help="Adapt how many requests are in flight to each host to how it copes, backing off when it slows down "
+                 "or throttles (429/503, honouring Retry-After) and creeping back up when it doesn't "
+                 "(sync engine only)",
+        )
+        parser.add_argument(
+            "--host-concurrency-floor",
+            type=int,
+            default=1,
+            help="The fewest requests --adaptive keeps in flight to a host (default: 1)",
+        )
+        parser.add_argument(
+            "--host-concurrency-ceiling",
+            type=int,
+            help="The most requests --adaptive allows in flight to a host (default: --workers)",
+        )
+        parser.add_argument(
+            "--max-connections-per-host",
+            type=int,
+            help="Maximum number of pooled connections to each host (default: one per worker for the sync engine, "
+                 "only limited by --concurrency for the async engine)",
+        )
+        parser.add_argument(
+            "--transport",
+            choices=sorted(TRANSPORTS),
+            default="requests",
+            help="The HTTP client to fetch pages with: requests, a bare urllib3 connection pool, or httpx which "
+                 "negotiates HTTP/2 with https hosts and needs 'httpx[http2]' installed (sync engine only) "
+                 "(default: requests)",
+        )
+        parser.add_argument(
+            "--no-keep-alive",
+            dest="keep_alive",
+            action="store_false",
+            help="Open a new connection for every request instead of reusing them",
+        )
+        parser.add_argument(
+            "-H", "--header",
+            dest="headers",
+            action="append",
+            type=CLI._parse_header,
+            help="Extra header to send with every request, as 'Name: value' (may be given more than once)",
+        )
+        parser.add_argument(
+            "--stream-links",
+            action="store_true",
+            help="Extract the links from each page while it downloads instead of parsing the whole page afterwards",
+        )
+        parser.add_argument(
+            "--all-content-types",
+            action="store_true",
+            help="Download and parse every response, by default only those whose Content-Type is HTML are",
+        )
+        parser.add_argument(
+            "--max-page-size",
+            type=int,
+            metavar="BYTES",
+            help="Abandon downloading pages larger than this, they are kept without any links (sync engine only)",
+        )
+        parser.add_argument(
+            "--skip-binary-extensions",
+            action="store_true",
+            help="Don't request links to files which are never HTML by their extension (.pdf, .jpg, .zip, ...), they "
+                 "are kept without any links (sync engine only)",
+        )
+        parser.add_argument(
+            "--near-duplicates",
+            action="store_true",
+            help="Fingerprint the text of every page (SimHash) and don't parse or follow the links of pages which are "
+                 "near duplicates of a page already crawled, they are written with the page they duplicate (sync "
+                 "engine only)",
+        )
+        parser.add_argument(
+            "--near-duplicate-distance",
+            type=int,
+            default=3,
+            metavar="BITS",
+            help="How many bits of a page's 64 bit fingerprint may differ from another's for --near-duplicates to "
+                 "count it as a near duplicate (default: 3)",
+        )
+        parser.add_argument(
+            "--resolve-redirects",
+            action="store_true",
+            help="Don't fetch a page again when a redirect leads to one already crawled, only record the link as an "
+                 "alias of it. Pages are always kept under the link they were redirected to (sync engine only)",
+        )
+        parser.add_argument(
+            "--parse-processes",
+            type=int,
+            default=0,
+            metavar="N",
+            help="Parse the pages in N worker processes so parsing can use more than one core, use at least as many "
+                 "--workers (or --concurrency) to keep them busy (default: 0, parse on the fetching threads)",
+        )
+        parser.add_argument(
+            "--progress",
+            action="store_true",
+            help="Print how the crawl is going (pages, pages/s, bytes/s, frontier size and ETA) to stderr every "
+                 "--metrics-interval seconds (sync engine only)",
+        )
+        parser.add_argument(
+            "--metrics-file",
+            metavar="FILE",
+            help="Write the crawl's metrics (counters and a latency histogram for each stage of crawling a page) to "
+                 "FILE in the Prometheus text format every --metrics-interval seconds, e.g. for the node exporter's "
+                 "textfile collector (sync engine only)",
+        )
+        parser.add_argument(
+            "--metrics-address",
+            type=CLI._parse_address,
+            metavar="HOST:PORT",
+            help="Serve the crawl's metrics for Prometheus to scrape at http://HOST:PORT/metrics (sync engine only)",
+        )
+        parser.add_argument(
+            "--metrics-interval",
+            type=float,
+            default=10.0,
+            metavar="SECONDS",
+            help="How often to write --progress and --metrics-file (default: 10)",
+        )
+        parser.add_argument(
+            "--profile-wall",
+            "--profile-cpu",
+            dest="profile_wall",
+            metavar="FILE",
+            help="Sample every thread's stack and write the wall clock time charged to each function to FILE once the "
+                 "crawl finishes, the most first. Time waiting for responses is charged too (sync engine only)",
+        )
+        parser.add_argument(
+            "--profile-sample-interval",
+            type=float,
+            default=0.005,
+            metavar="SECONDS",
+            help="How often --profile-wall samples (default: 0.005)",
+        )
+        parser.add_argument(
+            "--profile-memory",
+            metavar="FILE",
+            help="Trace memory allocations, snapshotting every --profile-memory-every pages, and write the lines "
+                 "holding the most memory at each snapshot to FILE once the crawl finishes. Tracing slows the crawl "
+                 "down. (sync engine only)",
+        )
+        parser.add_argument(
+            "--profile-memory-every",
+            type=int,
+            default=1000,
+            metavar="N",
+            help="How many pages to crawl between --profile-memory snapshots (default: 1000)",
+        )
+        parser.add_argument(
+            "--coordinate",
+            type=int,
+            metavar="N",
+            help="Split the crawl between N workers started with --join, possibly on other machines, each crawling "
+                 "its own shard of the urls. This process only passes links between them and writes the pages.",
+        )
+        parser.add_argument(
+            "--listen",
+            type=CLI._parse_address,
+            default=("127.0.0.1", CLI.COORDINATOR_PORT),
+            metavar="HOST:PORT",
+            help="Where --coordinate waits for its workers (default: 127.0.0.1:{})".format(CLI.COORDINATOR_PORT),
+        )
+        parser.add_argument(
+            "--join",
+            type=CLI._parse_address,
+            metavar="HOST:PORT",
+            help="Crawl a shard of the urls for the --coordinate process listening at HOST:PORT, the fetching options "
+                 "(--workers, --header, ...) apply to this worker",
+        )
+        parser.add_argument(
+            "--link-cache-size",
+            type=int,
+            default=10000,
+            help="How many resolved hrefs to cache, hrefs repeated on many pages are only parsed once (default: "
+                 "10000, 0 disables the cache)",
+        )
+        parser.add_argument(
+            "--sitemaps",
+            action="store_true",
+            help="Before crawling fetch the sitemaps listed in robots.txt (or /sitemap.xml) and visit all the pages "
+                 "they list along with the links from the start page",
+        )
+        parser.add_argument(
+            "--site-map",
+            choices=["pages", "graph"],
+            help="Keep every crawled page in memory (pages) or only a compact graph of the links between them (graph), "
+                 "use graph for very large sites (default: pages)",
+        )
+        parser.add_argument(
+            "--state",
+            metavar="FILE",
+            help="Keep the crawl in an SQLite database, checkpointing as it goes so it can be resumed, rather than in "
+                 "memory (sync engine only)",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Carry on with the interrupted crawl in the --state database without fetching its pages again",
+        )
+        parser.add_argument(
+            "--expected-urls",
+            type=int,
+            metavar="N",
+            help="Track the urls already seen in a Bloom filter sized for N urls rather than an exact set of the urls "
+                 "waiting to be fetched, skipping a few pages (see --false-positive-rate). Every crawled page is still "
+                 "kept, use --site-map graph or --state to keep those in less memory",
+        )
+        parser.add_argument(
+            "--false-positive-rate",
+            type=float,
+            default=0.001,
+            help="The rate of unvisited urls the --expected-urls filter may wrongly report as seen once it holds N "
+                 "urls (default: 0.001)",
+        )
+        parser.add_argument(
+            "--http-cache",
+            metavar="FILE",
+            help="Remember the ETag/Last-Modified and links of every page in an SQLite database, pages already in it "
+                 "are only downloaded if the server says they have changed (sync engine only)",
+        )
+        parser.add_argument(
+            "--http-cache-size",
+            type=int,
+            default=100000,
+            help="The most pages to keep in the --http-cache, the least recently used are dropped (default: 100000)",
+        )
+        parser.add_argument(
+            "--incremental",
+            metavar="FILE",
+            help="Keep the results of each crawl in an SQLite database, pages whose body is the same as last time "
+                 "reuse last time's links instead of being parsed (sync engine only)",
+        )
+        parser.add_argument(
+            "--diff-output",
+            metavar="FILE",
+            help="Write the pages and links added and removed since the last --incremental crawl to FILE",
+        )
 
         args = parser.parse_args()
 
-        if args.verbose:
-            logging.basicConfig(level=logging.INFO)
+        if args.domain is None and args.join is None:
+            parser.error("the domain is required unless joining a distributed crawl with --join")
+
+        if args.workers < 1:
+            parser.error("--workers must be at least 1")
+        if args.concurrency < 1:
+            parser.error("--concurrency must be at least 1")
+        if args.link_cache_size < 0:
+            parser.error("--link-cache-size can't be negative")
+        if args.max_connections_per_host is not None and args.max_connections_per_host < 1:
+            parser.error("--max-connections-per-host must be at least 1")
+
+        if args.max_depth is not None and args.max_depth < 0:
+            parser.error("--max-depth can't be negative")
+        if args.max_pages is not None and args.max_pages < 1:
+            parser.error("--max-pages must be at least 1")
+        if (args.max_depth is not None or args.max_pages is not None or args.prefix_budgets is not None) and (
+                args.engine == "async" or args.state is not None or args.coordinate is not None
+                or args.join is not None):
+            parser.error("--max-depth, --max-pages and --prefix-budget need the sync engine, without --state, "
+                         "--coordinate or --join")
+
+        if args.adaptive and args.engine == "async":
+            parser.error("--adaptive can only be used with the sync engine")
+        if args.host_concurrency_floor < 1:
+            parser.error("--host-concurrency-floor must be at least 1")
+        if args.host_concurrency_ceiling is not None:
+            if args.host_concurrency_ceiling < args.host_concurrency_floor:
+                parser.error("--host-concurrency-ceiling can't be less than --host-concurrency-floor")
+            if args.host_concurrency_ceiling > args.workers:
+                parser.error("--host-concurrency-ceiling can't be more than --workers, they make the requests")
+        elif args.host_concurrency_floor > args.workers:
+            parser.error("--host-concurrency-floor can't be more than --workers, they make the requests")
+
+        if args.parse_in_executor and (args.engine != "async" or args.parse_processes > 0 or args.stream_links):
+            parser.error("--parse-in-executor needs the async engine, without --parse-processes or --stream-links")
+        if args.parse_processes < 0:
+            parser.error("--parse-processes can't be negative")
+        if args.parse_processes > 0 and args.stream_links:
+            parser.error("--parse-processes can't be used with --stream-links, the links are extracted as pages arrive")
+        if not 0 <= args.near_duplicate_distance <= 15:
+            parser.error("--near-duplicate-distance must be between 0 and 15")
+        if args.near_duplicates and (args.engine == "async" or args.stream_links):
+            parser.error("--near-duplicates needs the sync engine, without --stream-links")
+        if args.transport != "requests" and args.engine == "async":
+            parser.error("--transport can only be used with the sync engine")
+        if args.transport == "httpx" and not HttpxTransport.is_available():
+            parser.error("--transport httpx needs httpx with HTTP/2 support, pip install 'httpx[http2]'")
+        if args.resolve_redirects and (args.engine == "async" or args.coordinate is not None or args.join is not None):
+            parser.error("--resolve-redirects needs the sync engine, without --coordinate or --join")
+        if args.max_page_size is not None and args.max_page_size < 1:
+            parser.error("--max-page-size must be at least 1")
+        if args.engine == "async" and (args.all_content_types or args.max_page_size or args.skip_binary_extensions):
+            parser.error("--all-content-types, --max-page-size and --skip-binary-extensions need the sync engine")
+
+        if args.expected_urls is not None and args.expected_urls < 1:
+            parser.error("--expected-urls must be at least 1")
+        if not 0 < args.false_positive_rate < 1:
+            parser.error("--false-positive-rate must be between 0 and 1")
+        if args.http_cache_size < 1:
+            parser.error("--http-cache-size must be at least 1")
+        if args.http_cache is not None and args.engine == "async":
+            parser.error("--http-cache can only be used with the sync engine")
+        if args.incremental is not None and args.engine == "async":
+            parser.error("--incremental can only be used with the sync engine")
+        if args.diff_output is not None and args.incremental is None:
+            parser.error("--diff-output needs --incremental")
+        if args.resume and args.state is None:
+            parser.error("--resume needs --state")
+        if args.state is not None and args.engine == "async":
+            parser.error("--state can only be used with the sync engine")
+        if args.state is not None and args.site_map is not None:
+            parser.error("--state keeps the site map in its database, it can't be used with --site-map")
+
+        if args.metrics_interval <= 0:
+            parser.error("--metrics-interval must be more than 0")
+        if (args.progress or args.metrics_file is not None or args.metrics_address is not None) and (
+                args.engine == "async" or args.coordinate is not None):
+            parser.error("--progress, --metrics-file and --metrics-address need the sync engine, without --coordinate")
+
+        if args.profile_sample_interval <= 0:
+            parser.error("--profile-sample-interval must be more than 0")
+        if args.profile_memory_every < 1:
+            parser.error("--profile-memory-every must be at least 1")
+        if (args.profile_wall is not None or args.profile_memory is not None) and (
+                args.engine == "async" or args.coordinate is not None or args.join is not None):
+            parser.error("--profile-wall and --profile-memory need the sync engine, without --coordinate or --join")
 
-        crawler = Crawler(args.domain)
-        crawler.crawl()
+        if args.coordinate is not None and args.coordinate < 1:
+            parser.error("--coordinate must be at least 1")
+        if args.coordinate is not None and args.join is not None:
+            parser.error("--coordinate and --join can't be used together, start the workers separately")
+        if args.join is not None and args.domain is not None:
+            parser.error("--join crawls the domain given to the --coordinate process, don't give one")
+        if args.join is not None and args.engine == "async":
+            parser.error("--join can only be used with the sync engine")
+        distributed_option = "--coordinate" if args.coordinate is not None else "--join"
+        if (args.coordinate is not None or args.join is not None) and (
+                args.state is not None or args.incremental is not None or args.sitemaps
+                or args.expected_urls is not None):
+            parser.error("{} can't be used with --state, --incremental, --sitemaps or --expected-urls".format(
+                distributed_option,
+            ))
+        if args.join is not None and (args.export_graph is not None or args.site_map is not None):
+            parser.error("--join sends its pages to the --coordinate process, use --export-graph and --site-map there")
 
-        for page in crawler.site_map.all_pages():
-            print("Page: {}".format(page.link))
-            print("    Outbound Links:")
-            for out_link in set(page.out_links):
-                print("        {}".format(out_link))
+        if args.headers is not None:
+            args.headers = dict(args.headers)
+
+        return args
+
+    def _parse_address(address):
+        """Parse a host and port given on the command line
+
+        Args:
+            address (string): The address as 'host:port'
+
+        Returns:
+            tuple(host: str, port: int): The host and port
+
+        Raises:
+            argparse.ArgumentTypeError: If the address has no port or the port isn't a number
+        """
+        host, _, port = address.rpartition(":")
+        if host == "" or not port.isdigit():
+            raise argparse.ArgumentTypeError("Address must be given as 'host:port', got '{}'".format(address))
+
+        return (host, int(port))
+
+    def _parse_prefix_budget(prefix_budget):
+        """Parse a path prefix's page budget given on the command line
+
+        Args:
+            prefix_budget (string): The budget as 'prefix=pages'
+
+        Returns:
+            tuple(prefix: str, pages: int): The path prefix and the most pages to fetch under it
+
+        Raises:
+            argparse.ArgumentTypeError: If there is no prefix or the pages isn't a number
+        """
+        prefix, _, pages = prefix_budget.rpartition("=")
+        if not prefix.startswith("/") or not pages.isdigit():
+            raise argparse.ArgumentTypeError("Prefix budget must be given as '/prefix=pages', got '{}'".format(
+                prefix_budget,
+            ))
+
+        return (prefix, int(pages))
+
+    def _parse_header(header):
+        """Parse a header given on the command line
+
+        Args:
+            header (string): The header as 'Name: value'
+
+        Returns:
+            tuple(name: str, value: str): The header name and value
+
+        Raises:
+            argparse.ArgumentTypeError: If the header has no name
+        """
+        name, _, value = header.partition(":")
+        if name.strip() == "":
+            raise argparse.ArgumentTypeError("Header must be given as 'Name: value', got '{}'".format(header))
 
-            print("\n\n")
+        return (name.strip(), value.strip())
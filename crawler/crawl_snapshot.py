@@ -0,0 +1,293 @@
+import hashlib
+import sqlite3
+import threading
+
+
+class CrawlDiff:
+    """The differences between a crawl and the one before it
+
+        Attributes:
+            added_pages (list): The urls of the pages which weren't in the previous crawl
+            removed_pages (list): The urls of the pages from the previous crawl which are gone: fetched again and not
+                found (404 or 410), or, if the crawl was complete, no longer linked to
+            added_links (list): tuple(from url, to url) for links which weren't in the previous crawl
+            removed_links (list): tuple(from url, to url) for links from the previous crawl which weren't found
+            changed_pages (int): How many pages in both crawls have a different fingerprint
+            unchanged_pages (int): How many pages in both crawls have the same fingerprint
+    """
+    def __init__(self, added_pages, removed_pages, added_links, removed_links, changed_pages, unchanged_pages):
+        self.added_pages = added_pages
+        self.removed_pages = removed_pages
+        self.added_links = added_links
+        self.removed_links = removed_links
+        self.changed_pages = changed_pages
+        self.unchanged_pages = unchanged_pages
+
+    def write(self, output):
+        """Write the diff, one change per line, prefixed with + for additions and - for removals
+
+            Args:
+                output (file): The text file to write to
+        """
+        for url in self.added_pages:
+            output.write("+page {}\n".format(url))
+        for url in self.removed_pages:
+            output.write("-page {}\n".format(url))
+        for from_url, to_url in self.added_links:
+            output.write("+link {} -> {}\n".format(from_url, to_url))
+        for from_url, to_url in self.removed_links:
+            output.write("-link {} -> {}\n".format(from_url, to_url))
+
+    def __repr__(self):
+        return "{} pages added, {} removed, {} changed, {} unchanged; {} links added, {} removed".format(
+            len(self.added_pages),
+            len(self.removed_pages),
+            self.changed_pages,
+            self.unchanged_pages,
+            len(self.added_links),
+            len(self.removed_links),
+        )
+
+
+class CrawlSnapshot:
+    """The results of the previous crawl of a site, kept in an SQLite database, for crawling it again incrementally.
+
+       Each page's body is fingerprinted, if it is identical to last time the out links recorded last time are used
+       rather than parsing it again. The pages of the new crawl are recorded as it goes, when it finishes they are
+       compared with the previous crawl and replace it. The pages of a crawl cut short (by a page or depth budget)
+       replace only the pages they fetched again, the rest are kept from the previous crawl.
+
+       previous_out_link_urls is safe to call from any thread, the rest only from the crawling thread.
+
+        Attributes:
+            reused (int): How many pages were not parsed because their fingerprint matched the previous crawl
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS {prefix}pages (
+            key TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            fingerprint BLOB,
+            out_links TEXT NOT NULL,
+            status_code INTEGER,
+            duplicate_of TEXT
+        );
+        CREATE TABLE IF NOT EXISTS {prefix}links (
+            from_key TEXT NOT NULL,
+            to_key TEXT NOT NULL,
+            to_url TEXT NOT NULL,
+            PRIMARY KEY (from_key, to_key)
+        ) WITHOUT ROWID;
+    """
+    # Columns added since the first version of the schema, added to the tables of older snapshots when opened
+    ADDED_COLUMNS = (("status_code", "INTEGER"), ("duplicate_of", "TEXT"))
+    # The statuses of a page which has been removed
+    GONE_STATUS_CODES = (404, 410)
+    reused = 0
+
+    def __init__(self, path, resume=False):
+        """Initialiser, opens the snapshot creating it if it doesn't exist
+
+            Args:
+                path (string): The path of the database file
+                resume (bool): Keep the pages already recorded by an unfinished crawl, otherwise they are forgotten
+        """
+        self.reused = 0
+        self._lock = threading.Lock()
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(CrawlSnapshot.SCHEMA.format(prefix=""))
+        self._connection.executescript(CrawlSnapshot.SCHEMA.format(prefix="current_"))
+        for table in ("pages", "current_pages"):
+            self._add_missing_columns(table)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+
+        if not resume:
+            with self._connection:
+                self._connection.execute("DELETE FROM current_pages")
+                self._connection.execute("DELETE FROM current_links")
+
+    def fingerprint(body):
+        """Fingerprint a page body
+
+            Args:
+                body (bytes): The body
+
+            Returns:
+                bytes: The fingerprint
+        """
+        return CrawlSnapshot.fingerprinter(body).digest()
+
+    def fingerprinter(body=b""):
+        """Get a hash object for fingerprinting a body a chunk at a time
+
+            Args:
+                body (bytes): The start of the body
+
+            Returns:
+                hashlib.blake2b: The hash object, its digest is the fingerprint
+        """
+        return hashlib.blake2b(body, digest_size=16)
+
+    def previous_out_link_urls(self, link, fingerprint):
+        """Get the out links of a page from the previous crawl, if the page hasn't changed
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                fingerprint (bytes): The fingerprint of the page's body now
+
+            Returns:
+                list: The urls of the out links, or None if the page has changed (or wasn't in the previous crawl)
+        """
+        previous_page = self.previous_page(link, fingerprint)
+
+        return None if previous_page is None else previous_page[0]
+
+    def previous_page(self, link, fingerprint):
+        """Get the out links of a page from the previous crawl and the page it was a near duplicate of, if the page
+           hasn't changed
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                fingerprint (bytes): The fingerprint of the page's body now
+
+            Returns:
+                tuple(out_link_urls: list, duplicate_of_url: string): The urls of the out links and the url of the page
+                    it was a near duplicate of (None if it wasn't one), or None if the page has changed (or wasn't in
+                    the previous crawl)
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT out_links, duplicate_of FROM pages WHERE key = ? AND fingerprint = ?",
+                (link.normalised_netloc_and_path, fingerprint),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            self.reused += 1
+
+        out_links, duplicate_of = row
+
+        return (out_links.split("\n") if out_links != "" else [], duplicate_of)
+
+    def record(self, page):
+        """Record a page of the current crawl
+
+            Args:
+                page (crawler.pages.page.Page): The page, if it has no fingerprint (because its body was never
+                    downloaded) the previous crawl's fingerprint is kept
+        """
+        key = page.link.normalised_netloc_and_path
+        fingerprint = page.fingerprint
+
+        with self._lock, self._connection:
+            if fingerprint is None:
+                row = self._connection.execute("SELECT fingerprint FROM pages WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    fingerprint = row[0]
+
+            self._connection.execute(
+                "INSERT OR REPLACE INTO current_pages (key, url, fingerprint, out_links, status_code, duplicate_of) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    page.link.url,
+                    fingerprint,
+                    "\n".join(out_link.url for out_link in page.out_links),
+                    page.status_code,
+                    None if page.duplicate_of is None else page.duplicate_of.url,
+                ),
+            )
+            self._connection.execute("DELETE FROM current_links WHERE from_key = ?", (key,))
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO current_links (from_key, to_key, to_url) VALUES (?, ?, ?)",
+                [(key, out_link.normalised_netloc_and_path, out_link.url) for out_link in page.out_links],
+            )
+
+    def finish(self, complete=True):
+        """Compare the current crawl with the previous one, then make the current crawl the previous one
+
+            Args:
+                complete (bool): Whether the crawl fetched every page it found. If it was cut short a page it didn't
+                    reach isn't removed, only pages it fetched again and didn't find are, and the previous crawl's
+                    pages it didn't reach are kept for next time.
+
+            Returns:
+                CrawlDiff: The differences from the previous crawl
+        """
+        gone = "SELECT key FROM current_pages WHERE status_code IN ({})".format(
+            ", ".join(str(status_code) for status_code in CrawlSnapshot.GONE_STATUS_CODES),
+        )
+        if complete:
+            removed = "key NOT IN (SELECT key FROM current_pages) OR key IN ({})".format(gone)
+        else:
+            removed = "key IN ({})".format(gone)
+
+        with self._lock, self._connection:
+            diff = CrawlDiff(
+                self._urls(
+                    "SELECT url FROM current_pages WHERE key NOT IN (SELECT key FROM pages) ORDER BY url",
+                ),
+                self._urls("SELECT url FROM pages WHERE {} ORDER BY url".format(removed)),
+                self._connection.execute(
+                    "SELECT pages.url, links.to_url FROM current_links AS links "
+                    "JOIN current_pages AS pages ON pages.key = links.from_key "
+                    "WHERE NOT EXISTS (SELECT 1 FROM links AS previous "
+                    "WHERE previous.from_key = links.from_key AND previous.to_key = links.to_key) "
+                    "ORDER BY pages.url, links.to_url"
+                ).fetchall(),
+                self._connection.execute(
+                    "SELECT previous_pages.url, previous.to_url FROM links AS previous "
+                    "JOIN pages AS previous_pages ON previous_pages.key = previous.from_key "
+                    "WHERE NOT EXISTS (SELECT 1 FROM current_links AS links "
+                    "WHERE links.from_key = previous.from_key AND links.to_key = previous.to_key) "
+                    # The links of a page which wasn't fetched again haven't been seen, not removed
+                    + ("" if complete else "AND previous.from_key IN (SELECT key FROM current_pages) ")
+                    + "ORDER BY previous_pages.url, previous.to_url"
+                ).fetchall(),
+                self._count(
+                    "SELECT COUNT(*) FROM current_pages JOIN pages ON pages.key = current_pages.key "
+                    "WHERE current_pages.fingerprint IS NOT pages.fingerprint"
+                ),
+                self._count(
+                    "SELECT COUNT(*) FROM current_pages JOIN pages ON pages.key = current_pages.key "
+                    "WHERE current_pages.fingerprint IS pages.fingerprint"
+                ),
+            )
+
+            if complete:
+                self._connection.execute("DELETE FROM pages")
+                self._connection.execute("DELETE FROM links")
+            else:
+                self._connection.execute("DELETE FROM pages WHERE key IN (SELECT key FROM current_pages)")
+                self._connection.execute("DELETE FROM links WHERE from_key IN (SELECT key FROM current_pages)")
+            self._connection.execute("INSERT INTO pages SELECT * FROM current_pages")
+            self._connection.execute("INSERT INTO links SELECT * FROM current_links")
+            self._connection.execute("DELETE FROM current_pages")
+            self._connection.execute("DELETE FROM current_links")
+
+        return diff
+
+    def close(self):
+        """Close the database
+        """
+        self._connection.close()
+
+    def _add_missing_columns(self, table):
+        """Add the columns added since a snapshot was created to one of its tables
+
+            Args:
+                table (string): The name of the table
+        """
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info({})".format(table))}
+        with self._connection:
+            for column, column_type in CrawlSnapshot.ADDED_COLUMNS:
+                if column not in columns:
+                    self._connection.execute("ALTER TABLE {} ADD COLUMN {} {}".format(table, column, column_type))
+
+    def _urls(self, query):
+        return [url for url, in self._connection.execute(query)]
+
+    def _count(self, query):
+        return self._connection.execute(query).fetchone()[0]
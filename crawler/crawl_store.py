@@ -0,0 +1,421 @@
+import sqlite3
+
+from crawler.links.link import BasePage, Link
+from crawler.pages.page import Page
+
+
+class CrawlStoreError(Exception):
+    pass
+
+
+class CrawlStore:
+    """Keeps a crawl on disk in an SQLite database so it can be resumed after it is interrupted, and so neither the
+       pages visited nor the links still to visit are limited by memory.
+
+       Acts as the site map of the crawl (it has the same interface as crawler.site_map.SiteMap) and also holds the
+       frontier, the links still to visit. Every batch of pages is written in a single transaction along with the
+       frontier changes it causes, so the database always holds a consistent checkpoint.
+
+       Note: Not safe to share between threads, only use it from the crawling thread.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS crawl (
+            start_url TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS urls (
+            id INTEGER PRIMARY KEY,
+            key TEXT NOT NULL UNIQUE,
+            url TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS pages (
+            url_id INTEGER PRIMARY KEY,
+            status_code INTEGER,
+            body_size INTEGER,
+            fetch_time REAL
+        );
+        CREATE TABLE IF NOT EXISTS out_links (
+            page_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            url_id INTEGER NOT NULL,
+            PRIMARY KEY (page_id, position)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS duplicates (
+            url_id INTEGER PRIMARY KEY,
+            canonical_url_id INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS aliases (
+            url_id INTEGER PRIMARY KEY,
+            canonical_url_id INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS aliases_canonical ON aliases (canonical_url_id);
+        CREATE TABLE IF NOT EXISTS frontier (
+            url_id INTEGER PRIMARY KEY,
+            level INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS frontier_level ON frontier (level, url_id);
+    """
+    # Columns added to tables since the first version of the schema, added to older stores when they are opened
+    ADDED_COLUMNS = (
+        ("pages", "status_code", "INTEGER"),
+        ("pages", "body_size", "INTEGER"),
+        ("pages", "fetch_time", "REAL"),
+    )
+
+    def __init__(self, path, start_url):
+        """Initialiser, opens the store creating it if it doesn't exist
+
+            Args:
+                path (string): The path of the database file
+                start_url (string): The url the crawl starts from, used to rebuild the links in the frontier
+
+            Raises:
+                CrawlStoreError: If the store holds a crawl which started from a different url
+        """
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(CrawlStore.SCHEMA)
+        self._add_missing_columns()
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+
+        self._start_base_page = BasePage(start_url)
+
+        stored_start_url = self._connection.execute("SELECT start_url FROM crawl").fetchone()
+        if stored_start_url is None:
+            with self._connection:
+                self._connection.execute("INSERT INTO crawl (start_url) VALUES (?)", (start_url,))
+        elif stored_start_url[0] != start_url:
+            raise CrawlStoreError("{} holds a crawl of {}, not {}".format(path, stored_start_url[0], start_url))
+
+    def is_empty(self):
+        """Has nothing been crawled yet
+
+            Returns:
+                bool: True if there are no pages and no links to visit
+        """
+        return len(self) == 0 and self.frontier_size() == 0
+
+    def link_already_visited(self, link):
+        """Has a link already been visited
+
+            Args:
+                link (crawler.links.link.Link): The link to check
+
+            Returns:
+                bool: True if link already visited, or is an alias of a visited page
+        """
+        row = self._connection.execute(
+            "SELECT 1 FROM urls WHERE urls.key = ? AND ("
+            "EXISTS (SELECT 1 FROM pages WHERE pages.url_id = urls.id) OR "
+            "EXISTS (SELECT 1 FROM aliases WHERE aliases.url_id = urls.id))",
+            (link.normalised_netloc_and_path,),
+        ).fetchone()
+
+        return row is not None
+
+    def page_for_link(self, link):
+        """Get the page for an already visited link
+
+            Note: The page is rebuilt from the store, it has no page text
+
+            Args:
+                link (crawler.links.link.Link): The link for the page to return, or an alias of it
+
+            Returns:
+                crawler.pages.page.Page: The visited page
+
+            Raises:
+                KeyError: If the link hasn't been visited
+        """
+        row = self._connection.execute(
+            "SELECT urls.id, urls.url, pages.status_code, pages.body_size, pages.fetch_time "
+            "FROM urls JOIN pages ON pages.url_id = urls.id WHERE urls.id = ("
+            "SELECT COALESCE(aliases.canonical_url_id, link_urls.id) FROM urls AS link_urls "
+            "LEFT JOIN aliases ON aliases.url_id = link_urls.id WHERE link_urls.key = ?)",
+            (link.normalised_netloc_and_path,),
+        ).fetchone()
+
+        if row is None:
+            raise KeyError(link)
+
+        return self._page_for_row(*row)
+
+    def add_page(self, page):
+        """Add a single page to the site map
+
+            Args:
+                page (crawler.pages.page.Page): The page to add
+        """
+        self.add_pages([page], [], None)
+
+    def add_pages(self, pages, links_to_visit, level):
+        """Add a batch of pages, and the links they lead to which still need visiting, in one transaction
+
+            Args:
+                pages (list): crawler.pages.page.Page instances which have been visited, they are removed from the
+                    frontier
+                links_to_visit (iterable): crawler.links.link.Link instances to add to the frontier, those already
+                    visited or already in the frontier are ignored
+                level (int): The crawl level of the links to visit
+        """
+        with self._connection:
+            for page in pages:
+                page_id = self._intern(page.link)
+                # Updated rather than replaced so the page keeps its place in the order pages were added
+                self._connection.execute("INSERT OR IGNORE INTO pages (url_id) VALUES (?)", (page_id,))
+                self._connection.execute(
+                    "UPDATE pages SET status_code = ?, body_size = ?, fetch_time = ? WHERE url_id = ?",
+                    (page.status_code, page.body_size, page.fetch_time, page_id),
+                )
+                self._connection.execute("DELETE FROM out_links WHERE page_id = ?", (page_id,))
+                self._connection.executemany(
+                    "INSERT INTO out_links (page_id, position, url_id) VALUES (?, ?, ?)",
+                    [(page_id, position, self._intern(link)) for position, link in enumerate(page.out_links)],
+                )
+                self._connection.execute("DELETE FROM duplicates WHERE url_id = ?", (page_id,))
+                if page.duplicate_of is not None:
+                    self._connection.execute(
+                        "INSERT INTO duplicates (url_id, canonical_url_id) VALUES (?, ?)",
+                        (page_id, self._intern(page.duplicate_of)),
+                    )
+                self._connection.execute("DELETE FROM frontier WHERE url_id = ?", (page_id,))
+                if page.aliases is not None:
+                    self._add_aliases(page_id, page.aliases)
+
+            for link in links_to_visit:
+                self._connection.execute(
+                    "INSERT OR IGNORE INTO frontier (url_id, level) "
+                    "SELECT :url_id, :level WHERE NOT EXISTS (SELECT 1 FROM pages WHERE url_id = :url_id) "
+                    "AND NOT EXISTS (SELECT 1 FROM aliases WHERE url_id = :url_id)",
+                    {"url_id": self._intern(link), "level": level},
+                )
+
+    def add_aliases(self, link, aliases):
+        """Record links which redirect to a page, they count as visited from now on and are removed from the
+           frontier
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                aliases (list): crawler.links.link.Link instances which redirect to it
+        """
+        with self._connection:
+            self._add_aliases(self._intern(link), aliases)
+
+    def all_pages(self):
+        """ Get all pages in the sitemap
+
+            Returns:
+                iterator: crawler.pages.page.Page instances, rebuilt from the store one at a time
+        """
+        rows = self._connection.execute(
+            "SELECT urls.id, urls.url, pages.status_code, pages.body_size, pages.fetch_time "
+            "FROM pages JOIN urls ON urls.id = pages.url_id ORDER BY pages.rowid"
+        ).fetchall()
+
+        return (self._page_for_row(*row) for row in rows)
+
+    def duplicate_of(self, link):
+        """Get which page a visited page is a near duplicate of
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+
+            Returns:
+                crawler.links.link.Link: The link of the canonical page, None if the page isn't a near duplicate
+        """
+        row = self._connection.execute(
+            "SELECT canonical_urls.url FROM urls "
+            "JOIN duplicates ON duplicates.url_id = urls.id "
+            "JOIN urls AS canonical_urls ON canonical_urls.id = duplicates.canonical_url_id "
+            "WHERE urls.key = ?",
+            (link.normalised_netloc_and_path,),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        return Link(self._start_base_page, row[0])
+
+    def near_duplicates(self):
+        """Get every near duplicate page and the page it duplicates
+
+            Returns:
+                list: tuple(link: crawler.links.link.Link, canonical link: crawler.links.link.Link)
+        """
+        rows = self._connection.execute(
+            "SELECT urls.url, canonical_urls.url FROM duplicates "
+            "JOIN urls ON urls.id = duplicates.url_id "
+            "JOIN urls AS canonical_urls ON canonical_urls.id = duplicates.canonical_url_id "
+            "ORDER BY duplicates.url_id"
+        )
+
+        return [
+            (Link(self._start_base_page, url), Link(self._start_base_page, canonical_url))
+            for url, canonical_url in rows
+        ]
+
+    def alias_of(self, link):
+        """Get which page a link redirects to
+
+            Args:
+                link (crawler.links.link.Link): The link
+
+            Returns:
+                crawler.links.link.Link: The link of the page it redirects to, None if it isn't a known alias
+        """
+        row = self._connection.execute(
+            "SELECT canonical_urls.url FROM urls "
+            "JOIN aliases ON aliases.url_id = urls.id "
+            "JOIN urls AS canonical_urls ON canonical_urls.id = aliases.canonical_url_id "
+            "WHERE urls.key = ?",
+            (link.normalised_netloc_and_path,),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        return Link(self._start_base_page, row[0])
+
+    def aliases(self):
+        """Get every alias and the page it redirects to
+
+            Returns:
+                list: tuple(alias: crawler.links.link.Link, link: crawler.links.link.Link)
+        """
+        rows = self._connection.execute(
+            "SELECT urls.url, canonical_urls.url FROM aliases "
+            "JOIN urls ON urls.id = aliases.url_id "
+            "JOIN urls AS canonical_urls ON canonical_urls.id = aliases.canonical_url_id "
+            "ORDER BY aliases.rowid"
+        )
+
+        return [
+            (Link(self._start_base_page, url), Link(self._start_base_page, canonical_url))
+            for url, canonical_url in rows
+        ]
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def frontier_size(self):
+        """How many links are waiting to be visited
+
+            Returns:
+                int: The number of links in the frontier
+        """
+        return self._connection.execute("SELECT COUNT(*) FROM frontier").fetchone()[0]
+
+    def next_frontier_level(self):
+        """The lowest crawl level with links left to visit
+
+            Returns:
+                int: The level, or None if the frontier is empty
+        """
+        return self._connection.execute("SELECT MIN(level) FROM frontier").fetchone()[0]
+
+    def frontier_batch(self, level, size):
+        """Get a batch of the links waiting to be visited at a level, they stay in the frontier until their pages
+           are added
+
+            Args:
+                level (int): The crawl level
+                size (int): The most links to return
+
+            Returns:
+                list: crawler.links.link.Link instances
+        """
+        rows = self._connection.execute(
+            "SELECT urls.url FROM frontier JOIN urls ON urls.id = frontier.url_id "
+            "WHERE frontier.level = ? ORDER BY frontier.url_id LIMIT ?",
+            (level, size),
+        )
+
+        return [Link(self._start_base_page, url) for url, in rows]
+
+    def close(self):
+        """Close the database
+        """
+        self._connection.close()
+
+    def _intern(self, link):
+        """Get the id for a link, adding it to the urls table if it isn't there
+
+            Args:
+                link (crawler.links.link.Link): The link
+
+            Returns:
+                int: The id of the link
+        """
+        self._connection.execute(
+            "INSERT OR IGNORE INTO urls (key, url) VALUES (?, ?)",
+            (link.normalised_netloc_and_path, link.url),
+        )
+
+        return self._connection.execute(
+            "SELECT id FROM urls WHERE key = ?",
+            (link.normalised_netloc_and_path,),
+        ).fetchone()[0]
+
+    def _add_aliases(self, page_id, aliases):
+        """Record links which redirect to a page and remove them from the frontier, within a transaction
+
+            Args:
+                page_id (int): The id of the page's url
+                aliases (list): crawler.links.link.Link instances which redirect to it
+        """
+        for alias in aliases:
+            alias_id = self._intern(alias)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO aliases (url_id, canonical_url_id) VALUES (?, ?)",
+                (alias_id, page_id),
+            )
+            self._connection.execute("DELETE FROM frontier WHERE url_id = ?", (alias_id,))
+
+    def _add_missing_columns(self):
+        """Add the columns added since the store was created to its tables
+        """
+        with self._connection:
+            for table, column, column_type in CrawlStore.ADDED_COLUMNS:
+                columns = {row[1] for row in self._connection.execute("PRAGMA table_info({})".format(table))}
+                if column not in columns:
+                    self._connection.execute("ALTER TABLE {} ADD COLUMN {} {}".format(table, column, column_type))
+
+    def _page_for_row(self, page_id, url, status_code, body_size, fetch_time):
+        """Rebuild a visited page
+
+            Args:
+                page_id (int): The id of the page's url
+                url (string): The url of the page
+                status_code (int): The HTTP status of the page's response, None if it wasn't fetched
+                body_size (int): How many bytes of the body were downloaded, None if it wasn't fetched
+                fetch_time (float): How many seconds fetching the page took, None if it wasn't fetched
+
+            Returns:
+                crawler.pages.page.Page: The page, with no page text
+        """
+        base_page = BasePage(url)
+        out_link_urls = self._connection.execute(
+            "SELECT urls.url FROM out_links JOIN urls ON urls.id = out_links.url_id "
+            "WHERE out_links.page_id = ? ORDER BY out_links.position",
+            (page_id,),
+        )
+
+        page = Page(
+            Link(self._start_base_page, url),
+            None,
+            out_links=[Link(base_page, out_link_url) for out_link_url, in out_link_urls],
+        )
+        page.status_code = status_code
+        page.body_size = body_size
+        page.fetch_time = fetch_time
+        page.duplicate_of = self.duplicate_of(page.link)
+        alias_urls = [
+            alias_url for alias_url, in self._connection.execute(
+                "SELECT urls.url FROM aliases JOIN urls ON urls.id = aliases.url_id "
+                "WHERE aliases.canonical_url_id = ? ORDER BY aliases.rowid",
+                (page_id,),
+            )
+        ]
+        if alias_urls:
+            page.aliases = [Link(base_page, alias_url) for alias_url in alias_urls]
+
+        return page
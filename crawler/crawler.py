@@ -1,58 +1,364 @@
 import logging
+import time
 
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+from crawler.frontier import Frontier
 from crawler.site_map import SiteMap
 from crawler.links.link import Link
+from crawler.pages.page import Page
 from crawler.pages.page_fetcher import PageFetcher
+from crawler.pages.transports import TransportError
 
 
 class Crawler:
-    """Crawls the given domain
+    """Crawls the given domain, fetching the links in the frontier (crawler.frontier.Frontier) best first and keeping
+       every worker busy, a new fetch starts as soon as one finishes
 
         Attributes:
             site_map: The site map of the crawled domain.
+            seen_filter: The filter of links already seen, if the crawler was given one
+            crawl_diff: The differences from the previous crawl once the crawl has finished, if the crawler was given
+                a snapshot of it
     """
     site_map = None
+    seen_filter = None
+    crawl_diff = None
 
-    def __init__(self, start_domain):
+    def __init__(self, start_domain, workers=1, page_fetcher=None, site_map=None, crawl_store=None,
+                 batch_size=1000, seen_filter=None, snapshot=None, seeder=None, on_page=None, metrics=None,
+                 profiler=None, frontier=None, resolve_redirects=False):
         """Initialiser
 
             Args:
                 start_domain (string): The domain to start crawling
+                workers (int): How many pages to fetch concurrently, 1 fetches the pages one at a time without
+                    starting any threads
+                page_fetcher (crawler.pages.page_fetcher.PageFetcher): The fetcher shared by all the workers, by
+                    default one is created with a connection for each worker
+                site_map: The site map to add the crawled pages to, by default a crawler.site_map.SiteMap
+                crawl_store (crawler.crawl_store.CrawlStore): Keep the crawl on disk, checkpointing after every batch
+                    of pages. If the store already holds a crawl it is resumed. The store is also the site map.
+                batch_size (int): How many links to take from the crawl store's frontier at a time
+                seen_filter (crawler.bloom_filter.BloomFilter): Track the links already seen in this probabilistic
+                    filter rather than a set of the links waiting to be fetched, but (at the filter's false positive
+                    rate) skipping some pages which haven't been visited. The site map still keeps every page crawled
+                    and the frontier every link waiting, so only the memory of that set is saved.
+                snapshot (crawler.crawl_snapshot.CrawlSnapshot): The previous crawl, every page crawled is recorded in
+                    it and when the crawl finishes crawl_diff is set to the differences from the previous crawl. Give
+                    the same snapshot to the page fetcher to skip parsing pages which haven't changed.
+                seeder (crawler.sitemap_seeder.SitemapSeeder): Find pages to visit from the site's sitemaps before
+                    crawling, they are visited along with the links from the start page
+                on_page (callable): Called with each page as soon as it has been added to the site map, always from
+                    the thread which called crawl
+                metrics (crawler.metrics.CrawlMetrics): Count the pages and bytes crawled, track the size of the
+                    frontier and record how long adding each page to the site map takes. Give the same metrics to the
+                    page fetcher for the time spent fetching and parsing.
+                profiler (crawler.profiling.CrawlProfiler): Profile the crawl, it is started when the crawl starts,
+                    told about every page and stopped (writing its profiles) when the crawl finishes
+                frontier (crawler.frontier.Frontier): The frontier to take the links to fetch from, which orders them
+                    and limits how much is crawled. By default a breadth first one without limits. A crawl store
+                    keeps its own frontier, a level at a time.
+                resolve_redirects (bool): Have the page fetcher stop at a redirect to a page already crawled, rather
+                    than fetching that page again for every alias of it.
+                    The links of every page crawled are kept in a set the worker threads can check.
         """
+        if workers < 1:
+            raise ValueError("workers must be at least 1, got {}".format(workers))
+
         self._start_link = Link(start_domain, "/")
-        self.site_map = SiteMap()
-        self._links_to_visit = set()
+        if crawl_store is not None:
+            if site_map is not None:
+                raise ValueError("A crawl store is its own site map, can't also use {}".format(site_map))
+            site_map = crawl_store
+            if frontier is not None:
+                raise ValueError("A crawl store keeps its own frontier, can't also use {}".format(frontier))
+
+        self.site_map = site_map if site_map is not None else SiteMap()
+        self._crawl_store = crawl_store
+        self._batch_size = batch_size
+        self.seen_filter = seen_filter
+        if seen_filter is not None:
+            seen_filter.add(self._start_link.normalised_netloc_and_path)
+        self._snapshot = snapshot
+        self._seeder = seeder
+        self._on_page = on_page
+        self._metrics = metrics
+        self._profiler = profiler
+        self._frontier = frontier if frontier is not None else Frontier()
+        # Links in the frontier or being fetched, so they aren't pushed again before they are in the site map
+        self._pending = set()
+        # The keys of the pages crawled and their aliases, when resolving redirects
+        self._crawled_keys = set() if resolve_redirects else None
+        self._workers = workers
+        self._executor = None
+
+        if page_fetcher is None:
+            page_fetcher = PageFetcher(max_connections_per_host=workers)
+        self._page_fetcher = page_fetcher
 
     def crawl(self):
         """Crawl the domain
         """
-        logging.info("Fetching: {}".format(self._start_link))
-        start_page = PageFetcher.get(self._start_link)
+        if self._profiler is None:
+            self._crawl_with_workers()
+        else:
+            self._profiler.start()
+            try:
+                self._crawl_with_workers()
+            finally:
+                self._profiler.stop()
+
+        if self._snapshot is not None:
+            # Pages a budget stopped the crawl reaching haven't been removed from the site
+            self.crawl_diff = self._snapshot.finish(complete=not self._frontier.dropped and not len(self._frontier))
+
+    def _crawl_with_workers(self):
+        """Crawl the domain, in the worker pool if there is more than one worker
+        """
+        if self._workers == 1:
+            self._crawl()
+        else:
+            with ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="crawler") as executor:
+                self._executor = executor
+                try:
+                    self._crawl()
+                finally:
+                    self._executor = None
+
+    def _crawl(self):
+        """Fetch the start page and then keep spidering out until there are no links left to visit
+        """
+        if self._crawl_store is not None:
+            self._crawl_into_store()
+            return
+
+        self._push_links([self._start_link], 0)
+        self._push_links(self._seed_links_to_visit(), 1)
+
+        if self._executor is None:
+            while True:
+                entry = self._pop_link()
+                if entry is None:
+                    break
+                link, depth = entry
+                self._page_fetched(self._fetch_page(link), depth)
+            return
 
-        self.site_map.add_page(start_page)
+        # The depth of the link each fetch is for
+        in_flight = dict()
+        while True:
+            while len(in_flight) < self._workers:
+                entry = self._pop_link()
+                if entry is None:
+                    break
+                link, depth = entry
+                in_flight[self._executor.submit(self._fetch_page, link)] = depth
 
-        self._links_to_visit = self._determine_links_to_visit(start_page)
+            if not in_flight:
+                break
 
-        while len(self._links_to_visit) != 0:
-            self._crawl_remaining_pages()
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fetch in done:
+                self._page_fetched(fetch.result(), in_flight.pop(fetch))
 
-    def _crawl_remaining_pages(self):
-        """After the first page has been crawled, spider out and crawl all out links within our subdomain which haven't
-            yet been visited
+    def _pop_link(self):
+        """Pop the next link to fetch from the frontier, skipping links which have become visited since they were
+           pushed, by a redirect to them or from them
+
+            Returns:
+                tuple(link: crawler.links.link.Link, depth: int): The link and its depth, None if there are none left
         """
-        new_links_to_visit = set()
-        visited_links = set()
+        return self._frontier.pop(skip=self._visited_since_pushed)
+
+    def _visited_since_pushed(self, link):
+        """Check whether a link popped from the frontier has been visited since it was pushed, forgetting it if so
+
+            Args:
+                link (crawler.links.link.Link): The link
+
+            Returns:
+                bool: True if it mustn't be fetched
+        """
+        if not self.site_map.link_already_visited(link):
+            return False
+
+        self._pending.discard(link)
+
+        return True
+
+    def _page_fetched(self, page, depth):
+        """Add a fetched page to the site map and push the links on it still to visit to the frontier
 
-        for link in self._links_to_visit:
-            logging.info("Fetching: {}".format(link))
-            page = PageFetcher.get(link)
-            visited_links.add(link)
+            Note: The pages may be fetched on worker threads but the site map and the frontier are only ever updated
+                  from the calling thread, so neither needs any locking.
+
+            Args:
+                page (crawler.pages.page.Page): The page
+                depth (int): How many links the page is from the start page
+        """
+        self._pending.discard(page.link)
+        if page.aliases is not None:
+            self._pending.difference_update(page.aliases)
+        if self.site_map.link_already_visited(page.link):
+            # The page was already crawled through another of its links, only its aliases (if any) are new
+            if page.aliases is not None:
+                self._add_aliases(page.link, page.aliases)
+            return
+
+        self._add_page(page)
+        self._push_links(self._determine_links_to_visit(page), depth + 1)
+        if self._metrics is not None:
+            self._metrics.frontier.set(len(self._frontier))
+        self._page_crawled(page)
+
+    def _push_links(self, links, depth):
+        """Push links on to the frontier
+
+            Args:
+                links (iterable): The crawler.links.link.Link instances still to visit
+                depth (int): How many links they are from the start page
+        """
+        for link in links:
+            if self._frontier.push(link, depth) and self.seen_filter is None:
+                self._pending.add(link)
+
+    def _crawl_into_store(self):
+        """Crawl a level at a time, a batch of links at a time, checkpointing each batch into the crawl store. If the
+           store already holds a crawl then it carries on from the last checkpoint without fetching any of the pages
+           again.
+        """
+        if self._crawl_store.is_empty():
+            start_page = self._fetch_page(self._start_link)
+            links_to_visit = self._determine_links_to_visit(start_page)
+            links_to_visit.update(self._seed_links_to_visit())
+            self._crawl_store.add_pages([start_page], links_to_visit, 1)
+            self._page_crawled(start_page)
+
+        level = self._crawl_store.next_frontier_level()
+        while level is not None:
+            # The pages of the batch keyed on their link, each page is only added once however many of its aliases
+            # were fetched
+            batch = dict()
+            for page in self._fetch_pages(self._crawl_store.frontier_batch(level, self._batch_size)):
+                if page.link in batch:
+                    if page.aliases is not None:
+                        batch[page.link].aliases = (batch[page.link].aliases or []) + page.aliases
+                elif page.aliases is not None and self._crawl_store.link_already_visited(page.link):
+                    self._add_aliases(page.link, page.aliases)
+                else:
+                    batch[page.link] = page
+            pages = list(batch.values())
+
+            links_to_visit = set()
+            for page in pages:
+                links_to_visit.update(self._determine_links_to_visit(page))
+
+            if self._metrics is None:
+                self._crawl_store.add_pages(pages, links_to_visit, level + 1)
+            else:
+                start = time.perf_counter()
+                self._crawl_store.add_pages(pages, links_to_visit, level + 1)
+                # One transaction for the batch, share its time out between the pages
+                seconds_per_page = (time.perf_counter() - start) / max(len(pages), 1)
+                for _ in pages:
+                    self._metrics.observe("site_map", seconds_per_page)
+                self._metrics.frontier.set(self._crawl_store.frontier_size())
+            for page in pages:
+                self._page_crawled(page)
+
+            level = self._crawl_store.next_frontier_level()
+
+    def _add_page(self, page):
+        """Add a page to the site map, recording how long it took if we have metrics
+
+            Args:
+                page (crawler.pages.page.Page): The page
+        """
+        if self._metrics is None:
             self.site_map.add_page(page)
-            new_links_to_visit.update(self._determine_links_to_visit(page))
+            return
+
+        start = time.perf_counter()
+        self.site_map.add_page(page)
+        self._metrics.observe("site_map", time.perf_counter() - start)
 
-        self._links_to_visit.update(new_links_to_visit)
-        # Remove the now visited links
-        self._links_to_visit.difference_update(visited_links)
+    def _add_aliases(self, link, aliases):
+        """Record the aliases of a page already in the site map
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                aliases (list): crawler.links.link.Link instances which redirect to it
+        """
+        self.site_map.add_aliases(link, aliases)
+        if self._crawled_keys is not None:
+            self._crawled_keys.update(alias.normalised_netloc_and_path for alias in aliases)
+
+    def _page_crawled(self, page):
+        """Called from the crawling thread for every page once it has been added to the site map
+
+            Args:
+                page (crawler.pages.page.Page): The page
+        """
+        if self._crawled_keys is not None:
+            self._crawled_keys.add(page.link.normalised_netloc_and_path)
+            if page.aliases is not None:
+                self._crawled_keys.update(alias.normalised_netloc_and_path for alias in page.aliases)
+        if self._metrics is not None:
+            self._metrics.page_crawled(page)
+        if self._profiler is not None:
+            self._profiler.page_crawled(page)
+        if self._snapshot is not None:
+            self._snapshot.record(page)
+        if self._on_page is not None:
+            self._on_page(page)
+
+    def _fetch_pages(self, links):
+        """Fetch the pages for all the links, using the worker pool if we have one
+
+            Args:
+                links (set): The crawler.links.link.Link instances to fetch, each one is fetched exactly once
+
+            Returns:
+                iterator: crawler.pages.page.Page instances, in the order they finished being fetched
+        """
+        if self._executor is None:
+            return map(self._fetch_page, links)
+
+        futures = [self._executor.submit(self._fetch_page, link) for link in links]
+
+        return (future.result() for future in as_completed(futures))
+
+    def _fetch_page(self, link):
+        """Fetch a single page, safe to call from a worker thread
+
+            Args:
+                link (crawler.links.link.Link): The link to fetch
+
+            Returns:
+                crawler.pages.page.Page: The fetched page, without any out links if it couldn't be fetched
+        """
+        logging.info("Fetching: {}".format(link))
+        try:
+            if self._crawled_keys is None:
+                return self._page_fetcher.get(link)
+
+            return self._page_fetcher.get(link, known_link=self._link_crawled)
+        except TransportError as error:
+            # One bad link mustn't end the crawl, the pages in flight would be lost with it
+            logging.warning("Can't fetch {}: {!r}".format(link, error))
+            return Page(link, None, out_links=[])
+
+    def _link_crawled(self, link):
+        """Check whether a link's page has already been crawled, safe to call from a worker thread
+
+            Args:
+                link (crawler.links.link.Link): The link
+
+            Returns:
+                bool: True if the page, or a page it is an alias of, has been crawled
+        """
+        return link.normalised_netloc_and_path in self._crawled_keys
 
     def _determine_links_to_visit(self, page):
         """Get the links we still need to visit from the page.
@@ -61,12 +367,46 @@ class Crawler:
                 page (crawler.pages.page.Page): The page to extract the links from
 
             Returns:
-                list: List of crawler.links.link.Link, only includes links which are inside the subdomain and still
+                set: Set of crawler.links.link.Link, only includes links which are inside the subdomain and still
+                      not yet visited
+        """
+        return self._links_not_yet_visited(page.out_links)
+
+    def _seed_links_to_visit(self):
+        """Get the links we still need to visit from the sitemaps, if we have a seeder
+
+            Returns:
+                set: Set of crawler.links.link.Link, only includes links which are inside the subdomain and still
+                      not yet visited
+        """
+        if self._seeder is None:
+            return set()
+
+        links_to_visit = self._links_not_yet_visited(self._seeder.seed_links(self._start_link))
+        logging.info("Seeded {} links from {} sitemaps".format(len(links_to_visit), self._seeder.sitemaps_fetched))
+
+        return links_to_visit
+
+    def _links_not_yet_visited(self, links):
+        """Filter links down to those we still need to visit
+
+            Args:
+                links (iterable): The crawler.links.link.Link instances
+
+            Returns:
+                set: Set of crawler.links.link.Link, only includes links which are inside the subdomain and still
                       not yet visited
         """
         links_to_visit = set()
-        for link in page.out_links:
-            if link.in_crawled_domain() and not self.site_map.link_already_visited(link):
+        for link in links:
+            if not link.in_crawled_domain():
+                continue
+
+            if self.seen_filter is None:
+                if link not in self._pending and not self.site_map.link_already_visited(link):
+                    links_to_visit.add(link)
+            elif self.seen_filter.add(link.normalised_netloc_and_path):
+                # With a filter every link is only ever returned the first time it is seen
                 links_to_visit.add(link)
 
         return links_to_visit
@@ -0,0 +1,271 @@
+import asyncio
+import logging
+import socket
+
+from crawler.distributed.protocol import Protocol, ProtocolError
+from crawler.links.link import BasePage, Link
+from crawler.pages.page import Page
+from crawler.site_map import SiteMap
+
+
+class Coordinator:
+    """Coordinates a crawl split between several crawler.distributed.worker.Worker processes, possibly on other
+       machines.
+
+       Each worker owns a shard of the url space (see crawler.distributed.protocol.Protocol.shard). The coordinator
+       sends the start link to the worker which owns it, then passes on the batches of links each worker finds to the
+       workers which own them, and merges the pages every worker crawls into one site map.
+
+       The crawl has finished when every worker has processed every link sent to it. A worker only says it has
+       processed a batch once the links found by crawling it have been sent, and they are passed on before the next
+       message is read, so when the counts match there is nothing left in flight anywhere.
+
+        Attributes:
+            site_map: The site map of the crawled domain, with the pages from every shard
+            address (tuple(host: str, port: int)): Where the workers should connect, once listen has been called
+            pages_per_shard (list): How many pages each shard crawled
+    """
+    site_map = None
+    address = None
+    pages_per_shard = None
+
+    def __init__(self, start_domain, shard_count, site_map=None, on_page=None, max_queued_messages=100):
+        """Initialiser
+
+            Args:
+                start_domain (string): The domain to start crawling
+                shard_count (int): How many workers to wait for, the url space is split between them
+                site_map: The site map to add the crawled pages to, by default a crawler.site_map.SiteMap
+                on_page (callable): Called with each page as soon as it has been added to the site map, always from
+                    the thread which called crawl
+                max_queued_messages (int): How many messages can be waiting to be written to each worker before
+                    passing on more links to it waits for it to read them
+        """
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1, got {}".format(shard_count))
+
+        self._start_link = Link(start_domain, "/")
+        self._shard_count = shard_count
+        self.site_map = site_map if site_map is not None else SiteMap()
+        self._on_page = on_page
+        self._max_queued_messages = max_queued_messages
+        self._socket = None
+        self.pages_per_shard = [0] * shard_count
+        # The aliases of pages in another shard from the one which followed the redirect, until the page arrives
+        self._pending_aliases = dict()
+
+    def listen(self, host="127.0.0.1", port=0):
+        """Start listening for workers, they can connect as soon as this returns
+
+            Args:
+                host (string): The interface to listen on
+                port (int): The port to listen on, by default any free port (see address)
+        """
+        self._socket = socket.create_server((host, port))
+        self.address = self._socket.getsockname()[:2]
+
+    def crawl(self):
+        """Wait for every worker to join and crawl the domain between them, listening on any free local port if listen
+           hasn't been called
+
+            Raises:
+                crawler.distributed.protocol.ProtocolError: If a worker disconnects or sends something unexpected
+        """
+        asyncio.run(self.crawl_async())
+
+    async def crawl_async(self):
+        """Wait for every worker to join and crawl the domain between them
+
+            Raises:
+                crawler.distributed.protocol.ProtocolError: If a worker disconnects or sends something unexpected
+        """
+        if self._socket is None:
+            self.listen()
+
+        joined = asyncio.Queue()
+
+        async def on_connect(reader, writer):
+            await joined.put((reader, writer))
+
+        server = await asyncio.start_server(on_connect, sock=self._socket)
+        logging.info("Waiting for {} workers on {}:{}".format(self._shard_count, *self.address))
+
+        connections = []
+        readers = []
+        try:
+            async with server:
+                while len(connections) < self._shard_count:
+                    reader, writer = await joined.get()
+                    message = await Protocol.read(reader)
+                    if message is None or message["type"] != "join":
+                        writer.close()
+                        continue
+
+                    writer.write(Protocol.encode({
+                        "type": "start",
+                        "shard": len(connections),
+                        "shards": self._shard_count,
+                        "start_url": self._start_link.url,
+                    }))
+                    connections.append((reader, writer))
+                    logging.info("Worker {} joined".format(len(connections) - 1))
+
+            messages = asyncio.Queue()
+            readers = [
+                asyncio.ensure_future(Coordinator._read_messages(shard, reader, messages))
+                for shard, (reader, _) in enumerate(connections)
+            ]
+            await self._coordinate([writer for _, writer in connections], messages)
+        finally:
+            for reader_task in readers:
+                reader_task.cancel()
+            for _, writer in connections:
+                writer.close()
+            self._socket.close()
+
+    async def _coordinate(self, writers, messages):
+        """Seed the crawl and pass links between the shards until every link sent to a shard has been processed
+
+            Args:
+                writers (list): The asyncio.StreamWriter for each shard
+                messages (asyncio.Queue): tuple(shard: int, message: dict) for every message from the workers, the
+                    message is None if the worker disconnected
+        """
+        sent = [0] * self._shard_count
+        processed = [0] * self._shard_count
+        # Each worker is written to by its own task, so one which is slow to read its links only holds up the links
+        # sent to it. Its queue is bounded, once it is that far behind we wait for it rather than buffer without limit
+        outboxes = [asyncio.Queue(self._max_queued_messages) for _ in writers]
+        writer_tasks = [
+            asyncio.ensure_future(Coordinator._write_messages(shard, writer, outbox, messages))
+            for shard, (writer, outbox) in enumerate(zip(writers, outboxes))
+        ]
+
+        async def send_links(shard, urls):
+            sent[shard] += len(urls)
+            await outboxes[shard].put(Protocol.encode({"type": "links", "urls": urls}))
+
+        try:
+            await send_links(Protocol.shard(self._start_link, self._shard_count), [self._start_link.url])
+
+            while sent != processed:
+                shard, message = await messages.get()
+                if message is None:
+                    raise ProtocolError("Worker {} disconnected before the crawl finished".format(shard))
+                if message["type"] != "crawled":
+                    raise ProtocolError("Expected crawled from worker {}, got {}".format(shard, message["type"]))
+
+                for page_message in message["pages"]:
+                    self._add_page(Coordinator._page(self._start_link.base_page, page_message))
+                self.pages_per_shard[shard] += len(message["pages"])
+                for url, alias_urls in message.get("aliases", dict()).items():
+                    self._add_aliases(url, alias_urls)
+
+                for owner, urls in message["links"].items():
+                    await send_links(int(owner), urls)
+                processed[shard] += message["processed"]
+
+            logging.info("Crawl finished, {} pages crawled by each shard".format(self.pages_per_shard))
+            for outbox in outboxes:
+                await outbox.put(Protocol.encode({"type": "stop"}))
+                await outbox.put(None)
+            await asyncio.gather(*writer_tasks)
+        finally:
+            for writer_task in writer_tasks:
+                writer_task.cancel()
+
+    async def _write_messages(shard, writer, outbox, messages):
+        """Write every message put on a worker's queue to it, until None is put on the queue
+
+            Args:
+                shard (int): The worker's shard
+                writer (asyncio.StreamWriter): The worker's connection
+                outbox (asyncio.Queue): The encoded messages to write, then None
+                messages (asyncio.Queue): The queue to put tuple(shard: int, None) on if the worker disconnects
+        """
+        disconnected = False
+        while True:
+            data = await outbox.get()
+            if data is None:
+                return
+            if disconnected:
+                # Keep emptying the queue, so nothing waits on a worker which has gone
+                continue
+
+            try:
+                writer.write(data)
+                await writer.drain()
+            except ConnectionError:
+                disconnected = True
+                await messages.put((shard, None))
+
+    def _add_page(self, page):
+        """Merge a page crawled by one of the shards into the site map
+
+            Args:
+                page (crawler.pages.page.Page): The page
+        """
+        pending_aliases = self._pending_aliases.pop(page.link, None)
+        if pending_aliases is not None:
+            aliases = page.aliases or []
+            page.aliases = aliases + [alias for alias in pending_aliases if alias not in aliases]
+
+        self.site_map.add_page(page)
+        if self._on_page is not None:
+            self._on_page(page)
+
+    def _add_aliases(self, url, alias_urls):
+        """Record the links which redirected to a page in another shard, they are added to the page when it arrives
+
+            Args:
+                url (string): The url of the page
+                alias_urls (list): The urls of the links which redirected to it
+        """
+        link = Link(self._start_link.base_page, url)
+        aliases = [Link(self._start_link.base_page, alias_url) for alias_url in alias_urls]
+        if self.site_map.link_already_visited(link):
+            self.site_map.add_aliases(link, aliases)
+        else:
+            self._pending_aliases.setdefault(link, []).extend(aliases)
+
+    async def _read_messages(shard, reader, messages):
+        """Put every message from a worker on the queue, then None once it disconnects
+
+            Args:
+                shard (int): The worker's shard
+                reader (asyncio.StreamReader): The worker's connection
+                messages (asyncio.Queue): The queue to put tuple(shard: int, message: dict) on
+        """
+        while True:
+            try:
+                message = await Protocol.read(reader)
+            except (ProtocolError, ConnectionError):
+                message = None
+
+            await messages.put((shard, message))
+            if message is None:
+                return
+
+    def _page(start_base_page, page_message):
+        """Rebuild a page sent by a worker
+
+            Args:
+                start_base_page (crawler.links.link.BasePage): The start page of the crawl
+                page_message (dict): The page, see crawler.distributed.protocol.Protocol
+
+            Returns:
+                crawler.pages.page.Page: The page
+        """
+        base_page = BasePage(page_message["url"])
+        page = Page(
+            Link(start_base_page, page_message["url"]),
+            None,
+            out_links=[Link(base_page, url) for url in page_message["out_links"]],
+        )
+        page.status_code = page_message["status_code"]
+        page.body_size = page_message["body_size"]
+        page.fetch_time = page_message["fetch_time"]
+        if page_message.get("aliases") is not None:
+            page.aliases = [Link(start_base_page, url) for url in page_message["aliases"]]
+
+        return page
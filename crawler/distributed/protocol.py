@@ -0,0 +1,159 @@
+import asyncio
+import json
+import struct
+import zlib
+
+
+class ProtocolError(Exception):
+    """Raised when a coordinator or worker gets a message it can't read, or the other end goes away mid crawl
+    """
+    pass
+
+
+class Protocol:
+    """The messages between the coordinator of a distributed crawl and its workers.
+
+       Every message is a JSON object, sent as its UTF-8 length as 4 big endian bytes followed by the UTF-8. Links
+       are sent as their urls. The messages, by "type", are:
+
+       * join (worker to coordinator): The first message from every worker
+       * start (coordinator to worker): {"shard": int, "shards": int, "start_url": str}, the shard the worker owns
+       * links (coordinator to worker): {"urls": [str]}, a batch of links in the worker's shard to visit
+       * crawled (worker to coordinator): {"pages": [page], "links": {shard: [str]}, "aliases": {str: [str]},
+         "processed": int}, the pages crawled since the last one, the links found on them grouped by the shard which
+         owns them, the links which redirected to a page in another shard keyed on the page's url (the page itself
+         is in links, for its owner to crawl), and how many of the links sent to the worker it has finished with
+         (only once every page they led to has been sent)
+       * stop (coordinator to worker): The crawl has finished, disconnect
+
+       A page is {"url": str, "out_links": [str], "status_code": int, "body_size": int, "fetch_time": float,
+       "aliases": [str]}, the aliases are the links which redirected to it, or null if it wasn't redirected to.
+    """
+    LENGTH = struct.Struct("!I")
+    MAX_MESSAGE_SIZE = 256 * 1024 * 1024
+
+    def shard(link, shard_count):
+        """Get the shard which owns a link, the same in every process (unlike hash(), which is randomised per process)
+
+            Args:
+                link (crawler.links.link.Link): The link
+                shard_count (int): How many shards the urls are split between
+
+            Returns:
+                int: The shard, 0 to shard_count - 1
+        """
+        return zlib.crc32(link.normalised_netloc_and_path.encode("utf-8")) % shard_count
+
+    def encode(message):
+        """Frame a message for sending
+
+            Args:
+                message (dict): The message
+
+            Returns:
+                bytes: The length prefixed message
+        """
+        data = json.dumps(message, separators=(",", ":")).encode("utf-8")
+
+        return Protocol.LENGTH.pack(len(data)) + data
+
+    def decode(data):
+        """Read a message from its frame, without the length prefix
+
+            Args:
+                data (bytes): The message
+
+            Returns:
+                dict: The message
+
+            Raises:
+                ProtocolError: If the data isn't a message
+        """
+        try:
+            message = json.loads(data.decode("utf-8"))
+        except ValueError as error:
+            raise ProtocolError("Unreadable message: {}".format(error))
+
+        if not isinstance(message, dict) or "type" not in message:
+            raise ProtocolError("Message has no type: {!r}".format(message))
+
+        return message
+
+    def message_size(prefix):
+        """Get the size of the message that follows a length prefix
+
+            Args:
+                prefix (bytes): The 4 byte length prefix
+
+            Returns:
+                int: The size of the message in bytes
+
+            Raises:
+                ProtocolError: If the message is larger than MAX_MESSAGE_SIZE
+        """
+        size, = Protocol.LENGTH.unpack(prefix)
+        if size > Protocol.MAX_MESSAGE_SIZE:
+            raise ProtocolError("Message of {} bytes is larger than the {} byte limit".format(
+                size,
+                Protocol.MAX_MESSAGE_SIZE,
+            ))
+
+        return size
+
+    def send(sock, message):
+        """Send a message over a blocking socket
+
+            Args:
+                sock (socket.socket): The connected socket
+                message (dict): The message
+        """
+        sock.sendall(Protocol.encode(message))
+
+    def receive(stream):
+        """Read the next message from a blocking stream
+
+            Args:
+                stream (file): A binary file over the socket, e.g. from socket.makefile("rb")
+
+            Returns:
+                dict: The message
+
+            Raises:
+                ProtocolError: If the message can't be read or the other end disconnected
+        """
+        size = Protocol.message_size(Protocol._read_exactly(stream, Protocol.LENGTH.size))
+
+        return Protocol.decode(Protocol._read_exactly(stream, size))
+
+    async def read(reader):
+        """Read the next message from an asyncio stream
+
+            Args:
+                reader (asyncio.StreamReader): The stream
+
+            Returns:
+                dict: The message, or None if the other end disconnected between messages
+
+            Raises:
+                ProtocolError: If the message can't be read or the other end disconnected part way through it
+        """
+        try:
+            prefix = await reader.readexactly(Protocol.LENGTH.size)
+        except asyncio.IncompleteReadError as error:
+            if error.partial:
+                raise ProtocolError("Disconnected part way through a message")
+            return None
+
+        try:
+            data = await reader.readexactly(Protocol.message_size(prefix))
+        except asyncio.IncompleteReadError:
+            raise ProtocolError("Disconnected part way through a message")
+
+        return Protocol.decode(data)
+
+    def _read_exactly(stream, size):
+        data = stream.read(size)
+        if len(data) != size:
+            raise ProtocolError("Disconnected part way through a message" if data else "Disconnected")
+
+        return data
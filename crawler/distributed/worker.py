@@ -0,0 +1,210 @@
+import logging
+import socket
+
+from concurrent.futures import ThreadPoolExecutor
+
+from crawler.distributed.protocol import Protocol, ProtocolError
+from crawler.links.link import BasePage, Link
+from crawler.pages.page import Page
+from crawler.pages.page_fetcher import PageFetcher
+from crawler.pages.transports import TransportError
+
+
+class Worker:
+    """Crawls one shard of a distributed crawl.
+
+       The worker joins a crawler.distributed.coordinator.Coordinator, which assigns it a shard of the url space.
+       It keeps its own frontier and visited set for the links in its shard. The links it finds to other shards are
+       sent on in batches, through the coordinator, to the workers which own them.
+
+        Attributes:
+            shard (int): The shard the worker owns, once it has joined
+            shard_count (int): How many shards the crawl is split between, once it has joined
+            pages_crawled (int): How many pages the worker has crawled
+    """
+    shard = None
+    shard_count = None
+    pages_crawled = 0
+
+    def __init__(self, coordinator_address, workers=1, page_fetcher=None, batch_size=1000):
+        """Initialiser
+
+            Args:
+                coordinator_address (tuple(host: str, port: int)): Where the coordinator is listening
+                workers (int): How many pages to fetch concurrently, 1 fetches the pages one at a time without
+                    starting any threads
+                page_fetcher (crawler.pages.page_fetcher.PageFetcher): The fetcher shared by all the workers, by
+                    default one is created with a connection for each worker
+                batch_size (int): How many pages to fetch before sending them and the links found on them to the
+                    coordinator
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1, got {}".format(workers))
+
+        self._coordinator_address = coordinator_address
+        self._workers = workers
+        self._batch_size = batch_size
+        self._visited = set()
+
+        if page_fetcher is None:
+            page_fetcher = PageFetcher(max_connections_per_host=workers)
+        self._page_fetcher = page_fetcher
+
+    def run(self):
+        """Join the coordinator and crawl the links it sends until it says the crawl has finished
+
+            Raises:
+                crawler.distributed.protocol.ProtocolError: If the coordinator goes away before the crawl finishes
+        """
+        with socket.create_connection(self._coordinator_address) as sock:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            stream = sock.makefile("rb")
+            Protocol.send(sock, {"type": "join"})
+
+            start = Protocol.receive(stream)
+            if start["type"] != "start":
+                raise ProtocolError("Expected start, got {}".format(start["type"]))
+            self.shard = start["shard"]
+            self.shard_count = start["shards"]
+            self._start_base_page = BasePage(start["start_url"])
+            logging.info("Joined {}:{} as shard {} of {}".format(
+                *self._coordinator_address,
+                self.shard,
+                self.shard_count,
+            ))
+
+            if self._workers == 1:
+                self._executor = None
+                self._serve(sock, stream)
+            else:
+                with ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="crawler") as executor:
+                    self._executor = executor
+                    self._serve(sock, stream)
+
+    def _serve(self, sock, stream):
+        """Crawl every batch of links the coordinator sends until it sends stop
+
+            Args:
+                sock (socket.socket): The connection to the coordinator
+                stream (file): The connection to the coordinator to read from
+        """
+        while True:
+            message = Protocol.receive(stream)
+            if message["type"] == "stop":
+                return
+            if message["type"] != "links":
+                raise ProtocolError("Expected links or stop, got {}".format(message["type"]))
+
+            self._crawl(sock, message["urls"])
+
+    def _crawl(self, sock, urls):
+        """Crawl a batch of links, and every link in this shard which spiders out from them, then tell the coordinator
+           they have been processed
+
+            Args:
+                sock (socket.socket): The connection to the coordinator
+                urls (list): The urls of the links to crawl, all in this shard
+        """
+        frontier = self._links_not_yet_visited(Link(self._start_base_page, url) for url in urls)
+
+        while True:
+            batch = frontier[:self._batch_size]
+            del frontier[:self._batch_size]
+
+            pages = []
+            links = dict()
+            aliases = dict()
+            for page in self._fetch_pages(batch):
+                # A page reached through a redirect is crawled under the link it was redirected to, if that link is
+                # in another shard its owner crawls it and only the links which redirected to it are sent
+                page_shard = Protocol.shard(page.link, self.shard_count)
+                if page_shard != self.shard:
+                    links.setdefault(page_shard, dict())[page.link] = None
+                    aliases.setdefault(page.link.url, []).extend(alias.url for alias in page.aliases or ())
+                    continue
+                # Unless it's in our shard, and we've already crawled it or have it queued to crawl
+                if page.aliases is not None and page.link.normalised_netloc_and_path in self._visited:
+                    aliases.setdefault(page.link.url, []).extend(alias.url for alias in page.aliases)
+                    continue
+
+                self._visited.add(page.link.normalised_netloc_and_path)
+                pages.append(Worker._page_message(page))
+                for link in page.out_links:
+                    if link.in_crawled_domain():
+                        links.setdefault(Protocol.shard(link, self.shard_count), dict())[link] = None
+
+            # Links in our own shard go straight on to the frontier rather than round trip through the coordinator
+            frontier.extend(self._links_not_yet_visited(links.pop(self.shard, ())))
+            self.pages_crawled += len(pages)
+
+            message = {
+                "type": "crawled",
+                "pages": pages,
+                "links": {shard: [link.url for link in shard_links] for shard, shard_links in links.items()},
+                "aliases": aliases,
+                "processed": 0,
+            }
+            if not frontier:
+                message["processed"] = len(urls)
+                Protocol.send(sock, message)
+                return
+
+            Protocol.send(sock, message)
+
+    def _links_not_yet_visited(self, links):
+        """Filter links down to those not visited, marking them as visited
+
+            Args:
+                links (iterable): The crawler.links.link.Link instances, all in this shard
+
+            Returns:
+                list: The crawler.links.link.Link instances still to visit
+        """
+        links_to_visit = []
+        for link in links:
+            if link.normalised_netloc_and_path not in self._visited:
+                self._visited.add(link.normalised_netloc_and_path)
+                links_to_visit.append(link)
+
+        return links_to_visit
+
+    def _fetch_pages(self, links):
+        """Fetch the pages for all the links, using the worker pool if we have one
+
+            Args:
+                links (list): The crawler.links.link.Link instances to fetch
+
+            Returns:
+                iterator: crawler.pages.page.Page instances
+        """
+        if self._executor is None:
+            return map(self._fetch_page, links)
+
+        return self._executor.map(self._fetch_page, links)
+
+    def _fetch_page(self, link):
+        logging.info("Fetching: {}".format(link))
+        try:
+            return self._page_fetcher.get(link)
+        except TransportError as error:
+            # As in crawler.crawler.Crawler, the page is kept without any links rather than ending the worker
+            logging.warning("Can't fetch {}: {!r}".format(link, error))
+            return Page(link, None, out_links=[])
+
+    def _page_message(page):
+        """Get a page as it is sent to the coordinator
+
+            Args:
+                page (crawler.pages.page.Page): The page
+
+            Returns:
+                dict: The page, see crawler.distributed.protocol.Protocol
+        """
+        return {
+            "url": page.link.url,
+            "out_links": [link.url for link in page.out_links],
+            "status_code": page.status_code,
+            "body_size": page.body_size,
+            "fetch_time": page.fetch_time,
+            "aliases": None if page.aliases is None else [alias.url for alias in page.aliases],
+        }
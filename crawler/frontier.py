@@ -0,0 +1,156 @@
+import heapq
+
+
+class Frontier:
+    """The links waiting to be fetched, in a heap so the most valuable link is always fetched next rather than a whole
+       level of links at a time.
+
+       Links are ordered on their score, lowest first, and then the order they were pushed. By default the score is
+       the link's depth (how many links it is from the start page) so the crawl is breadth first, give a scorer to
+       fetch the most valuable pages first.
+
+       The budgets bound how much of the site is crawled: links deeper than max_depth are never pushed, and once
+       max_pages links have been popped (or a path prefix's budget of them) no more are.
+
+        Attributes:
+            max_depth (int): The deepest links to fetch, None for no limit
+            max_pages (int): The most links to pop, None for no limit
+            prefix_budgets (dict): The most links to pop whose path is under each path prefix, the longest prefix a
+                path is under applies
+            popped (int): How many links have been popped
+            dropped (int): How many links were dropped for being too deep or over their prefix's budget
+    """
+    max_depth = None
+    max_pages = None
+    prefix_budgets = None
+    popped = 0
+    dropped = 0
+
+    def __init__(self, scorer=None, max_depth=None, max_pages=None, prefix_budgets=None):
+        """Initialiser
+
+            Args:
+                scorer (callable): Called with a link (crawler.links.link.Link) and its depth to give its score, links
+                    with lower scores are fetched first. By default the score is the depth.
+                max_depth (int): The deepest links to fetch, the start page is depth 0
+                max_pages (int): The most links to pop
+                prefix_budgets (dict): The most links to pop whose path is under each path prefix (e.g. {"/blog": 1000}
+                    limits /blog and everything below it, but not /blogroll)
+        """
+        if max_depth is not None and max_depth < 0:
+            raise ValueError("max_depth can't be negative, got {}".format(max_depth))
+        if max_pages is not None and max_pages < 1:
+            raise ValueError("max_pages must be at least 1, got {}".format(max_pages))
+
+        self._scorer = scorer if scorer is not None else Frontier.depth_score
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.prefix_budgets = dict()
+        for prefix, budget in (prefix_budgets or dict()).items():
+            if budget < 0:
+                raise ValueError("The budget of {} can't be negative, got {}".format(prefix, budget))
+            self.prefix_budgets[Frontier._normalise_prefix(prefix)] = budget
+        self.popped = 0
+        self.dropped = 0
+        self._heap = []
+        self._pushed = 0
+        self._prefix_counts = dict.fromkeys(self.prefix_budgets, 0)
+
+    def push(self, link, depth):
+        """Add a link to be fetched, unless it is deeper than max_depth
+
+            Args:
+                link (crawler.links.link.Link): The link
+                depth (int): How many links the link is from the start page
+
+            Returns:
+                bool: True if the link was added
+        """
+        if self.max_depth is not None and depth > self.max_depth:
+            self.dropped += 1
+            return False
+
+        # The push count breaks ties between equal scores in the order they were pushed, links are never compared
+        heapq.heappush(self._heap, (self._scorer(link, depth), self._pushed, link, depth))
+        self._pushed += 1
+
+        return True
+
+    def pop(self, skip=None):
+        """Take the link to fetch next, dropping any over their prefix's budget
+
+            Args:
+                skip (callable): Called with each link before it is taken, links it returns True for (such as those
+                    fetched since they were pushed) are thrown away without counting against max_pages or the budgets
+
+            Returns:
+                tuple(link: crawler.links.link.Link, depth: int): The link with the lowest score and its depth, None
+                    if there are none left or max_pages have been popped
+        """
+        while self._heap:
+            if self.max_pages is not None and self.popped >= self.max_pages:
+                return None
+
+            _, _, link, depth = heapq.heappop(self._heap)
+            if skip is not None and skip(link):
+                continue
+
+            prefix = self._budget_prefix(link)
+            if prefix is not None:
+                if self._prefix_counts[prefix] >= self.prefix_budgets[prefix]:
+                    self.dropped += 1
+                    continue
+                self._prefix_counts[prefix] += 1
+
+            self.popped += 1
+            return (link, depth)
+
+        return None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def depth_score(link, depth):
+        """The default score, breadth first
+
+            Args:
+                link (crawler.links.link.Link): The link
+                depth (int): How many links the link is from the start page
+
+            Returns:
+                int: The depth
+        """
+        return depth
+
+    def _budget_prefix(self, link):
+        """Get the longest prefix with a budget a link's path is under
+
+            Args:
+                link (crawler.links.link.Link): The link
+
+            Returns:
+                string: The prefix, None if the path isn't under any
+        """
+        if not self.prefix_budgets:
+            return None
+
+        _, _, path = link.normalised_netloc_and_path.partition("/")
+        path = "/" + path
+        longest = None
+        for prefix in self.prefix_budgets:
+            if (path == prefix or path.startswith(prefix + "/") or prefix == "") and \
+                    (longest is None or len(prefix) > len(longest)):
+                longest = prefix
+
+        return longest
+
+    def _normalise_prefix(prefix):
+        """Normalise a path prefix the way link paths are, with a leading / but without a trailing one
+
+            Args:
+                prefix (string): The path prefix, e.g. /blog/
+
+            Returns:
+                string: The normalised prefix, e.g. /blog, or the empty string for the root
+        """
+        return "/" + prefix.strip("/") if prefix.strip("/") else ""
@@ -0,0 +1,247 @@
+import math
+import mmap
+import struct
+import sys
+
+from array import array
+
+
+class GraphFileError(ValueError):
+    """Raised when a file isn't a crawl graph we can read
+    """
+    pass
+
+
+class CrawlGraphFile:
+    """A crawl graph in a compact binary file, memory mapped so loading it reads nothing up front.
+
+       Every url (visited or only linked to) is a node with an integer id. The file holds, after a fixed size header,
+       these arrays in order, each starting on an 8 byte boundary and all little endian:
+
+       * url_offsets (uint64, node_count + 1): The url of node n is url_data[url_offsets[n]:url_offsets[n + 1]]
+       * page_nodes (uint32, page_count): The node id of each visited page
+       * row_starts (uint64, page_count + 1): The out links of page p are out_links[row_starts[p]:row_starts[p + 1]]
+       * out_links (uint32, edge_count): Node ids, compressed sparse row style
+       * statuses (uint16, page_count): The HTTP status of each page, 0 if it isn't known
+       * body_sizes (uint64, page_count): The bytes downloaded for each page, 0 if it isn't known
+       * fetch_times (float64, page_count): The seconds each page took to fetch, NaN if it isn't known
+       * url_data (bytes, url_data_size): The urls, UTF-8
+
+       The arrays are exposed as memoryviews straight onto the mapped file, so they can be wrapped without copying,
+       e.g. numpy.frombuffer(graph.out_links, dtype=numpy.uint32).
+
+        Attributes:
+            node_count (int): How many urls there are
+            page_count (int): How many pages were visited
+            edge_count (int): How many links there are between them
+            url_offsets, page_nodes, row_starts, out_links, statuses, body_sizes, fetch_times, url_data (memoryview):
+                The arrays, as described above
+    """
+    MAGIC = b"CRAWLGRF"
+    VERSION = 1
+    HEADER = struct.Struct("<8sIIQQQQ")
+    ALIGNMENT = 8
+    # (attribute, array typecode, item size, count from (node_count, page_count, edge_count))
+    SECTIONS = (
+        ("url_offsets", "Q", 8, lambda nodes, pages, edges: nodes + 1),
+        ("page_nodes", "I", 4, lambda nodes, pages, edges: pages),
+        ("row_starts", "Q", 8, lambda nodes, pages, edges: pages + 1),
+        ("out_links", "I", 4, lambda nodes, pages, edges: edges),
+        ("statuses", "H", 2, lambda nodes, pages, edges: pages),
+        ("body_sizes", "Q", 8, lambda nodes, pages, edges: pages),
+        ("fetch_times", "d", 8, lambda nodes, pages, edges: pages),
+    )
+
+    def __init__(self, path):
+        """Initialiser, maps a file written by write
+
+            Args:
+                path (string): The path of the file
+
+            Raises:
+                GraphFileError: If the file isn't a crawl graph or is truncated
+        """
+        self._views = []
+
+        with open(path, "rb") as graph_file:
+            try:
+                self._mmap = mmap.mmap(graph_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise GraphFileError("{} is empty".format(path))
+
+        if len(self._mmap) < CrawlGraphFile.HEADER.size:
+            self._mmap.close()
+            raise GraphFileError("{} is too short to be a crawl graph".format(path))
+
+        magic, version, _, node_count, page_count, edge_count, url_data_size = CrawlGraphFile.HEADER.unpack_from(
+            self._mmap,
+        )
+        if magic != CrawlGraphFile.MAGIC or version != CrawlGraphFile.VERSION:
+            self._mmap.close()
+            raise GraphFileError("{} isn't a version {} crawl graph".format(path, CrawlGraphFile.VERSION))
+
+        self._buffer = memoryview(self._mmap)
+        self.node_count = node_count
+        self.page_count = page_count
+        self.edge_count = edge_count
+
+        offset = CrawlGraphFile._aligned(CrawlGraphFile.HEADER.size)
+        sections = []
+        for name, typecode, item_size, count in CrawlGraphFile.SECTIONS:
+            size = item_size * count(node_count, page_count, edge_count)
+            sections.append((name, typecode, offset, size))
+            offset = CrawlGraphFile._aligned(offset + size)
+
+        if offset + url_data_size > len(self._mmap):
+            self.close()
+            raise GraphFileError("{} is truncated".format(path))
+
+        for name, typecode, offset_in_file, size in sections:
+            setattr(self, name, self._view(offset_in_file, size, typecode))
+        self.url_data = self._view(offset, url_data_size, "B")
+
+    def write(site_map, path):
+        """Write the pages of a site map to a crawl graph file
+
+            Args:
+                site_map: The site map, anything with all_pages() such as crawler.site_map.SiteMap
+                path (string): The path of the file to write
+
+            Returns:
+                tuple(node_count: int, page_count: int, edge_count: int): The size of the graph written
+        """
+        node_ids = dict()
+        url_offsets = array("Q", [0])
+        url_data = bytearray()
+
+        def intern(link):
+            node_id = node_ids.get(link.normalised_netloc_and_path)
+            if node_id is None:
+                node_id = len(node_ids)
+                node_ids[link.normalised_netloc_and_path] = node_id
+                url_data.extend(link.url.encode("utf-8"))
+                url_offsets.append(len(url_data))
+
+            return node_id
+
+        page_nodes = array("I")
+        row_starts = array("Q", [0])
+        out_links = array("I")
+        statuses = array("H")
+        body_sizes = array("Q")
+        fetch_times = array("d")
+
+        for page in site_map.all_pages():
+            page_nodes.append(intern(page.link))
+            out_links.extend(intern(link) for link in page.out_links)
+            row_starts.append(len(out_links))
+            statuses.append(page.status_code or 0)
+            body_sizes.append(page.body_size or 0)
+            fetch_times.append(math.nan if page.fetch_time is None else page.fetch_time)
+
+        arrays = (url_offsets, page_nodes, row_starts, out_links, statuses, body_sizes, fetch_times)
+        if sys.byteorder != "little":
+            for values in arrays:
+                values.byteswap()
+
+        with open(path, "wb") as graph_file:
+            graph_file.write(CrawlGraphFile.HEADER.pack(
+                CrawlGraphFile.MAGIC,
+                CrawlGraphFile.VERSION,
+                0,
+                len(node_ids),
+                len(page_nodes),
+                len(out_links),
+                len(url_data),
+            ))
+            CrawlGraphFile._pad(graph_file)
+            for values in arrays:
+                values.tofile(graph_file)
+                CrawlGraphFile._pad(graph_file)
+            graph_file.write(url_data)
+
+        return len(node_ids), len(page_nodes), len(out_links)
+
+    def url(self, node_id):
+        """Get the url of a node
+
+            Args:
+                node_id (int): The id of the node
+
+            Returns:
+                string: The url
+        """
+        return str(self.url_data[self.url_offsets[node_id]:self.url_offsets[node_id + 1]], "utf-8")
+
+    def out_link_ids(self, page_index):
+        """Get the out links of a page
+
+            Args:
+                page_index (int): The index of the page, 0 to page_count - 1
+
+            Returns:
+                memoryview: The node ids of the page's out links
+        """
+        return self.out_links[self.row_starts[page_index]:self.row_starts[page_index + 1]]
+
+    def pages(self):
+        """Get every page and its out links by url, in the order they were written
+
+            Returns:
+                iterator: tuple(url: str, out_link_urls: list)
+        """
+        for page_index in range(self.page_count):
+            yield (
+                self.url(self.page_nodes[page_index]),
+                [self.url(node_id) for node_id in self.out_link_ids(page_index)],
+            )
+
+    def close(self):
+        """Unmap the file, the arrays can't be used afterwards
+
+            Raises:
+                BufferError: If something still holds a buffer made from one of the arrays (e.g. a numpy array)
+        """
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._buffer.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _view(self, offset, size, typecode):
+        """Get a view of part of the file as an array
+
+            Args:
+                offset (int): Where the array starts in the file
+                size (int): How many bytes it is
+                typecode (string): The array module typecode of its items
+
+            Returns:
+                memoryview: The array, straight onto the mapped file unless the host is big endian
+        """
+        raw = self._buffer[offset:offset + size]
+        self._views.append(raw)
+        if typecode == "B":
+            return raw
+
+        if sys.byteorder != "little":
+            values = array(typecode, raw.tobytes())
+            values.byteswap()
+            return memoryview(values)
+
+        view = raw.cast(typecode)
+        self._views.append(view)
+
+        return view
+
+    def _aligned(offset):
+        return (offset + CrawlGraphFile.ALIGNMENT - 1) // CrawlGraphFile.ALIGNMENT * CrawlGraphFile.ALIGNMENT
+
+    def _pad(graph_file):
+        graph_file.write(b"\0" * (CrawlGraphFile._aligned(graph_file.tell()) - graph_file.tell()))
@@ -0,0 +1,267 @@
+import math
+
+from array import array
+
+from crawler.links.link import BasePage, Link
+from crawler.pages.page import Page
+
+
+class GraphSiteMap:
+    """Compact map of the site, a drop in replacement for crawler.site_map.SiteMap for very large crawls.
+
+       Rather than keeping every Page (and its text, and a list of Link objects) alive, every url is interned to an
+       integer id the first time it is seen and the out links of each page are held as rows of ids in growable
+       arrays (compressed sparse row style). Pages are rebuilt from the arrays when they are asked for, without
+       their text.
+    """
+    NOT_A_PAGE = -1
+
+    def __init__(self):
+        # id of every url we've seen, keyed on the normalised netloc and path which identifies a Link
+        self._ids = dict()
+        self._keys = []
+        # Index into self._schemes for each id, the url of an id is its scheme and key
+        self._node_schemes = array("B")
+        self._schemes = []
+        # Row of the out link arrays for each id, NOT_A_PAGE for urls we haven't visited
+        self._page_rows = array("i")
+        # The ids of the visited pages, in the order they were added
+        self._page_ids = array("I")
+        # The out links of row n are self._out_links[self._row_starts[n]:self._row_starts[n + 1]]
+        self._row_starts = array("Q", [0])
+        self._out_links = array("I")
+        # How each row's page was fetched, a status of 0 means the page has no fetch details and a fetch time of NaN
+        # that the time isn't known (rather than that it took no time)
+        self._statuses = array("H")
+        self._body_sizes = array("Q")
+        self._fetch_times = array("d")
+        # The id of the canonical page for the id of each near duplicate page
+        self._duplicates = dict()
+        # The id of the page each alias (a link which redirected to another page) redirects to, keyed on its id
+        self._aliases = dict()
+        # The ids of the aliases of each page, keyed on its id
+        self._page_aliases = dict()
+
+    def link_already_visited(self, link):
+        """Has a link already been visited
+
+            Args:
+                link (crawler.links.link.Link): The link to check
+
+            Returns:
+                bool: True if link already visited, or is an alias of a visited page
+        """
+        node_id = self._ids.get(link.normalised_netloc_and_path)
+
+        return node_id is not None and (self._page_rows[node_id] != GraphSiteMap.NOT_A_PAGE or node_id in self._aliases)
+
+    def page_for_link(self, link):
+        """Get the page for an already visited link
+
+            Note: The page is rebuilt from the graph, it has no page text
+
+            Args:
+                link (crawler.links.link.Link): The link for the page to return, or an alias of it
+
+            Returns:
+                crawler.pages.page.Page: The visited page
+
+            Raises:
+                KeyError: If the link hasn't been visited
+        """
+        if not self.link_already_visited(link):
+            raise KeyError(link)
+
+        node_id = self._ids[link.normalised_netloc_and_path]
+
+        return self._page_for_id(self._aliases.get(node_id, node_id))
+
+    def add_page(self, page):
+        """Add a page to the site map, only its link, out links and fetch details are kept
+
+            Args:
+                page (crawler.pages.page.Page): The page to add
+        """
+        page_id = self._intern(page.link)
+
+        # Rows are never rewritten, adding a page again points it at a new row
+        self._out_links.extend(self._intern(link) for link in page.out_links)
+        if self._page_rows[page_id] == GraphSiteMap.NOT_A_PAGE:
+            self._page_ids.append(page_id)
+        self._page_rows[page_id] = len(self._row_starts) - 1
+        self._row_starts.append(len(self._out_links))
+        self._statuses.append(page.status_code or 0)
+        self._body_sizes.append(page.body_size or 0)
+        self._fetch_times.append(math.nan if page.fetch_time is None else page.fetch_time)
+        if page.duplicate_of is not None:
+            self._duplicates[page_id] = self._intern(page.duplicate_of)
+        else:
+            self._duplicates.pop(page_id, None)
+        if page.aliases is not None:
+            self.add_aliases(page.link, page.aliases)
+
+    def add_aliases(self, link, aliases):
+        """Record links which redirect to a page, they count as visited from now on
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                aliases (list): crawler.links.link.Link instances which redirect to it
+        """
+        page_id = self._intern(link)
+        for alias in aliases:
+            alias_id = self._intern(alias)
+            if self._aliases.get(alias_id) != page_id:
+                self._aliases[alias_id] = page_id
+                self._page_aliases.setdefault(page_id, []).append(alias_id)
+
+    def all_pages(self):
+        """ Get all pages in the sitemap
+
+            Returns:
+                iterator: crawler.pages.page.Page instances, rebuilt from the graph one at a time
+        """
+        return (self._page_for_id(page_id) for page_id in self._page_ids)
+
+    def duplicate_of(self, link):
+        """Get which page a visited page is a near duplicate of
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+
+            Returns:
+                crawler.links.link.Link: The link of the canonical page, None if the page isn't a near duplicate
+        """
+        canonical_id = self._duplicates.get(self._ids.get(link.normalised_netloc_and_path))
+        if canonical_id is None:
+            return None
+
+        return self._link_for_id(canonical_id, BasePage(link.url))
+
+    def near_duplicates(self):
+        """Get every near duplicate page and the page it duplicates
+
+            Returns:
+                list: tuple(link: crawler.links.link.Link, canonical link: crawler.links.link.Link)
+        """
+        near_duplicates = []
+        for page_id, canonical_id in self._duplicates.items():
+            base_page = BasePage(self._url_for_id(page_id))
+            near_duplicates.append((self._link_for_id(page_id, base_page), self._link_for_id(canonical_id, base_page)))
+
+        return near_duplicates
+
+    def alias_of(self, link):
+        """Get which page a link redirects to
+
+            Args:
+                link (crawler.links.link.Link): The link
+
+            Returns:
+                crawler.links.link.Link: The link of the page it redirects to, None if it isn't a known alias
+        """
+        page_id = self._aliases.get(self._ids.get(link.normalised_netloc_and_path))
+        if page_id is None:
+            return None
+
+        return self._link_for_id(page_id, BasePage(link.url))
+
+    def aliases(self):
+        """Get every alias and the page it redirects to
+
+            Returns:
+                list: tuple(alias: crawler.links.link.Link, link: crawler.links.link.Link)
+        """
+        aliases = []
+        for alias_id, page_id in self._aliases.items():
+            base_page = BasePage(self._url_for_id(alias_id))
+            aliases.append((self._link_for_id(alias_id, base_page), self._link_for_id(page_id, base_page)))
+
+        return aliases
+
+    def __len__(self):
+        return len(self._page_ids)
+
+    def _intern(self, link):
+        """Get the id for a link, giving it a new one if we haven't seen it before
+
+            Args:
+                link (crawler.links.link.Link): The link
+
+            Returns:
+                int: The id of the link
+        """
+        node_id = self._ids.get(link.normalised_netloc_and_path)
+        if node_id is not None:
+            return node_id
+
+        node_id = len(self._keys)
+        self._ids[link.normalised_netloc_and_path] = node_id
+        self._keys.append(link.normalised_netloc_and_path)
+        self._node_schemes.append(self._scheme_index(link.scheme))
+        self._page_rows.append(GraphSiteMap.NOT_A_PAGE)
+
+        return node_id
+
+    def _scheme_index(self, scheme):
+        """Get the index of a scheme in the scheme table, adding it if it's new
+
+            Args:
+                scheme (string): The scheme
+
+            Returns:
+                int: The index of the scheme
+        """
+        try:
+            return self._schemes.index(scheme)
+        except ValueError:
+            self._schemes.append(scheme)
+            return len(self._schemes) - 1
+
+    def _page_for_id(self, page_id):
+        """Rebuild the page for the id of a visited url
+
+            Args:
+                page_id (int): The id of the page
+
+            Returns:
+                crawler.pages.page.Page: The page, with no page text
+        """
+        base_page = BasePage(self._url_for_id(page_id))
+        row = self._page_rows[page_id]
+        out_link_ids = self._out_links[self._row_starts[row]:self._row_starts[row + 1]]
+
+        page = Page(
+            self._link_for_id(page_id, base_page),
+            None,
+            out_links=[self._link_for_id(out_link_id, base_page) for out_link_id in out_link_ids],
+        )
+        if self._statuses[row] != 0:
+            page.status_code = self._statuses[row]
+            page.body_size = self._body_sizes[row]
+            if not math.isnan(self._fetch_times[row]):
+                page.fetch_time = self._fetch_times[row]
+        if page_id in self._duplicates:
+            page.duplicate_of = self._link_for_id(self._duplicates[page_id], base_page)
+        if page_id in self._page_aliases:
+            page.aliases = [self._link_for_id(alias_id, base_page) for alias_id in self._page_aliases[page_id]]
+
+        return page
+
+    def _url_for_id(self, node_id):
+        return Link._construct_url(self._schemes[self._node_schemes[node_id]], self._keys[node_id])
+
+    def _link_for_id(self, node_id, base_page):
+        """Rebuild the link for an id
+
+            Args:
+                node_id (int): The id of the link
+                base_page (crawler.links.link.BasePage): The page the link was found on
+
+            Returns:
+                crawler.links.link.Link: The link
+        """
+        scheme = self._schemes[self._node_schemes[node_id]]
+        key = self._keys[node_id]
+        domain, port = Link._parse_netloc(key.split("/", 1)[0], scheme)
+
+        return Link._from_resolved(base_page, scheme, domain, port, key)
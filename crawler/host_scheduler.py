@@ -0,0 +1,286 @@
+import contextlib
+import email.utils
+import threading
+import time
+
+
+class HostState:
+    """What the scheduler knows about one host
+
+        Attributes:
+            floor (int): The fewest requests it will allow in flight to the host
+            ceiling (int): The most requests it will allow in flight to the host
+            limit (float): How many requests may be in flight to the host now, between the floor and the ceiling
+            in_flight (int): How many requests are in flight to the host now
+            latency (float): Smoothed seconds the host takes to respond, None until it has responded
+            baseline_latency (float): The lowest smoothed latency seen, what the host manages when it isn't loaded
+            error_rate (float): Smoothed fraction of requests to the host which failed or were throttled
+            blocked_until (float): time.monotonic() before which no more requests are sent, from a Retry-After
+            requests (int): How many requests have been made to the host
+            errors (int): How many of them failed or were throttled
+    """
+    __slots__ = (
+        "floor", "ceiling", "limit", "in_flight", "latency", "baseline_latency", "error_rate", "blocked_until",
+        "last_decrease", "requests", "errors",
+    )
+
+    def __init__(self, floor, ceiling, limit):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.limit = float(limit)
+        self.in_flight = 0
+        self.latency = None
+        self.baseline_latency = None
+        self.error_rate = 0.0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def __repr__(self):
+        return "limit {:.1f} ({}-{}), {} requests, {:.1%} errors, latency {}".format(
+            self.limit,
+            self.floor,
+            self.ceiling,
+            self.requests,
+            self.error_rate,
+            "-" if self.latency is None else "{:.0f}ms".format(self.latency * 1000),
+        )
+
+
+class HostScheduler:
+    """Decides how many requests may be in flight to each host at once, adapting to how the host copes.
+
+       The limit for each host follows AIMD (additive increase, multiplicative decrease), like TCP's congestion window:
+       every successful response adds increase / limit to it, so it grows by about increase per round of requests,
+       while a throttled (429 or 503) or failed request, or the host's latency climbing to latency_factor times its
+       baseline, multiplies it by decrease. Decreases happen at most once per round trip so one burst of errors only
+       counts once. A Retry-After header stops any requests being sent to the host until it has passed, a throttled
+       request without one backs the host off for retry_backoff seconds, doubling with each retry.
+
+       A host is the domain and port of a link, as parsed by crawler.links.link.Link. The scheduler is safe to share
+       between all the worker threads of a crawl, acquire blocks the calling thread until the host has a free slot.
+    """
+    THROTTLED_STATUS_CODES = (429, 503)
+    # Weight of each new sample in the smoothed latency and error rate
+    SMOOTHING = 0.2
+
+    def __init__(self, floor=1, ceiling=16, initial=None, increase=1.0, decrease=0.5, latency_factor=2.0,
+                 max_retries=3, max_retry_after=300, host_limits=None, retry_backoff=1.0):
+        """Initialiser
+
+            Args:
+                floor (int): The fewest requests to allow in flight to a host, however badly it copes
+                ceiling (int): The most requests to allow in flight to a host, however well it copes
+                initial (int): How many requests to allow in flight to a host before it has responded, by default the
+                    floor
+                increase (float): How much to raise a host's limit by for each round of successful requests
+                decrease (float): What to multiply a host's limit by when it is throttling or failing, below 1
+                latency_factor (float): How many times a host's baseline latency its latency must reach before it is
+                    taken as overloaded
+                max_retries (int): How many times to retry a throttled request before giving up on it
+                max_retry_after (float): The longest Retry-After to honour in seconds, longer ones are cut to this
+                host_limits (dict): tuple(floor, ceiling) to use instead of the defaults for particular hosts, keyed on
+                    tuple(domain, port)
+                retry_backoff (float): How many seconds to hold off a host before the first retry of a request it
+                    throttled without a Retry-After, each further retry waits twice as long (see back_off)
+
+            Raises:
+                ValueError: If the limits don't make sense
+        """
+        if floor < 1 or ceiling < floor:
+            raise ValueError("Need 1 <= floor <= ceiling, got floor {} and ceiling {}".format(floor, ceiling))
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be between 0 and 1, got {}".format(decrease))
+
+        self._floor = floor
+        self._ceiling = ceiling
+        self._initial = initial
+        self._increase = increase
+        self._decrease = decrease
+        self._latency_factor = latency_factor
+        self.max_retries = max_retries
+        self._max_retry_after = max_retry_after
+        self._host_limits = dict(host_limits or {})
+        self._retry_backoff = retry_backoff
+
+        self._hosts = {}
+        self._condition = threading.Condition()
+
+    def host(link):
+        """Get the host of a link, requests to the same host share a limit
+
+            Args:
+                link (crawler.links.link.Link): The link
+
+            Returns:
+                tuple(domain: str, port: int): The host
+        """
+        return (link.domain.lower(), int(link.port))
+
+    def acquire(self, link):
+        """Wait until another request may be sent to the host of the link and take a slot for it. Every acquire must be
+           followed by a release.
+
+            Args:
+                link (crawler.links.link.Link): The link about to be requested
+        """
+        host = HostScheduler.host(link)
+
+        with self._condition:
+            state = self._state(host)
+            while True:
+                now = time.monotonic()
+                if now < state.blocked_until:
+                    self._condition.wait(state.blocked_until - now)
+                elif state.in_flight >= int(state.limit):
+                    self._condition.wait()
+                else:
+                    break
+
+            state.in_flight += 1
+
+    def release(self, link, latency, status_code=None, retry_after=None):
+        """Give back the slot taken for a request, adjusting the host's limit by how it went
+
+            Args:
+                link (crawler.links.link.Link): The link that was requested
+                latency (float): Seconds the host took to respond
+                status_code (int): The status of the response, None if the request failed without one
+                retry_after (string): The Retry-After header of the response, if it had one
+        """
+        host = HostScheduler.host(link)
+        throttled = status_code is None or status_code in HostScheduler.THROTTLED_STATUS_CODES
+
+        with self._condition:
+            state = self._state(host)
+            now = time.monotonic()
+
+            state.in_flight -= 1
+            state.requests += 1
+            state.error_rate += HostScheduler.SMOOTHING * ((1.0 if throttled else 0.0) - state.error_rate)
+
+            if state.latency is None:
+                state.latency = latency
+            else:
+                state.latency += HostScheduler.SMOOTHING * (latency - state.latency)
+            if state.baseline_latency is None or state.latency < state.baseline_latency:
+                state.baseline_latency = state.latency
+
+            overloaded = state.latency > self._latency_factor * state.baseline_latency
+            if throttled:
+                state.errors += 1
+            if throttled or overloaded:
+                # Only back off once per round trip, the other requests of the round saw the same conditions
+                if now - state.last_decrease >= state.latency:
+                    state.limit = max(state.floor, state.limit * self._decrease)
+                    state.last_decrease = now
+            else:
+                state.limit = min(state.ceiling, state.limit + self._increase / state.limit)
+
+            if retry_after is not None:
+                delay = HostScheduler._retry_after_seconds(retry_after)
+                if delay is not None:
+                    state.blocked_until = max(state.blocked_until, now + min(delay, self._max_retry_after))
+
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, link):
+        """Hold a slot for a request while inside the with block, a request which raises counts as failed
+
+            Args:
+                link (crawler.links.link.Link): The link about to be requested
+
+            Yields:
+                callable: Call with (latency, status_code, retry_after) once the response arrives
+        """
+        self.acquire(link)
+
+        outcome = {}
+
+        def record(latency, status_code=None, retry_after=None):
+            outcome.update(latency=latency, status_code=status_code, retry_after=retry_after)
+
+        start = time.monotonic()
+        try:
+            yield record
+        finally:
+            if not outcome:
+                outcome["latency"] = time.monotonic() - start
+            self.release(link, **outcome)
+
+    def should_retry(self, status_code, attempt):
+        """Whether a request should be sent again
+
+            Args:
+                status_code (int): The status of the response
+                attempt (int): How many times the request has already been retried
+
+            Returns:
+                bool: True if the host throttled the request and it hasn't been retried too often
+        """
+        return status_code in HostScheduler.THROTTLED_STATUS_CODES and attempt < self.max_retries
+
+    def back_off(self, link, attempt):
+        """Stop any requests being sent to the host of a link for a while, before retrying a request it throttled
+           without saying how long to wait
+
+            Args:
+                link (crawler.links.link.Link): The link that was throttled
+                attempt (int): How many times the request has already been retried
+        """
+        delay = min(self._retry_backoff * 2 ** attempt, self._max_retry_after)
+
+        with self._condition:
+            state = self._state(HostScheduler.host(link))
+            state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+
+    def host_states(self):
+        """Get what is known about every host requested so far
+
+            Returns:
+                dict: HostState instances keyed on tuple(domain, port), they are updated as the crawl goes on
+        """
+        with self._condition:
+            return dict(self._hosts)
+
+    def _state(self, host):
+        """Get the state of a host, creating it the first time, must be called holding the condition
+
+            Args:
+                host (tuple): The host
+
+            Returns:
+                HostState: The host's state
+        """
+        state = self._hosts.get(host)
+        if state is None:
+            floor, ceiling = self._host_limits.get(host, (self._floor, self._ceiling))
+            initial = floor if self._initial is None else min(max(self._initial, floor), ceiling)
+            state = HostState(floor, ceiling, initial)
+            self._hosts[host] = state
+
+        return state
+
+    def _retry_after_seconds(retry_after):
+        """Parse a Retry-After header
+
+            Args:
+                retry_after (string): The header, either a number of seconds or an HTTP date
+
+            Returns:
+                float: How many seconds to wait from now, or None if the header can't be parsed
+        """
+        retry_after = retry_after.strip()
+        if retry_after.isdigit():
+            return float(retry_after)
+
+        try:
+            retry_at = email.utils.parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError, IndexError):
+            return None
+        if retry_at is None or retry_at.tzinfo is None:
+            return None
+
+        return max(0.0, retry_at.timestamp() - time.time())
@@ -11,6 +11,39 @@ class UnknownSchemeError(ValueError):
     pass
 
 
+class BasePage:
+    """The parsed url of a crawled page, relative links are resolved against it.
+
+       Parsed once and shared by every Link found on the same page, rather than each Link keeping its own copy.
+
+        Attributes:
+            url (string): The url of the crawled page
+            scheme (string): The scheme of the crawled page
+            netloc (string): The netloc (domain and optional port) of the crawled page
+            domain (string): The domain of the crawled page
+            port (int): The port of the crawled page
+            subdir (string): The directory of the crawled page's path
+    """
+    __slots__ = ("url", "scheme", "netloc", "domain", "port", "subdir")
+
+    def __init__(self, url):
+        """Initialise
+
+        Args:
+            url (string): The url of the crawled page
+
+        Raises:
+            UnknownSchemeError: If the url is an unknown url scheme (only http, and https are known)
+        """
+        self.url = url
+        self.scheme, self.netloc, path, _, _, _ = urlparse(url)
+        self.domain, self.port = Link._parse_netloc(self.netloc, self.scheme)
+        self.subdir = Link._parse_subdir(path)
+
+    def __repr__(self):
+        return self.url
+
+
 class Link:
     """Represents a Link on a page, links are equivalent in the following circumstances:
         * They have the same domain
@@ -21,6 +54,12 @@ class Link:
         Attributes:
             url (string): The complete url, either as the normalised original href (if the path was absolute) or as
                 derived from combining the href of the link with the page being crawled (if the href is relative)
+            base_page (BasePage): The crawled page the link was found on
+            scheme (string): The scheme of the link
+            domain (string): The domain of the link
+            port (int): The port of the link
+            normalised_netloc_and_path (string): The netloc and normalised absolute path, this is what identifies
+                the link
 
         # Design note: This class is pretty complex, but knowing any old nonsense can be in the href of the links
                        on webpages, and my desire to ensure I can _know_ that different looking hrefs lead to the same
@@ -28,51 +67,87 @@ class Link:
                        like, and no matter where we are in the website heirachy) leads to this complexity. If this
                        class can be comprehensive and correct then it makes the rest of this task _much_ easier and
                        makes it trivial to avoid graphing loops when traversing a heirarch of pages.
+
+        # Memory note: A crawl can hold millions of links so only the normalised result of parsing the href is kept,
+                       in slots rather than a __dict__, and everything about the crawled page lives in the shared
+                       BasePage. The url is built when asked for rather than stored.
     """
-    url = None
+    __slots__ = ("base_page", "scheme", "domain", "port", "normalised_netloc_and_path", "_hash")
 
     def __init__(self, crawled_page, href):
         """Initialise
 
         Args:
-            crawled_page: The domain that is being crawled, used to construct links from relative urls
+            crawled_page: The page that is being crawled, used to construct links from relative urls. Either its
+                url, or a BasePage shared with the other links on the same page.
             href: The href of the link to parse
 
         Raises:
             InvalidPathError: If the href tries to escape the root of the domain
             UnknownSchemeError: If the href is an unknown url scheme (only http, and https are known)
         """
-        self._raw_crawled_page = crawled_page
-        self._raw_href = href
-
-        self.crawled_scheme, self.crawled_netloc, self.crawled_path, _, _, _ = urlparse(crawled_page)
-        self.scheme, self.netloc, self.path, _, _, _ = urlparse(href)
-
-        self._raw_scheme = self.scheme
-        if self.scheme == "":
-            self.scheme = self.crawled_scheme
+        if not isinstance(crawled_page, BasePage):
+            crawled_page = BasePage(crawled_page)
 
-        self._raw_netloc = self.netloc
-        if self.netloc == "":
-            self.netloc = self.crawled_netloc
+        scheme, netloc, path, _, _, _ = urlparse(href)
 
-        # Parse the domains and ports
-        self.crawled_domain, self.crawled_port = self._parse_netloc(self.crawled_netloc, self.crawled_scheme)
-        self.domain, self.port = self._parse_netloc(self.netloc, self.scheme)
+        raw_netloc = netloc
+        if scheme == "":
+            scheme = crawled_page.scheme
+        if netloc == "":
+            netloc = crawled_page.netloc
 
-        # Parse the subpaths
-        self.crawled_subdir = self._parse_subdir(self.crawled_path)
-        self.subdir = self._parse_subdir(self.path)
+        # Parse the domain and port
+        domain, port = Link._parse_netloc(netloc, scheme)
 
         # Construct our final absolute path
-        if self._is_relative_path():
-            self.absolute_path = self._join_paths(self.crawled_subdir, self.path)
+        if Link._is_relative_path(href, raw_netloc):
+            absolute_path = Link._join_paths(crawled_page.subdir, path)
         else:
-            self.absolute_path = self.path
+            absolute_path = path
 
         # Test for paths that are escaping from the root of the domain
-        self.normalised_netloc_and_path = self._join_netloc_and_path()
-        self.url = self._construct_url()
+        normalised_netloc_and_path = Link._join_netloc_and_path(netloc, absolute_path)
+
+        self._set_resolved(crawled_page, scheme, domain, port, normalised_netloc_and_path)
+
+    def _from_resolved(base_page, scheme, domain, port, normalised_netloc_and_path):
+        """Build a link from an href which has already been resolved, without parsing anything
+
+        Args:
+            base_page (BasePage): The crawled page the link was found on
+            scheme (string): The scheme of the link
+            domain (string): The domain of the link
+            port (int): The port of the link
+            normalised_netloc_and_path (string): The normalised netloc and path of the link
+
+        Returns:
+            Link: The link
+        """
+        link = Link.__new__(Link)
+        link._set_resolved(base_page, scheme, domain, port, normalised_netloc_and_path)
+
+        return link
+
+    def _set_resolved(self, base_page, scheme, domain, port, normalised_netloc_and_path):
+        # Links to the crawled domain are by far the most common, share its strings rather than keeping a copy
+        if domain == base_page.domain:
+            domain = base_page.domain
+        if scheme == base_page.scheme:
+            scheme = base_page.scheme
+
+        self.base_page = base_page
+        self.scheme = scheme
+        self.domain = domain
+        self.port = port
+        self.normalised_netloc_and_path = normalised_netloc_and_path
+        self._hash = hash(normalised_netloc_and_path)
+
+    @property
+    def url(self):
+        """The parsed and cleaned url with only scheme, domain, port, and path parts
+        """
+        return Link._construct_url(self.scheme, self.normalised_netloc_and_path)
 
     def in_crawled_domain(self):
         """Check if the link is within the originally crawled domain
@@ -80,13 +155,13 @@ class Link:
         Returns:
             bool: True if the Link is within the crawled domain
         """
-        return self.domain == self.crawled_domain
+        return self.domain == self.base_page.domain
 
-    def _join_paths(self, subdir, path):
+    def _join_paths(subdir, path):
         """Joins a subdir with a path to produce a clean, absolute path
 
         """
-        abspath = self._path_to_abspath(path)
+        abspath = Link._path_to_abspath(path)
         if subdir == "":
             return abspath
         else:
@@ -95,34 +170,34 @@ class Link:
                 abspath=abspath,
             )
 
-    def _path_to_abspath(self, path):
+    def _path_to_abspath(path):
         if path.startswith("/"):
             return path
-        
+
         return "/{}".format(path)
 
-    def _construct_url(self):
+    def _construct_url(scheme, normalised_netloc_and_path):
         """Return a parsed and cleaned url
 
         Returns:
             string: The parsed and cleaned url with only scheme, domain, port, and path parts
         """
-        if self.scheme == "":
+        if scheme == "":
             scheme_separator = ""
         else:
             scheme_separator = ":"
 
         return "{scheme}{scheme_separator}//{netloc_and_path}".format(
-            scheme=self.scheme,
+            scheme=scheme,
             scheme_separator=scheme_separator,
-            netloc_and_path=self.normalised_netloc_and_path
+            netloc_and_path=normalised_netloc_and_path
         )
 
-    def _join_netloc_and_path(self):
+    def _join_netloc_and_path(netloc, absolute_path):
         """Join the netlocation and the path together and normalise the path
 
         Returns:
-            None
+            string: The normalised netloc and path
 
         Raises:
             InvalidPathError: Raised if the path tries to escape the root of the domain (like
@@ -132,25 +207,25 @@ class Link:
         # If we join the netloc and the absolute path together and then normalise the string,
         # if does not start with the netloc we know there was enough upwards directory
         # traversal to escape from the root
-        netloc_and_path = "{netloc}{path}".format(netloc=self.netloc, path=self.absolute_path)
+        netloc_and_path = "{netloc}{path}".format(netloc=netloc, path=absolute_path)
         normalised_url = os.path.normpath(netloc_and_path)
 
-        if not normalised_url.startswith(self.netloc):
+        if not normalised_url.startswith(netloc):
             raise InvalidPathError()
 
         return normalised_url
 
-    def _is_relative_path(self):
+    def _is_relative_path(href, raw_netloc):
         """Checks if the href is a relative path
 
         Returns:
             bool: True if the href was a relative url
         """
-        href_is_relative = not self._raw_href.startswith("/")
+        href_is_relative = not href.startswith("/")
 
-        return self._raw_netloc == "" and href_is_relative
+        return raw_netloc == "" and href_is_relative
 
-    def _parse_subdir(self, path):
+    def _parse_subdir(path):
         """Parses the subdir from the filepath
 
         Args:
@@ -161,7 +236,7 @@ class Link:
         """
         return os.path.dirname(path)
 
-    def _parse_netloc(self, netloc, scheme):
+    def _parse_netloc(netloc, scheme):
         """Parse a netloc to a domain and port
 
         Args:
@@ -176,10 +251,10 @@ class Link:
         else:
             return (
                 netloc,
-                self._default_port_for_scheme(scheme),
+                Link._default_port_for_scheme(scheme),
             )
 
-    def _default_port_for_scheme(self, scheme):
+    def _default_port_for_scheme(scheme):
         """Returnt the default port for a particular scheme
         """
         scheme_lower_case = scheme.lower()
@@ -191,6 +266,13 @@ class Link:
         else:
             raise UnknownSchemeError("Unknown scheme {}".format(scheme))
 
+    def __getstate__(self):
+        # str hashes are randomised per process, so the cached hash can't be pickled
+        return (self.base_page, self.scheme, self.domain, self.port, self.normalised_netloc_and_path)
+
+    def __setstate__(self, state):
+        self._set_resolved(*state)
+
     def __repr__(self):
         return self.url
 
@@ -198,7 +280,7 @@ class Link:
         """We are implementing this so we can keep a dict of all the visited links
            making it trivial, and O(1) operation to know if we have already crawled
         """
-        return hash(self.normalised_netloc_and_path)
+        return self._hash
 
     def __eq__(self, other):
         return self.normalised_netloc_and_path == other.normalised_netloc_and_path
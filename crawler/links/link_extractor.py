@@ -1,14 +1,16 @@
 # Note I am _not_ using any of the scraping ability of pyquery, only its jquery like interface for selecting elements
 # from an already retrieved web page
+import time
+
 from pyquery import PyQuery
 
-from crawler.links.link import Link, InvalidPathError, UnknownSchemeError
+from crawler.links.link import BasePage, Link, InvalidPathError, UnknownSchemeError
 
 
 class LinkExtractor:
     """Extracts links from the text of a web page
     """
-    def extract(crawled_page_url, page_text):
+    def extract(crawled_page_url, page_text, resolver=None, metrics=None):
         """Given a web page will extract all <a> links, turn them into crawler.links.link.Link instances
            and return the results.
 
@@ -18,20 +20,70 @@ class LinkExtractor:
            Args:
                crawled_page_url (string): The url of the crawled page
                page_text (string): The web page text
+               resolver (crawler.links.link_resolver.LinkResolver): Cache to build the links through, if not given
+                   every href is parsed
+               metrics (crawler.metrics.CrawlMetrics): Record the time spent parsing the page and building its links
 
            Returns:
                list: List of crawler.links.link.Link instances representing every unique link on the page
         """
+        if metrics is not None:
+            start = time.perf_counter()
 
         parsed_page = PyQuery(page_text)
+        base_page = BasePage(crawled_page_url)
         links = []
 
         anchor_elements = parsed_page("a[href]")
+        if metrics is not None:
+            parsed = time.perf_counter()
+            metrics.observe("parse", parsed - start)
+
         for anchor_element in anchor_elements:
             try:
-                link = Link(crawled_page_url, anchor_element.attrib["href"])
+                if resolver is None:
+                    link = Link(base_page, anchor_element.attrib["href"])
+                else:
+                    link = resolver.resolve(base_page, anchor_element.attrib["href"])
                 links.append(link)
             except (InvalidPathError, UnknownSchemeError):
                 next
 
+        if metrics is not None:
+            metrics.observe("link_normalise", time.perf_counter() - parsed)
+
+        return links
+
+    def extract_resolved(crawled_page_url, page_text):
+        """Extract the links from a web page in a compact form, for sending back from another process
+
+           Args:
+               crawled_page_url (string): The url of the crawled page
+               page_text (string): The web page text
+
+           Returns:
+               list: tuple(scheme: str, normalised_netloc_and_path: str) for every link on the page, turn them back
+                   into crawler.links.link.Link instances with links_from_resolved
+        """
+        return [
+            (link.scheme, link.normalised_netloc_and_path)
+            for link in LinkExtractor.extract(crawled_page_url, page_text)
+        ]
+
+    def links_from_resolved(crawled_page_url, resolved_links):
+        """Rebuild the links returned by extract_resolved, without parsing them again
+
+           Args:
+               crawled_page_url (string): The url of the crawled page
+               resolved_links (list): tuple(scheme: str, normalised_netloc_and_path: str) for each link
+
+           Returns:
+               list: List of crawler.links.link.Link instances
+        """
+        base_page = BasePage(crawled_page_url)
+        links = []
+        for scheme, normalised_netloc_and_path in resolved_links:
+            domain, port = Link._parse_netloc(normalised_netloc_and_path.split("/", 1)[0], scheme)
+            links.append(Link._from_resolved(base_page, scheme, domain, port, normalised_netloc_and_path))
+
         return links
@@ -0,0 +1,111 @@
+import threading
+
+from collections import OrderedDict
+
+from crawler.links.link import Link, InvalidPathError, UnknownSchemeError
+
+
+class LinkResolver:
+    """Builds Links through a bounded least recently used cache of href resolutions.
+
+       Navigation bars, footers and breadcrumbs mean the same hrefs appear in the same directory on page after page, a
+       cache hit builds the Link straight from the already normalised result instead of parsing the href again. Hrefs
+       which are invalid are cached too, and raise the same error again.
+
+       Safe to share between threads.
+
+        Attributes:
+            max_size (int): The most resolutions to keep
+            hits (int): How many links were built from the cache
+            misses (int): How many links had to be parsed
+    """
+    max_size = None
+    hits = 0
+    misses = 0
+
+    def __init__(self, max_size=10000):
+        """Initialiser
+
+            Args:
+                max_size (int): The most resolutions to keep, the least recently used is dropped to make room
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1, got {}".format(max_size))
+
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._resolutions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, base_page, href):
+        """Get the Link for an href on a crawled page
+
+            Args:
+                base_page (crawler.links.link.BasePage): The crawled page the href is on
+                href (string): The href of the link to parse
+
+            Returns:
+                crawler.links.link.Link: The link
+
+            Raises:
+                InvalidPathError: If the href tries to escape the root of the domain
+                UnknownSchemeError: If the href is an unknown url scheme (only http, and https are known)
+        """
+        # Only the parts of the crawled page a relative href is resolved against matter, every page in the same
+        # directory shares the same resolutions
+        key = (base_page.scheme, base_page.netloc, base_page.subdir, href)
+
+        with self._lock:
+            resolution = self._resolutions.get(key)
+            if resolution is None:
+                self.misses += 1
+            else:
+                self._resolutions.move_to_end(key)
+                self.hits += 1
+
+        if resolution is None:
+            resolution = self._parse(base_page, href)
+
+            with self._lock:
+                self._resolutions[key] = resolution
+                if len(self._resolutions) > self.max_size:
+                    self._resolutions.popitem(last=False)
+
+        if isinstance(resolution, _InvalidHref):
+            raise resolution.error_class(*resolution.error_args)
+
+        return Link._from_resolved(base_page, *resolution)
+
+    def __len__(self):
+        return len(self._resolutions)
+
+    def _parse(self, base_page, href):
+        """Parse an href which isn't in the cache
+
+            Args:
+                base_page (crawler.links.link.BasePage): The crawled page the href is on
+                href (string): The href of the link to parse
+
+            Returns:
+                tuple: The scheme, domain, port and normalised_netloc_and_path of the link, or an _InvalidHref if it
+                    couldn't be parsed
+        """
+        try:
+            link = Link(base_page, href)
+        except (InvalidPathError, UnknownSchemeError) as error:
+            # Keep the class rather than the error itself, raising the same instance again would keep growing its
+            # traceback
+            return _InvalidHref(type(error), error.args)
+
+        return (link.scheme, link.domain, link.port, link.normalised_netloc_and_path)
+
+
+class _InvalidHref:
+    """The cached result of an href which couldn't be parsed
+    """
+    __slots__ = ("error_class", "error_args")
+
+    def __init__(self, error_class, error_args):
+        self.error_class = error_class
+        self.error_args = error_args
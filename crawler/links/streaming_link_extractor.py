@@ -0,0 +1,142 @@
+# Note this uses lxml's event driven (target) parser interface, the page is never built into a tree so the memory used
+# stays flat no matter how large the page is
+import codecs
+
+from lxml import etree
+
+from crawler.links.link import BasePage, Link, InvalidPathError, UnknownSchemeError
+
+
+class StreamingLinkExtractor:
+    """Extracts links from a web page a chunk at a time, while it is still being downloaded.
+
+       Finds the same links as crawler.links.link_extractor.LinkExtractor, in the same order.
+    """
+    def __init__(self, crawled_page_url, encoding=None, resolver=None):
+        """Initialiser
+
+            Args:
+                crawled_page_url (string): The url of the crawled page
+                encoding (string): The character encoding of the page, if not given (or not known) it is detected
+                    from the page
+                resolver (crawler.links.link_resolver.LinkResolver): Cache to build the links through, if not given
+                    every href is parsed
+        """
+        self._target = _AnchorTarget(crawled_page_url, resolver)
+        self._parser = StreamingLinkExtractor._parser_for(self._target, encoding)
+        self._fed = False
+
+    def feed(self, chunk):
+        """Parse the next chunk of the page
+
+            Args:
+                chunk (bytes): The next chunk of the page body
+
+            Returns:
+                list: crawler.links.link.Link instances for the links which were completed by this chunk
+        """
+        if len(chunk) == 0:
+            return []
+
+        self._fed = True
+        self._parser.feed(chunk)
+
+        return self._target.take_new_links()
+
+    def close(self):
+        """Finish parsing the page
+
+            Returns:
+                list: crawler.links.link.Link instances for every link on the page
+        """
+        if self._fed:
+            self._parser.close()
+
+        return self._target.links
+
+    def _parser_for(target, encoding):
+        """Create the incremental parser
+
+            Args:
+                target (_AnchorTarget): The target receiving the parser events
+                encoding (string): The character encoding of the page, may be None
+
+            Returns:
+                lxml.etree.HTMLParser: The parser
+        """
+        if encoding is not None:
+            try:
+                # libxml2 doesn't know every python alias (like latin-1) but does know the canonical names
+                return etree.HTMLParser(target=target, encoding=codecs.lookup(encoding).name)
+            except LookupError:
+                pass
+
+        return etree.HTMLParser(target=target)
+
+    def extract(crawled_page_url, chunks, encoding=None, resolver=None):
+        """Given the chunks of a web page will yield each <a> link as soon as it has been parsed
+
+           Note: Will silently ignore all invalid (semantically, not whether they lead somewhere) links, and all
+                Links with an unknown url scheme
+
+           Args:
+               crawled_page_url (string): The url of the crawled page
+               chunks (iterable): The web page body as bytes chunks
+               encoding (string): The character encoding of the page, if not given it is detected from the page
+               resolver (crawler.links.link_resolver.LinkResolver): Cache to build the links through
+
+           Yields:
+               crawler.links.link.Link: Every link on the page
+        """
+        extractor = StreamingLinkExtractor(crawled_page_url, encoding=encoding, resolver=resolver)
+        links_yielded = 0
+
+        for chunk in chunks:
+            new_links = extractor.feed(chunk)
+            links_yielded += len(new_links)
+            yield from new_links
+
+        # Closing the parser can flush a final tag which was waiting on more input
+        yield from extractor.close()[links_yielded:]
+
+
+class _AnchorTarget:
+    """lxml parser target collecting the links from <a href> start tags
+    """
+    def __init__(self, crawled_page_url, resolver):
+        self._base_page = BasePage(crawled_page_url)
+        self._resolver = resolver
+        self.links = []
+        self._new_links_start = 0
+
+    def take_new_links(self):
+        """Get the links seen since this was last called
+
+            Returns:
+                list: crawler.links.link.Link instances
+        """
+        new_links = self.links[self._new_links_start:]
+        self._new_links_start = len(self.links)
+
+        return new_links
+
+    def start(self, tag, attrib):
+        if tag != "a" or "href" not in attrib:
+            return
+
+        try:
+            if self._resolver is None:
+                self.links.append(Link(self._base_page, attrib["href"]))
+            else:
+                self.links.append(self._resolver.resolve(self._base_page, attrib["href"]))
+        except (InvalidPathError, UnknownSchemeError):
+            pass
+
+    def end(self, tag):
+        pass
+
+    def data(self, data):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,393 @@
+import bisect
+import http.server
+import io
+import os
+import threading
+import time
+
+
+class Counter:
+    """A count which only goes up, safe to share between threads
+
+        Attributes:
+            value: The count
+    """
+    value = 0
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """Add to the count
+
+            Args:
+                amount: How much to add
+        """
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """A value which goes up and down, the last value set wins
+
+        Attributes:
+            value: The value
+    """
+    value = 0
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        """Set the value
+
+            Args:
+                value: The value
+        """
+        self.value = value
+
+
+class Histogram:
+    """Counts observations into fixed buckets, like a Prometheus histogram. Observing is a binary search and three
+       additions, cheap enough to do for every request.
+
+        Attributes:
+            buckets (tuple): The upper bound of each bucket, ascending, there is always a final bucket for everything
+                larger
+            count (int): How many observations there have been
+            sum (float): The total of the observations
+    """
+    # Seconds, from a tenth of a millisecond to a minute
+    DEFAULT_BUCKETS = (
+        0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+        60.0,
+    )
+    buckets = None
+    count = 0
+    sum = 0.0
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """Initialiser
+
+            Args:
+                buckets (tuple): The upper bound of each bucket, ascending
+        """
+        self.buckets = tuple(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Record an observation
+
+            Args:
+                value (float): The observation
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def cumulative_counts(self):
+        """Get how many observations were at most each bucket's upper bound
+
+            Returns:
+                list: The cumulative count for each bucket, then the count of every observation
+        """
+        with self._lock:
+            counts = list(self._counts)
+
+        total = 0
+        for index, count in enumerate(counts):
+            total += count
+            counts[index] = total
+
+        return counts
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating within the bucket it falls in, as Prometheus' histogram_quantile does
+
+            Args:
+                q (float): The quantile, between 0 and 1
+
+            Returns:
+                float: The estimate, None if there are no observations. Observations in the final bucket are
+                    estimated as the largest upper bound.
+        """
+        counts = self.cumulative_counts()
+        if counts[-1] == 0:
+            return None
+
+        rank = q * counts[-1]
+        # The first bucket whose cumulative count reaches the rank; a rank of 0 is reached by every leading empty
+        # bucket, so start from the first one holding an observation instead
+        index = bisect.bisect_left(counts, rank) if rank > 0 else bisect.bisect_right(counts, 0)
+        if index == len(self.buckets):
+            return self.buckets[-1]
+
+        lower = self.buckets[index - 1] if index > 0 else 0.0
+        below = counts[index - 1] if index > 0 else 0
+        in_bucket = counts[index] - below
+
+        return lower + (self.buckets[index] - lower) * (rank - below) / in_bucket
+
+
+class CrawlMetrics:
+    """The metrics of a crawl: latency histograms for each stage of crawling a page, counts of the pages and bytes
+       crawled and the size of the frontier. Give the same instance to the crawler and its page fetcher.
+
+       The stages are:
+
+       * connect: Opening a connection (including the TLS handshake), only when a new connection is needed
+       * first_byte: Sending the request until the response headers have arrived, including connecting
+       * download: Reading the body
+       * decode: Decoding the body to text
+       * parse: Parsing the page and selecting its anchors
+       * link_normalise: Building a Link from each href on a page
+       * site_map: Adding the page to the site map
+
+        Attributes:
+            stages (dict): The crawler.metrics.Histogram of seconds spent in each stage, keyed on its name
+            pages (Counter): How many pages have been crawled
+            bytes (Counter): How many bytes of page bodies have been downloaded
+            frontier (Gauge): How many links are waiting to be fetched
+    """
+    STAGES = ("connect", "first_byte", "download", "decode", "parse", "link_normalise", "site_map")
+    stages = None
+    pages = None
+    bytes = None
+    frontier = None
+
+    def __init__(self, clock=time.monotonic):
+        """Initialiser, the crawl is taken to start now for the rates
+
+            Args:
+                clock (callable): Gives the time in seconds
+        """
+        self.stages = {stage: Histogram() for stage in CrawlMetrics.STAGES}
+        self.pages = Counter()
+        self.bytes = Counter()
+        self.frontier = Gauge()
+        self._clock = clock
+        self._started = clock()
+
+    def observe(self, stage, seconds):
+        """Record the time spent in a stage
+
+            Args:
+                stage (string): One of STAGES
+                seconds (float): How long it took
+        """
+        self.stages[stage].observe(seconds)
+
+    def page_crawled(self, page):
+        """Count a crawled page
+
+            Args:
+                page (crawler.pages.page.Page): The page
+        """
+        self.pages.inc()
+        if page.body_size:
+            self.bytes.inc(page.body_size)
+
+    def elapsed(self):
+        """Get how long the crawl has been running
+
+            Returns:
+                float: The seconds since the metrics were created
+        """
+        return self._clock() - self._started
+
+    def pages_per_second(self):
+        """Get the average rate pages have been crawled at
+
+            Returns:
+                float: Pages a second since the crawl started
+        """
+        return self.pages.value / max(self.elapsed(), 1e-9)
+
+    def bytes_per_second(self):
+        """Get the average rate bytes have been downloaded at
+
+            Returns:
+                float: Bytes a second since the crawl started
+        """
+        return self.bytes.value / max(self.elapsed(), 1e-9)
+
+    def write_prometheus(self, output):
+        """Write the metrics in the Prometheus text exposition format
+
+            Args:
+                output (file): The text file to write to
+        """
+        lines = [
+            "# HELP crawler_stage_seconds Time spent in each stage of crawling a page",
+            "# TYPE crawler_stage_seconds histogram",
+        ]
+        for stage, histogram in self.stages.items():
+            counts = histogram.cumulative_counts()
+            for upper_bound, count in zip(histogram.buckets, counts):
+                lines.append('crawler_stage_seconds_bucket{{stage="{}",le="{}"}} {}'.format(stage, upper_bound, count))
+            lines.append('crawler_stage_seconds_bucket{{stage="{}",le="+Inf"}} {}'.format(stage, counts[-1]))
+            lines.append('crawler_stage_seconds_sum{{stage="{}"}} {!r}'.format(stage, histogram.sum))
+            lines.append('crawler_stage_seconds_count{{stage="{}"}} {}'.format(stage, counts[-1]))
+
+        for name, metric_type, help_text, value in (
+            ("crawler_pages_total", "counter", "Pages crawled", self.pages.value),
+            ("crawler_bytes_total", "counter", "Bytes of page bodies downloaded", self.bytes.value),
+            ("crawler_frontier_size", "gauge", "Links waiting to be fetched", self.frontier.value),
+            ("crawler_pages_per_second", "gauge", "Average pages crawled a second", self.pages_per_second()),
+            ("crawler_bytes_per_second", "gauge", "Average bytes downloaded a second", self.bytes_per_second()),
+            ("crawler_elapsed_seconds", "gauge", "Seconds since the crawl started", self.elapsed()),
+        ):
+            lines.append("# HELP {} {}".format(name, help_text))
+            lines.append("# TYPE {} {}".format(name, metric_type))
+            lines.append("{} {!r}".format(name, value))
+
+        output.write("\n".join(lines))
+        output.write("\n")
+
+    def write_textfile(self, path):
+        """Write the metrics to a file in the Prometheus text format, replacing it in one go so a collector (such as
+           the node exporter's textfile collector) never reads it half written
+
+            Args:
+                path (string): The path of the file
+        """
+        temporary_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(temporary_path, "w") as textfile:
+            self.write_prometheus(textfile)
+        os.replace(temporary_path, path)
+
+    def progress_line(self):
+        """Describe how the crawl is going in one line
+
+            Returns:
+                string: The pages crawled, the rates, the frontier size and an estimate of how long until the links in
+                    the frontier have been fetched (more links may be found by then)
+        """
+        pages_per_second = self.pages_per_second()
+        if pages_per_second > 0:
+            eta = CrawlMetrics._duration(self.frontier.value / pages_per_second)
+        else:
+            eta = "unknown"
+
+        return "{:,} pages in {}, {:.1f} pages/s, {:.1f} KiB/s, {:,} in the frontier, ETA {}".format(
+            self.pages.value,
+            CrawlMetrics._duration(self.elapsed()),
+            pages_per_second,
+            self.bytes_per_second() / 1024,
+            self.frontier.value,
+            eta,
+        )
+
+    def _duration(seconds):
+        minutes, seconds = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+
+        return "{}:{:02}:{:02}".format(hours, minutes, seconds)
+
+
+class MetricsReporter:
+    """Periodically writes the metrics of a crawl on a background thread, as a Prometheus textfile and/or a progress
+       line
+    """
+    def __init__(self, metrics, interval=10.0, textfile=None, progress=None):
+        """Initialiser
+
+            Args:
+                metrics (CrawlMetrics): The metrics
+                interval (float): The seconds between reports
+                textfile (string): The path to write the metrics to in the Prometheus text format, if any
+                progress (file): The text file to write a progress line to, if any
+        """
+        self._metrics = metrics
+        self._interval = interval
+        self._textfile = textfile
+        self._progress = progress
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-reporter", daemon=True)
+
+    def start(self):
+        """Start reporting
+        """
+        self._thread.start()
+
+    def stop(self):
+        """Stop reporting, after a final report
+        """
+        self._stopped.set()
+        self._thread.join()
+        self.report()
+
+    def report(self):
+        """Report the metrics now
+        """
+        if self._textfile is not None:
+            self._metrics.write_textfile(self._textfile)
+        if self._progress is not None:
+            self._progress.write(self._metrics.progress_line())
+            self._progress.write("\n")
+            self._progress.flush()
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            self.report()
+
+
+class MetricsServer(http.server.ThreadingHTTPServer):
+    """Serves the metrics of a crawl in the Prometheus text format at /metrics, from a background thread
+
+        Attributes:
+            metrics (CrawlMetrics): The metrics
+    """
+    daemon_threads = True
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, metrics, address=("127.0.0.1", 0)):
+        """Initialiser, binds the address
+
+            Args:
+                metrics (CrawlMetrics): The metrics
+                address (tuple(host: str, port: int)): Where to listen, by default any free local port
+        """
+        self.metrics = metrics
+        super().__init__(address, MetricsRequestHandler)
+        self._thread = None
+
+    def start(self):
+        """Start serving on a background thread
+        """
+        self._thread = threading.Thread(target=self.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop serving and release the port
+        """
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+        self.server_close()
+
+
+class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+
+        text = io.StringIO()
+        self.server.metrics.write_prometheus(text)
+        body = text.getvalue().encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", MetricsServer.CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,98 @@
+import csv
+import json
+
+
+class TextPageWriter:
+    """Writes each page as the indented text the crawler has always printed, with the page it is a near duplicate of
+       if it is one and the links which redirected to it
+    """
+    def __init__(self, output):
+        """Initialiser
+
+            Args:
+                output (file): The text file to write to
+        """
+        self._output = output
+
+    def write(self, page):
+        """Write a page
+
+            Args:
+                page (crawler.pages.page.Page): The page
+        """
+        lines = ["Page: {}".format(page.link)]
+        if page.duplicate_of is not None:
+            lines.append("    Near Duplicate Of: {}".format(page.duplicate_of))
+        if page.aliases is not None:
+            lines.extend("    Redirected From: {}".format(alias) for alias in page.aliases)
+        lines.append("    Outbound Links:")
+        lines.extend("        {}".format(out_link) for out_link in set(page.out_links))
+        lines.append("\n\n\n")
+
+        self._output.write("\n".join(lines))
+
+
+class JsonLinesPageWriter:
+    """Writes each page as a JSON object on its own line: {"url": ..., "out_links": [...]}, the out links are unique
+       and in the order they first appear on the page. Near duplicate pages also have "duplicate_of": the url of the
+       page they duplicate, and pages reached through redirects "redirected_from": the urls which redirected to them.
+    """
+    def __init__(self, output):
+        """Initialiser
+
+            Args:
+                output (file): The text file to write to
+        """
+        self._output = output
+
+    def write(self, page):
+        """Write a page
+
+            Args:
+                page (crawler.pages.page.Page): The page
+        """
+        record = {
+            "url": page.link.url,
+            "out_links": list(dict.fromkeys(out_link.url for out_link in page.out_links)),
+        }
+        if page.duplicate_of is not None:
+            record["duplicate_of"] = page.duplicate_of.url
+        if page.aliases is not None:
+            record["redirected_from"] = [alias.url for alias in page.aliases]
+        self._output.write(json.dumps(record))
+        self._output.write("\n")
+
+
+class CsvPageWriter:
+    """Writes a row for every link between pages: page,out_link. A page without any out links has one row with an empty
+       out_link, so every page appears.
+    """
+    HEADER = ("page", "out_link")
+
+    def __init__(self, output):
+        """Initialiser, writes the header
+
+            Args:
+                output (file): The text file to write to, opened with newline=""
+        """
+        self._writer = csv.writer(output)
+        self._writer.writerow(CsvPageWriter.HEADER)
+
+    def write(self, page):
+        """Write a page
+
+            Args:
+                page (crawler.pages.page.Page): The page
+        """
+        out_link_urls = list(dict.fromkeys(out_link.url for out_link in page.out_links))
+        if not out_link_urls:
+            out_link_urls = [""]
+
+        self._writer.writerows((page.link.url, out_link_url) for out_link_url in out_link_urls)
+
+
+PAGE_WRITERS = {
+    "text": TextPageWriter,
+    "jsonl": JsonLinesPageWriter,
+    "csv": CsvPageWriter,
+}
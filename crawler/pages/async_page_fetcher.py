@@ -0,0 +1,99 @@
+import asyncio
+import functools
+import time
+
+from crawler.links.streaming_link_extractor import StreamingLinkExtractor
+from crawler.pages.page import Page
+
+
+class AsyncPageFetcher:
+    """Gets pages without blocking the event loop, for use by crawler.async_crawler.AsyncCrawler
+    """
+    def __init__(self, session, parse_in_executor=False, stream_links=False, chunk_size=16384, link_resolver=None,
+                 parse_pool=None):
+        """Initialiser
+
+            Args:
+                session (aiohttp.ClientSession): The session to make all the requests with, its connector decides
+                    how many connections are kept open
+                parse_in_executor (bool): Parse the pages in the event loop's default executor instead of on the
+                    event loop itself
+                stream_links (bool): Extract the links on the event loop while the page is downloading, a chunk at a
+                    time, rather than downloading the whole page and then parsing it. The page text is not kept.
+                chunk_size (int): How many bytes to read at a time when streaming links
+                link_resolver (crawler.links.link_resolver.LinkResolver): Cache to build the out links through,
+                    shared by every page fetched
+                parse_pool (crawler.pages.parse_pool.ParsePool): Extract the links in these worker processes rather
+                    than on the event loop (or in its executor), the link_resolver isn't used for them. Not used when
+                    streaming links.
+        """
+        self._session = session
+        self._parse_in_executor = parse_in_executor
+        self._stream_links = stream_links
+        self._chunk_size = chunk_size
+        self._link_resolver = link_resolver
+        self._parse_pool = parse_pool
+
+    async def get(self, link):
+        """Get the page at the specified link
+
+            Args:
+                link (crawler.links.link.Link): The link to fetch
+
+            Returns:
+                crawler.pages.page.Page: The page
+        """
+        start = time.monotonic()
+
+        if self._stream_links:
+            page, response = await self._get_streaming_links(link)
+        else:
+            page, response = await self._get_page(link)
+
+        page.status_code = response.status
+        page.body_size = response.content.total_bytes
+        page.fetch_time = time.monotonic() - start
+
+        return page
+
+    async def _get_page(self, link):
+        """Get the page at the specified link, parsing it once the whole body has downloaded
+
+            Args:
+                link (crawler.links.link.Link): The link to fetch
+
+            Returns:
+                tuple(page: crawler.pages.page.Page, response: aiohttp.ClientResponse): The page and its response
+        """
+        async with self._session.get(link.url) as response:
+            page_text = await response.text(errors="replace")
+
+        if self._parse_pool is not None:
+            page = Page(link, page_text, out_links=await self._parse_pool.parse_async(link, page_text))
+        elif self._parse_in_executor:
+            page = await asyncio.get_running_loop().run_in_executor(
+                None,
+                functools.partial(Page, link, page_text, resolver=self._link_resolver),
+            )
+        else:
+            page = Page(link, page_text, resolver=self._link_resolver)
+
+        return page, response
+
+    async def _get_streaming_links(self, link):
+        """Get the page at the specified link, extracting the links as the body downloads
+
+            Args:
+                link (crawler.links.link.Link): The link to fetch
+
+            Returns:
+                tuple(page: crawler.pages.page.Page, response: aiohttp.ClientResponse): The page, without its text,
+                    and its response
+        """
+        async with self._session.get(link.url) as response:
+            extractor = StreamingLinkExtractor(link.url, encoding=response.charset, resolver=self._link_resolver)
+
+            async for chunk in response.content.iter_chunked(self._chunk_size):
+                extractor.feed(chunk)
+
+        return Page(link, None, out_links=extractor.close()), response
@@ -0,0 +1,153 @@
+import re
+import threading
+import zlib
+
+from array import array
+
+
+class NearDuplicateDetector:
+    """Spots pages whose text is nearly the same as a page already fetched, such as print views, paginated archives
+       and tag pages listing the same items, so they needn't be parsed or have their links followed again.
+
+       Each page's text is reduced to a 64 bit SimHash of its overlapping runs of words (shingles), pages with similar
+       text have fingerprints differing in only a few bits. A page is a near duplicate if its fingerprint is within
+       max_distance bits (the Hamming distance) of the first page seen with a similar one, its canonical page.
+
+       Fingerprints are split into max_distance + 1 blocks of bits and indexed on each block. Two fingerprints within
+       max_distance bits must have at least one block the same, so only the fingerprints sharing a block with a page
+       are compared to it rather than every one seen.
+
+       Note: Safe to share between threads.
+
+        Attributes:
+            max_distance (int): The most bits a page's fingerprint may differ from its canonical page's
+            shingle_size (int): How many words are in each shingle
+            pages (int): How many pages have been checked
+            near_duplicates (int): How many of them were near duplicates
+    """
+    FINGERPRINT_BITS = 64
+    # Script and style elements and tags are markup, not the text of the page
+    MARKUP = re.compile(r"<(script|style)\b.*?</\1\s*>|<[^>]*>", re.DOTALL | re.IGNORECASE)
+    # UNSET_BYTES[n] is every byte without bit n set
+    UNSET_BYTES = tuple(bytes(value for value in range(256) if not value >> bit & 1) for bit in range(8))
+    max_distance = None
+    shingle_size = None
+    pages = 0
+    near_duplicates = 0
+
+    def __init__(self, max_distance=3, shingle_size=3):
+        """Initialiser
+
+            Args:
+                max_distance (int): The most bits a page's fingerprint may differ from its canonical page's to be a
+                    near duplicate of it, 0 only finds pages with the same fingerprint
+                shingle_size (int): How many words are in each shingle, longer shingles make pages less alike
+        """
+        if not 0 <= max_distance < NearDuplicateDetector.FINGERPRINT_BITS // 4:
+            raise ValueError("max_distance must be between 0 and {}, got {}".format(
+                NearDuplicateDetector.FINGERPRINT_BITS // 4 - 1,
+                max_distance,
+            ))
+        if shingle_size < 1:
+            raise ValueError("shingle_size must be at least 1, got {}".format(shingle_size))
+
+        self.max_distance = max_distance
+        self.shingle_size = shingle_size
+        self.pages = 0
+        self.near_duplicates = 0
+        self._lock = threading.Lock()
+
+        # (shift, mask) of each block of bits, the first blocks take any bits left over
+        self._blocks = []
+        block_count = max_distance + 1
+        shift = 0
+        for block in range(block_count):
+            bits = NearDuplicateDetector.FINGERPRINT_BITS // block_count
+            if block < NearDuplicateDetector.FINGERPRINT_BITS % block_count:
+                bits += 1
+            self._blocks.append((shift, (1 << bits) - 1))
+            shift += bits
+        # For each block, the (fingerprint, link) of every canonical page keyed on the value of the block
+        self._indexes = [dict() for _ in self._blocks]
+
+    def canonical_link(self, link, page_text):
+        """Check whether a page is a near duplicate of one already checked, if it isn't it becomes a canonical page
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                page_text (string): The text of the page
+
+            Returns:
+                crawler.links.link.Link: The link of the page it is a near duplicate of, None if it isn't one
+        """
+        return self.add(link, NearDuplicateDetector.simhash(page_text, self.shingle_size))
+
+    def add(self, link, fingerprint):
+        """Check whether a fingerprint is within max_distance bits of a canonical page's, if it isn't the page
+           becomes a canonical page
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                fingerprint (int): The SimHash of the page
+
+            Returns:
+                crawler.links.link.Link: The link of the page it is a near duplicate of, None if it isn't one
+        """
+        keys = [(fingerprint >> shift) & mask for shift, mask in self._blocks]
+
+        with self._lock:
+            self.pages += 1
+            for index, key in zip(self._indexes, keys):
+                for canonical_fingerprint, canonical_link in index.get(key, ()):
+                    if NearDuplicateDetector.distance(fingerprint, canonical_fingerprint) <= self.max_distance:
+                        self.near_duplicates += 1
+                        return canonical_link
+
+            for index, key in zip(self._indexes, keys):
+                index.setdefault(key, []).append((fingerprint, link))
+
+        return None
+
+    def simhash(page_text, shingle_size=3):
+        """Fingerprint the text of a page, similar text gives fingerprints which differ in few bits
+
+            Each bit of the fingerprint is set if that bit is set in the hashes of more than half of the page's
+            distinct shingles. Words are hashed with CRC-32 and shingles as tuples of those, neither is salted so the
+            same text always gives the same fingerprint. The bits are counted in C, a byte position at a time, by
+            deleting the bytes at that position without the bit set and counting those left.
+
+            Args:
+                page_text (string): The text (HTML) of the page
+                shingle_size (int): How many words are in each shingle
+
+            Returns:
+                int: The 64 bit fingerprint
+        """
+        words = list(map(zlib.crc32, map(str.encode, NearDuplicateDetector.MARKUP.sub(" ", page_text).lower().split())))
+        shingles = set(zip(*(words[start:] for start in range(shingle_size))))
+        if not shingles:
+            # Fewer words than a shingle, the page is its only shingle
+            shingles = {tuple(words)}
+
+        hashes = array("q", map(hash, shingles)).tobytes()
+        half = len(shingles) / 2
+        fingerprint = 0
+        for position in range(8):
+            column = hashes[position::8]
+            for bit, unset_bytes in enumerate(NearDuplicateDetector.UNSET_BYTES):
+                if len(column.translate(None, unset_bytes)) > half:
+                    fingerprint |= 1 << (position * 8 + bit)
+
+        return fingerprint
+
+    def distance(fingerprint, other_fingerprint):
+        """Get how many bits two fingerprints differ in
+
+            Args:
+                fingerprint (int): A fingerprint
+                other_fingerprint (int): Another fingerprint
+
+            Returns:
+                int: The Hamming distance
+        """
+        return bin(fingerprint ^ other_fingerprint).count("1")
@@ -7,18 +7,46 @@ class Page:
     Attributes:
         link: The link that describes this page
         out_links: The links that describe all the anchor links out from this page
+        fingerprint: The fingerprint of the page body, if it was taken
+        status_code: The HTTP status of the response the page came from, None if it wasn't fetched
+        body_size: How many bytes of the body were downloaded, None if it wasn't fetched
+        fetch_time: How many seconds fetching and parsing the page took, None if it wasn't fetched
+        duplicate_of: The link of the page this one is a near duplicate of, None if it isn't one (see
+            crawler.pages.near_duplicates.NearDuplicateDetector)
+        redirect_chain: Every url requested to fetch the page, the url of the link it was fetched for first and the
+            url redirected to last, None if the request wasn't redirected
+        aliases: The links which redirected to this page, the link it was fetched for first, None if it wasn't
+            reached through a redirect
+        skipped: True if the page's links weren't extracted (it isn't HTML, is too large or is a near duplicate), so
+            it has no out links whatever its body holds
     """
     link = None
     out_links = None
+    fingerprint = None
+    status_code = None
+    body_size = None
+    fetch_time = None
+    duplicate_of = None
+    redirect_chain = None
+    aliases = None
+    skipped = False
 
-    def __init__(self, link, page_text):
+    def __init__(self, link, page_text, out_links=None, resolver=None, fingerprint=None, metrics=None):
         """Initialiser
 
             Args:
                 link: The link that describes this page
-                page_text: The text of the page
+                page_text: The text of the page, may be None if the out_links are given
+                out_links: The links out from this page if they have already been extracted, otherwise they are
+                    extracted from the page_text
+                resolver: The crawler.links.link_resolver.LinkResolver to extract the links through, if any
+                fingerprint: The fingerprint of the page body, see crawler.crawl_snapshot.CrawlSnapshot
+                metrics: The crawler.metrics.CrawlMetrics to record the time spent extracting the links in, if any
         """
         self.link = link
         self._page_text = page_text
+        self.fingerprint = fingerprint
 
-        self.out_links = LinkExtractor.extract(self.link.url, page_text)
+        if out_links is None:
+            out_links = LinkExtractor.extract(self.link.url, page_text, resolver=resolver, metrics=metrics)
+        self.out_links = out_links
@@ -1,20 +1,668 @@
+import contextlib
+import functools
+import logging
+import posixpath
 import requests
+import time
 
+from crawler.crawl_snapshot import CrawlSnapshot
+from crawler.links.link import BasePage, InvalidPathError, Link, UnknownSchemeError
+from crawler.links.streaming_link_extractor import StreamingLinkExtractor
 from crawler.pages.page import Page
+from crawler.pages.transports import RequestsTransport, TransportError
+
+
+class TooManyRedirects(TransportError):
+    """Raised when a page redirects more than max_redirects times
+    """
+    pass
 
 
 class PageFetcher:
-    """Gets pages
+    """Gets pages through a long lived transport (see crawler.pages.transports), so connections (and their TLS
+       handshakes) are reused between pages. Redirects are followed here, a hop at a time, whichever transport makes
+       the requests.
+
+       A single instance is safe to share between all the worker threads of a crawl, the connection pool hands each
+       thread its own connection.
+
+        Attributes:
+            transport: The transport all requests are made with
+            session (requests.Session): The session of the requests transport, None with the other transports
+            max_redirects (int): The most redirects to follow for a page
+            timeout (float): The most seconds to wait to connect to a server, or for it to send anything
     """
-    def get(link):
+    # Extensions of files which are never HTML, for the skip_extensions pre-filter
+    BINARY_EXTENSIONS = frozenset([
+        "7z", "avi", "bmp", "bz2", "css", "csv", "dmg", "doc", "docx", "eot", "epub", "exe", "flac", "gif", "gz",
+        "ico", "iso", "jar", "jpeg", "jpg", "js", "json", "m4a", "m4v", "mkv", "mov", "mp3", "mp4", "mpeg", "mpg",
+        "msi", "odp", "ods", "odt", "ogg", "otf", "pdf", "png", "ppt", "pptx", "rar", "rss", "svg", "tar", "tgz",
+        "tif", "tiff", "ttf", "wav", "webm", "webp", "wmv", "woff", "woff2", "xls", "xlsx", "xml", "xz", "zip",
+    ])
+    transport = None
+    session = None
+    max_redirects = None
+    timeout = None
+
+    def __init__(self, pool_size=10, max_connections_per_host=10, keep_alive=True, headers=None, stream_links=False,
+                 chunk_size=16384, link_resolver=None, validation_cache=None, snapshot=None,
+                 scheduler=None, html_only=True, max_body_size=None, skip_extensions=None, parse_pool=None,
+                 metrics=None, near_duplicates=None, transport=RequestsTransport, max_redirects=30,
+                 timeout=30.0, verify=True):
+        """Initialiser
+
+            Args:
+                pool_size (int): How many hosts to keep a connection pool for
+                max_connections_per_host (int): How many connections to keep open to each host, this should be at
+                    least the number of threads fetching pages at once or connections will be thrown away
+                keep_alive (bool): Keep connections open between requests, if False every request uses a new
+                    connection
+                headers (dict): Headers to send with every request
+                stream_links (bool): Extract the links while the page is downloading, a chunk at a time, rather than
+                    downloading the whole page and then parsing it. The page text is not kept.
+                chunk_size (int): How many bytes to read at a time when streaming links
+                link_resolver (crawler.links.link_resolver.LinkResolver): Cache to build the out links through,
+                    shared by every page fetched
+                validation_cache (crawler.pages.validation_cache.ValidationCache): Cache of the validators and out
+                    links of pages, pages in it are requested conditionally and rebuilt from it if not modified
+                snapshot (crawler.crawl_snapshot.CrawlSnapshot): The previous crawl, every page body is fingerprinted
+                    and if it is the same as last time the links from last time are used instead of parsing it. When
+                    streaming links the fingerprint is still taken but the page has already been parsed.
+                scheduler (crawler.host_scheduler.HostScheduler): Decides how many requests may be in flight to each
+                    host, requests wait for a free slot and throttled requests are retried once the host allows
+                html_only (bool): Only download the body of responses whose Content-Type is HTML (or which don't give
+                    one), the others become pages without any out links
+                max_body_size (int): The most bytes of a body to download, larger pages are abandoned part way
+                    through and become pages without any out links
+                skip_extensions (set): Don't request links whose path ends in one of these extensions (lower case,
+                    without the dot), they become pages without any out links. BINARY_EXTENSIONS is a good choice.
+                parse_pool (crawler.pages.parse_pool.ParsePool): Extract the links in these worker processes rather
+                    than on the fetching thread, the link_resolver isn't used for them. Not used when streaming links.
+                metrics (crawler.metrics.CrawlMetrics): Record how long connecting, waiting for the response headers,
+                    downloading, decoding and parsing each page takes. When streaming links the time parsing is part of
+                    downloading.
+                near_duplicates (crawler.pages.near_duplicates.NearDuplicateDetector): Check every page's text against
+                    the pages already fetched, near duplicates aren't parsed and become pages without any out links
+                    which record the page they duplicate. Not used when streaming links.
+                transport (class): The transport to make the requests with, one of
+                    crawler.pages.transports.TRANSPORTS, it is given the connection pool options, headers and metrics
+                max_redirects (int): The most redirects to follow for a page
+                timeout (float): The most seconds to wait to connect to a server, or for it to send anything, before
+                    giving up on the request
+                verify (bool or string): Check the certificates of https servers, against the CA certificates in this
+                    file if it is a path
+        """
+        self._stream_links = stream_links
+        self._chunk_size = chunk_size
+        self._link_resolver = link_resolver
+        self._validation_cache = validation_cache
+        self._snapshot = snapshot
+        self._scheduler = scheduler
+        self._html_only = html_only
+        self._max_body_size = max_body_size
+        self._skip_extensions = skip_extensions
+        self._parse_pool = parse_pool
+        self._metrics = metrics
+        self._near_duplicates = near_duplicates
+        self.max_redirects = max_redirects
+        self.timeout = timeout
+
+        self.transport = transport(
+            pool_size=pool_size,
+            max_connections_per_host=max_connections_per_host,
+            keep_alive=keep_alive,
+            headers=headers,
+            metrics=metrics,
+            timeout=timeout,
+            verify=verify,
+        )
+        self.session = getattr(self.transport, "session", None)
+
+    def get(self, link, known_link=None):
         """Get the page at the specified link
 
+            A redirect to another page in the crawled domain gives the page of the link redirected to, with the links
+            redirected from as its aliases. A redirect out of the crawled domain gives a page without any out links
+            for the link itself.
+
             Args:
                 link (crawler.links.link.Link): The link to fetch
+                known_link (callable): Called with the link each redirect leads to, if it returns True (the page has
+                    already been fetched) the redirect isn't followed and the page is returned without any out links.
+                    A redirect out of the crawled domain is never followed.
+
+            Returns:
+                crawler.pages.page: The page
+
+            Raises:
+                crawler.pages.transports.TransportError: If the page couldn't be fetched, including when it redirects
+                    more than max_redirects times
+        """
+        if self._skip_extensions is not None and PageFetcher._extension(link) in self._skip_extensions:
+            return self._skipped_page(link, "not HTML by its extension")
+
+        cached_page = None
+        request_headers = None
+        if self._validation_cache is not None:
+            cached_page = self._validation_cache.lookup(link)
+            if cached_page is not None:
+                request_headers = cached_page.conditional_headers()
+
+        attempt = 0
+        while True:
+            with self._slot(link) as record:
+                # Waiting for the host to have a free slot isn't part of fetching the page
+                start = time.monotonic()
+                with self._request(link, request_headers, known_link) as response:
+                    retry_after = response.headers.get("Retry-After")
+                    if record is not None:
+                        record(response.elapsed, response.status_code, retry_after)
+                        if self._scheduler.should_retry(response.status_code, attempt):
+                            if retry_after is None:
+                                self._scheduler.back_off(link, attempt)
+                            attempt += 1
+                            continue
+
+                    if self._metrics is not None:
+                        self._metrics.observe("first_byte", response.elapsed)
+
+                    redirect_chain = PageFetcher._redirect_chain(response)
+                    page_link = link if redirect_chain is None else PageFetcher._redirected_link(
+                        link,
+                        redirect_chain[-1],
+                    )
+
+                    if page_link is None:
+                        build_page = PageFetcher._built(self._skipped_page(
+                            link,
+                            "it redirects out of the crawled domain to {}".format(redirect_chain[-1]),
+                        ))
+                    elif response.is_redirect:
+                        logging.info("Skipping: {}, it redirects to {} which has already been fetched".format(
+                            link,
+                            page_link,
+                        ))
+                        build_page = PageFetcher._built(Page(page_link, None, out_links=[]))
+                    elif cached_page is not None and response.status_code == 304 and page_link == link:
+                        self._validation_cache.record_hit(link)
+                        build_page = PageFetcher._built(self._page_from_cache(page_link, cached_page))
+                    else:
+                        build_page = self._page_from_response(page_link, response)
+                    body_size = response.bytes_read
+
+            break
+
+        # The body has been downloaded, and the host's slot given back for the next request, before it is parsed
+        page = build_page()
+        page.status_code = response.status_code
+        page.body_size = body_size
+        page.fetch_time = time.monotonic() - start
+        if redirect_chain is not None:
+            page.redirect_chain = redirect_chain
+            if page_link is not None:
+                page.aliases = PageFetcher._aliases(link, redirect_chain, page_link)
+
+        # The links of a page which wasn't parsed aren't its links, a 304 next time would rebuild it without any
+        if self._validation_cache is not None and response.status_code == 200 and not page.skipped:
+            self._validation_cache.store(
+                page.link,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+                page.out_links,
+            )
+
+        return page
+
+    def _request(self, link, headers, known_link):
+        """Request a link, following any redirects a hop at a time
+
+            Args:
+                link (crawler.links.link.Link): The link to request
+                headers (dict): Headers to send with the request, if any. They are the link's conditional headers so
+                    aren't sent on to where it redirects.
+                known_link (callable): Stop at a redirect to a link it returns True for, if given. A redirect out of
+                    the crawled domain is never followed.
+
+            Returns:
+                crawler.pages.transports.TransportResponse: The response, its history the redirect responses which
+                    led to it. If a redirect wasn't followed the response is that redirect, with its body already read.
+
+            Raises:
+                crawler.pages.transports.TransportError: If a request got no response
+                crawler.pages.page_fetcher.TooManyRedirects: If there are more than max_redirects redirects
+        """
+        history = []
+        response = self.transport.get(link.url, headers=headers)
+        while response.is_redirect:
+            # Reading the (small) body of a redirect lets its connection go back to the pool
+            response.read()
+            redirect_url = response.redirect_url()
+            redirected_link = PageFetcher._redirected_link(link, redirect_url)
+            if redirected_link is None or (known_link is not None and known_link(redirected_link)):
+                break
+
+            response.close()
+            if len(history) >= self.max_redirects:
+                raise TooManyRedirects("Exceeded {} redirects.".format(self.max_redirects))
+            history.append(response)
+            response = self.transport.get(redirect_url)
+
+        response.history = history
+
+        return response
+
+    def _redirect_chain(response):
+        """Get the urls a request was redirected through
+
+            Args:
+                response (crawler.pages.transports.TransportResponse): The response, after any redirects followed
+
+            Returns:
+                list: The url of every response, and the url redirected to if the response is itself a redirect which
+                    wasn't followed, None if the request wasn't redirected
+        """
+        if not response.history and not response.is_redirect:
+            return None
+
+        redirect_chain = [redirect.url for redirect in response.history]
+        redirect_chain.append(response.url)
+        if response.is_redirect:
+            redirect_chain.append(response.redirect_url())
+
+        return redirect_chain
+
+    def _redirected_link(link, url):
+        """Build the link a redirect leads to, if it is in the crawled domain
+
+            Args:
+                link (crawler.links.link.Link): The link which was redirected
+                url (string): The url it was redirected to
+
+            Returns:
+                crawler.links.link.Link: The link, found on the same page as the link which was redirected, None if it
+                    is out of the crawled domain or isn't a link we can crawl
+        """
+        try:
+            redirected_link = Link(link.base_page, url)
+        except (InvalidPathError, UnknownSchemeError):
+            return None
+
+        return redirected_link if redirected_link.in_crawled_domain() else None
+
+    def _aliases(link, redirect_chain, page_link):
+        """Get the links a page was redirected from
+
+            Args:
+                link (crawler.links.link.Link): The link the page was fetched for
+                redirect_chain (list): The urls requested to fetch the page
+                page_link (crawler.links.link.Link): The link the page was redirected to
+
+            Returns:
+                list: crawler.links.link.Link instances in the order they were requested, None if every url requested
+                    is the same link as the page (such as a redirect adding a trailing slash)
+        """
+        aliases = []
+        for url in redirect_chain[1:-1]:
+            alias = PageFetcher._redirected_link(link, url)
+            if alias is not None and alias != page_link and alias not in aliases:
+                aliases.append(alias)
+        if link != page_link:
+            aliases.insert(0, link)
+
+        return aliases or None
+
+    def _page_from_response(self, link, response):
+        """Download the page from a response, by whichever means the fetcher was set up for. Its body is parsed
+           later, by calling what this returns, so the parsing needn't hold the response open (or the host's slot).
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                response (crawler.pages.transports.TransportResponse): The response
+
+            Returns:
+                callable: Builds the crawler.pages.page, taking no arguments
+        """
+        if self._html_only and not PageFetcher._is_html(response):
+            return PageFetcher._built(self._skipped_page(
+                link,
+                "its Content-Type is {}".format(response.headers["Content-Type"]),
+            ))
+        content_length = PageFetcher._content_length(response)
+        if self._max_body_size is not None and content_length is not None and content_length > self._max_body_size:
+            return PageFetcher._built(self._skipped_page(link, "its Content-Length is {}".format(content_length)))
+
+        if self._stream_links:
+            # The links are extracted as the body downloads, there is nothing left to parse afterwards
+            return PageFetcher._built(self._timed("download", self._page_from_stream, link, response))
+
+        body = self._timed("download", self._read_body, response)
+        if body is None:
+            return PageFetcher._built(self._skipped_page(link, "its body is over {} bytes".format(
+                self._max_body_size,
+            )))
+
+        if self._snapshot is not None:
+            return self._page_from_fingerprint(link, response, body)
+
+        return functools.partial(self._parse_body, link, response, body)
+
+    def _built(page):
+        """Wrap a page which needs no parsing the same way as one which is parsed later, see _page_from_response
+
+            Args:
+                page (crawler.pages.page): The page
+
+            Returns:
+                callable: Returns the page, taking no arguments
+        """
+        return lambda: page
+
+    def _parse_body(self, link, response, body, fingerprint=None):
+        """Build a page by decoding its body and extracting the links from it
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                response (crawler.pages.transports.TransportResponse): The response the body is from
+                body (bytes): The body
+                fingerprint (bytes): The fingerprint of the page body, if it was taken
+
+            Returns:
+                crawler.pages.page: The page
+        """
+        page_text = self._timed("decode", PageFetcher._decode, response, body)
+
+        return self._parse_page(link, page_text, fingerprint=fingerprint)
+
+    def _parse_page(self, link, page_text, fingerprint=None):
+        """Build a page by extracting the links from its text, in the parse pool if we have one, unless it is a near
+           duplicate of a page already fetched
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                page_text (string): The text of the page
+                fingerprint (bytes): The fingerprint of the page body, if it was taken
 
             Returns:
                 crawler.pages.page: The page
         """
-        response = requests.get(link.url)
+        if self._near_duplicates is not None:
+            duplicate_of = self._near_duplicates.canonical_link(link, page_text)
+            # The same page fetched again through another alias of it isn't a near duplicate of itself
+            if duplicate_of is not None and duplicate_of != link:
+                page = self._skipped_page(link, "it is a near duplicate of {}".format(duplicate_of))
+                page.fingerprint = fingerprint
+                page.duplicate_of = duplicate_of
+                return page
+
+        if self._parse_pool is None:
+            return Page(link, page_text, resolver=self._link_resolver, fingerprint=fingerprint, metrics=self._metrics)
+
+        out_links = self._timed("parse", self._parse_pool.parse, link, page_text)
+
+        return Page(link, page_text, out_links=out_links, fingerprint=fingerprint)
+
+    def _read_body(self, response):
+        """Download the body of a streamed response, giving up if it grows past the maximum body size
+
+            Args:
+                response (crawler.pages.transports.TransportResponse): The response
+
+            Returns:
+                bytes: The body, or None if it was too large
+        """
+        if self._max_body_size is None:
+            return response.read()
+
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=self._chunk_size):
+            size += len(chunk)
+            if size > self._max_body_size:
+                return None
+            chunks.append(chunk)
+
+        return b"".join(chunks)
+
+    def _decode(response, body):
+        """Decode a body the same way requests.Response.text does
+
+            Args:
+                response (crawler.pages.transports.TransportResponse): The response the body is from
+                body (bytes): The body
+
+            Returns:
+                string: The text of the body
+        """
+        encoding = response.encoding
+        if encoding is None:
+            encoding = requests.compat.chardet.detect(body)["encoding"] or "utf-8"
+
+        try:
+            return str(body, encoding, errors="replace")
+        except LookupError:
+            return str(body, "utf-8", errors="replace")
+
+    def _skipped_page(self, link, reason):
+        """Build the page for a link whose body wasn't downloaded
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                reason (string): Why it was skipped, for the log
+
+            Returns:
+                crawler.pages.page: The page, without any out links
+        """
+        logging.info("Skipping: {}, {}".format(link, reason))
+        page = Page(link, None, out_links=[])
+        page.skipped = True
+
+        return page
+
+    def _is_html(response):
+        """Check whether a response is HTML from its Content-Type, a response without one might be
+
+            Args:
+                response (crawler.pages.transports.TransportResponse): The response
+
+            Returns:
+                bool: True if the body should be read
+        """
+        content_type = response.headers.get("Content-Type")
+        if content_type is None:
+            return True
+
+        return "html" in content_type.split(";")[0].lower()
+
+    def _content_length(response):
+        """Get the Content-Length of a response, a header we can't make sense of counts as no header at all and the
+           body size is checked as it downloads instead
+
+            Args:
+                response (crawler.pages.transports.TransportResponse): The response
+
+            Returns:
+                int: The length of the body in bytes, None if it isn't known
+        """
+        content_length = response.headers.get("Content-Length")
+        if content_length is None:
+            return None
+
+        # Repeated headers are joined with commas, they must all be the same length (RFC 9110 8.6)
+        lengths = {length.strip() for length in content_length.split(",")}
+        if len(lengths) != 1:
+            return None
+
+        length = lengths.pop()
+        if not length.isdigit():
+            return None
+
+        return int(length)
+
+    def _extension(link):
+        """Get the extension of a link's path
+
+            Args:
+                link (crawler.links.link.Link): The link
+
+            Returns:
+                string: The extension in lower case without the dot, empty if there isn't one
+        """
+        _, _, path = link.normalised_netloc_and_path.partition("/")
+        _, extension = posixpath.splitext(path)
+
+        return extension[1:].lower()
+
+    def _page_from_stream(self, link, response):
+        """Build the page from a streamed response, extracting the links as the body downloads
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                response (crawler.pages.transports.TransportResponse): The response
+
+            Returns:
+                crawler.pages.page: The page, without its text
+        """
+        extractor = StreamingLinkExtractor(
+            link.url,
+            encoding=PageFetcher._declared_encoding(response),
+            resolver=self._link_resolver,
+        )
+        fingerprinter = None if self._snapshot is None else CrawlSnapshot.fingerprinter()
+
+        size = 0
+        for chunk in response.iter_content(chunk_size=self._chunk_size):
+            size += len(chunk)
+            if self._max_body_size is not None and size > self._max_body_size:
+                return self._skipped_page(link, "its body is over {} bytes".format(self._max_body_size))
+
+            extractor.feed(chunk)
+            if fingerprinter is not None:
+                fingerprinter.update(chunk)
+
+        fingerprint = None if fingerprinter is None else fingerprinter.digest()
+
+        return Page(link, None, out_links=extractor.close(), fingerprint=fingerprint)
+
+    def _page_from_fingerprint(self, link, response, body):
+        """Build the page from a response, only parsing it if its fingerprint has changed since the previous crawl
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                response (crawler.pages.transports.TransportResponse): The response
+                body (bytes): The body of the response
+
+            Returns:
+                callable: Builds the crawler.pages.page, without its text if it wasn't parsed, see _page_from_response
+        """
+        fingerprint = CrawlSnapshot.fingerprint(body)
+        previous_page = self._snapshot.previous_page(link, fingerprint)
+
+        if previous_page is None:
+            return functools.partial(self._parse_body, link, response, body, fingerprint=fingerprint)
+
+        out_link_urls, duplicate_of_url = previous_page
+        if duplicate_of_url is not None:
+            duplicate_of = self._links_from_urls(link, [duplicate_of_url])[0]
+            page = self._skipped_page(link, "it is unchanged and was a near duplicate of {}".format(duplicate_of))
+            page.fingerprint = fingerprint
+            page.duplicate_of = duplicate_of
+            return PageFetcher._built(page)
+
+        return PageFetcher._built(Page(
+            link,
+            None,
+            out_links=self._links_from_urls(link, out_link_urls),
+            fingerprint=fingerprint,
+        ))
+
+    def _page_from_cache(self, link, cached_page):
+        """Rebuild a page which hasn't been modified from the validation cache
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                cached_page (crawler.pages.validation_cache.CachedPage): The cached page
+
+            Returns:
+                crawler.pages.page: The page, without its text
+        """
+        return Page(link, None, out_links=self._links_from_urls(link, cached_page.out_link_urls))
+
+    def _slot(self, link):
+        """Hold a slot with the scheduler for a request to the link, if we have a scheduler
+
+            Args:
+                link (crawler.links.link.Link): The link about to be requested
+
+            Returns:
+                context manager: Gives the function to record the response with, or None without a scheduler
+        """
+        if self._scheduler is None:
+            return contextlib.nullcontext()
+
+        return self._scheduler.slot(link)
+
+    def _timed(self, stage, function, *args):
+        """Call a function, recording how long it took as a stage of fetching the page if we have metrics
+
+            Args:
+                stage (string): The stage, see crawler.metrics.CrawlMetrics
+                function (callable): The function
+                *args: The arguments to call it with
+
+            Returns:
+                What the function returns
+        """
+        if self._metrics is None:
+            return function(*args)
+
+        start = time.perf_counter()
+        result = function(*args)
+        self._metrics.observe(stage, time.perf_counter() - start)
+
+        return result
+
+    def _links_from_urls(self, link, urls):
+        """Rebuild the out links of a page from their urls
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                urls (list): The absolute urls of the out links
+
+            Returns:
+                list: crawler.links.link.Link instances
+        """
+        base_page = BasePage(link.url)
+        if self._link_resolver is None:
+            return [Link(base_page, url) for url in urls]
+
+        return [self._link_resolver.resolve(base_page, url) for url in urls]
+
+    def _declared_encoding(response):
+        """Get the character encoding given in the Content-Type header of a response
+
+            Note: Unlike crawler.pages.transports.TransportResponse.encoding this does not fall back to ISO-8859-1 for
+                  text types, if the header doesn't say we let the parser detect the encoding from the page itself
+
+            Args:
+                response (crawler.pages.transports.TransportResponse): The response
+
+            Returns:
+                string: The encoding, or None if the header doesn't give one
+        """
+        for parameter in response.headers.get("Content-Type", "").split(";")[1:]:
+            name, _, value = parameter.partition("=")
+            if name.strip().lower() == "charset":
+                return value.strip().strip("\"'")
+
+        return None
+
+    def close(self):
+        """Close all the pooled connections
+        """
+        self.transport.close()
+
+    def __enter__(self):
+        return self
 
-        return Page(link, response.text)
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,74 @@
+import asyncio
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+from crawler.links.link_extractor import LinkExtractor
+
+
+class ParsePool:
+    """Extracts the links from pages in a pool of worker processes, so parsing isn't limited to one core by the GIL.
+
+       Only the page text goes to the workers and only the scheme and normalised netloc and path of each link comes
+       back, the links are rebuilt here without parsing them again. One pool can be shared by every thread (or the
+       event loop) of a crawl, each page waits for its own result.
+
+        Attributes:
+            processes (int): How many worker processes there are
+    """
+    processes = None
+
+    def __init__(self, processes=None):
+        """Initialiser, starts the worker processes
+
+            Args:
+                processes (int): How many worker processes to start, by default one per core
+        """
+        if processes is None:
+            processes = os.cpu_count() or 1
+        self.processes = processes
+        self._executor = ProcessPoolExecutor(max_workers=processes)
+
+    def parse(self, link, page_text):
+        """Extract the links from a page, blocking until a worker has parsed it
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                page_text (string): The page text
+
+            Returns:
+                list: crawler.links.link.Link instances for every link on the page
+        """
+        resolved_links = self._executor.submit(LinkExtractor.extract_resolved, link.url, page_text).result()
+
+        return LinkExtractor.links_from_resolved(link.url, resolved_links)
+
+    async def parse_async(self, link, page_text):
+        """Extract the links from a page without blocking the event loop while a worker parses it
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                page_text (string): The page text
+
+            Returns:
+                list: crawler.links.link.Link instances for every link on the page
+        """
+        resolved_links = await asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            LinkExtractor.extract_resolved,
+            link.url,
+            page_text,
+        )
+
+        return LinkExtractor.links_from_resolved(link.url, resolved_links)
+
+    def close(self):
+        """Stop the worker processes, once they have finished the pages already given to them
+        """
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
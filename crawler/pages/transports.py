@@ -0,0 +1,627 @@
+import abc
+import asyncio
+import contextlib
+import ssl
+import threading
+import time
+
+import requests
+import urllib3
+
+from requests.adapters import HTTPAdapter
+
+# httpx and h2 are optional, only the httpx transport needs them
+try:
+    import httpx
+except ImportError:
+    httpx = None
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+
+class TransportError(Exception):
+    """Raised by every transport when a request gets no response, or its body can't be read: it couldn't connect,
+       timed out, or the connection was dropped or broke the protocol. The transport's own exception is its __cause__.
+    """
+    @contextlib.contextmanager
+    def raised_for(errors):
+        """Raise a TransportError in place of any of a transport's own exceptions raised inside the with block
+
+            Args:
+                errors (tuple): The exception classes of the transport
+        """
+        try:
+            yield
+        except errors as error:
+            raise TransportError("{}: {}".format(type(error).__name__, error)) from error
+
+
+class TransportResponse(abc.ABC):
+    """A response from any of the transports, with just what crawler.pages.page_fetcher.PageFetcher needs. The body
+       isn't read until it is asked for, so it can be streamed or never downloaded at all.
+
+       Each transport subclasses it, implementing iter_content, bytes_read and close.
+
+        Attributes:
+            url (string): The url which was requested
+            status_code (int): The HTTP status
+            headers (mapping): The response headers, looked up case-insensitively
+            elapsed (float): The seconds from sending the request until the response headers arrived
+            http_version (string): The HTTP version the response came over, e.g. HTTP/1.1 or HTTP/2
+            history (list): The redirect responses which led to this one, oldest first, if the caller followed any
+    """
+    REDIRECT_STATUSES = frozenset([301, 302, 303, 307, 308])
+    url = None
+    status_code = None
+    headers = None
+    elapsed = None
+    http_version = None
+    history = None
+
+    def __init__(self, url, status_code, headers, elapsed, http_version="HTTP/1.1"):
+        """Initialiser
+
+            Args:
+                url (string): The url which was requested
+                status_code (int): The HTTP status
+                headers (mapping): The response headers, looked up case-insensitively
+                elapsed (float): The seconds from sending the request until the response headers arrived
+                http_version (string): The HTTP version the response came over
+        """
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.elapsed = elapsed
+        self.http_version = http_version
+        self.history = []
+
+    @property
+    def is_redirect(self):
+        """Is this a redirect, which has somewhere to redirect to
+        """
+        return self.status_code in TransportResponse.REDIRECT_STATUSES and "Location" in self.headers
+
+    @property
+    def encoding(self):
+        """The encoding of the body as the Content-Type gives it, ISO-8859-1 for text without one (as
+           requests.Response.encoding), None if it doesn't say
+        """
+        return requests.utils.get_encoding_from_headers(self.headers)
+
+    def redirect_url(self):
+        """Get the absolute url a redirect leads to
+
+            Returns:
+                string: The url
+        """
+        location = self.headers["Location"]
+        # Servers send non-ASCII locations as UTF-8, which are decoded as ISO-8859-1 along with the other headers
+        try:
+            location = location.encode("latin1").decode("utf8")
+        except UnicodeError:
+            pass
+
+        return requests.compat.urljoin(self.url, location)
+
+    @abc.abstractmethod
+    def iter_content(self, chunk_size):
+        """Read the body a chunk at a time, decompressing it if it was compressed
+
+            Args:
+                chunk_size (int): How many bytes to read at a time
+
+            Yields:
+                bytes: The chunks of the body
+
+            Raises:
+                crawler.pages.transports.TransportError: If the body couldn't be read
+        """
+
+    def read(self):
+        """Read the whole body, decompressing it if it was compressed
+
+            Returns:
+                bytes: The body
+
+            Raises:
+                crawler.pages.transports.TransportError: If the body couldn't be read
+        """
+        return b"".join(self.iter_content(65536))
+
+    @property
+    @abc.abstractmethod
+    def bytes_read(self):
+        """How many bytes of the body have been downloaded so far, before decompressing it
+        """
+
+    @abc.abstractmethod
+    def close(self):
+        """Release the connection, back to the pool if the body has been read
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _http_version(version):
+        """Name the HTTP version of an http.client style response
+
+            Args:
+                version (int): The version as http.client gives it, 10 or 11
+
+            Returns:
+                string: HTTP/1.0 or HTTP/1.1
+        """
+        return "HTTP/{}.{}".format(*divmod(version, 10))
+
+
+class RequestsResponse(TransportResponse):
+    """A response from the requests transport
+    """
+    def __init__(self, response):
+        """Initialiser
+
+            Args:
+                response (requests.Response): The response, made with stream=True
+        """
+        super().__init__(
+            response.url,
+            response.status_code,
+            response.headers,
+            response.elapsed.total_seconds(),
+            TransportResponse._http_version(response.raw.version),
+        )
+        self._response = response
+
+    def iter_content(self, chunk_size):
+        with TransportError.raised_for(RequestsTransport.ERRORS):
+            yield from self._response.iter_content(chunk_size=chunk_size)
+
+    def read(self):
+        with TransportError.raised_for(RequestsTransport.ERRORS):
+            return self._response.content
+
+    @property
+    def bytes_read(self):
+        return self._response.raw.tell()
+
+    def close(self):
+        self._response.close()
+
+
+class Urllib3Response(TransportResponse):
+    """A response from the urllib3 transport
+    """
+    def __init__(self, url, response, elapsed):
+        """Initialiser
+
+            Args:
+                url (string): The url which was requested
+                response (urllib3.response.HTTPResponse): The response, made with preload_content=False
+                elapsed (float): The seconds from sending the request until the response headers arrived
+        """
+        super().__init__(
+            url,
+            response.status,
+            response.headers,
+            elapsed,
+            TransportResponse._http_version(response.version),
+        )
+        self._response = response
+
+    def iter_content(self, chunk_size):
+        with TransportError.raised_for(Urllib3Transport.ERRORS):
+            yield from self._response.stream(chunk_size, decode_content=True)
+
+    def read(self):
+        with TransportError.raised_for(Urllib3Transport.ERRORS):
+            return self._response.read(decode_content=True)
+
+    @property
+    def bytes_read(self):
+        return self._response.tell()
+
+    def close(self):
+        # As requests.Response.close, a connection with an unread body is closed rather than reused
+        if not self._response.isclosed():
+            self._response.close()
+        self._response.release_conn()
+
+
+class HttpxResponse(TransportResponse):
+    """A response from the httpx transport, its body is read on the transport's event loop
+    """
+    def __init__(self, url, response, elapsed, run):
+        """Initialiser
+
+            Args:
+                url (string): The url which was requested
+                response (httpx.Response): The response, sent with stream=True by an httpx.AsyncClient
+                elapsed (float): The seconds from sending the request until the response headers arrived
+                run (callable): Runs a coroutine on the transport's event loop and returns its result
+        """
+        super().__init__(url, response.status_code, response.headers, elapsed, response.http_version)
+        self._response = response
+        self._run = run
+
+    def iter_content(self, chunk_size):
+        chunks = self._response.aiter_bytes(chunk_size)
+        while True:
+            try:
+                yield self._run(HttpxResponse._next_chunk(chunks))
+            except StopAsyncIteration:
+                return
+
+    def read(self):
+        return self._run(self._response.aread())
+
+    @property
+    def bytes_read(self):
+        return self._response.num_bytes_downloaded
+
+    def close(self):
+        self._run(self._response.aclose())
+
+    async def _next_chunk(chunks):
+        return await chunks.__anext__()
+
+
+class RequestsTransport:
+    """Makes the requests with requests, over a long lived Session. The Session adds its cookie jar and its hooks to
+       every request, which the other transports don't have.
+
+       Safe to share between threads, the connection pool hands each thread its own connection.
+
+        Attributes:
+            session (requests.Session): The session all requests are made with
+    """
+    # The exceptions of requests raised as TransportError
+    ERRORS = (requests.exceptions.RequestException,)
+    session = None
+
+    def __init__(self, pool_size=10, max_connections_per_host=10, keep_alive=True, headers=None, metrics=None,
+                 timeout=30.0, verify=True):
+        """Initialiser
+
+            Args:
+                pool_size (int): How many hosts to keep a connection pool for
+                max_connections_per_host (int): How many connections to keep open to each host
+                keep_alive (bool): Keep connections open between requests, if False every request uses a new
+                    connection
+                headers (dict): Headers to send with every request
+                metrics (crawler.metrics.CrawlMetrics): Record how long connecting takes, if given
+                timeout (float): The most seconds to wait to connect, or for the server to send anything
+                verify (bool or string): Check the certificates of https servers, against the CA certificates in
+                    this file if it is a path
+        """
+        self._timeout = timeout
+        # Given with each request, on the session a REQUESTS_CA_BUNDLE in the environment would take its place
+        self._verify = verify
+        self.session = requests.Session()
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=max_connections_per_host)
+        if metrics is not None:
+            adapter.poolmanager.pool_classes_by_scheme = Urllib3Transport._timed_pool_classes(
+                adapter.poolmanager.pool_classes_by_scheme,
+                metrics,
+            )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        if headers is not None:
+            self.session.headers.update(headers)
+
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+    def get(self, url, headers=None):
+        """Send a GET request, without following any redirect
+
+            Args:
+                url (string): The url
+                headers (dict): Headers to send with this request as well as those sent with every request
+
+            Returns:
+                crawler.pages.transports.RequestsResponse: The response, with the body still to read
+
+            Raises:
+                crawler.pages.transports.TransportError: If there was no response
+        """
+        with TransportError.raised_for(RequestsTransport.ERRORS):
+            return RequestsResponse(self.session.get(
+                url,
+                headers=headers,
+                stream=True,
+                allow_redirects=False,
+                timeout=self._timeout,
+                verify=self._verify,
+            ))
+
+    def close(self):
+        """Close all the pooled connections
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Urllib3Transport:
+    """Makes the requests straight on a urllib3 PoolManager, which requests is built on, without requests' Session
+       and Response on top of it.
+
+       Safe to share between threads, the connection pool hands each thread its own connection.
+
+        Attributes:
+            pool_manager (urllib3.PoolManager): The pool manager all requests are made with
+    """
+    # The exceptions of urllib3 raised as TransportError
+    ERRORS = (urllib3.exceptions.HTTPError,)
+    pool_manager = None
+
+    def __init__(self, pool_size=10, max_connections_per_host=10, keep_alive=True, headers=None, metrics=None,
+                 timeout=30.0, verify=True):
+        """Initialiser
+
+            Args:
+                pool_size (int): How many hosts to keep a connection pool for
+                max_connections_per_host (int): How many connections to keep open to each host
+                keep_alive (bool): Keep connections open between requests, if False every request uses a new
+                    connection
+                headers (dict): Headers to send with every request
+                metrics (crawler.metrics.CrawlMetrics): Record how long connecting takes, if given
+                timeout (float): The most seconds to wait to connect, or for the server to send anything
+                verify (bool or string): Check the certificates of https servers, against the CA certificates in
+                    this file if it is a path
+        """
+        # The same headers requests sends by default
+        self._headers = urllib3.util.make_headers(
+            keep_alive=keep_alive,
+            accept_encoding=True,
+            user_agent="python-urllib3/{}".format(urllib3.__version__),
+        )
+        self._headers["Accept"] = "*/*"
+        if not keep_alive:
+            self._headers["Connection"] = "close"
+        if headers is not None:
+            self._headers.update(headers)
+
+        self.pool_manager = urllib3.PoolManager(
+            num_pools=pool_size,
+            maxsize=max_connections_per_host,
+            timeout=urllib3.Timeout(connect=timeout, read=timeout),
+            cert_reqs="CERT_REQUIRED" if verify else "CERT_NONE",
+            ca_certs=verify if isinstance(verify, str) else None,
+        )
+        if metrics is not None:
+            self.pool_manager.pool_classes_by_scheme = Urllib3Transport._timed_pool_classes(
+                self.pool_manager.pool_classes_by_scheme,
+                metrics,
+            )
+
+    def get(self, url, headers=None):
+        """Send a GET request, without following any redirect
+
+            Args:
+                url (string): The url
+                headers (dict): Headers to send with this request as well as those sent with every request
+
+            Returns:
+                crawler.pages.transports.Urllib3Response: The response, with the body still to read
+
+            Raises:
+                crawler.pages.transports.TransportError: If there was no response
+        """
+        request_headers = self._headers if headers is None else dict(self._headers, **headers)
+
+        start = time.perf_counter()
+        with TransportError.raised_for(Urllib3Transport.ERRORS):
+            response = self.pool_manager.request(
+                "GET",
+                url,
+                headers=request_headers,
+                preload_content=False,
+                redirect=False,
+                retries=False,
+            )
+
+        return Urllib3Response(url, response, time.perf_counter() - start)
+
+    def close(self):
+        """Close all the pooled connections
+        """
+        self.pool_manager.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _timed_pool_classes(pool_classes_by_scheme, metrics):
+        """Subclass urllib3's connection pools so their connections record how long connecting takes
+
+            Args:
+                pool_classes_by_scheme (dict): The urllib3 connection pool class for each scheme
+                metrics (crawler.metrics.CrawlMetrics): The metrics to record the connect stage in
+
+            Returns:
+                dict: The subclassed pool class for each scheme
+        """
+        def timed_connection_class(connection_class):
+            def connect(self):
+                start = time.perf_counter()
+                connection_class.connect(self)
+                metrics.observe("connect", time.perf_counter() - start)
+
+            return type(connection_class.__name__, (connection_class,), {"connect": connect})
+
+        return {
+            scheme: type(pool_class.__name__, (pool_class,), {
+                "ConnectionCls": timed_connection_class(pool_class.ConnectionCls),
+            })
+            for scheme, pool_class in pool_classes_by_scheme.items()
+        }
+
+
+class HttpxTransport:
+    """Makes the requests with an httpx AsyncClient speaking HTTP/2 where the server does, so the requests of every
+       thread to a host are multiplexed over one connection rather than each needing its own.
+
+       The client runs on an event loop thread of the transport's own, and each thread calling get waits for its
+       request there. httpx's sync Client can't share an HTTP/2 connection between threads: two threads sending their
+       request headers at once can take the same stream or corrupt the connection's header compression. On one event
+       loop only one request touches the connection at a time.
+
+       HTTP/2 is agreed during the TLS handshake (ALPN), plain http:// urls and servers which only speak HTTP/1.1 get
+       HTTP/1.1 over a pool of connections as the other transports do.
+
+       Needs the optional httpx and h2 packages: pip install 'httpx[http2]'. Safe to share between threads.
+
+        Attributes:
+            client (httpx.AsyncClient): The client all requests are made with
+    """
+    # The exceptions of httpx raised as TransportError
+    ERRORS = () if httpx is None else (httpx.RequestError,)
+    client = None
+
+    def __init__(self, pool_size=10, max_connections_per_host=10, keep_alive=True, headers=None, metrics=None,
+                 timeout=30.0, verify=True, http2=True):
+        """Initialiser
+
+            Args:
+                pool_size (int): How many hosts to keep connections open to
+                max_connections_per_host (int): How many connections to keep open to each host, an HTTP/2 host only
+                    ever needs one
+                keep_alive (bool): Keep connections open between requests, if False every request uses a new
+                    connection
+                headers (dict): Headers to send with every request
+                metrics (crawler.metrics.CrawlMetrics): Record how long connecting takes, if given
+                timeout (float): The most seconds to wait to connect, for the server to send anything, to send a
+                    request or for a free connection
+                verify (bool or string): Check the certificates of https servers, against the CA certificates in
+                    this file if it is a path
+                http2 (bool): Offer HTTP/2 to servers
+
+            Raises:
+                ImportError: If httpx or h2 isn't installed
+        """
+        if not HttpxTransport.is_available():
+            raise ImportError("The httpx transport needs httpx and h2, pip install 'httpx[http2]'")
+
+        # httpx takes the CA certificates as an SSLContext, a path is deprecated
+        if isinstance(verify, str):
+            verify = ssl.create_default_context(cafile=verify)
+
+        self._metrics = metrics
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            verify=verify,
+            headers=headers,
+            limits=httpx.Limits(
+                max_connections=None,
+                max_keepalive_connections=pool_size * max_connections_per_host if keep_alive else 0,
+            ),
+            timeout=httpx.Timeout(timeout),
+            follow_redirects=False,
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="httpx-transport", daemon=True)
+        self._thread.start()
+
+    def get(self, url, headers=None):
+        """Send a GET request, without following any redirect
+
+            Args:
+                url (string): The url
+                headers (dict): Headers to send with this request as well as those sent with every request
+
+            Returns:
+                crawler.pages.transports.HttpxResponse: The response, with the body still to read
+
+            Raises:
+                crawler.pages.transports.TransportError: If there was no response
+        """
+        extensions = None
+        if self._metrics is not None:
+            extensions = {"trace": self._connect_tracer(url)}
+        request = self.client.build_request("GET", url, headers=headers, extensions=extensions)
+
+        start = time.perf_counter()
+        response = self._run(self.client.send(request, stream=True))
+
+        return HttpxResponse(url, response, time.perf_counter() - start, self._run)
+
+    def close(self):
+        """Close all the pooled connections and stop the event loop
+        """
+        self._run(self.client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self, coroutine):
+        """Run a coroutine on the event loop and wait for it, all of the transport's I/O is done through here
+
+            Args:
+                coroutine (coroutine): The coroutine
+
+            Returns:
+                object: What the coroutine returned
+
+            Raises:
+                crawler.pages.transports.TransportError: If the request or reading the response failed
+        """
+        with TransportError.raised_for(HttpxTransport.ERRORS):
+            return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def is_available():
+        """Check whether the optional packages this transport needs are installed
+
+            Returns:
+                bool: True if httpx and h2 can be imported
+        """
+        return httpx is not None and h2 is not None
+
+    def _connect_tracer(self, url):
+        """Build the httpcore trace callback which records how long opening a new connection for a request takes,
+           up to the end of the TLS handshake for https
+
+            Args:
+                url (string): The url being requested
+
+            Returns:
+                callable: The trace coroutine function, called with the name of each event and its details
+        """
+        connected_event = "connection.start_tls.complete" if url.startswith("https:") else \
+            "connection.connect_tcp.complete"
+        started = []
+
+        async def trace(event_name, info):
+            if event_name == "connection.connect_tcp.started":
+                started.append(time.perf_counter())
+            elif event_name == connected_event and started:
+                self._metrics.observe("connect", time.perf_counter() - started.pop())
+
+        return trace
+
+
+# The transports PageFetcher can make its requests with, by their name on the command line
+TRANSPORTS = {
+    "requests": RequestsTransport,
+    "urllib3": Urllib3Transport,
+    "httpx": HttpxTransport,
+}
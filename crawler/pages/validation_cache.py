@@ -0,0 +1,175 @@
+import sqlite3
+import threading
+import time
+
+
+class CachedPage:
+    """What the validation cache remembers about a page
+
+        Attributes:
+            etag (string): The ETag header the page was served with, or None
+            last_modified (string): The Last-Modified header the page was served with, or None
+            out_link_urls (list): The urls of the page's out links
+    """
+    etag = None
+    last_modified = None
+    out_link_urls = None
+
+    def __init__(self, etag, last_modified, out_link_urls):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.out_link_urls = out_link_urls
+
+    def conditional_headers(self):
+        """The headers asking the server to only send the page if it has changed
+
+            Returns:
+                dict: The request headers
+        """
+        headers = dict()
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+
+class ValidationCache:
+    """Remembers the validators (ETag and Last-Modified) and out links of every page fetched in an SQLite database,
+       so a later crawl can ask the server whether a page has changed and, if it hasn't, rebuild the page without
+       downloading or parsing it.
+
+       Holds at most max_entries pages, the least recently used are evicted first. Safe to share between threads.
+
+        Attributes:
+            max_entries (int): The most pages to remember
+            lookups (int): How many pages have been looked up
+            hits (int): How many pages the server said were not modified, so were rebuilt from the cache
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            key TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            out_links TEXT NOT NULL,
+            last_used REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used);
+    """
+    max_entries = None
+    lookups = 0
+    hits = 0
+
+    def __init__(self, path, max_entries=100000):
+        """Initialiser, opens the cache creating it if it doesn't exist
+
+            Args:
+                path (string): The path of the database file
+                max_entries (int): The most pages to remember
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1, got {}".format(max_entries))
+
+        self.max_entries = max_entries
+        self.lookups = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(ValidationCache.SCHEMA)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._entries = self._connection.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def lookup(self, link):
+        """Get what is cached for a page
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+
+            Returns:
+                CachedPage: The cached page, or None if it isn't cached
+        """
+        with self._lock:
+            self.lookups += 1
+            row = self._connection.execute(
+                "SELECT etag, last_modified, out_links FROM pages WHERE key = ?",
+                (link.normalised_netloc_and_path,),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        etag, last_modified, out_links = row
+        return CachedPage(etag, last_modified, out_links.split("\n") if out_links != "" else [])
+
+    def record_hit(self, link):
+        """Record that a cached page was used because it hadn't been modified
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+        """
+        with self._lock, self._connection:
+            self.hits += 1
+            self._connection.execute(
+                "UPDATE pages SET last_used = ? WHERE key = ?",
+                (time.time(), link.normalised_netloc_and_path),
+            )
+
+    def store(self, link, etag, last_modified, out_links):
+        """Remember a page, if it has no validators it is forgotten instead as we'd never be able to use it
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                etag (string): The page's ETag header, or None
+                last_modified (string): The page's Last-Modified header, or None
+                out_links (list): The page's out links, crawler.links.link.Link instances
+        """
+        key = link.normalised_netloc_and_path
+
+        with self._lock, self._connection:
+            if etag is None and last_modified is None:
+                self._entries -= self._connection.execute("DELETE FROM pages WHERE key = ?", (key,)).rowcount
+                return
+
+            self._entries += self._connection.execute(
+                "INSERT OR IGNORE INTO pages (key, out_links, last_used) VALUES (?, '', 0)",
+                (key,),
+            ).rowcount
+            self._connection.execute(
+                "UPDATE pages SET etag = ?, last_modified = ?, out_links = ?, last_used = ? WHERE key = ?",
+                (etag, last_modified, "\n".join(out_link.url for out_link in out_links), time.time(), key),
+            )
+
+            if self._entries > self.max_entries:
+                self._evict()
+
+    def hit_rate(self):
+        """The fraction of lookups which were served from the cache
+
+            Returns:
+                float: The hit rate, between 0 and 1
+        """
+        if self.lookups == 0:
+            return 0.0
+
+        return self.hits / self.lookups
+
+    def __len__(self):
+        return self._entries
+
+    def close(self):
+        """Close the database
+        """
+        self._connection.close()
+
+    def _evict(self):
+        """Forget the least recently used pages until we're a tenth under the limit, so we aren't evicting on every
+           store
+        """
+        excess = self._entries - self.max_entries * 9 // 10
+        self._entries -= self._connection.execute(
+            "DELETE FROM pages WHERE key IN (SELECT key FROM pages ORDER BY last_used LIMIT ?)",
+            (excess,),
+        ).rowcount
@@ -0,0 +1,367 @@
+import linecache
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+
+class SamplingProfiler:
+    """Finds where a crawl spends its time by sampling the stack of every thread at a fixed interval, from a
+       background thread, rather than tracing every call as cProfile does.
+
+       Each sample charges the wall clock time since the last sample to the function each thread is in (self) and to
+       every function on its stack (total). This is a wall clock profile, not a CPU one: a thread waiting for a
+       response, a lock or more work is charged to the function it waits in, so time spent in socket reads shows up
+       there rather than in whatever the thread parsed next. Charging CPU time per sample instead would put the CPU a
+       thread used between samples on the frame it happens to be in when sampled, often a blocking call.
+
+        Attributes:
+            interval (float): The seconds between samples
+            samples (int): How many thread stacks have been charged
+    """
+    interval = None
+    samples = 0
+
+    def __init__(self, interval=0.005):
+        """Initialiser
+
+            Args:
+                interval (float): The seconds between samples
+        """
+        if interval <= 0:
+            raise ValueError("interval must be more than 0, got {}".format(interval))
+
+        self.interval = interval
+        self.samples = 0
+        self._self_seconds = dict()
+        self._total_seconds = dict()
+        self._functions = dict()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._started = None
+        self._last_sample = None
+        self._elapsed = 0.0
+
+    def start(self):
+        """Start sampling
+        """
+        self._stopped.clear()
+        self._started = time.monotonic()
+        self._last_sample = self._started
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling
+        """
+        self._stopped.set()
+        self._thread.join()
+        self._elapsed += time.monotonic() - self._started
+
+    def sample(self):
+        """Take one sample of every thread but the profiler's own, normally called from the profiler's thread. Each
+           is charged the time since the last sample, or the interval if sampling hasn't been started.
+        """
+        now = time.monotonic()
+        seconds = self.interval if self._last_sample is None else now - self._last_sample
+        self._last_sample = now
+
+        profiler_thread = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == profiler_thread:
+                continue
+
+            self.samples += 1
+            self._charge(frame, seconds)
+
+    def functions(self):
+        """Get the time charged to every function sampled
+
+            Returns:
+                list: tuple(function: str, self_seconds: float, total_seconds: float), the most self time first
+        """
+        return sorted(
+            (
+                (function, self._self_seconds.get(function, 0.0), total_seconds)
+                for function, total_seconds in self._total_seconds.items()
+            ),
+            key=lambda row: (-row[1], -row[2], row[0]),
+        )
+
+    def write(self, output, limit=None):
+        """Write the profile as a table, one function per line, the most self time first. Paths are relative to the
+           sys.path entry they were imported from, so profiles from different machines can be diffed.
+
+            Args:
+                output (file): The text file to write to
+                limit (int): The most functions to write, by default all of them
+        """
+        rows = self.functions()
+        charged = sum(self_seconds for _, self_seconds, _ in rows)
+
+        output.write("# Wall clock profile: {} samples every {:g}s over {:.3f}s, {:.3f}s charged\n".format(
+            self.samples,
+            self.interval,
+            self._elapsed,
+            charged,
+        ))
+        output.write("# {:>9} {:>6} {:>9} {:>6}  function\n".format("self_s", "self%", "total_s", "total%"))
+        for function, self_seconds, total_seconds in rows[:limit]:
+            output.write("{:>11.3f} {:>6.1%} {:>9.3f} {:>6.1%}  {}\n".format(
+                self_seconds,
+                self_seconds / charged if charged else 0,
+                total_seconds,
+                total_seconds / charged if charged else 0,
+                function,
+            ))
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def _charge(self, frame, seconds):
+        """Charge a stack for some time
+
+            Args:
+                frame (frame): The innermost frame of the stack
+                seconds (float): The wall clock time
+        """
+        function = self._function(frame.f_code)
+        self._self_seconds[function] = self._self_seconds.get(function, 0.0) + seconds
+
+        # A recursive function is only charged once per sample
+        seen = set()
+        while frame is not None:
+            function = self._function(frame.f_code)
+            if function not in seen:
+                seen.add(function)
+                self._total_seconds[function] = self._total_seconds.get(function, 0.0) + seconds
+            frame = frame.f_back
+
+    def _function(self, code):
+        """Get the name a function is reported under, cached as every sample needs the name of every frame
+
+            Args:
+                code (code): The function's code object
+
+            Returns:
+                string: path:first line(name)
+        """
+        function = self._functions.get(code)
+        if function is None:
+            function = "{}:{}({})".format(
+                SamplingProfiler._relative_path(code.co_filename),
+                code.co_firstlineno,
+                code.co_name,
+            )
+            self._functions[code] = function
+
+        return function
+
+    def _relative_path(filename):
+        """Shorten a source file's path to be relative to the sys.path entry it was imported from, the longest matching
+           one, so profiles taken on different machines or in different virtualenvs can be compared
+
+            Args:
+                filename (string): The path of the source file
+
+            Returns:
+                string: The shortened path, or the path unchanged if it isn't under any sys.path entry
+        """
+        longest = ""
+        for entry in sys.path:
+            entry = os.path.abspath(entry or os.curdir)
+            if filename.startswith(entry + os.sep) and len(entry) > len(longest):
+                longest = entry
+
+        if not longest:
+            return filename
+
+        return filename[len(longest) + 1:]
+
+
+class MemoryProfiler:
+    """Finds where a crawl's memory goes by taking a tracemalloc snapshot every so many pages and reporting the
+       lines which allocated the most memory still alive.
+
+       Tracing allocations slows the crawl down and the traces take memory of their own, so this is for looking into
+       a problem rather than leaving on.
+
+        Attributes:
+            every_pages (int): How many pages to crawl between snapshots
+            top (int): How many allocation sites to report in each snapshot
+            snapshots (list): tuple(pages: int, traced_bytes: int, peak_bytes: int, sites: list) for each snapshot
+                taken, the sites are tuple(site: str, size: int, count: int, size_change: int) the largest first
+    """
+    every_pages = None
+    top = None
+    snapshots = None
+
+    # tracemalloc's own allocations and those made importing modules aren't the crawl's
+    IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>",
+                     "<unknown>")
+
+    def __init__(self, every_pages=1000, top=25):
+        """Initialiser
+
+            Args:
+                every_pages (int): How many pages to crawl between snapshots
+                top (int): How many allocation sites to report in each snapshot
+        """
+        if every_pages < 1:
+            raise ValueError("every_pages must be at least 1, got {}".format(every_pages))
+
+        self.every_pages = every_pages
+        self.top = top
+        self.snapshots = []
+        self._pages = 0
+        self._last_sizes = dict()
+        self._started_tracing = False
+
+    def start(self):
+        """Start tracing allocations, if they aren't already being traced
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def page_crawled(self, page):
+        """Count a crawled page, taking a snapshot if it's time
+
+            Args:
+                page (crawler.pages.page.Page): The page
+        """
+        self._pages += 1
+        if self._pages % self.every_pages == 0:
+            self.snapshot()
+
+    def snapshot(self):
+        """Take a snapshot now and record the top allocation sites
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in MemoryProfiler.IGNORED_FILES],
+        )
+        traced_bytes, peak_bytes = tracemalloc.get_traced_memory()
+
+        sizes = dict()
+        sites = []
+        for statistic in snapshot.statistics("lineno"):
+            frame = statistic.traceback[0]
+            sizes[(frame.filename, frame.lineno)] = statistic.size
+            if len(sites) < self.top:
+                sites.append((
+                    "{}:{}".format(SamplingProfiler._relative_path(frame.filename), frame.lineno),
+                    statistic.size,
+                    statistic.count,
+                    statistic.size - self._last_sizes.get((frame.filename, frame.lineno), 0),
+                ))
+
+        self._last_sizes = sizes
+        self.snapshots.append((self._pages, traced_bytes, peak_bytes, sites))
+
+    def stop(self):
+        """Take a final snapshot, unless one was just taken, and stop tracing if we started it
+        """
+        if not self.snapshots or self.snapshots[-1][0] != self._pages:
+            self.snapshot()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def write(self, output):
+        """Write every snapshot, the top allocation sites with their source line
+
+            Args:
+                output (file): The text file to write to
+        """
+        output.write("# Memory profile: tracemalloc snapshot every {} pages, top {} allocation sites by size\n".format(
+            self.every_pages,
+            self.top,
+        ))
+        for pages, traced_bytes, peak_bytes, sites in self.snapshots:
+            output.write("\n== After {} pages: {:.1f} KiB traced, peak {:.1f} KiB\n".format(
+                pages,
+                traced_bytes / 1024,
+                peak_bytes / 1024,
+            ))
+            output.write("# {:>10} {:>9} {:>11}  site\n".format("size_kib", "count", "change_kib"))
+            for site, size, count, size_change in sites:
+                filename, _, lineno = site.rpartition(":")
+                output.write("{:>12.1f} {:>9} {:>+11.1f}  {}  {}\n".format(
+                    size / 1024,
+                    count,
+                    size_change / 1024,
+                    site,
+                    MemoryProfiler._source(filename, int(lineno)),
+                ))
+
+    def _source(filename, lineno):
+        for path in [filename] + [os.path.join(entry, filename) for entry in sys.path]:
+            line = linecache.getline(path, lineno).strip()
+            if line:
+                return line
+
+        return ""
+
+
+class CrawlProfiler:
+    """Profiles where a crawl's time and/or memory goes, writing what it found to files once the crawl has finished.
+
+       Give it to crawler.crawler.Crawler (profiler=) and the crawler starts and stops it and tells it about every
+       page, or call start, page_crawled and stop around any other crawl.
+    """
+    def __init__(self, wall_path=None, memory_path=None, sample_interval=0.005, memory_every_pages=1000,
+                 memory_top=25):
+        """Initialiser
+
+            Args:
+                wall_path (string): Write a SamplingProfiler profile to this file, if given
+                memory_path (string): Write a MemoryProfiler profile to this file, if given
+                sample_interval (float): The seconds between SamplingProfiler samples
+                memory_every_pages (int): How many pages to crawl between memory snapshots
+                memory_top (int): How many allocation sites to report in each memory snapshot
+        """
+        self._wall_path = wall_path
+        self._memory_path = memory_path
+        self.sampling_profiler = None if wall_path is None else SamplingProfiler(interval=sample_interval)
+        self.memory_profiler = None if memory_path is None else MemoryProfiler(
+            every_pages=memory_every_pages,
+            top=memory_top,
+        )
+
+    def start(self):
+        """Start profiling
+        """
+        if self.memory_profiler is not None:
+            self.memory_profiler.start()
+        if self.sampling_profiler is not None:
+            self.sampling_profiler.start()
+
+    def page_crawled(self, page):
+        """Tell the profiler a page has been crawled
+
+            Args:
+                page (crawler.pages.page.Page): The page
+        """
+        if self.memory_profiler is not None:
+            self.memory_profiler.page_crawled(page)
+
+    def stop(self):
+        """Stop profiling and write the profiles
+        """
+        if self.sampling_profiler is not None:
+            self.sampling_profiler.stop()
+            with open(self._wall_path, "w") as output:
+                self.sampling_profiler.write(output)
+        if self.memory_profiler is not None:
+            self.memory_profiler.stop()
+            with open(self._memory_path, "w") as output:
+                self.memory_profiler.write(output)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
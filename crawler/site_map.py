@@ -3,6 +3,10 @@ class SiteMap:
     """
     def __init__(self):
         self._visited_links = dict()
+        # The link of the canonical page for each near duplicate page
+        self._duplicates = dict()
+        # The link of the page each alias (a link which redirected to another page) redirects to
+        self._aliases = dict()
 
     def link_already_visited(self, link):
         """Has a link already been visited
@@ -11,20 +15,20 @@ class SiteMap:
                 link (crawler.links.link.Link): The link to check
 
             Returns:
-                bool: True if link already visited
+                bool: True if link already visited, or is an alias of a visited page
         """
-        return link in self._visited_links
+        return link in self._visited_links or link in self._aliases
 
     def page_for_link(self, link):
         """Get the page for an already visited link
 
             Args:
-                link (crawler.links.link.Link): The link for the page to return
+                link (crawler.links.link.Link): The link for the page to return, or an alias of it
 
             Returns:
                 crawler.pages.page.Page: The visited page
         """
-        return self._visited_links[link]
+        return self._visited_links[self._aliases.get(link, link)]
 
     def add_page(self, page):
         """Add a page to the site map
@@ -33,6 +37,22 @@ class SiteMap:
                 page (crawler.pages.page.Page): The page to add
         """
         self._visited_links[page.link] = page
+        if page.duplicate_of is not None:
+            self._duplicates[page.link] = page.duplicate_of
+        else:
+            self._duplicates.pop(page.link, None)
+        if page.aliases is not None:
+            self.add_aliases(page.link, page.aliases)
+
+    def add_aliases(self, link, aliases):
+        """Record links which redirect to a page, they count as visited from now on
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+                aliases (list): crawler.links.link.Link instances which redirect to it
+        """
+        for alias in aliases:
+            self._aliases[alias] = link
 
     def all_pages(self):
         """ Get all pages in the sitemap
@@ -42,3 +62,43 @@ class SiteMap:
         """
         return self._visited_links.values()
 
+    def duplicate_of(self, link):
+        """Get which page a visited page is a near duplicate of
+
+            Args:
+                link (crawler.links.link.Link): The link of the page
+
+            Returns:
+                crawler.links.link.Link: The link of the canonical page, None if the page isn't a near duplicate
+        """
+        return self._duplicates.get(link)
+
+    def near_duplicates(self):
+        """Get every near duplicate page and the page it duplicates
+
+            Returns:
+                list: tuple(link: crawler.links.link.Link, canonical link: crawler.links.link.Link)
+        """
+        return list(self._duplicates.items())
+
+    def alias_of(self, link):
+        """Get which page a link redirects to
+
+            Args:
+                link (crawler.links.link.Link): The link
+
+            Returns:
+                crawler.links.link.Link: The link of the page it redirects to, None if it isn't a known alias
+        """
+        return self._aliases.get(link)
+
+    def aliases(self):
+        """Get every alias and the page it redirects to
+
+            Returns:
+                list: tuple(alias: crawler.links.link.Link, link: crawler.links.link.Link)
+        """
+        return list(self._aliases.items())
+
+    def __len__(self):
+        return len(self._visited_links)
@@ -0,0 +1,182 @@
+import logging
+import zlib
+
+import requests
+
+from lxml import etree
+
+from crawler.links.link import BasePage, Link, InvalidPathError, UnknownSchemeError
+
+
+class SitemapSeeder:
+    """Finds the pages of a site from its sitemaps, before crawling it, so deep pages don't have to wait for every level
+       above them to be crawled first.
+
+       The sitemaps are those listed in robots.txt, or /sitemap.xml if it doesn't list any. Sitemap index files are
+       followed to the sitemaps they list. Each sitemap is parsed as it downloads, a chunk at a time, so even the
+       largest (50,000 urls, 50MB) is never held in memory, and gzipped sitemaps are decompressed as they stream.
+
+        Attributes:
+            sitemaps_fetched (int): How many sitemaps (including indexes) have been fetched
+            urls_found (int): How many page urls the sitemaps listed, including those outside the crawled domain
+    """
+    GZIP_MAGIC = b"\x1f\x8b"
+    sitemaps_fetched = 0
+    urls_found = 0
+
+    def __init__(self, session=None, headers=None, max_sitemaps=1000, chunk_size=16384, timeout=30.0):
+        """Initialiser
+
+            Args:
+                session (requests.Session): The session to fetch robots.txt and the sitemaps with, by default a new one
+                headers (dict): Headers to send with every request if we create the session
+                max_sitemaps (int): The most sitemaps (including indexes) to fetch, any more are ignored
+                chunk_size (int): How many bytes to read at a time
+                timeout (float): The most seconds to wait to connect to a server, or for it to send anything, before
+                    giving up on robots.txt or a sitemap. Use the page fetcher's, see
+                    crawler.pages.page_fetcher.PageFetcher
+        """
+        if session is None:
+            session = requests.Session()
+            if headers is not None:
+                session.headers.update(headers)
+        self._session = session
+        self._max_sitemaps = max_sitemaps
+        self._chunk_size = chunk_size
+        self._timeout = timeout
+        self.sitemaps_fetched = 0
+        self.urls_found = 0
+
+    def seed_links(self, start_link):
+        """Find the pages listed in the sitemaps of a site
+
+            Args:
+                start_link (crawler.links.link.Link): The link the crawl starts from, the sitemaps are looked for on
+                    its host
+
+            Yields:
+                crawler.links.link.Link: The links of the pages in the sitemaps which are inside the crawled domain,
+                    as if they were found on the start page. They may repeat.
+        """
+        base_page = BasePage(start_link.url)
+        sitemap_urls = self._robots_sitemap_urls(base_page)
+        if not sitemap_urls:
+            sitemap_urls = [Link(base_page, "/sitemap.xml").url]
+
+        queued = set(sitemap_urls)
+        while sitemap_urls and self.sitemaps_fetched < self._max_sitemaps:
+            sitemap_url = sitemap_urls.pop(0)
+            self.sitemaps_fetched += 1
+
+            for kind, url in self._sitemap_entries(sitemap_url):
+                if kind == "sitemap":
+                    if url not in queued:
+                        queued.add(url)
+                        sitemap_urls.append(url)
+                    continue
+
+                self.urls_found += 1
+                try:
+                    link = Link(base_page, url)
+                except (InvalidPathError, UnknownSchemeError):
+                    continue
+
+                if link.in_crawled_domain():
+                    yield link
+
+        if sitemap_urls:
+            logging.warning("Only fetched the first {} sitemaps, {} more ignored".format(
+                self.sitemaps_fetched,
+                len(sitemap_urls),
+            ))
+
+    def _robots_sitemap_urls(self, base_page):
+        """Get the sitemaps listed in a site's robots.txt
+
+            Args:
+                base_page (crawler.links.link.BasePage): A page of the site
+
+            Returns:
+                list: The urls of the sitemaps, empty if there is no robots.txt or it doesn't list any
+        """
+        robots_url = Link(base_page, "/robots.txt").url
+        try:
+            with self._session.get(robots_url, timeout=self._timeout) as response:
+                if response.status_code != 200:
+                    return []
+                robots_text = response.text
+        except requests.exceptions.RequestException as error:
+            logging.warning("Can't fetch {}: {}".format(robots_url, error))
+            return []
+
+        sitemap_urls = []
+        for line in robots_text.splitlines():
+            name, _, value = line.split("#", 1)[0].partition(":")
+            if name.strip().lower() == "sitemap" and value.strip() != "":
+                sitemap_urls.append(value.strip())
+
+        return sitemap_urls
+
+    def _sitemap_entries(self, sitemap_url):
+        """Fetch and parse a sitemap or sitemap index as it downloads
+
+            Args:
+                sitemap_url (string): The url of the sitemap
+
+            Yields:
+                tuple(kind: str, url: str): "url" for a page the sitemap lists, "sitemap" for a sitemap an index lists
+        """
+        parser = etree.XMLPullParser(events=("end",), resolve_entities=False, no_network=True)
+        decompressor = None
+        first_chunk = True
+
+        try:
+            with self._session.get(sitemap_url, stream=True, timeout=self._timeout) as response:
+                if response.status_code != 200:
+                    logging.warning("Can't fetch sitemap {}: status {}".format(sitemap_url, response.status_code))
+                    return
+
+                for chunk in response.iter_content(chunk_size=self._chunk_size):
+                    if first_chunk:
+                        # Gzipped sitemaps are usually served as files rather than with Content-Encoding
+                        if chunk.startswith(SitemapSeeder.GZIP_MAGIC):
+                            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                        first_chunk = False
+
+                    if decompressor is not None:
+                        chunk = decompressor.decompress(chunk)
+                    parser.feed(chunk)
+                    yield from SitemapSeeder._parsed_entries(parser)
+
+            if decompressor is not None:
+                parser.feed(decompressor.flush())
+            parser.close()
+            yield from SitemapSeeder._parsed_entries(parser)
+        except requests.exceptions.RequestException as error:
+            logging.warning("Can't fetch sitemap {}: {}".format(sitemap_url, error))
+        except (etree.XMLSyntaxError, zlib.error) as error:
+            logging.warning("Can't parse sitemap {}: {}".format(sitemap_url, error))
+
+    def _parsed_entries(parser):
+        """Take the entries the parser has finished parsing, throwing their elements away as we go
+
+            Args:
+                parser (lxml.etree.XMLPullParser): The parser
+
+            Yields:
+                tuple(kind: str, url: str): "url" for a page the sitemap lists, "sitemap" for a sitemap an index lists
+        """
+        for _, element in parser.read_events():
+            kind = etree.QName(element).localname
+            if kind not in ("url", "sitemap"):
+                continue
+
+            for child in element:
+                if isinstance(child.tag, str) and etree.QName(child).localname == "loc" and child.text:
+                    yield (kind, child.text.strip())
+                    break
+
+            # Only the entry being parsed needs to stay in the tree
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
@@ -0,0 +1,254 @@
+import asyncio
+import http.server
+import multiprocessing
+import socket
+import threading
+import unittest
+
+from crawler.crawler import Crawler
+from crawler.distributed.coordinator import Coordinator
+from crawler.distributed.protocol import Protocol, ProtocolError
+from crawler.distributed.worker import Worker
+from crawler.graph_site_map import GraphSiteMap
+from crawler.links.link import Link
+
+
+def run_worker(address):
+    Worker(address, workers=2).run()
+
+
+class TestCoordinator(unittest.TestCase):
+    SITE = dict(
+        [
+            ("/", "".join('<a href="/section-{}/index.html">Section</a>'.format(i) for i in range(5))),
+        ] + [
+            (
+                "/section-{}/index.html".format(i),
+                "".join('<a href="page-{}.html">Page</a>'.format(j) for j in range(10)) + '<a href="/">Home</a>',
+            )
+            for i in range(5)
+        ] + [
+            (
+                "/section-{}/page-{}.html".format(i, j),
+                '<a href="../section-{}/index.html">Next</a><a href="http://www.example.net/">External</a>'.format(
+                    (i + 1) % 5,
+                ),
+            )
+            for i in range(5)
+            for j in range(10)
+        ]
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        cls.requested_paths = []
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                TestCoordinator.requested_paths.append(self.path)
+                body = TestCoordinator.SITE[self.path].encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever)
+        cls.server_thread.start()
+        cls.domain = "http://127.0.0.1:{}".format(cls.server.server_address[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.server_thread.join()
+
+    def setUp(self):
+        del TestCoordinator.requested_paths[:]
+
+    def crawl(self, coordinator, worker_count):
+        """Crawl with worker processes, as if they were on other machines
+        """
+        coordinator.listen()
+        workers = [
+            multiprocessing.Process(target=run_worker, args=(coordinator.address,))
+            for _ in range(worker_count)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            coordinator.crawl()
+        finally:
+            for worker in workers:
+                worker.join(10)
+
+        self.assertEqual([worker.exitcode for worker in workers], [0] * worker_count)
+
+    def test_crawl(self):
+        coordinator = Coordinator(self.domain, 3)
+        self.crawl(coordinator, 3)
+
+        self.assertEqual(
+            set(page.link for page in coordinator.site_map.all_pages()),
+            set(Link(self.domain, path) for path in TestCoordinator.SITE),
+        )
+        self.assertEqual(sum(coordinator.pages_per_shard), len(TestCoordinator.SITE))
+        self.assertTrue(all(pages > 0 for pages in coordinator.pages_per_shard))
+
+    def test_crawl_fetches_each_page_once(self):
+        self.crawl(Coordinator(self.domain, 3), 3)
+
+        self.assertCountEqual(TestCoordinator.requested_paths, TestCoordinator.SITE.keys())
+
+    def test_crawl_matches_single_process_crawl(self):
+        site_map = GraphSiteMap()
+        self.crawl(Coordinator(self.domain, 2, site_map=site_map), 2)
+        crawler = Crawler(self.domain)
+        crawler.crawl()
+
+        self.assertEqual(len(site_map), len(crawler.site_map))
+        for page in crawler.site_map.all_pages():
+            distributed_page = site_map.page_for_link(page.link)
+            self.assertEqual(
+                [link.url for link in distributed_page.out_links],
+                [link.url for link in page.out_links],
+            )
+            self.assertEqual(distributed_page.status_code, 200)
+            self.assertEqual(distributed_page.body_size, page.body_size)
+
+    def test_crawl_with_one_worker(self):
+        pages = []
+        coordinator = Coordinator(self.domain, 1, on_page=pages.append)
+        self.crawl(coordinator, 1)
+
+        self.assertEqual(len(pages), len(TestCoordinator.SITE))
+        self.assertEqual(coordinator.pages_per_shard, [len(TestCoordinator.SITE)])
+
+    def test_crawl_when_a_worker_disconnects(self):
+        coordinator = Coordinator(self.domain, 1)
+        coordinator.listen()
+
+        def join_and_leave():
+            with socket.create_connection(coordinator.address) as sock:
+                Protocol.send(sock, {"type": "join"})
+                stream = sock.makefile("rb")
+                Protocol.receive(stream)
+                Protocol.receive(stream)
+
+        thread = threading.Thread(target=join_and_leave)
+        thread.start()
+        with self.assertRaisesRegex(ProtocolError, "disconnected"):
+            coordinator.crawl()
+        thread.join()
+
+    def test_coordinate_merges_aliases_from_other_shards(self):
+        class Writer:
+            def __init__(self):
+                self.messages = []
+                self.drained = 0
+
+            def write(self, data):
+                self.messages.append(Protocol.decode(data[Protocol.LENGTH.size:]))
+
+            async def drain(self):
+                self.drained += 1
+
+        def page_message(path, aliases=None):
+            return {
+                "url": self.domain + path,
+                "out_links": [],
+                "status_code": 200,
+                "body_size": 0,
+                "fetch_time": 0.0,
+                "aliases": aliases,
+            }
+
+        start_shard = Protocol.shard(Link(self.domain, "/"), 2)
+        other_shard = 1 - start_shard
+        messages = asyncio.Queue()
+        # The start page redirects to a page in the other shard, which arrives later
+        messages.put_nowait((start_shard, {
+            "type": "crawled",
+            "pages": [],
+            "links": {str(other_shard): [self.domain + "/new.html"]},
+            "aliases": {self.domain + "/new.html": [self.domain]},
+            "processed": 1,
+        }))
+        messages.put_nowait((other_shard, {
+            "type": "crawled",
+            "pages": [page_message("/new.html", aliases=[self.domain + "/older.html"])],
+            "links": {},
+            "aliases": {},
+            "processed": 1,
+        }))
+        coordinator = Coordinator(self.domain, 2)
+        writers = [Writer(), Writer()]
+
+        asyncio.run(coordinator._coordinate(writers, messages))
+
+        page = coordinator.site_map.page_for_link(Link(self.domain, "/new.html"))
+        self.assertEqual(page.aliases, [Link(self.domain, "/older.html"), Link(self.domain, "/")])
+        self.assertIs(coordinator.site_map.page_for_link(Link(self.domain, "/")), page)
+        self.assertEqual(len(coordinator.site_map), 1)
+        self.assertEqual(writers[other_shard].messages[0], {"type": "links", "urls": [self.domain + "/new.html"]})
+        # Every message written is drained, the links as well as the stop
+        for writer in writers:
+            self.assertEqual(writer.drained, len(writer.messages))
+
+    def test_coordinate_isnt_held_up_by_a_slow_worker(self):
+        class Writer:
+            def __init__(self, released=None):
+                self.messages = []
+                self.released = released
+
+            def write(self, data):
+                self.messages.append(Protocol.decode(data[Protocol.LENGTH.size:]))
+
+            async def drain(self):
+                if self.released is not None:
+                    await self.released.wait()
+
+        start_shard = Protocol.shard(Link(self.domain, "/"), 2)
+        other_shard = 1 - start_shard
+
+        async def coordinate():
+            # The worker with the start page doesn't read anything it is sent until it is released
+            released = asyncio.Event()
+            writers = [None, None]
+            writers[start_shard] = Writer(released)
+            writers[other_shard] = Writer()
+            messages = asyncio.Queue()
+            messages.put_nowait((start_shard, {
+                "type": "crawled",
+                "pages": [],
+                "links": {str(other_shard): [self.domain + "/foo.html"]},
+                "processed": 1,
+            }))
+            coordinator = Coordinator(self.domain, 2)
+            coordinating = asyncio.ensure_future(coordinator._coordinate(writers, messages))
+
+            async def other_shard_sent_links():
+                while not writers[other_shard].messages:
+                    await asyncio.sleep(0.01)
+
+            await asyncio.wait_for(other_shard_sent_links(), 5)
+            self.assertEqual(writers[other_shard].messages, [{"type": "links", "urls": [self.domain + "/foo.html"]}])
+
+            messages.put_nowait((other_shard, {"type": "crawled", "pages": [], "links": {}, "processed": 1}))
+            released.set()
+            await asyncio.wait_for(coordinating, 5)
+
+            return writers
+
+        writers = asyncio.run(coordinate())
+
+        for writer in writers:
+            self.assertEqual(writer.messages[-1], {"type": "stop"})
+
+    def test_init_with_no_shards(self):
+        with self.assertRaises(ValueError):
+            Coordinator(self.domain, 0)
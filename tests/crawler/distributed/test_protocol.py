@@ -0,0 +1,65 @@
+import asyncio
+import io
+import unittest
+
+from crawler.distributed.protocol import Protocol, ProtocolError
+from crawler.links.link import Link
+
+
+class TestProtocol(unittest.IsolatedAsyncioTestCase):
+    def test_shard(self):
+        links = [Link("http://www.example.com", "/page-{}.html".format(i)) for i in range(100)]
+        shards = [Protocol.shard(link, 4) for link in links]
+
+        self.assertEqual(set(shards), {0, 1, 2, 3})
+        # The same in every process, so it can't depend on the randomised hash()
+        self.assertEqual(Protocol.shard(Link("http://www.example.com", "/"), 4), 3)
+
+    def test_shard_of_equivalent_links(self):
+        self.assertEqual(
+            Protocol.shard(Link("http://www.example.com/foo/", "bar.html"), 7),
+            Protocol.shard(Link("https://www.example.com", "/foo/bar.html"), 7),
+        )
+
+    def test_receive(self):
+        messages = [{"type": "join"}, {"type": "links", "urls": ["http://www.example.com/"]}]
+        stream = io.BytesIO(b"".join(Protocol.encode(message) for message in messages))
+
+        self.assertEqual(Protocol.receive(stream), messages[0])
+        self.assertEqual(Protocol.receive(stream), messages[1])
+        with self.assertRaisesRegex(ProtocolError, "^Disconnected$"):
+            Protocol.receive(stream)
+
+    def test_receive_truncated(self):
+        stream = io.BytesIO(Protocol.encode({"type": "stop"})[:-1])
+
+        with self.assertRaisesRegex(ProtocolError, "part way"):
+            Protocol.receive(stream)
+
+    def test_receive_too_large(self):
+        stream = io.BytesIO(Protocol.LENGTH.pack(Protocol.MAX_MESSAGE_SIZE + 1))
+
+        with self.assertRaisesRegex(ProtocolError, "limit"):
+            Protocol.receive(stream)
+
+    def test_decode_without_type(self):
+        with self.assertRaisesRegex(ProtocolError, "no type"):
+            Protocol.decode(b'{"urls": []}')
+        with self.assertRaisesRegex(ProtocolError, "Unreadable"):
+            Protocol.decode(b"not json")
+
+    async def test_read(self):
+        reader = asyncio.StreamReader()
+        reader.feed_data(Protocol.encode({"type": "stop"}))
+        reader.feed_eof()
+
+        self.assertEqual(await Protocol.read(reader), {"type": "stop"})
+        self.assertIsNone(await Protocol.read(reader))
+
+    async def test_read_truncated(self):
+        reader = asyncio.StreamReader()
+        reader.feed_data(Protocol.encode({"type": "stop"})[:-1])
+        reader.feed_eof()
+
+        with self.assertRaisesRegex(ProtocolError, "part way"):
+            await Protocol.read(reader)
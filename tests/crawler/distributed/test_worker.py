@@ -0,0 +1,228 @@
+import requests
+import responses
+import socket
+import threading
+import unittest
+
+from crawler.distributed.protocol import Protocol, ProtocolError
+from crawler.distributed.worker import Worker
+from crawler.links.link import Link
+
+
+class TestWorker(unittest.TestCase):
+    SITE = {
+        "/": """
+            <a href="/foo.html">Foo</a>
+            <a href="/bar.html">Bar</a>
+            <a href="http://www.example.net/external.html">External</a>
+        """,
+        "/foo.html": """<a href="/">Home</a>""",
+        "/bar.html": """<a href="/foo.html">Foo</a>""",
+    }
+
+    def setUp(self):
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.addCleanup(self.listener.close)
+        for path, text in TestWorker.SITE.items():
+            responses.add(responses.GET, "http://www.example.com" + path, body=text, content_type="text/html")
+
+    def start_worker(self, shard, shard_count, **kwargs):
+        """Start a worker on a thread, and accept its connection as the coordinator
+
+            Returns:
+                tuple(worker: Worker, thread: threading.Thread, connection: socket.socket, stream: file)
+        """
+        worker = Worker(self.listener.getsockname(), **kwargs)
+        thread = threading.Thread(target=worker.run)
+        thread.start()
+
+        connection, _ = self.listener.accept()
+        self.addCleanup(connection.close)
+        stream = connection.makefile("rb")
+        self.assertEqual(Protocol.receive(stream), {"type": "join"})
+        Protocol.send(connection, {
+            "type": "start",
+            "shard": shard,
+            "shards": shard_count,
+            "start_url": "http://www.example.com/",
+        })
+
+        return worker, thread, connection, stream
+
+    def stop_worker(self, thread, connection):
+        Protocol.send(connection, {"type": "stop"})
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    @responses.activate
+    def test_crawls_its_own_shard_without_forwarding(self):
+        worker, thread, connection, stream = self.start_worker(0, 1)
+        Protocol.send(connection, {"type": "links", "urls": ["http://www.example.com/"]})
+
+        message = Protocol.receive(stream)
+        self.assertEqual(message["type"], "crawled")
+        self.assertEqual(message["processed"], 0)
+        self.assertEqual(message["links"], {})
+        self.assertEqual([page["url"] for page in message["pages"]], ["http://www.example.com"])
+        self.assertEqual(message["pages"][0]["out_links"], [
+            "http://www.example.com/foo.html",
+            "http://www.example.com/bar.html",
+            "http://www.example.net/external.html",
+        ])
+        self.assertEqual(message["pages"][0]["status_code"], 200)
+
+        message = Protocol.receive(stream)
+        self.assertEqual(message["processed"], 1)
+        self.assertEqual(
+            set(page["url"] for page in message["pages"]),
+            {"http://www.example.com/foo.html", "http://www.example.com/bar.html"},
+        )
+
+        self.stop_worker(thread, connection)
+        self.assertEqual(worker.shard, 0)
+        self.assertEqual(worker.shard_count, 1)
+        self.assertEqual(worker.pages_crawled, 3)
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def test_forwards_links_in_other_shards(self):
+        shard_count = 64
+        start_shard = Protocol.shard(Link("http://www.example.com", "/"), shard_count)
+        worker, thread, connection, stream = self.start_worker(start_shard, shard_count, workers=2)
+        Protocol.send(connection, {"type": "links", "urls": ["http://www.example.com/"]})
+
+        message = Protocol.receive(stream)
+        expected_links = dict()
+        for path in ("/foo.html", "/bar.html"):
+            link = Link("http://www.example.com", path)
+            expected_links.setdefault(str(Protocol.shard(link, shard_count)), []).append(link.url)
+
+        self.assertEqual(message["processed"], 1)
+        self.assertEqual(len(message["pages"]), 1)
+        self.assertEqual(message["links"], expected_links)
+
+        self.stop_worker(thread, connection)
+
+    @responses.activate
+    def test_forwards_redirects_to_other_shards(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/old.html",
+            status=301,
+            headers={"Location": "/foo.html"},
+        )
+        old_link = Link("http://www.example.com", "/old.html")
+        foo_link = Link("http://www.example.com", "/foo.html")
+        shard_count = 2
+        self.assertNotEqual(Protocol.shard(old_link, shard_count), Protocol.shard(foo_link, shard_count))
+
+        _, thread, connection, stream = self.start_worker(Protocol.shard(old_link, shard_count), shard_count)
+        Protocol.send(connection, {"type": "links", "urls": [old_link.url]})
+
+        message = Protocol.receive(stream)
+        self.assertEqual(message["processed"], 1)
+        self.assertEqual(message["pages"], [])
+        self.assertEqual(message["links"], {str(Protocol.shard(foo_link, shard_count)): [foo_link.url]})
+        self.assertEqual(message["aliases"], {foo_link.url: [old_link.url]})
+
+        self.stop_worker(thread, connection)
+
+    @responses.activate
+    def test_skips_redirects_to_pages_already_visited(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/old.html",
+            status=301,
+            headers={"Location": "/foo.html"},
+        )
+        _, thread, connection, stream = self.start_worker(0, 1)
+        Protocol.send(connection, {"type": "links", "urls": ["http://www.example.com/foo.html"]})
+        processed = 0
+        while processed < 1:
+            processed += Protocol.receive(stream)["processed"]
+
+        Protocol.send(connection, {"type": "links", "urls": ["http://www.example.com/old.html"]})
+        message = Protocol.receive(stream)
+        self.assertEqual(message["processed"], 1)
+        self.assertEqual(message["pages"], [])
+        self.assertEqual(message["links"], {})
+        self.assertEqual(message["aliases"], {
+            "http://www.example.com/foo.html": ["http://www.example.com/old.html"],
+        })
+
+        self.stop_worker(thread, connection)
+
+    @responses.activate
+    def test_keeps_crawling_past_fetch_errors(self):
+        responses.replace(
+            responses.GET,
+            "http://www.example.com/foo.html",
+            body=requests.exceptions.ConnectionError("refused"),
+        )
+        worker, thread, connection, stream = self.start_worker(0, 1)
+        Protocol.send(connection, {"type": "links", "urls": ["http://www.example.com/"]})
+
+        pages = dict()
+        processed = 0
+        while processed < 1:
+            message = Protocol.receive(stream)
+            pages.update((page["url"], page) for page in message["pages"])
+            processed += message["processed"]
+
+        self.assertCountEqual(pages, [
+            "http://www.example.com",
+            "http://www.example.com/foo.html",
+            "http://www.example.com/bar.html",
+        ])
+        self.assertEqual(pages["http://www.example.com/foo.html"]["out_links"], [])
+        self.assertIsNone(pages["http://www.example.com/foo.html"]["status_code"])
+
+        self.stop_worker(thread, connection)
+        self.assertEqual(worker.pages_crawled, 3)
+
+    @responses.activate
+    def test_skips_links_already_visited(self):
+        _, thread, connection, stream = self.start_worker(0, 1, batch_size=1)
+        Protocol.send(connection, {"type": "links", "urls": ["http://www.example.com/foo.html"]})
+        Protocol.send(connection, {
+            "type": "links",
+            "urls": ["http://www.example.com/foo.html", "http://www.example.com/bar.html"],
+        })
+
+        pages = []
+        processed = 0
+        while processed < 3:
+            message = Protocol.receive(stream)
+            pages.extend(page["url"] for page in message["pages"])
+            processed += message["processed"]
+
+        self.assertCountEqual(pages, [
+            "http://www.example.com/foo.html",
+            "http://www.example.com",
+            "http://www.example.com/bar.html",
+        ])
+
+        self.stop_worker(thread, connection)
+
+    def test_run_when_coordinator_disconnects(self):
+        worker = Worker(self.listener.getsockname())
+        errors = []
+
+        def run():
+            try:
+                worker.run()
+            except ProtocolError as error:
+                errors.append(error)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        connection, _ = self.listener.accept()
+        Protocol.receive(connection.makefile("rb"))
+        connection.close()
+        thread.join(5)
+
+        self.assertEqual(len(errors), 1)
+
+    def test_init_with_no_workers(self):
+        with self.assertRaises(ValueError):
+            Worker(("127.0.0.1", 1), workers=0)
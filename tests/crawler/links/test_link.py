@@ -1,6 +1,7 @@
+import pickle
 import unittest
 
-from crawler.links.link import Link, InvalidPathError, UnknownSchemeError
+from crawler.links.link import BasePage, Link, InvalidPathError, UnknownSchemeError
 
 
 class TestLink(unittest.TestCase):
@@ -179,3 +180,48 @@ class TestLink(unittest.TestCase):
             Link("http://www.example.com/index.html", "sub/path/foo.html"),
         )
 
+    def test_equal_with_shared_base_page(self):
+        base_page = BasePage("http://www.example.com/sub/path/index.html")
+
+        self.assertEqual(
+            Link(base_page, "foo.html"),
+            Link("http://www.example.com/sub/path/index.html", "foo.html"),
+        )
+        self.assertEqual(Link(base_page, "foo.html").url, "http://www.example.com/sub/path/foo.html")
+
+    def test_shared_base_page(self):
+        base_page = BasePage(self.crawled_page)
+
+        self.assertIs(Link(base_page, "foo.html").base_page, Link(base_page, "bar.html").base_page)
+
+    def test_has_no_instance_dict(self):
+        with self.assertRaises(AttributeError):
+            Link(self.crawled_page, "foo.html").__dict__
+
+    def test_pickle(self):
+        link = Link(self.crawled_page, "/foo/bar.html")
+        unpickled_link = pickle.loads(pickle.dumps(link))
+
+        self.assertEqual(unpickled_link, link)
+        self.assertEqual(hash(unpickled_link), hash(link))
+        self.assertEqual(unpickled_link.url, link.url)
+        self.assertTrue(unpickled_link.in_crawled_domain())
+
+
+class TestBasePage(unittest.TestCase):
+    def test_init(self):
+        base_page = BasePage("https://www.example.com:8443/sub/path/index.html")
+
+        self.assertEqual(base_page.url, "https://www.example.com:8443/sub/path/index.html")
+        self.assertEqual(base_page.scheme, "https")
+        self.assertEqual(base_page.netloc, "www.example.com:8443")
+        self.assertEqual(base_page.domain, "www.example.com")
+        self.assertEqual(base_page.port, "8443")
+        self.assertEqual(base_page.subdir, "/sub/path")
+
+    def test_init_default_port(self):
+        self.assertEqual(BasePage("https://www.example.com/").port, 443)
+
+    def test_init_with_unknown_scheme(self):
+        with self.assertRaises(UnknownSchemeError):
+            BasePage("www.example.com")
@@ -2,6 +2,8 @@ import unittest
 
 from crawler.links.link_extractor import LinkExtractor
 from crawler.links.link import Link
+from crawler.links.link_resolver import LinkResolver
+from crawler.metrics import CrawlMetrics
 
 
 class TestLinkExtractor(unittest.TestCase):
@@ -143,3 +145,71 @@ class TestLinkExtractor(unittest.TestCase):
 
         actual_links = LinkExtractor.extract(self.crawled_page_url, page)
         self.assertEqual(actual_links, expected_links)
+
+    def test_extract_records_metrics(self):
+        page = """
+        <a href="foo.html">FooPage</a>
+        <a href="../../escapes.html">Escapes</a>
+        """
+        metrics = CrawlMetrics()
+
+        LinkExtractor.extract(self.crawled_page_url, page, metrics=metrics)
+
+        self.assertEqual(metrics.stages["parse"].count, 1)
+        self.assertEqual(metrics.stages["link_normalise"].count, 1)
+
+    def test_extract_with_resolver(self):
+        page = """
+        <html>
+        <body>
+            <a href="foo.html">FooPage</a>
+            <a href="foo.html">FooPage again</a>
+            <a href="ftp://www.example.com/foo.html">Unknown scheme</a>
+            <a href="ftp://www.example.com/foo.html">Unknown scheme again</a>
+        </body>
+        </html>
+        """
+        resolver = LinkResolver()
+
+        actual_links = LinkExtractor.extract(self.crawled_page_url, page, resolver=resolver)
+
+        self.assertEqual(actual_links, [
+            Link(self.crawled_page_url, "/foo.html"),
+            Link(self.crawled_page_url, "/foo.html"),
+        ])
+        self.assertEqual(resolver.hits, 2)
+        self.assertEqual(resolver.misses, 2)
+
+    def test_extract_resolved(self):
+        page = """
+            <a href="/foo.html">Foo</a>
+            <a href="https://www.example.com/sub/../bar.html">Bar</a>
+            <a href="http://www.example.net:8080/baz.html">Baz</a>
+            <a href="mailto:someone@example.com">Mail</a>
+        """
+
+        resolved_links = LinkExtractor.extract_resolved("http://www.example.com/index.html", page)
+
+        self.assertEqual(resolved_links, [
+            ("http", "www.example.com/foo.html"),
+            ("https", "www.example.com/bar.html"),
+            ("http", "www.example.net:8080/baz.html"),
+        ])
+
+    def test_links_from_resolved(self):
+        page = """
+            <a href="foo.html">Foo</a>
+            <a href="https://www.example.com/bar.html">Bar</a>
+            <a href="http://www.example.net:8080/baz.html">Baz</a>
+        """
+        expected_links = LinkExtractor.extract("http://www.example.com/index.html", page)
+
+        links = LinkExtractor.links_from_resolved(
+            "http://www.example.com/index.html",
+            LinkExtractor.extract_resolved("http://www.example.com/index.html", page),
+        )
+
+        self.assertEqual(links, expected_links)
+        self.assertEqual([link.url for link in links], [link.url for link in expected_links])
+        self.assertEqual([link.port for link in links], [link.port for link in expected_links])
+        self.assertEqual([link.in_crawled_domain() for link in links], [True, True, False])
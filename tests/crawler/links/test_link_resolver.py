@@ -0,0 +1,86 @@
+import unittest
+
+from crawler.links.link import BasePage, Link, InvalidPathError, UnknownSchemeError
+from crawler.links.link_resolver import LinkResolver
+
+
+class TestLinkResolver(unittest.TestCase):
+    def setUp(self):
+        self.base_page = BasePage("http://www.example.com/sub/index.html")
+        self.resolver = LinkResolver(max_size=2)
+
+    def test_resolve(self):
+        link = self.resolver.resolve(self.base_page, "foo.html")
+
+        self.assertEqual(link, Link(self.base_page, "foo.html"))
+        self.assertEqual(link.url, "http://www.example.com/sub/foo.html")
+        self.assertEqual(self.resolver.misses, 1)
+        self.assertEqual(self.resolver.hits, 0)
+
+    def test_resolve_cached(self):
+        self.resolver.resolve(self.base_page, "foo.html")
+        link = self.resolver.resolve(self.base_page, "foo.html")
+
+        self.assertEqual(link, Link(self.base_page, "foo.html"))
+        self.assertEqual(link.url, "http://www.example.com/sub/foo.html")
+        self.assertEqual(self.resolver.misses, 1)
+        self.assertEqual(self.resolver.hits, 1)
+
+    def test_resolve_shared_by_pages_in_same_directory(self):
+        self.resolver.resolve(self.base_page, "foo.html")
+        other_base_page = BasePage("http://www.example.com/sub/other.html")
+        link = self.resolver.resolve(other_base_page, "foo.html")
+
+        self.assertIs(link.base_page, other_base_page)
+        self.assertEqual(self.resolver.hits, 1)
+
+    def test_resolve_not_shared_by_pages_in_different_directories(self):
+        self.resolver.resolve(self.base_page, "foo.html")
+        link = self.resolver.resolve(BasePage("http://www.example.com/other/index.html"), "foo.html")
+
+        self.assertEqual(link.url, "http://www.example.com/other/foo.html")
+        self.assertEqual(self.resolver.hits, 0)
+
+    def test_resolve_not_shared_by_different_schemes(self):
+        self.resolver.resolve(self.base_page, "foo.html")
+        link = self.resolver.resolve(BasePage("https://www.example.com/sub/index.html"), "foo.html")
+
+        self.assertEqual(link.url, "https://www.example.com/sub/foo.html")
+
+    def test_resolve_keeps_in_crawled_domain(self):
+        self.resolver.resolve(BasePage("http://www.example.net/sub/index.html"), "http://www.example.com/foo.html")
+        link = self.resolver.resolve(self.base_page, "http://www.example.com/foo.html")
+
+        self.assertTrue(link.in_crawled_domain())
+
+    def test_resolve_invalid_path_cached(self):
+        for _ in range(2):
+            with self.assertRaises(InvalidPathError):
+                self.resolver.resolve(self.base_page, "../../foo.html")
+
+        self.assertEqual(self.resolver.hits, 1)
+
+    def test_resolve_unknown_scheme_cached(self):
+        for _ in range(2):
+            with self.assertRaises(UnknownSchemeError):
+                self.resolver.resolve(self.base_page, "ftp://www.example.com/foo.html")
+
+        self.assertEqual(self.resolver.hits, 1)
+
+    def test_resolve_evicts_least_recently_used(self):
+        self.resolver.resolve(self.base_page, "foo.html")
+        self.resolver.resolve(self.base_page, "bar.html")
+        self.resolver.resolve(self.base_page, "foo.html")
+        self.resolver.resolve(self.base_page, "baz.html")
+
+        self.assertEqual(len(self.resolver), 2)
+
+        self.resolver.resolve(self.base_page, "foo.html")
+        self.assertEqual(self.resolver.hits, 2)
+
+        self.resolver.resolve(self.base_page, "bar.html")
+        self.assertEqual(self.resolver.misses, 4)
+
+    def test_init_with_no_size(self):
+        with self.assertRaises(ValueError):
+            LinkResolver(max_size=0)
@@ -0,0 +1,89 @@
+import unittest
+
+from crawler.links.link import Link
+from crawler.links.link_extractor import LinkExtractor
+from crawler.links.streaming_link_extractor import StreamingLinkExtractor
+
+
+class TestStreamingLinkExtractor(unittest.TestCase):
+    PAGE = """
+        <html>
+        <head>
+            <title>Test Page</title>
+        </head>
+        <body>
+            <p>
+                <a href="http://www.example.com/foo.html">FooPage</a>
+                <a href="bar.html">BarPage</a>
+                <a name="no-href">NoHref</a>
+                <a href="ftp://www.example.com/foo.html">Unknown scheme</a>
+                <a href="../../escaped.html">Escaped</a>
+                <a href="http://www.example.net/baz.html">External</a>
+            </p>
+            <div><div><a href="/sub/page/../qux.html">QuxPage</a></div></div>
+        </body>
+        </html>
+    """
+
+    def setUp(self):
+        self.crawled_page_url = "http://www.example.com"
+
+    def _chunks(self, size):
+        body = TestStreamingLinkExtractor.PAGE.encode("utf-8")
+        return [body[start:start + size] for start in range(0, len(body), size)]
+
+    def test_extract(self):
+        expected_links = [
+            Link(self.crawled_page_url, "/foo.html"),
+            Link(self.crawled_page_url, "/bar.html"),
+            Link(self.crawled_page_url, "http://www.example.net/baz.html"),
+            Link(self.crawled_page_url, "/sub/qux.html"),
+        ]
+
+        actual_links = list(StreamingLinkExtractor.extract(self.crawled_page_url, self._chunks(7)))
+
+        self.assertEqual(actual_links, expected_links)
+
+    def test_extract_matches_link_extractor(self):
+        self.assertEqual(
+            list(StreamingLinkExtractor.extract(self.crawled_page_url, self._chunks(1))),
+            LinkExtractor.extract(self.crawled_page_url, TestStreamingLinkExtractor.PAGE),
+        )
+
+    def test_extract_upper_case_tags(self):
+        chunks = [b'<HTML><BODY><A HREF="/foo.html">Foo</A></BODY></HTML>']
+
+        actual_links = list(StreamingLinkExtractor.extract(self.crawled_page_url, chunks))
+
+        self.assertEqual(actual_links, [Link(self.crawled_page_url, "/foo.html")])
+
+    def test_extract_with_unknown_encoding(self):
+        chunks = [b'<a href="/foo.html">Foo</a>']
+
+        actual_links = list(StreamingLinkExtractor.extract(self.crawled_page_url, chunks, encoding="not-a-charset"))
+
+        self.assertEqual(actual_links, [Link(self.crawled_page_url, "/foo.html")])
+
+    def test_extract_no_chunks(self):
+        self.assertEqual(list(StreamingLinkExtractor.extract(self.crawled_page_url, [])), [])
+
+    def test_extract_with_encoding(self):
+        chunks = ['<a href="/café.html">Cafe</a>'.encode("latin-1")]
+
+        actual_links = list(StreamingLinkExtractor.extract(self.crawled_page_url, chunks, encoding="latin-1"))
+
+        self.assertEqual(actual_links, [Link(self.crawled_page_url, "/café.html")])
+
+    def test_feed_returns_links_as_they_are_parsed(self):
+        extractor = StreamingLinkExtractor(self.crawled_page_url)
+
+        self.assertEqual(extractor.feed(b'<html><body><a href="/foo.html">Foo</a><p>'), [
+            Link(self.crawled_page_url, "/foo.html"),
+        ])
+        self.assertEqual(extractor.feed(b'<a href="/bar.html">Bar</a></p>'), [
+            Link(self.crawled_page_url, "/bar.html"),
+        ])
+        self.assertEqual(extractor.close(), [
+            Link(self.crawled_page_url, "/foo.html"),
+            Link(self.crawled_page_url, "/bar.html"),
+        ])
@@ -0,0 +1,91 @@
+import aiohttp
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from crawler.links.link import Link
+from crawler.pages.async_page_fetcher import AsyncPageFetcher
+from crawler.pages.parse_pool import ParsePool
+
+
+class TestAsyncPageFetcher(unittest.IsolatedAsyncioTestCase):
+    MOCK_PAGE = """
+        <html>
+        <body>
+            <p>
+                <a href="/foo.html">FooPage</a>
+                <a href="sub/page/bar.html">BarPage</a>
+            </p>
+        </body>
+        </html>
+    """
+
+    async def asyncSetUp(self):
+        async def handler(request):
+            return web.Response(text=TestAsyncPageFetcher.MOCK_PAGE, content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/index.html", handler)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.domain = "http://{}:{}".format(self.server.host, self.server.port)
+        self.session = aiohttp.ClientSession()
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.server.close()
+
+    async def test_get(self):
+        link = Link(self.domain, "index.html")
+
+        actual_page = await AsyncPageFetcher(self.session).get(link)
+
+        self.assertEqual(actual_page.link, link)
+        self.assertEqual(actual_page.out_links, [
+            Link(self.domain, "/foo.html"),
+            Link(self.domain, "/sub/page/bar.html"),
+        ])
+
+    async def test_get_parse_in_executor(self):
+        link = Link(self.domain, "index.html")
+
+        actual_page = await AsyncPageFetcher(self.session, parse_in_executor=True).get(link)
+
+        self.assertEqual(actual_page.out_links, [
+            Link(self.domain, "/foo.html"),
+            Link(self.domain, "/sub/page/bar.html"),
+        ])
+
+    async def test_get_stream_links(self):
+        link = Link(self.domain, "index.html")
+
+        actual_page = await AsyncPageFetcher(self.session, stream_links=True, chunk_size=10).get(link)
+
+        self.assertEqual(actual_page.link, link)
+        self.assertEqual(actual_page.out_links, [
+            Link(self.domain, "/foo.html"),
+            Link(self.domain, "/sub/page/bar.html"),
+        ])
+
+    async def test_get_records_fetch(self):
+        for stream_links in (False, True):
+            with self.subTest(stream_links=stream_links):
+                page = await AsyncPageFetcher(self.session, stream_links=stream_links).get(
+                    Link(self.domain, "index.html"),
+                )
+
+                self.assertEqual(page.status_code, 200)
+                self.assertEqual(page.body_size, len(TestAsyncPageFetcher.MOCK_PAGE.encode()))
+                self.assertGreaterEqual(page.fetch_time, 0)
+
+    async def test_get_with_parse_pool(self):
+        link = Link(self.domain, "index.html")
+
+        with ParsePool(processes=1) as parse_pool:
+            actual_page = await AsyncPageFetcher(self.session, parse_pool=parse_pool).get(link)
+
+        self.assertEqual(actual_page.out_links, [
+            Link(self.domain, "/foo.html"),
+            Link(self.domain, "/sub/page/bar.html"),
+        ])
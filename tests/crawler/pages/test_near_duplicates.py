@@ -0,0 +1,123 @@
+import random
+import threading
+import unittest
+
+from crawler.links.link import Link
+from crawler.pages.near_duplicates import NearDuplicateDetector
+
+
+class TestNearDuplicateDetector(unittest.TestCase):
+    WORDS = ["word{}".format(i) for i in range(2000)]
+
+    def article(seed, heading="Archive"):
+        rng = random.Random(seed)
+        paragraphs = "\n".join(
+            "<p>{}</p>".format(" ".join(rng.choice(TestNearDuplicateDetector.WORDS) for _ in range(100)))
+            for _ in range(10)
+        )
+
+        return "<html><head><style>p {{ margin: 0; }}</style></head><body><h1>{}</h1>{}</body></html>".format(
+            heading,
+            paragraphs,
+        )
+
+    def test_simhash_same_text(self):
+        self.assertEqual(
+            NearDuplicateDetector.simhash(TestNearDuplicateDetector.article(0)),
+            NearDuplicateDetector.simhash(TestNearDuplicateDetector.article(0)),
+        )
+
+    def test_simhash_ignores_markup(self):
+        self.assertEqual(
+            NearDuplicateDetector.simhash("<p>Some <b>text</b> on a page</p><script>var x = 1;</script>"),
+            NearDuplicateDetector.simhash("<div>Some text on a <i>page</i></div>"),
+        )
+
+    def test_simhash_similar_text(self):
+        self.assertLessEqual(NearDuplicateDetector.distance(
+            NearDuplicateDetector.simhash(TestNearDuplicateDetector.article(0)),
+            NearDuplicateDetector.simhash(TestNearDuplicateDetector.article(0, heading="Archive (print view)")),
+        ), 3)
+
+    def test_simhash_different_text(self):
+        self.assertGreater(NearDuplicateDetector.distance(
+            NearDuplicateDetector.simhash(TestNearDuplicateDetector.article(0)),
+            NearDuplicateDetector.simhash(TestNearDuplicateDetector.article(1)),
+        ), 3)
+
+    def test_simhash_fewer_words_than_a_shingle(self):
+        self.assertEqual(NearDuplicateDetector.simhash("<p>Hello</p>"), NearDuplicateDetector.simhash("hello"))
+        self.assertEqual(NearDuplicateDetector.simhash(""), NearDuplicateDetector.simhash("<html></html>"))
+
+    def test_distance(self):
+        self.assertEqual(NearDuplicateDetector.distance(0b1011, 0b0110), 3)
+        self.assertEqual(NearDuplicateDetector.distance(2 ** 64 - 1, 0), 64)
+
+    def test_add(self):
+        detector = NearDuplicateDetector(max_distance=3)
+        canonical_link = Link("http://www.example.com", "/archive.html")
+
+        self.assertIsNone(detector.add(canonical_link, 0b1111 << 40))
+        # Differing in 3 bits, spread across the blocks
+        print_link = Link("http://www.example.com", "/print.html")
+        self.assertEqual(detector.add(print_link, (0b1111 << 40) ^ (1 | 1 << 30 | 1 << 63)), canonical_link)
+        self.assertIsNone(detector.add(Link("http://www.example.com", "/other.html"), 0b1111))
+
+        self.assertEqual(detector.pages, 3)
+        self.assertEqual(detector.near_duplicates, 1)
+
+    def test_add_beyond_max_distance(self):
+        detector = NearDuplicateDetector(max_distance=2)
+
+        self.assertIsNone(detector.add(Link("http://www.example.com", "/a.html"), 0))
+        self.assertIsNone(detector.add(Link("http://www.example.com", "/b.html"), 0b111))
+
+        self.assertEqual(detector.near_duplicates, 0)
+
+    def test_add_exact_duplicates_only(self):
+        detector = NearDuplicateDetector(max_distance=0)
+        canonical_link = Link("http://www.example.com", "/a.html")
+
+        self.assertIsNone(detector.add(canonical_link, 12345))
+        self.assertEqual(detector.add(Link("http://www.example.com", "/b.html"), 12345), canonical_link)
+        self.assertIsNone(detector.add(Link("http://www.example.com", "/c.html"), 12344))
+
+    def test_canonical_link(self):
+        detector = NearDuplicateDetector(max_distance=6)
+        canonical_link = Link("http://www.example.com", "/archive.html")
+        page_two = TestNearDuplicateDetector.article(0, heading="Archive page 2")
+
+        self.assertIsNone(detector.canonical_link(canonical_link, TestNearDuplicateDetector.article(0)))
+        self.assertEqual(
+            detector.canonical_link(Link("http://www.example.com", "/archive-2.html"), page_two),
+            canonical_link,
+        )
+        self.assertIsNone(detector.canonical_link(
+            Link("http://www.example.com", "/other.html"),
+            TestNearDuplicateDetector.article(1),
+        ))
+
+    def test_add_from_threads(self):
+        detector = NearDuplicateDetector()
+
+        def add(thread):
+            for fingerprint in range(thread * 1000, thread * 1000 + 100):
+                detector.add(Link("http://www.example.com", "/{}.html".format(fingerprint)), fingerprint << 48)
+
+        threads = [threading.Thread(target=add, args=(thread,)) for thread in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(detector.pages, 400)
+
+    def test_init_with_invalid_max_distance(self):
+        with self.assertRaises(ValueError):
+            NearDuplicateDetector(max_distance=-1)
+        with self.assertRaises(ValueError):
+            NearDuplicateDetector(max_distance=16)
+
+    def test_init_with_no_shingle_size(self):
+        with self.assertRaises(ValueError):
+            NearDuplicateDetector(shingle_size=0)
@@ -15,7 +15,12 @@ class TestPage(unittest.TestCase):
         page = Page(link, "mocked_page_body")
 
         self.assertEqual(page.link, link)
-        mock_link_extractor.assert_called_with("http://www.example.com/index.html", "mocked_page_body")
+        mock_link_extractor.assert_called_with(
+            "http://www.example.com/index.html",
+            "mocked_page_body",
+            resolver=None,
+            metrics=None,
+        )
 
     @patch("crawler.pages.page.LinkExtractor.extract", return_value=[
         Link("http://www.example.com", "foo/index.html"),
@@ -29,3 +34,12 @@ class TestPage(unittest.TestCase):
             Link("http://www.example.com", "foo/index.html"),
             Link("http://www.example.com", "bar/index.html"),
         ])
+
+    @patch("crawler.pages.page.LinkExtractor.extract")
+    def test_out_links_already_extracted(self, mocked_link_extractor):
+        link = Link("http://www.example.com/", "index.html")
+        out_links = [Link("http://www.example.com", "foo/index.html")]
+        page = Page(link, None, out_links=out_links)
+
+        self.assertEqual(page.out_links, out_links)
+        mocked_link_extractor.assert_not_called()
@@ -1,10 +1,23 @@
+import http.server
+import os
 import requests
 import responses
+import tempfile
+import threading
+import time
 import unittest
 
+from crawler.crawl_snapshot import CrawlSnapshot
+from crawler.host_scheduler import HostScheduler
 from crawler.links.link import Link
-from crawler.pages.page_fetcher import PageFetcher
-from unittest.mock import patch
+from crawler.metrics import CrawlMetrics
+from crawler.pages.near_duplicates import NearDuplicateDetector
+from crawler.pages.page import Page
+from crawler.pages.page_fetcher import PageFetcher, TooManyRedirects
+from crawler.pages.parse_pool import ParsePool
+from crawler.pages.transports import TRANSPORTS, HttpxTransport, TransportError
+from crawler.pages.validation_cache import ValidationCache
+from unittest.mock import Mock, patch
 
 
 class TestPageFetcher(unittest.TestCase):
@@ -46,7 +59,788 @@ class TestPageFetcher(unittest.TestCase):
         ]
         expected_link = Link("http://www.example.com/", "index.html")
 
-        actual_page = PageFetcher.get(Link("http://www.example.com/", "index.html"))
+        actual_page = PageFetcher().get(Link("http://www.example.com/", "index.html"))
 
         self.assertEqual(actual_page.link, expected_link)
         self.assertEqual(actual_page.out_links, expected_out_links)
+
+    @responses.activate
+    def test_get_sends_headers(self):
+        responses.add(responses.GET, "http://www.example.com/index.html", body="", status=200)
+
+        PageFetcher(headers={"User-Agent": "test-crawler"}).get(Link("http://www.example.com/", "index.html"))
+
+        self.assertEqual(responses.calls[0].request.headers["User-Agent"], "test-crawler")
+
+    @responses.activate
+    def test_get_without_keep_alive(self):
+        responses.add(responses.GET, "http://www.example.com/index.html", body="", status=200)
+
+        PageFetcher(keep_alive=False).get(Link("http://www.example.com/", "index.html"))
+
+        self.assertEqual(responses.calls[0].request.headers["Connection"], "close")
+
+    def test_init_configures_connection_pool(self):
+        page_fetcher = PageFetcher(pool_size=3, max_connections_per_host=7)
+
+        for prefix in ["http://", "https://"]:
+            adapter = page_fetcher.session.get_adapter(prefix)
+            self.assertEqual(adapter._pool_connections, 3)
+            self.assertEqual(adapter._pool_maxsize, 7)
+
+    @patch("crawler.pages.page_fetcher.requests.Session.close")
+    def test_close(self, mock_close):
+        with PageFetcher():
+            mock_close.assert_not_called()
+
+        mock_close.assert_called_once()
+
+    @responses.activate
+    def test_get_stream_links(self):
+        responses.add(**{
+            "method": responses.GET,
+            "url": "http://www.example.com/index.html",
+            "body": TestPageFetcher.MOCK_PAGE,
+            "status": 200,
+            "content_type": "text/html; charset=utf-8",
+        })
+
+        actual_page = PageFetcher(stream_links=True, chunk_size=10).get(Link("http://www.example.com/", "index.html"))
+
+        self.assertEqual(actual_page.link, Link("http://www.example.com/", "index.html"))
+        self.assertEqual(actual_page.out_links, [
+            Link("http://www.example.com/index.html", "/foo.html"),
+            Link("http://www.example.com/index.html", "/sub/page/bar.html"),
+        ])
+
+    @responses.activate
+    def test_get_with_validation_cache(self):
+        expected_out_links = [
+            Link("http://www.example.com/index.html", "/foo.html"),
+            Link("http://www.example.com/index.html", "/sub/page/bar.html"),
+        ]
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+            headers={"ETag": '"v1"'},
+        )
+        responses.add(responses.GET, "http://www.example.com/index.html", status=304)
+
+        with tempfile.TemporaryDirectory() as directory:
+            validation_cache = ValidationCache(os.path.join(directory, "cache.sqlite"))
+            page_fetcher = PageFetcher(validation_cache=validation_cache)
+
+            first_page = page_fetcher.get(Link("http://www.example.com/", "index.html"))
+            with patch("crawler.pages.page.LinkExtractor.extract") as mock_link_extractor:
+                second_page = page_fetcher.get(Link("http://www.example.com/", "index.html"))
+
+            validation_cache.close()
+
+        self.assertNotIn("If-None-Match", responses.calls[0].request.headers)
+        self.assertEqual(responses.calls[1].request.headers["If-None-Match"], '"v1"')
+        self.assertEqual(first_page.out_links, expected_out_links)
+        self.assertEqual(second_page.out_links, expected_out_links)
+        self.assertEqual([link.url for link in second_page.out_links], [
+            "http://www.example.com/foo.html",
+            "https://www.example.com/sub/page/bar.html",
+        ])
+        mock_link_extractor.assert_not_called()
+        self.assertEqual(validation_cache.hits, 1)
+
+    @responses.activate
+    def test_get_with_validation_cache_modified(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+            headers={"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"},
+        )
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body="<a href='/changed.html'>Changed</a>",
+            content_type="text/html",
+            headers={"Last-Modified": "Thu, 22 Oct 2015 07:28:00 GMT"},
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            validation_cache = ValidationCache(os.path.join(directory, "cache.sqlite"))
+            page_fetcher = PageFetcher(validation_cache=validation_cache, stream_links=True)
+
+            page_fetcher.get(Link("http://www.example.com/", "index.html"))
+            changed_page = page_fetcher.get(Link("http://www.example.com/", "index.html"))
+            cached_page = validation_cache.lookup(Link("http://www.example.com/", "index.html"))
+
+            validation_cache.close()
+
+        self.assertEqual(
+            responses.calls[1].request.headers["If-Modified-Since"],
+            "Wed, 21 Oct 2015 07:28:00 GMT",
+        )
+        self.assertEqual(changed_page.out_links, [Link("http://www.example.com/", "/changed.html")])
+        self.assertEqual(cached_page.last_modified, "Thu, 22 Oct 2015 07:28:00 GMT")
+        self.assertEqual(cached_page.out_link_urls, ["http://www.example.com/changed.html"])
+        self.assertEqual(validation_cache.hits, 0)
+
+    @responses.activate
+    def test_get_with_validation_cache_only_stores_parsed_pages(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/report.pdf",
+            body=b"%PDF",
+            content_type="application/pdf",
+            headers={"ETag": '"pdf"'},
+        )
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+            headers={"ETag": '"index"'},
+        )
+        responses.add(
+            responses.GET,
+            "http://www.example.com/print.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+            headers={"ETag": '"print"'},
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            validation_cache = ValidationCache(os.path.join(directory, "cache.sqlite"))
+            page_fetcher = PageFetcher(validation_cache=validation_cache, near_duplicates=NearDuplicateDetector())
+
+            pdf_page = page_fetcher.get(Link("http://www.example.com/", "report.pdf"))
+            page_fetcher.get(Link("http://www.example.com/", "index.html"))
+            duplicate_page = page_fetcher.get(Link("http://www.example.com/", "print.html"))
+            cached_pages = [
+                validation_cache.lookup(Link("http://www.example.com/", path))
+                for path in ("report.pdf", "index.html", "print.html")
+            ]
+
+            validation_cache.close()
+
+        self.assertTrue(pdf_page.skipped)
+        self.assertTrue(duplicate_page.skipped)
+        self.assertIsNone(cached_pages[0])
+        self.assertEqual(cached_pages[1].etag, '"index"')
+        self.assertIsNone(cached_pages[2])
+
+    @responses.activate
+    def test_get_with_validation_cache_redirected(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/old.html",
+            status=301,
+            headers={"Location": "http://www.example.com/index.html"},
+        )
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+            headers={"ETag": '"index"'},
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            validation_cache = ValidationCache(os.path.join(directory, "cache.sqlite"))
+            validation_cache.store(Link("http://www.example.com/", "old.html"), '"old"', None, [])
+            page_fetcher = PageFetcher(validation_cache=validation_cache)
+
+            page = page_fetcher.get(Link("http://www.example.com/", "old.html"))
+            cached_page = validation_cache.lookup(Link("http://www.example.com/", "index.html"))
+
+            validation_cache.close()
+
+        self.assertEqual(responses.calls[0].request.headers["If-None-Match"], '"old"')
+        self.assertNotIn("If-None-Match", responses.calls[1].request.headers)
+        self.assertEqual(page.link, Link("http://www.example.com/", "index.html"))
+        self.assertEqual(cached_page.etag, '"index"')
+        self.assertEqual(len(cached_page.out_link_urls), 2)
+
+    @responses.activate
+    def test_get_with_snapshot_near_duplicate(self):
+        for path in ("index.html", "print.html", "print.html"):
+            responses.add(
+                responses.GET,
+                "http://www.example.com/" + path,
+                body=TestPageFetcher.MOCK_PAGE,
+                content_type="text/html",
+            )
+
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot = CrawlSnapshot(os.path.join(directory, "snapshot.sqlite"))
+            page_fetcher = PageFetcher(snapshot=snapshot, near_duplicates=NearDuplicateDetector())
+            for path in ("index.html", "print.html"):
+                snapshot.record(page_fetcher.get(Link("http://www.example.com/", path)))
+            snapshot.finish()
+
+            unchanged_page = PageFetcher(snapshot=snapshot).get(Link("http://www.example.com/", "print.html"))
+
+            snapshot.close()
+
+        self.assertEqual(snapshot.reused, 1)
+        self.assertEqual(unchanged_page.duplicate_of, Link("http://www.example.com/", "index.html"))
+        self.assertEqual(unchanged_page.out_links, [])
+        self.assertTrue(unchanged_page.skipped)
+
+    @responses.activate
+    def test_get_with_snapshot(self):
+        expected_out_links = [
+            Link("http://www.example.com/index.html", "/foo.html"),
+            Link("http://www.example.com/index.html", "/sub/page/bar.html"),
+        ]
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+        )
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+        )
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body="<a href='/changed.html'>Changed</a>",
+            content_type="text/html",
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot = CrawlSnapshot(os.path.join(directory, "snapshot.sqlite"))
+            page_fetcher = PageFetcher(snapshot=snapshot)
+
+            first_page = page_fetcher.get(Link("http://www.example.com/", "index.html"))
+            snapshot.record(first_page)
+            snapshot.finish()
+
+            with patch("crawler.pages.page.LinkExtractor.extract") as mock_link_extractor:
+                unchanged_page = page_fetcher.get(Link("http://www.example.com/", "index.html"))
+            changed_page = page_fetcher.get(Link("http://www.example.com/", "index.html"))
+
+            snapshot.close()
+
+        mock_link_extractor.assert_not_called()
+        self.assertEqual(first_page.fingerprint, CrawlSnapshot.fingerprint(TestPageFetcher.MOCK_PAGE.encode()))
+        self.assertEqual(unchanged_page.fingerprint, first_page.fingerprint)
+        self.assertEqual(unchanged_page.out_links, expected_out_links)
+        self.assertNotEqual(changed_page.fingerprint, first_page.fingerprint)
+        self.assertEqual(changed_page.out_links, [Link("http://www.example.com/", "/changed.html")])
+        self.assertEqual(snapshot.reused, 1)
+
+    @responses.activate
+    def test_get_stream_links_with_snapshot(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot = CrawlSnapshot(os.path.join(directory, "snapshot.sqlite"))
+            page = PageFetcher(snapshot=snapshot, stream_links=True, chunk_size=7).get(
+                Link("http://www.example.com/", "index.html"),
+            )
+            snapshot.close()
+
+        self.assertEqual(page.fingerprint, CrawlSnapshot.fingerprint(TestPageFetcher.MOCK_PAGE.encode()))
+
+    @responses.activate
+    def test_get_with_scheduler_retries_throttled(self):
+        responses.add(responses.GET, "http://www.example.com/index.html", status=429, headers={"Retry-After": "0"})
+        responses.add(responses.GET, "http://www.example.com/index.html", status=503)
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+        )
+        scheduler = HostScheduler(retry_backoff=0.01)
+
+        page = PageFetcher(scheduler=scheduler).get(Link("http://www.example.com/", "index.html"))
+
+        host_state = scheduler.host_states()[("www.example.com", 80)]
+        self.assertEqual(len(responses.calls), 3)
+        self.assertEqual(len(page.out_links), 2)
+        self.assertEqual(host_state.requests, 3)
+        self.assertEqual(host_state.errors, 2)
+        self.assertEqual(host_state.in_flight, 0)
+
+    @responses.activate
+    def test_get_with_scheduler_gives_up_retrying(self):
+        responses.add(responses.GET, "http://www.example.com/index.html", status=503, body="Unavailable")
+        scheduler = HostScheduler(max_retries=2, retry_backoff=0.01)
+
+        page = PageFetcher(scheduler=scheduler).get(Link("http://www.example.com/", "index.html"))
+
+        self.assertEqual(len(responses.calls), 3)
+        self.assertEqual(page.out_links, [])
+
+    @responses.activate
+    def test_get_with_scheduler_backs_off_before_retrying(self):
+        responses.add(responses.GET, "http://www.example.com/index.html", status=503)
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+        )
+        scheduler = HostScheduler(retry_backoff=0.3)
+
+        start = time.monotonic()
+        page = PageFetcher(scheduler=scheduler).get(Link("http://www.example.com/", "index.html"))
+
+        self.assertEqual(len(responses.calls), 2)
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+        # Waiting out the backoff for the host's slot isn't part of fetching the page
+        self.assertLess(page.fetch_time, 0.3)
+
+    @responses.activate
+    def test_get_with_scheduler_parses_after_releasing_slot(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+        )
+        scheduler = HostScheduler()
+        page_fetcher = PageFetcher(scheduler=scheduler)
+        in_flight_when_parsed = []
+
+        def parse_page(link, page_text, fingerprint=None):
+            in_flight_when_parsed.append(scheduler.host_states()[("www.example.com", 80)].in_flight)
+            return Page(link, page_text)
+
+        with patch.object(page_fetcher, "_parse_page", side_effect=parse_page):
+            page = page_fetcher.get(Link("http://www.example.com/", "index.html"))
+
+        self.assertEqual(in_flight_when_parsed, [0])
+        self.assertEqual(len(page.out_links), 2)
+        self.assertEqual(page.body_size, len(TestPageFetcher.MOCK_PAGE))
+
+    @responses.activate
+    def test_get_with_scheduler_connection_error(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=requests.exceptions.ConnectionError("Refused"),
+        )
+        scheduler = HostScheduler()
+
+        with self.assertRaises(TransportError) as raised:
+            PageFetcher(scheduler=scheduler).get(Link("http://www.example.com/", "index.html"))
+        self.assertIsInstance(raised.exception.__cause__, requests.exceptions.ConnectionError)
+
+        host_state = scheduler.host_states()[("www.example.com", 80)]
+        self.assertEqual(host_state.errors, 1)
+        self.assertEqual(host_state.in_flight, 0)
+
+    @responses.activate
+    def test_get_skips_non_html(self):
+        responses.add(responses.GET, "http://www.example.com/report", body=b"%PDF-1.4", content_type="application/pdf")
+
+        with patch("crawler.pages.page.LinkExtractor.extract") as mock_link_extractor:
+            page = PageFetcher().get(Link("http://www.example.com/", "report"))
+
+        mock_link_extractor.assert_not_called()
+        self.assertEqual(page.link, Link("http://www.example.com/", "report"))
+        self.assertEqual(page.out_links, [])
+
+    @responses.activate
+    def test_get_without_html_only(self):
+        responses.add(responses.GET, "http://www.example.com/index.txt", body=TestPageFetcher.MOCK_PAGE)
+
+        page = PageFetcher(html_only=False).get(Link("http://www.example.com/", "index.txt"))
+
+        self.assertEqual(len(page.out_links), 2)
+
+    def test_is_html(self):
+        self.assertTrue(PageFetcher._is_html(Mock(headers={"Content-Type": "text/html; charset=utf-8"})))
+        self.assertTrue(PageFetcher._is_html(Mock(headers={"Content-Type": "application/xhtml+xml"})))
+        self.assertTrue(PageFetcher._is_html(Mock(headers={"Content-Type": "TEXT/HTML"})))
+        self.assertTrue(PageFetcher._is_html(Mock(headers={})))
+        self.assertFalse(PageFetcher._is_html(Mock(headers={"Content-Type": "image/png"})))
+        self.assertFalse(PageFetcher._is_html(Mock(headers={"Content-Type": "text/plain; name=page.html"})))
+
+    @responses.activate
+    def test_get_skips_extensions(self):
+        page = PageFetcher(skip_extensions=PageFetcher.BINARY_EXTENSIONS).get(
+            Link("http://www.example.com/", "/files/Report.PDF?download=1"),
+        )
+
+        self.assertEqual(len(responses.calls), 0)
+        self.assertEqual(page.out_links, [])
+
+    def test_extension(self):
+        self.assertEqual(PageFetcher._extension(Link("http://www.example.com", "/a/b.tar.GZ")), "gz")
+        self.assertEqual(PageFetcher._extension(Link("http://www.example.com", "/a.pdf/index")), "")
+        self.assertEqual(PageFetcher._extension(Link("http://www.example.com", "/")), "")
+
+    @responses.activate
+    def test_get_skips_oversized(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+        )
+
+        for stream_links in (False, True):
+            with self.subTest(stream_links=stream_links):
+                page = PageFetcher(max_body_size=100, stream_links=stream_links, chunk_size=16).get(
+                    Link("http://www.example.com/", "index.html"),
+                )
+
+                self.assertEqual(page.out_links, [])
+
+        page = PageFetcher(max_body_size=len(TestPageFetcher.MOCK_PAGE)).get(
+            Link("http://www.example.com/", "index.html"),
+        )
+        self.assertEqual(len(page.out_links), 2)
+
+    @responses.activate
+    def test_get_with_malformed_content_length(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+            auto_calculate_content_length=False,
+            headers={"Content-Length": "lots"},
+        )
+
+        page = PageFetcher(max_body_size=100).get(Link("http://www.example.com/", "index.html"))
+
+        # Abandoned once the body grew too large, rather than failing on the header
+        self.assertEqual(page.out_links, [])
+        self.assertTrue(page.skipped)
+
+    def test_content_length(self):
+        for content_length, expected in (
+            (None, None),
+            ("1234", 1234),
+            (" 1234 ", 1234),
+            ("1234, 1234", 1234),
+            ("1234, 99", None),
+            ("-1", None),
+            ("12.5", None),
+            ("", None),
+            ("lots", None),
+        ):
+            headers = {} if content_length is None else {"Content-Length": content_length}
+            with self.subTest(content_length=content_length):
+                self.assertEqual(PageFetcher._content_length(Mock(headers=headers)), expected)
+
+    def test_read_body_abandons_oversized(self):
+        response = Mock(headers={})
+        response.iter_content.return_value = iter([b"0123456789"] * 100)
+
+        self.assertIsNone(PageFetcher(max_body_size=55)._read_body(response))
+
+        response.iter_content.return_value = iter([b"0123456789"] * 5)
+        self.assertEqual(PageFetcher(max_body_size=55)._read_body(response), b"0123456789" * 5)
+
+    @responses.activate
+    def test_get_records_fetch(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+        )
+        responses.add(responses.GET, "http://www.example.com/report", body=b"%PDF-1.4", content_type="application/pdf")
+
+        page = PageFetcher().get(Link("http://www.example.com/", "index.html"))
+        skipped_page = PageFetcher().get(Link("http://www.example.com/", "report"))
+        not_fetched_page = PageFetcher(skip_extensions={"pdf"}).get(Link("http://www.example.com/", "report.pdf"))
+
+        self.assertEqual(page.status_code, 200)
+        self.assertEqual(page.body_size, len(TestPageFetcher.MOCK_PAGE))
+        self.assertGreaterEqual(page.fetch_time, 0)
+        self.assertEqual(skipped_page.status_code, 200)
+        self.assertEqual(skipped_page.body_size, 0)
+        self.assertIsNone(not_fetched_page.status_code)
+        self.assertIsNone(not_fetched_page.fetch_time)
+
+    @responses.activate
+    def test_get_with_parse_pool(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+        )
+
+        with ParsePool(processes=1) as parse_pool:
+            page = PageFetcher(parse_pool=parse_pool).get(Link("http://www.example.com/", "index.html"))
+
+        self.assertEqual(page.out_links, [
+            Link("http://www.example.com/index.html", "/foo.html"),
+            Link("http://www.example.com/index.html", "/sub/page/bar.html"),
+        ])
+
+    @responses.activate
+    def test_get_with_near_duplicates(self):
+        for path in ("/index.html", "/print/index.html"):
+            responses.add(
+                responses.GET,
+                "http://www.example.com{}".format(path),
+                body=TestPageFetcher.MOCK_PAGE,
+                content_type="text/html",
+            )
+        near_duplicates = NearDuplicateDetector()
+        page_fetcher = PageFetcher(near_duplicates=near_duplicates)
+
+        page = page_fetcher.get(Link("http://www.example.com/", "index.html"))
+        duplicate_page = page_fetcher.get(Link("http://www.example.com/", "print/index.html"))
+
+        self.assertEqual(len(page.out_links), 2)
+        self.assertIsNone(page.duplicate_of)
+        self.assertEqual(duplicate_page.out_links, [])
+        self.assertEqual(duplicate_page.duplicate_of, page.link)
+        self.assertEqual(duplicate_page.status_code, 200)
+        self.assertEqual(near_duplicates.near_duplicates, 1)
+
+    @responses.activate
+    def test_get_follows_redirects(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/old",
+            status=301,
+            headers={"Location": "/Old/"},
+        )
+        responses.add(
+            responses.GET,
+            "http://www.example.com/Old/",
+            status=302,
+            headers={"Location": "http://www.example.com/new/index.html"},
+        )
+        responses.add(
+            responses.GET,
+            "http://www.example.com/new/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+        )
+
+        page = PageFetcher().get(Link("http://www.example.com/", "old"))
+
+        self.assertEqual(page.link, Link("http://www.example.com/", "new/index.html"))
+        self.assertEqual(page.aliases, [Link("http://www.example.com/", "old"), Link("http://www.example.com/", "Old")])
+        self.assertEqual(page.redirect_chain, [
+            "http://www.example.com/old",
+            "http://www.example.com/Old/",
+            "http://www.example.com/new/index.html",
+        ])
+        self.assertEqual(page.status_code, 200)
+        self.assertEqual(len(page.out_links), 2)
+
+    @responses.activate
+    def test_get_without_redirect(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+        )
+
+        page = PageFetcher().get(Link("http://www.example.com/", "index.html"))
+
+        self.assertIsNone(page.redirect_chain)
+        self.assertIsNone(page.aliases)
+
+    @responses.activate
+    def test_get_redirect_to_same_link(self):
+        responses.add(responses.GET, "http://www.example.com/docs", status=301, headers={"Location": "/docs/"})
+        responses.add(
+            responses.GET,
+            "http://www.example.com/docs/",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+        )
+
+        page = PageFetcher().get(Link("http://www.example.com/", "docs"))
+
+        self.assertEqual(page.link, Link("http://www.example.com/", "docs"))
+        self.assertEqual(page.redirect_chain, ["http://www.example.com/docs", "http://www.example.com/docs/"])
+        self.assertIsNone(page.aliases)
+        self.assertEqual(len(page.out_links), 2)
+
+    @responses.activate
+    def test_get_redirect_out_of_domain(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/elsewhere",
+            status=302,
+            headers={"Location": "http://other.example.org/"},
+        )
+
+        page = PageFetcher().get(Link("http://www.example.com/", "elsewhere"))
+
+        # The other site is never requested
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(page.link, Link("http://www.example.com/", "elsewhere"))
+        self.assertEqual(page.out_links, [])
+        self.assertIsNone(page.aliases)
+        self.assertEqual(page.redirect_chain, ["http://www.example.com/elsewhere", "http://other.example.org/"])
+
+    @responses.activate
+    def test_get_with_known_link_follows_redirects(self):
+        responses.add(responses.GET, "http://www.example.com/old", status=301, headers={"Location": "/new"})
+        responses.add(
+            responses.GET,
+            "http://www.example.com/new",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+        )
+        known_link = Mock(return_value=False)
+
+        page = PageFetcher().get(Link("http://www.example.com/", "old"), known_link=known_link)
+
+        known_link.assert_called_once_with(Link("http://www.example.com/", "new"))
+        self.assertEqual(page.link, Link("http://www.example.com/", "new"))
+        self.assertEqual(page.aliases, [Link("http://www.example.com/", "old")])
+        self.assertEqual(page.redirect_chain, ["http://www.example.com/old", "http://www.example.com/new"])
+        self.assertEqual(len(page.out_links), 2)
+
+    @responses.activate
+    def test_get_with_known_link_stops_at_known_page(self):
+        responses.add(responses.GET, "http://www.example.com/old", status=301, headers={"Location": "/new"})
+        responses.add(
+            responses.GET,
+            "http://www.example.com/new",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+        )
+
+        page = PageFetcher().get(Link("http://www.example.com/", "old"), known_link=lambda link: True)
+
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(page.link, Link("http://www.example.com/", "new"))
+        self.assertEqual(page.aliases, [Link("http://www.example.com/", "old")])
+        self.assertEqual(page.redirect_chain, ["http://www.example.com/old", "http://www.example.com/new"])
+        self.assertEqual(page.out_links, [])
+        self.assertEqual(page.status_code, 301)
+
+    @responses.activate
+    def test_get_with_known_link_stops_out_of_domain(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/elsewhere",
+            status=302,
+            headers={"Location": "http://other.example.org/"},
+        )
+        known_link = Mock(return_value=False)
+
+        page = PageFetcher().get(Link("http://www.example.com/", "elsewhere"), known_link=known_link)
+
+        self.assertEqual(len(responses.calls), 1)
+        known_link.assert_not_called()
+        self.assertEqual(page.link, Link("http://www.example.com/", "elsewhere"))
+        self.assertEqual(page.out_links, [])
+
+    @responses.activate
+    def test_get_with_known_link_too_many_redirects(self):
+        responses.add(responses.GET, "http://www.example.com/loop", status=302, headers={"Location": "/loop/again"})
+        responses.add(responses.GET, "http://www.example.com/loop/again", status=302, headers={"Location": "/loop"})
+        page_fetcher = PageFetcher(max_redirects=5)
+
+        with self.assertRaises(TooManyRedirects):
+            page_fetcher.get(Link("http://www.example.com/", "loop"), known_link=lambda link: False)
+        self.assertEqual(len(responses.calls), 6)
+
+    @responses.activate
+    def test_get_records_metrics(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/index.html",
+            body=TestPageFetcher.MOCK_PAGE,
+            content_type="text/html",
+        )
+        metrics = CrawlMetrics()
+
+        PageFetcher(metrics=metrics).get(Link("http://www.example.com/", "index.html"))
+
+        for stage in ("first_byte", "download", "decode", "parse", "link_normalise"):
+            self.assertEqual(metrics.stages[stage].count, 1, stage)
+        self.assertEqual(metrics.stages["site_map"].count, 0)
+
+    def test_get_records_connect(self):
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                body = TestPageFetcher.MOCK_PAGE.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = "http://127.0.0.1:{}".format(server.server_address[1])
+        metrics = CrawlMetrics()
+
+        with PageFetcher(metrics=metrics) as page_fetcher:
+            page = page_fetcher.get(Link(url, "/index.html"))
+            page_fetcher.get(Link(url, "/other.html"))
+
+        self.assertEqual(len(page.out_links), 2)
+        # The second request reuses the connection
+        self.assertEqual(metrics.stages["connect"].count, 1)
+        self.assertEqual(metrics.stages["first_byte"].count, 2)
+
+    def test_get_with_each_transport(self):
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path == "/old.html":
+                    self.send_response(301)
+                    self.send_header("Location", "/index.html")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                body = TestPageFetcher.MOCK_PAGE.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = "http://127.0.0.1:{}".format(server.server_address[1])
+
+        for name, transport in TRANSPORTS.items():
+            if transport is HttpxTransport and not HttpxTransport.is_available():
+                continue
+            with self.subTest(transport=name), PageFetcher(transport=transport) as page_fetcher:
+                page = page_fetcher.get(Link(url, "/old.html"))
+
+                self.assertEqual(page.link, Link(url, "/index.html"))
+                self.assertEqual(page.aliases, [Link(url, "/old.html")])
+                self.assertEqual(len(page.out_links), 2)
+                self.assertEqual(page.status_code, 200)
+                self.assertEqual(page.body_size, len(TestPageFetcher.MOCK_PAGE.encode("utf-8")))
+                self.assertEqual(page_fetcher.session is None, name != "requests")
@@ -0,0 +1,43 @@
+import unittest
+
+from crawler.links.link import Link
+from crawler.links.link_extractor import LinkExtractor
+from crawler.pages.parse_pool import ParsePool
+
+
+class TestParsePool(unittest.IsolatedAsyncioTestCase):
+    PAGE = """
+        <a href="/foo.html">Foo</a>
+        <a href="sub/bar.html">Bar</a>
+        <a href="http://www.example.net/baz.html">Baz</a>
+        <a href="../../escapes.html">Escapes</a>
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.parse_pool = ParsePool(processes=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.parse_pool.close()
+
+    def setUp(self):
+        self.link = Link("http://www.example.com", "/index.html")
+
+    def test_init(self):
+        self.assertEqual(self.parse_pool.processes, 2)
+
+    def test_parse(self):
+        links = self.parse_pool.parse(self.link, TestParsePool.PAGE)
+
+        self.assertEqual(links, LinkExtractor.extract(self.link.url, TestParsePool.PAGE))
+        self.assertEqual(links[0].base_page.url, self.link.url)
+
+    async def test_parse_async(self):
+        links = await self.parse_pool.parse_async(self.link, TestParsePool.PAGE)
+
+        self.assertEqual([link.url for link in links], [
+            "http://www.example.com/foo.html",
+            "http://www.example.com/sub/bar.html",
+            "http://www.example.net/baz.html",
+        ])
@@ -0,0 +1,261 @@
+import gzip
+import http.server
+import socket
+import threading
+import time
+import unittest
+
+import requests
+import urllib3
+
+from benchmarks import synthetic_site
+from benchmarks.synthetic_site import CERTIFICATE, SyntheticSite, SyntheticSiteTLSServer
+from concurrent.futures import ThreadPoolExecutor
+from crawler.crawler import Crawler
+from crawler.metrics import CrawlMetrics
+from crawler.pages import transports
+from crawler.pages.page_fetcher import PageFetcher
+from crawler.pages.transports import TRANSPORTS, HttpxTransport, TransportError
+from crawler.site_map import SiteMap
+from unittest.mock import patch
+
+PAGE = b"<html><body><a href='/foo.html'>Foo</a></body></html>"
+INDEX = b"<html><body><a href='/slow'>Slow</a> <a href='/page'>Page</a></body></html>"
+
+
+def transport_classes():
+    return [
+        (name, transport_class) for name, transport_class in TRANSPORTS.items()
+        if transport_class is not HttpxTransport or HttpxTransport.is_available()
+    ]
+
+
+class BodylessResponse(transports.TransportResponse):
+    def iter_content(self, chunk_size):
+        return iter([])
+
+    @property
+    def bytes_read(self):
+        return 0
+
+    def close(self):
+        pass
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/redirect":
+            self.send_response(301)
+            self.send_header("Location", "/page")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = PAGE
+        if self.path == "/":
+            body = INDEX
+        elif self.path == "/slow":
+            time.sleep(1)
+        elif self.path == "/headers":
+            body = "\n".join("{}: {}".format(name.lower(), value) for name, value in self.headers.items()).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if self.path == "/gzip":
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTransports(unittest.TestCase):
+    def setUp(self):
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.url = "http://127.0.0.1:{}".format(server.server_address[1])
+
+    def test_get(self):
+        for name, transport_class in transport_classes():
+            with self.subTest(transport=name), transport_class() as transport, \
+                    transport.get(self.url + "/page") as response:
+                self.assertEqual(response.url, self.url + "/page")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.headers["content-type"], "text/html; charset=utf-8")
+                self.assertEqual(response.encoding, "utf-8")
+                self.assertFalse(response.is_redirect)
+                self.assertGreater(response.elapsed, 0)
+                self.assertEqual(response.read(), PAGE)
+                self.assertEqual(response.bytes_read, len(PAGE))
+
+    def test_get_decompresses(self):
+        for name, transport_class in transport_classes():
+            with self.subTest(transport=name), transport_class() as transport, \
+                    transport.get(self.url + "/gzip") as response:
+                self.assertEqual(b"".join(response.iter_content(16)), PAGE)
+                self.assertEqual(response.bytes_read, len(gzip.compress(PAGE)))
+
+    def test_get_does_not_follow_redirects(self):
+        for name, transport_class in transport_classes():
+            with self.subTest(transport=name), transport_class() as transport, \
+                    transport.get(self.url + "/redirect") as response:
+                self.assertEqual(response.status_code, 301)
+                self.assertTrue(response.is_redirect)
+                self.assertEqual(response.redirect_url(), self.url + "/page")
+
+    def test_get_sends_headers(self):
+        for name, transport_class in transport_classes():
+            with self.subTest(transport=name), transport_class(headers={"User-Agent": "crawler"}) as transport, \
+                    transport.get(self.url + "/headers", headers={"If-None-Match": '"abc"'}) as response:
+                headers = response.read().decode().splitlines()
+
+                self.assertIn("user-agent: crawler", headers)
+                self.assertIn('if-none-match: "abc"', headers)
+
+    def test_get_reuses_connections(self):
+        for keep_alive, connections in ((True, 1), (False, 2)):
+            for name, transport_class in transport_classes():
+                metrics = CrawlMetrics()
+                with self.subTest(transport=name, keep_alive=keep_alive), \
+                        transport_class(keep_alive=keep_alive, metrics=metrics) as transport:
+                    for _ in range(2):
+                        with transport.get(self.url + "/page") as response:
+                            response.read()
+
+                    self.assertEqual(metrics.stages["connect"].count, connections)
+
+    def test_get_times_out(self):
+        # Connections are queued but never accepted, so no response ever comes
+        listener = socket.create_server(("127.0.0.1", 0))
+        self.addCleanup(listener.close)
+        url = "http://127.0.0.1:{}/page".format(listener.getsockname()[1])
+        timeouts = (requests.exceptions.Timeout, urllib3.exceptions.TimeoutError)
+        if transports.httpx is not None:
+            timeouts += (transports.httpx.TimeoutException,)
+
+        for name, transport_class in transport_classes():
+            with self.subTest(transport=name), transport_class(timeout=0.2) as transport:
+                start = time.monotonic()
+                with self.assertRaises(TransportError) as raised:
+                    transport.get(url)
+                self.assertIsInstance(raised.exception.__cause__, timeouts)
+                self.assertLess(time.monotonic() - start, 5)
+
+    def test_get_without_a_server(self):
+        listener = socket.create_server(("127.0.0.1", 0))
+        url = "http://127.0.0.1:{}/page".format(listener.getsockname()[1])
+        listener.close()
+
+        for name, transport_class in transport_classes():
+            with self.subTest(transport=name), transport_class() as transport, self.assertRaises(TransportError):
+                transport.get(url)
+
+    def test_crawl_finishes_when_a_page_times_out(self):
+        for name, transport_class in transport_classes():
+            with self.subTest(transport=name), PageFetcher(transport=transport_class, timeout=0.2) as page_fetcher:
+                crawler = Crawler(self.url, workers=2, page_fetcher=page_fetcher)
+                with self.assertLogs(level="WARNING"):
+                    crawler.crawl()
+
+                self.assertEqual(
+                    {page.link.url: len(page.out_links) for page in crawler.site_map.all_pages()},
+                    {self.url + path: out_links for path, out_links in (
+                        ("", 2), ("/slow", 0), ("/page", 1), ("/foo.html", 1),
+                    )},
+                )
+
+    def test_redirect_url_decodes_utf8(self):
+        response = BodylessResponse(
+            "http://www.example.com/old",
+            301,
+            {"Location": "/cafÃ©"},
+            0.0,
+        )
+
+        self.assertEqual(response.redirect_url(), "http://www.example.com/café")
+
+    def test_transport_response_is_abstract(self):
+        class NoClose(transports.TransportResponse):
+            def iter_content(self, chunk_size):
+                return iter([])
+
+            @property
+            def bytes_read(self):
+                return 0
+
+        with self.assertRaises(TypeError):
+            NoClose("http://www.example.com/", 200, {}, 0.0)
+        with self.assertRaises(TypeError):
+            transports.TransportResponse("http://www.example.com/", 200, {}, 0.0)
+        self.assertEqual(BodylessResponse("http://www.example.com/", 200, {}, 0.0).read(), b"")
+
+    def test_httpx_transport_without_httpx(self):
+        with patch.object(transports, "httpx", None):
+            self.assertFalse(HttpxTransport.is_available())
+            with self.assertRaises(ImportError):
+                HttpxTransport()
+
+
+@unittest.skipIf(synthetic_site.h2 is None, "serving HTTP/2 needs h2")
+class TestTransportsOverTLS(unittest.TestCase):
+    def setUp(self):
+        self.site = SyntheticSite(pages=30, fan_out=5, page_size=50000, depth=3, latency=0.2)
+        server = SyntheticSiteTLSServer(self.site)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.url = server.url
+
+    def test_get(self):
+        for name, transport_class in transport_classes():
+            with self.subTest(transport=name), transport_class(verify=CERTIFICATE) as transport, \
+                    transport.get(self.url + "/") as response:
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.http_version, "HTTP/2" if transport_class is HttpxTransport else "HTTP/1.1")
+                self.assertEqual(response.read(), self.site.text(0).encode())
+
+    def test_get_checks_certificate(self):
+        errors = (requests.exceptions.SSLError, urllib3.exceptions.SSLError)
+        if transports.httpx is not None:
+            errors += (transports.httpx.ConnectError,)
+
+        for name, transport_class in transport_classes():
+            with self.subTest(transport=name), transport_class() as transport, \
+                    self.assertRaises(TransportError) as raised:
+                transport.get(self.url + "/")
+            self.assertIsInstance(raised.exception.__cause__, errors)
+
+    @unittest.skipUnless(HttpxTransport.is_available(), "the httpx transport needs httpx and h2")
+    def test_httpx_multiplexes_threads_over_one_connection(self):
+        metrics = CrawlMetrics()
+        pages = range(1, 17)
+
+        def get(page):
+            with transport.get(self.url + self.site.path(page)) as response:
+                return response.http_version, response.read()
+
+        with HttpxTransport(verify=CERTIFICATE, metrics=metrics) as transport, ThreadPoolExecutor(16) as executor:
+            start = time.monotonic()
+            responses = list(executor.map(get, pages))
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(responses, [("HTTP/2", self.site.text(page).encode()) for page in pages])
+        self.assertEqual(metrics.stages["connect"].count, 1)
+        # Each page takes 0.2s to serve, one after another they would take 3.2s
+        self.assertLess(elapsed, 1.6)
+
+    @unittest.skipUnless(HttpxTransport.is_available(), "the httpx transport needs httpx and h2")
+    def test_crawl_over_http2(self):
+        site_map = SiteMap()
+        with PageFetcher(transport=HttpxTransport, verify=CERTIFICATE, max_connections_per_host=8) as page_fetcher:
+            Crawler(self.url, workers=8, page_fetcher=page_fetcher, site_map=site_map).crawl()
+
+        self.assertEqual(len(site_map), self.site.pages)
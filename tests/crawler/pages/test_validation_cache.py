@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+
+from crawler.links.link import Link
+from crawler.pages.validation_cache import CachedPage, ValidationCache
+
+
+class TestValidationCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite")
+        self.validation_cache = ValidationCache(self.path, max_entries=10)
+        self.link = Link("http://www.example.com", "/index.html")
+        self.out_links = [
+            Link("http://www.example.com/index.html", "foo.html"),
+            Link("http://www.example.com/index.html", "http://www.example.net/bar.html"),
+        ]
+
+    def tearDown(self):
+        self.validation_cache.close()
+        self.directory.cleanup()
+
+    def test_lookup_not_cached(self):
+        self.assertIsNone(self.validation_cache.lookup(self.link))
+        self.assertEqual(self.validation_cache.lookups, 1)
+
+    def test_store(self):
+        self.validation_cache.store(self.link, '"abc"', "Wed, 21 Oct 2015 07:28:00 GMT", self.out_links)
+
+        cached_page = self.validation_cache.lookup(Link("https://www.example.com", "index.html"))
+
+        self.assertEqual(cached_page.etag, '"abc"')
+        self.assertEqual(cached_page.last_modified, "Wed, 21 Oct 2015 07:28:00 GMT")
+        self.assertEqual(cached_page.out_link_urls, [
+            "http://www.example.com/foo.html",
+            "http://www.example.net/bar.html",
+        ])
+
+    def test_store_no_out_links(self):
+        self.validation_cache.store(self.link, '"abc"', None, [])
+
+        self.assertEqual(self.validation_cache.lookup(self.link).out_link_urls, [])
+
+    def test_store_without_validators_forgets_page(self):
+        self.validation_cache.store(self.link, '"abc"', None, self.out_links)
+        self.validation_cache.store(self.link, None, None, self.out_links)
+
+        self.assertIsNone(self.validation_cache.lookup(self.link))
+        self.assertEqual(len(self.validation_cache), 0)
+
+    def test_store_replaces_page(self):
+        self.validation_cache.store(self.link, '"abc"', None, self.out_links)
+        self.validation_cache.store(self.link, '"def"', None, [])
+
+        self.assertEqual(self.validation_cache.lookup(self.link).etag, '"def"')
+        self.assertEqual(len(self.validation_cache), 1)
+
+    def test_store_evicts_least_recently_used(self):
+        for i in range(10):
+            self.validation_cache.store(Link("http://www.example.com", "/{}.html".format(i)), '"abc"', None, [])
+        self.validation_cache.record_hit(Link("http://www.example.com", "/0.html"))
+
+        self.validation_cache.store(self.link, '"abc"', None, [])
+
+        self.assertEqual(len(self.validation_cache), 9)
+        self.assertIsNotNone(self.validation_cache.lookup(Link("http://www.example.com", "/0.html")))
+        self.assertIsNone(self.validation_cache.lookup(Link("http://www.example.com", "/1.html")))
+        self.assertIsNotNone(self.validation_cache.lookup(self.link))
+
+    def test_hit_rate(self):
+        self.assertEqual(self.validation_cache.hit_rate(), 0)
+
+        self.validation_cache.store(self.link, '"abc"', None, [])
+        self.validation_cache.lookup(self.link)
+        self.validation_cache.record_hit(self.link)
+        self.validation_cache.lookup(Link("http://www.example.com", "/foo.html"))
+
+        self.assertEqual(self.validation_cache.hits, 1)
+        self.assertEqual(self.validation_cache.hit_rate(), 0.5)
+
+    def test_reopen(self):
+        self.validation_cache.store(self.link, '"abc"', None, self.out_links)
+        self.validation_cache.close()
+
+        self.validation_cache = ValidationCache(self.path)
+
+        self.assertEqual(len(self.validation_cache), 1)
+        self.assertEqual(self.validation_cache.lookup(self.link).etag, '"abc"')
+
+    def test_init_with_no_entries(self):
+        with self.assertRaises(ValueError):
+            ValidationCache(self.path, max_entries=0)
+
+
+class TestCachedPage(unittest.TestCase):
+    def test_conditional_headers(self):
+        self.assertEqual(CachedPage('"abc"', "Wed, 21 Oct 2015 07:28:00 GMT", []).conditional_headers(), {
+            "If-None-Match": '"abc"',
+            "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+        })
+
+    def test_conditional_headers_etag_only(self):
+        self.assertEqual(CachedPage('"abc"', None, []).conditional_headers(), {"If-None-Match": '"abc"'})
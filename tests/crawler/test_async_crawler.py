@@ -0,0 +1,115 @@
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from crawler.async_crawler import AsyncCrawler
+from crawler.bloom_filter import BloomFilter
+from crawler.links.link import Link
+from unittest.mock import Mock
+
+
+class TestAsyncCrawler(unittest.IsolatedAsyncioTestCase):
+    SITE = {
+        "/": """
+            <a href="/foo.html">Foo</a>
+            <a href="bar.html">Bar</a>
+            <a href="http://www.example.net/external.html">External</a>
+        """,
+        "/foo.html": """
+            <a href="/">Home</a>
+            <a href="/sub/baz.html">Baz</a>
+        """,
+        "/bar.html": """
+            <a href="/foo.html">Foo</a>
+            <a href="/sub/baz.html">Baz</a>
+        """,
+        "/sub/baz.html": """
+            <a href="../index.html">Index</a>
+            <a href="qux.html">Qux</a>
+        """,
+        "/index.html": "<p>No links here</p>",
+        "/sub/qux.html": """<a href="/sub/baz.html">Baz</a>""",
+    }
+
+    async def asyncSetUp(self):
+        self.requested_paths = []
+
+        async def handler(request):
+            self.requested_paths.append(request.path)
+            if request.path not in TestAsyncCrawler.SITE:
+                # Drop the connection without a response
+                request.transport.close()
+                return web.Response()
+            return web.Response(text=TestAsyncCrawler.SITE[request.path], content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/{path:.*}", handler)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.domain = "http://{}:{}".format(self.server.host, self.server.port)
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def test_crawl(self):
+        crawler = AsyncCrawler(self.domain, concurrency=2)
+        await crawler.crawl_async()
+
+        self.assertEqual(
+            set(page.link for page in crawler.site_map.all_pages()),
+            set(Link(self.domain, path) for path in TestAsyncCrawler.SITE.keys()),
+        )
+
+    async def test_crawl_fetches_each_page_once(self):
+        crawler = AsyncCrawler(self.domain, concurrency=10)
+        await crawler.crawl_async()
+
+        self.assertEqual(sorted(self.requested_paths), sorted(TestAsyncCrawler.SITE.keys()))
+
+    async def test_crawl_parse_in_executor(self):
+        crawler = AsyncCrawler(self.domain, parse_in_executor=True)
+        await crawler.crawl_async()
+
+        self.assertEqual(len(list(crawler.site_map.all_pages())), len(TestAsyncCrawler.SITE))
+
+    async def test_crawl_with_seen_filter(self):
+        crawler = AsyncCrawler(self.domain, seen_filter=BloomFilter(1000))
+        await crawler.crawl_async()
+
+        self.assertEqual(sorted(self.requested_paths), sorted(TestAsyncCrawler.SITE.keys()))
+        self.assertEqual(len(crawler.seen_filter), len(TestAsyncCrawler.SITE))
+
+    async def test_crawl_seeded(self):
+        seeder = Mock(sitemaps_fetched=1)
+        seeder.seed_links.return_value = iter([
+            Link(self.domain, "/sub/qux.html"),
+            Link(self.domain, "/"),
+            Link(self.domain, "/sub/qux.html"),
+        ])
+        crawler = AsyncCrawler(self.domain, seeder=seeder)
+        await crawler.crawl_async()
+
+        seeder.seed_links.assert_called_once_with(Link(self.domain, "/"))
+        self.assertEqual(sorted(self.requested_paths), sorted(TestAsyncCrawler.SITE.keys()))
+
+    async def test_crawl_calls_on_page(self):
+        pages = []
+        crawler = AsyncCrawler(self.domain, on_page=pages.append)
+        await crawler.crawl_async()
+
+        self.assertEqual(pages, list(crawler.site_map.all_pages()))
+
+    async def test_crawl_continues_past_fetch_errors(self):
+        seeder = Mock(sitemaps_fetched=1)
+        seeder.seed_links.return_value = iter([Link(self.domain, "/broken.html")])
+        crawler = AsyncCrawler(self.domain, seeder=seeder)
+        with self.assertLogs(level="WARNING"):
+            await crawler.crawl_async()
+
+        self.assertEqual(len(list(crawler.site_map.all_pages())), len(TestAsyncCrawler.SITE) + 1)
+        self.assertEqual(crawler.site_map.page_for_link(Link(self.domain, "/broken.html")).out_links, [])
+
+    def test_init_with_no_concurrency(self):
+        with self.assertRaises(ValueError):
+            AsyncCrawler(self.domain, concurrency=0)
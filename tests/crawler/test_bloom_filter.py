@@ -0,0 +1,56 @@
+import unittest
+
+from crawler.bloom_filter import BloomFilter
+
+
+class TestBloomFilter(unittest.TestCase):
+    def setUp(self):
+        self.bloom_filter = BloomFilter(1000, false_positive_rate=0.01)
+
+    def test_init_sizing(self):
+        self.assertEqual(self.bloom_filter.size_in_bits, 9586)
+        self.assertEqual(self.bloom_filter.hash_count, 7)
+
+    def test_init_with_no_expected_items(self):
+        with self.assertRaises(ValueError):
+            BloomFilter(0)
+
+    def test_init_with_invalid_false_positive_rate(self):
+        for rate in [0, 1, 1.5]:
+            with self.assertRaises(ValueError):
+                BloomFilter(1000, false_positive_rate=rate)
+
+    def test_add(self):
+        self.assertTrue(self.bloom_filter.add("www.example.com/foo.html"))
+        self.assertFalse(self.bloom_filter.add("www.example.com/foo.html"))
+        self.assertEqual(len(self.bloom_filter), 1)
+
+    def test_contains(self):
+        self.bloom_filter.add("www.example.com/foo.html")
+
+        self.assertIn("www.example.com/foo.html", self.bloom_filter)
+        self.assertNotIn("www.example.com/bar.html", self.bloom_filter)
+
+    def test_no_false_negatives(self):
+        items = ["www.example.com/{}.html".format(i) for i in range(1000)]
+        for item in items:
+            self.bloom_filter.add(item)
+
+        self.assertTrue(all(item in self.bloom_filter for item in items))
+
+    def test_false_positive_rate(self):
+        for i in range(1000):
+            self.bloom_filter.add("www.example.com/{}.html".format(i))
+
+        false_positives = sum("www.example.net/{}.html".format(i) in self.bloom_filter for i in range(10000))
+
+        self.assertLess(false_positives / 10000, 0.02)
+        self.assertAlmostEqual(self.bloom_filter.estimated_false_positive_rate(), 0.01, delta=0.005)
+
+    def test_fill_ratio(self):
+        self.assertEqual(self.bloom_filter.fill_ratio(), 0)
+        self.assertEqual(self.bloom_filter.estimated_false_positive_rate(), 0)
+
+        self.bloom_filter.add("www.example.com/foo.html")
+
+        self.assertEqual(self.bloom_filter.fill_ratio(), 7 / 9586)
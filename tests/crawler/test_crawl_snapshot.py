@@ -0,0 +1,233 @@
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from crawler.crawl_snapshot import CrawlDiff, CrawlSnapshot
+from crawler.links.link import Link
+from crawler.pages.page import Page
+
+
+class TestCrawlSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "snapshot.sqlite")
+        self.snapshot = CrawlSnapshot(self.path)
+        self.link = Link("http://www.example.com", "/index.html")
+
+    def tearDown(self):
+        self.snapshot.close()
+        self.directory.cleanup()
+
+    def _page(self, path, out_paths, body):
+        link = Link("http://www.example.com", path)
+        return Page(
+            link,
+            None,
+            out_links=[Link(link.url, out_path) for out_path in out_paths],
+            fingerprint=CrawlSnapshot.fingerprint(body),
+        )
+
+    def test_fingerprint(self):
+        fingerprinter = CrawlSnapshot.fingerprinter(b"<a href")
+        fingerprinter.update(b"='/foo.html'>Foo</a>")
+
+        self.assertEqual(fingerprinter.digest(), CrawlSnapshot.fingerprint(b"<a href='/foo.html'>Foo</a>"))
+        self.assertEqual(len(CrawlSnapshot.fingerprint(b"")), 16)
+        self.assertNotEqual(CrawlSnapshot.fingerprint(b"a"), CrawlSnapshot.fingerprint(b"b"))
+
+    def test_previous_out_link_urls_no_previous_crawl(self):
+        self.assertIsNone(self.snapshot.previous_out_link_urls(self.link, CrawlSnapshot.fingerprint(b"body")))
+        self.assertEqual(self.snapshot.reused, 0)
+
+    def test_previous_out_link_urls(self):
+        self.snapshot.record(self._page("/index.html", ["/foo.html", "http://www.example.net/"], b"body"))
+        self.assertIsNone(self.snapshot.previous_out_link_urls(self.link, CrawlSnapshot.fingerprint(b"body")))
+        self.snapshot.finish()
+
+        out_link_urls = self.snapshot.previous_out_link_urls(
+            Link("https://www.example.com", "index.html"),
+            CrawlSnapshot.fingerprint(b"body"),
+        )
+
+        self.assertEqual(out_link_urls, ["http://www.example.com/foo.html", "http://www.example.net"])
+        self.assertEqual(self.snapshot.reused, 1)
+
+    def test_previous_out_link_urls_changed(self):
+        self.snapshot.record(self._page("/index.html", ["/foo.html"], b"body"))
+        self.snapshot.finish()
+
+        self.assertIsNone(self.snapshot.previous_out_link_urls(self.link, CrawlSnapshot.fingerprint(b"changed")))
+
+    def test_previous_out_link_urls_no_out_links(self):
+        self.snapshot.record(self._page("/index.html", [], b"body"))
+        self.snapshot.finish()
+
+        self.assertEqual(self.snapshot.previous_out_link_urls(self.link, CrawlSnapshot.fingerprint(b"body")), [])
+
+    def test_record_without_fingerprint_keeps_previous(self):
+        self.snapshot.record(self._page("/index.html", ["/foo.html"], b"body"))
+        self.snapshot.finish()
+
+        self.snapshot.record(Page(self.link, None, out_links=[Link(self.link.url, "/foo.html")]))
+        diff = self.snapshot.finish()
+
+        self.assertEqual(diff.unchanged_pages, 1)
+        self.assertEqual(self.snapshot.previous_out_link_urls(self.link, CrawlSnapshot.fingerprint(b"body")), [
+            "http://www.example.com/foo.html",
+        ])
+
+    def test_finish_first_crawl(self):
+        self.snapshot.record(self._page("/index.html", ["/foo.html"], b"body"))
+        self.snapshot.record(self._page("/foo.html", [], b"foo"))
+
+        diff = self.snapshot.finish()
+
+        self.assertEqual(diff.added_pages, ["http://www.example.com/foo.html", "http://www.example.com/index.html"])
+        self.assertEqual(diff.removed_pages, [])
+        self.assertEqual(diff.added_links, [("http://www.example.com/index.html", "http://www.example.com/foo.html")])
+        self.assertEqual(diff.removed_links, [])
+        self.assertEqual(diff.changed_pages, 0)
+        self.assertEqual(diff.unchanged_pages, 0)
+
+    def test_finish(self):
+        self.snapshot.record(self._page("/index.html", ["/foo.html", "/bar.html"], b"index"))
+        self.snapshot.record(self._page("/foo.html", [], b"foo"))
+        self.snapshot.record(self._page("/bar.html", [], b"bar"))
+        self.snapshot.finish()
+
+        self.snapshot.record(self._page("/index.html", ["/foo.html", "/baz.html"], b"index changed"))
+        self.snapshot.record(self._page("/foo.html", [], b"foo"))
+        self.snapshot.record(self._page("/baz.html", [], b"baz"))
+        diff = self.snapshot.finish()
+
+        self.assertEqual(diff.added_pages, ["http://www.example.com/baz.html"])
+        self.assertEqual(diff.removed_pages, ["http://www.example.com/bar.html"])
+        self.assertEqual(diff.added_links, [("http://www.example.com/index.html", "http://www.example.com/baz.html")])
+        self.assertEqual(
+            diff.removed_links,
+            [("http://www.example.com/index.html", "http://www.example.com/bar.html")],
+        )
+        self.assertEqual(diff.changed_pages, 1)
+        self.assertEqual(diff.unchanged_pages, 1)
+
+    def test_finish_gone_pages_removed(self):
+        self.snapshot.record(self._page("/index.html", ["/foo.html"], b"index"))
+        self.snapshot.record(self._page("/foo.html", [], b"foo"))
+        self.snapshot.finish()
+
+        self.snapshot.record(self._page("/index.html", ["/foo.html"], b"index"))
+        gone_page = self._page("/foo.html", [], b"Not Found")
+        gone_page.status_code = 404
+        self.snapshot.record(gone_page)
+        diff = self.snapshot.finish()
+
+        self.assertEqual(diff.added_pages, [])
+        self.assertEqual(diff.removed_pages, ["http://www.example.com/foo.html"])
+
+    def test_finish_incomplete(self):
+        self.snapshot.record(self._page("/index.html", ["/foo.html", "/bar.html"], b"index"))
+        self.snapshot.record(self._page("/foo.html", ["/baz.html"], b"foo"))
+        self.snapshot.record(self._page("/bar.html", [], b"bar"))
+        self.snapshot.finish()
+
+        self.snapshot.record(self._page("/index.html", ["/foo.html"], b"index changed"))
+        gone_page = self._page("/bar.html", [], b"Gone")
+        gone_page.status_code = 410
+        self.snapshot.record(gone_page)
+        diff = self.snapshot.finish(complete=False)
+
+        self.assertEqual(diff.removed_pages, ["http://www.example.com/bar.html"])
+        self.assertEqual(
+            diff.removed_links,
+            [("http://www.example.com/index.html", "http://www.example.com/bar.html")],
+        )
+
+        # The page the crawl didn't reach is kept for the next crawl to compare with
+        self.snapshot.record(self._page("/index.html", ["/foo.html"], b"index changed"))
+        self.snapshot.record(self._page("/foo.html", [], b"foo changed"))
+        diff = self.snapshot.finish()
+
+        self.assertEqual(diff.added_pages, [])
+        self.assertEqual(diff.removed_pages, ["http://www.example.com/bar.html"])
+        self.assertEqual(diff.removed_links, [("http://www.example.com/foo.html", "http://www.example.com/baz.html")])
+        self.assertEqual(diff.changed_pages, 1)
+        self.assertEqual(diff.unchanged_pages, 1)
+
+    def test_previous_page_near_duplicate(self):
+        page = self._page("/print.html", [], b"body")
+        page.duplicate_of = self.link
+        self.snapshot.record(page)
+        self.snapshot.finish()
+
+        previous_page = self.snapshot.previous_page(
+            Link("http://www.example.com", "/print.html"),
+            CrawlSnapshot.fingerprint(b"body"),
+        )
+
+        self.assertEqual(previous_page, ([], "http://www.example.com/index.html"))
+
+    def test_open_snapshot_without_added_columns(self):
+        self.snapshot.close()
+        connection = sqlite3.connect(self.path)
+        with connection:
+            for table in ("pages", "current_pages"):
+                connection.execute("DROP TABLE {}".format(table))
+                connection.execute(
+                    "CREATE TABLE {} (key TEXT PRIMARY KEY, url TEXT NOT NULL, fingerprint BLOB, "
+                    "out_links TEXT NOT NULL)".format(table),
+                )
+            connection.execute(
+                "INSERT INTO pages VALUES (?, ?, ?, ?)",
+                ("www.example.com/index.html", "http://www.example.com/index.html", CrawlSnapshot.fingerprint(b"body"),
+                 ""),
+            )
+        connection.close()
+
+        self.snapshot = CrawlSnapshot(self.path)
+
+        self.assertEqual(self.snapshot.previous_page(self.link, CrawlSnapshot.fingerprint(b"body")), ([], None))
+        self.snapshot.record(self._page("/index.html", [], b"body"))
+        self.assertEqual(self.snapshot.finish().unchanged_pages, 1)
+
+    def test_unfinished_crawl_forgotten_unless_resumed(self):
+        self.snapshot.record(self._page("/index.html", [], b"index"))
+        self.snapshot.close()
+
+        self.snapshot = CrawlSnapshot(self.path, resume=True)
+        self.assertEqual(self.snapshot.finish().added_pages, ["http://www.example.com/index.html"])
+
+        self.snapshot.record(self._page("/foo.html", [], b"foo"))
+        self.snapshot.close()
+
+        self.snapshot = CrawlSnapshot(self.path)
+        diff = self.snapshot.finish()
+        self.assertEqual(diff.added_pages, [])
+        self.assertEqual(diff.removed_pages, ["http://www.example.com/index.html"])
+
+
+class TestCrawlDiff(unittest.TestCase):
+    def setUp(self):
+        self.diff = CrawlDiff(
+            ["http://www.example.com/new.html"],
+            ["http://www.example.com/old.html"],
+            [("http://www.example.com/", "http://www.example.com/new.html")],
+            [("http://www.example.com/", "http://www.example.com/old.html")],
+            2,
+            3,
+        )
+
+    def test_write(self):
+        output = io.StringIO()
+        self.diff.write(output)
+
+        self.assertEqual(output.getvalue(), (
+            "+page http://www.example.com/new.html\n"
+            "-page http://www.example.com/old.html\n"
+            "+link http://www.example.com/ -> http://www.example.com/new.html\n"
+            "-link http://www.example.com/ -> http://www.example.com/old.html\n"
+        ))
+
+    def test_repr(self):
+        self.assertEqual(repr(self.diff), "1 pages added, 1 removed, 2 changed, 3 unchanged; 1 links added, 1 removed")
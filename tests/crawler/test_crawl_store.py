@@ -0,0 +1,180 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from crawler.crawl_store import CrawlStore, CrawlStoreError
+from crawler.links.link import Link
+from crawler.pages.page import Page
+
+
+class TestCrawlStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "crawl.sqlite")
+        self.crawl_store = CrawlStore(self.path, "http://www.example.com")
+
+        self.index_page = Page(Link("http://www.example.com", "/"), None, out_links=[
+            Link("http://www.example.com/", "foo.html"),
+            Link("http://www.example.com/", "http://www.example.net:8080/baz.html"),
+            Link("http://www.example.com/", "foo.html"),
+        ])
+        self.foo_page = Page(Link("http://www.example.com/", "foo.html"), None, out_links=[
+            Link("http://www.example.com/foo.html", "/"),
+            Link("http://www.example.com/foo.html", "sub/bar.html"),
+        ])
+
+    def tearDown(self):
+        self.crawl_store.close()
+        self.directory.cleanup()
+
+    def test_is_empty(self):
+        self.assertTrue(self.crawl_store.is_empty())
+
+        self.crawl_store.add_page(self.index_page)
+
+        self.assertFalse(self.crawl_store.is_empty())
+
+    def test_link_already_visited(self):
+        self.crawl_store.add_page(self.index_page)
+
+        self.assertTrue(self.crawl_store.link_already_visited(Link("https://www.example.com", "/")))
+        self.assertFalse(self.crawl_store.link_already_visited(Link("http://www.example.com", "/foo.html")))
+
+    def test_page_for_link(self):
+        self.crawl_store.add_page(self.index_page)
+
+        page = self.crawl_store.page_for_link(Link("http://www.example.com", "/"))
+
+        self.assertEqual(page.link, self.index_page.link)
+        self.assertEqual(page.out_links, self.index_page.out_links)
+        self.assertEqual([link.in_crawled_domain() for link in page.out_links], [True, False, True])
+
+    def test_page_for_link_keeps_fetch_details(self):
+        self.index_page.status_code = 200
+        self.index_page.body_size = 1234
+        self.index_page.fetch_time = 0.25
+        self.crawl_store.add_page(self.index_page)
+        self.crawl_store.add_page(self.foo_page)
+
+        index_page = self.crawl_store.page_for_link(Link("http://www.example.com", "/"))
+        foo_page, = [page for page in self.crawl_store.all_pages() if page.link == self.foo_page.link]
+
+        self.assertEqual((index_page.status_code, index_page.body_size, index_page.fetch_time), (200, 1234, 0.25))
+        self.assertEqual((foo_page.status_code, foo_page.body_size, foo_page.fetch_time), (None, None, None))
+
+    def test_page_for_link_not_visited(self):
+        with self.assertRaises(KeyError):
+            self.crawl_store.page_for_link(Link("http://www.example.com", "/"))
+
+    def test_all_pages(self):
+        self.crawl_store.add_page(self.index_page)
+        self.crawl_store.add_page(self.foo_page)
+
+        pages = list(self.crawl_store.all_pages())
+
+        self.assertEqual([page.link for page in pages], [self.index_page.link, self.foo_page.link])
+        self.assertEqual([page.out_links for page in pages], [self.index_page.out_links, self.foo_page.out_links])
+        self.assertEqual(len(self.crawl_store), 2)
+
+    def test_add_pages_updates_frontier(self):
+        self.crawl_store.add_pages([self.index_page], [Link("http://www.example.com", "/foo.html")], 1)
+
+        self.assertEqual(self.crawl_store.frontier_size(), 1)
+        self.assertEqual(self.crawl_store.next_frontier_level(), 1)
+        self.assertEqual(self.crawl_store.frontier_batch(1, 10), [Link("http://www.example.com", "/foo.html")])
+
+        self.crawl_store.add_pages(
+            [self.foo_page],
+            [
+                Link("http://www.example.com", "/"),
+                Link("http://www.example.com", "/sub/bar.html"),
+                Link("http://www.example.com", "/foo.html"),
+            ],
+            2,
+        )
+
+        self.assertEqual(self.crawl_store.next_frontier_level(), 2)
+        self.assertEqual(self.crawl_store.frontier_batch(2, 10), [Link("http://www.example.com", "/sub/bar.html")])
+
+    def test_add_pages_keeps_links_already_in_frontier(self):
+        self.crawl_store.add_pages([self.index_page], [Link("http://www.example.com", "/foo.html")], 1)
+        self.crawl_store.add_pages([], [Link("http://www.example.com", "/foo.html")], 2)
+
+        self.assertEqual(self.crawl_store.next_frontier_level(), 1)
+        self.assertEqual(self.crawl_store.frontier_size(), 1)
+
+    def test_frontier_batch_size(self):
+        self.crawl_store.add_pages([], [
+            Link("http://www.example.com", "/foo.html"),
+            Link("http://www.example.com", "/bar.html"),
+        ], 1)
+
+        self.assertEqual(len(self.crawl_store.frontier_batch(1, 1)), 1)
+
+    def test_duplicate_of(self):
+        duplicate_page = Page(Link("http://www.example.com", "/print.html"), None, out_links=[])
+        duplicate_page.duplicate_of = self.foo_page.link
+        self.crawl_store.add_pages([self.foo_page, duplicate_page], [], 1)
+
+        self.assertEqual(self.crawl_store.duplicate_of(duplicate_page.link), self.foo_page.link)
+        self.assertIsNone(self.crawl_store.duplicate_of(self.foo_page.link))
+        self.assertEqual(self.crawl_store.near_duplicates(), [(duplicate_page.link, self.foo_page.link)])
+        self.assertEqual(self.crawl_store.page_for_link(duplicate_page.link).duplicate_of, self.foo_page.link)
+
+        # Adding it again without being a near duplicate forgets what it duplicated
+        self.crawl_store.add_page(Page(duplicate_page.link, None, out_links=[]))
+
+        self.assertEqual(self.crawl_store.near_duplicates(), [])
+
+    def test_aliases(self):
+        old_link = Link("http://www.example.com", "/old.html")
+        other_link = Link("http://www.example.com", "/Old")
+        self.crawl_store.add_pages([self.index_page], [old_link, other_link], 1)
+        self.foo_page.aliases = [old_link]
+        self.crawl_store.add_pages([self.foo_page], [old_link], 2)
+        self.crawl_store.add_aliases(self.foo_page.link, [other_link])
+
+        for alias_link in (old_link, other_link):
+            self.assertTrue(self.crawl_store.link_already_visited(alias_link))
+            self.assertEqual(self.crawl_store.page_for_link(alias_link).link, self.foo_page.link)
+            self.assertEqual(self.crawl_store.alias_of(alias_link), self.foo_page.link)
+        self.assertIsNone(self.crawl_store.alias_of(self.foo_page.link))
+        self.assertEqual(self.crawl_store.aliases(), [(old_link, self.foo_page.link), (other_link, self.foo_page.link)])
+        self.assertEqual(self.crawl_store.page_for_link(self.foo_page.link).aliases, [old_link, other_link])
+        # Aliases leave the frontier and aren't added to it again
+        self.assertEqual(self.crawl_store.frontier_size(), 0)
+        self.assertEqual(len(self.crawl_store), 2)
+
+    def test_next_frontier_level_empty(self):
+        self.assertIsNone(self.crawl_store.next_frontier_level())
+
+    def test_reopen(self):
+        self.crawl_store.add_pages([self.index_page], [Link("http://www.example.com", "/foo.html")], 1)
+        self.crawl_store.close()
+
+        self.crawl_store = CrawlStore(self.path, "http://www.example.com")
+
+        self.assertEqual(len(self.crawl_store), 1)
+        self.assertEqual(self.crawl_store.frontier_batch(1, 10), [Link("http://www.example.com", "/foo.html")])
+
+    def test_reopen_without_added_columns(self):
+        self.crawl_store.add_page(self.index_page)
+        self.crawl_store.close()
+        connection = sqlite3.connect(self.path)
+        with connection:
+            connection.execute("CREATE TABLE old_pages (url_id INTEGER PRIMARY KEY)")
+            connection.execute("INSERT INTO old_pages SELECT url_id FROM pages")
+            connection.execute("DROP TABLE pages")
+            connection.execute("ALTER TABLE old_pages RENAME TO pages")
+        connection.close()
+
+        self.crawl_store = CrawlStore(self.path, "http://www.example.com")
+        self.foo_page.status_code = 200
+        self.crawl_store.add_page(self.foo_page)
+
+        self.assertEqual([page.status_code for page in self.crawl_store.all_pages()], [None, 200])
+
+    def test_reopen_different_start_url(self):
+        with self.assertRaises(CrawlStoreError):
+            CrawlStore(self.path, "http://www.example.net")
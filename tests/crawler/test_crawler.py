@@ -1,2 +1,521 @@
-# TODO - I'm running very short of time in this take home test and so I chose to not write the
-# tests in this instance. This is not a practice I would do in production!
+import os
+import requests
+import responses
+import tempfile
+import unittest
+
+from crawler.bloom_filter import BloomFilter
+from crawler.crawl_snapshot import CrawlSnapshot
+from crawler.crawl_store import CrawlStore
+from crawler.crawler import Crawler
+from crawler.frontier import Frontier
+from crawler.graph_site_map import GraphSiteMap
+from crawler.links.link import Link
+from crawler.metrics import CrawlMetrics
+from crawler.pages.near_duplicates import NearDuplicateDetector
+from crawler.pages.page_fetcher import PageFetcher
+from crawler.profiling import CrawlProfiler
+from crawler.sitemap_seeder import SitemapSeeder
+
+
+class TestCrawler(unittest.TestCase):
+    SITE = {
+        "/": """
+            <a href="/foo.html">Foo</a>
+            <a href="bar.html">Bar</a>
+            <a href="http://www.example.net/external.html">External</a>
+        """,
+        "/foo.html": """
+            <a href="/">Home</a>
+            <a href="/sub/baz.html">Baz</a>
+        """,
+        "/bar.html": """
+            <a href="/foo.html">Foo</a>
+            <a href="http://www.example.com/sub/baz.html">Baz</a>
+        """,
+        "/sub/baz.html": """
+            <a href="../index.html">Index</a>
+            <a href="qux.html">Qux</a>
+        """,
+        "/index.html": "<p>No links here</p>",
+        "/sub/qux.html": """<a href="/sub/baz.html">Baz</a>""",
+    }
+
+    def _add_site_responses(self, skip_path=None):
+        for path, body in TestCrawler.SITE.items():
+            if path == skip_path:
+                continue
+            responses.add(**{
+                "method": responses.GET,
+                "url": "http://www.example.com{}".format(path),
+                "body": body,
+                "status": 200,
+                "content_type": "text/html",
+            })
+
+    def _site_map_summary(self, crawler):
+        return {
+            page.link.url: set(link.url for link in page.out_links)
+            for page in crawler.site_map.all_pages()
+        }
+
+    @responses.activate
+    def test_crawl(self):
+        self._add_site_responses()
+        crawler = Crawler("http://www.example.com")
+        crawler.crawl()
+
+        self.assertEqual(
+            set(page.link for page in crawler.site_map.all_pages()),
+            set(Link("http://www.example.com", path) for path in TestCrawler.SITE.keys()),
+        )
+
+    @responses.activate
+    def test_crawl_continues_past_fetch_errors(self):
+        self._add_site_responses(skip_path="/sub/baz.html")
+        responses.add(responses.GET, "http://www.example.com/sub/baz.html", body=requests.ConnectionError("reset"))
+        for workers in (1, 4):
+            with self.subTest(workers=workers):
+                crawler = Crawler("http://www.example.com", workers=workers)
+                with self.assertLogs(level="WARNING"):
+                    crawler.crawl()
+
+                # The broken page is kept without any links, the pages only it links to aren't reached
+                self.assertEqual(
+                    self._site_map_summary(crawler)["http://www.example.com/sub/baz.html"],
+                    set(),
+                )
+                self.assertEqual(len(crawler.site_map), len(TestCrawler.SITE) - 2)
+
+    @responses.activate
+    def test_crawl_fetches_each_page_once(self):
+        self._add_site_responses()
+        crawler = Crawler("http://www.example.com", workers=4)
+        crawler.crawl()
+
+        fetched_urls = [call.request.url for call in responses.calls]
+        self.assertEqual(len(fetched_urls), len(TestCrawler.SITE))
+        self.assertEqual(len(set(fetched_urls)), len(TestCrawler.SITE))
+
+    @responses.activate
+    def test_crawl_with_workers_matches_serial_crawl(self):
+        self._add_site_responses()
+        serial_crawler = Crawler("http://www.example.com")
+        serial_crawler.crawl()
+
+        concurrent_crawler = Crawler("http://www.example.com", workers=4)
+        concurrent_crawler.crawl()
+
+        self.assertEqual(
+            self._site_map_summary(concurrent_crawler),
+            self._site_map_summary(serial_crawler),
+        )
+
+    @responses.activate
+    def test_crawl_with_graph_site_map_matches_site_map(self):
+        self._add_site_responses()
+
+        crawler = Crawler("http://www.example.com")
+        crawler.crawl()
+
+        graph_crawler = Crawler("http://www.example.com", site_map=GraphSiteMap())
+        graph_crawler.crawl()
+
+        self.assertEqual(self._site_map_summary(graph_crawler), self._site_map_summary(crawler))
+
+    @responses.activate
+    def test_crawl_with_crawl_store_matches_site_map(self):
+        self._add_site_responses()
+
+        crawler = Crawler("http://www.example.com")
+        crawler.crawl()
+
+        with tempfile.TemporaryDirectory() as directory:
+            crawl_store = CrawlStore(os.path.join(directory, "crawl.sqlite"), "http://www.example.com")
+            stored_crawler = Crawler("http://www.example.com", crawl_store=crawl_store, workers=2, batch_size=2)
+            stored_crawler.crawl()
+
+            self.assertEqual(self._site_map_summary(stored_crawler), self._site_map_summary(crawler))
+            self.assertEqual(crawl_store.frontier_size(), 0)
+            crawl_store.close()
+
+    @responses.activate
+    def test_crawl_resumes_from_crawl_store(self):
+        self._add_site_responses(skip_path="/sub/qux.html")
+        # Anything but an error fetching the page interrupts the crawl
+        responses.add(responses.GET, "http://www.example.com/sub/qux.html", body=RuntimeError("interrupted"))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "crawl.sqlite")
+
+            crawl_store = CrawlStore(path, "http://www.example.com")
+            with self.assertRaises(RuntimeError):
+                Crawler("http://www.example.com", crawl_store=crawl_store, batch_size=1).crawl()
+            crawl_store.close()
+
+            interrupted_urls = [call.request.url for call in responses.calls]
+            responses.calls.reset()
+            responses.replace(
+                responses.GET,
+                "http://www.example.com/sub/qux.html",
+                body=TestCrawler.SITE["/sub/qux.html"],
+            )
+
+            crawl_store = CrawlStore(path, "http://www.example.com")
+            crawler = Crawler("http://www.example.com", crawl_store=crawl_store, batch_size=1)
+            crawler.crawl()
+
+            resumed_urls = [call.request.url for call in responses.calls]
+            self.assertEqual(resumed_urls, ["http://www.example.com/sub/qux.html"])
+            self.assertEqual(len(interrupted_urls), len(TestCrawler.SITE))
+            self.assertEqual(
+                set(page.link for page in crawler.site_map.all_pages()),
+                set(Link("http://www.example.com", path) for path in TestCrawler.SITE.keys()),
+            )
+            crawl_store.close()
+
+    @responses.activate
+    def test_crawl_with_seen_filter_matches_site_map(self):
+        self._add_site_responses()
+
+        crawler = Crawler("http://www.example.com")
+        crawler.crawl()
+
+        filtered_crawler = Crawler("http://www.example.com", workers=2, seen_filter=BloomFilter(1000))
+        filtered_crawler.crawl()
+
+        self.assertEqual(self._site_map_summary(filtered_crawler), self._site_map_summary(crawler))
+        self.assertEqual(len(responses.calls), 2 * len(TestCrawler.SITE))
+        self.assertEqual(len(filtered_crawler.seen_filter), len(TestCrawler.SITE))
+
+    @responses.activate
+    def test_crawl_incrementally(self):
+        self._add_site_responses()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "snapshot.sqlite")
+            snapshot = CrawlSnapshot(path)
+            first_crawler = Crawler(
+                "http://www.example.com",
+                page_fetcher=PageFetcher(snapshot=snapshot),
+                snapshot=snapshot,
+            )
+            first_crawler.crawl()
+            snapshot.close()
+
+            responses.reset()
+            self._add_site_responses(skip_path="/sub/qux.html")
+            responses.replace(
+                responses.GET,
+                "http://www.example.com/sub/baz.html",
+                body="""<a href="../index.html">Index</a>""",
+                content_type="text/html",
+            )
+
+            snapshot = CrawlSnapshot(path)
+            second_crawler = Crawler(
+                "http://www.example.com",
+                page_fetcher=PageFetcher(snapshot=snapshot),
+                snapshot=snapshot,
+            )
+            second_crawler.crawl()
+            snapshot.close()
+
+        self.assertEqual(len(first_crawler.crawl_diff.added_pages), len(TestCrawler.SITE))
+        self.assertEqual(snapshot.reused, len(TestCrawler.SITE) - 2)
+        self.assertEqual(second_crawler.crawl_diff.added_pages, [])
+        self.assertEqual(second_crawler.crawl_diff.removed_pages, ["http://www.example.com/sub/qux.html"])
+        self.assertEqual(second_crawler.crawl_diff.added_links, [])
+        self.assertEqual(second_crawler.crawl_diff.removed_links, [
+            ("http://www.example.com/sub/baz.html", "http://www.example.com/sub/qux.html"),
+            ("http://www.example.com/sub/qux.html", "http://www.example.com/sub/baz.html"),
+        ])
+        self.assertEqual(second_crawler.crawl_diff.changed_pages, 1)
+        self.assertEqual(second_crawler.crawl_diff.unchanged_pages, len(TestCrawler.SITE) - 2)
+
+    @responses.activate
+    def test_crawl_incrementally_with_budget(self):
+        self._add_site_responses()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "snapshot.sqlite")
+            snapshot = CrawlSnapshot(path)
+            Crawler("http://www.example.com", snapshot=snapshot).crawl()
+            snapshot.close()
+
+            snapshot = CrawlSnapshot(path)
+            crawler = Crawler("http://www.example.com", snapshot=snapshot, frontier=Frontier(max_pages=2))
+            crawler.crawl()
+            snapshot.close()
+
+        # The pages the budget stopped the crawl reaching are still on the site
+        self.assertEqual(crawler.crawl_diff.removed_pages, [])
+        self.assertEqual(crawler.crawl_diff.removed_links, [])
+
+    @responses.activate
+    def test_crawl_seeded_from_sitemap(self):
+        self._add_site_responses()
+        responses.add(responses.GET, "http://www.example.com/robots.txt", status=404)
+        responses.add(responses.GET, "http://www.example.com/sitemap.xml", body="""
+            <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+                <url><loc>http://www.example.com/sub/qux.html</loc></url>
+                <url><loc>http://www.example.com/sub/baz.html</loc></url>
+                <url><loc>http://www.example.com/</loc></url>
+            </urlset>
+        """)
+        crawler = Crawler("http://www.example.com", seeder=SitemapSeeder())
+        crawler.crawl()
+
+        fetched_urls = [call.request.url for call in responses.calls[2:]]
+        self.assertEqual(len(fetched_urls), len(TestCrawler.SITE))
+        self.assertEqual(len(set(fetched_urls)), len(TestCrawler.SITE))
+        # Without the sitemap /sub/qux.html is 3 links from the start page, the sitemap's pages are fetched alongside
+        # those linked from it
+        self.assertEqual(set(fetched_urls[1:5]), {
+            "http://www.example.com/foo.html",
+            "http://www.example.com/bar.html",
+            "http://www.example.com/sub/baz.html",
+            "http://www.example.com/sub/qux.html",
+        })
+
+    @responses.activate
+    def test_crawl_into_crawl_store_seeded_from_sitemap(self):
+        self._add_site_responses()
+        responses.add(responses.GET, "http://www.example.com/robots.txt", status=404)
+        responses.add(responses.GET, "http://www.example.com/sitemap.xml", body="""
+            <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+                <url><loc>http://www.example.com/sub/qux.html</loc></url>
+            </urlset>
+        """)
+
+        with tempfile.TemporaryDirectory() as directory:
+            crawl_store = CrawlStore(os.path.join(directory, "crawl.sqlite"), "http://www.example.com")
+            crawler = Crawler("http://www.example.com", crawl_store=crawl_store, seeder=SitemapSeeder())
+            self.assertEqual(crawl_store.frontier_size(), 0)
+            crawler.crawl()
+            page_count = len(crawl_store)
+            crawl_store.close()
+
+        self.assertEqual(page_count, len(TestCrawler.SITE))
+
+    @responses.activate
+    def test_crawl_calls_on_page_as_pages_are_added(self):
+        self._add_site_responses()
+        pages = []
+
+        def on_page(page):
+            self.assertTrue(crawler.site_map.link_already_visited(page.link))
+            pages.append(page)
+
+        crawler = Crawler("http://www.example.com", workers=4, on_page=on_page)
+        crawler.crawl()
+
+        self.assertEqual(pages, list(crawler.site_map.all_pages()))
+
+    @responses.activate
+    def test_crawl_records_metrics(self):
+        self._add_site_responses()
+        metrics = CrawlMetrics()
+
+        crawler = Crawler("http://www.example.com", workers=2, metrics=metrics)
+        crawler.crawl()
+
+        self.assertEqual(metrics.pages.value, len(TestCrawler.SITE))
+        self.assertEqual(metrics.bytes.value, sum(len(body) for body in TestCrawler.SITE.values()))
+        self.assertEqual(metrics.stages["site_map"].count, len(TestCrawler.SITE))
+        self.assertEqual(metrics.frontier.value, 0)
+
+    @responses.activate
+    def test_crawl_into_crawl_store_records_metrics(self):
+        self._add_site_responses()
+        metrics = CrawlMetrics()
+
+        with tempfile.TemporaryDirectory() as directory:
+            crawl_store = CrawlStore(os.path.join(directory, "crawl.db"), "http://www.example.com")
+            Crawler("http://www.example.com", crawl_store=crawl_store, metrics=metrics).crawl()
+            crawl_store.close()
+
+        self.assertEqual(metrics.pages.value, len(TestCrawler.SITE))
+        self.assertEqual(metrics.frontier.value, 0)
+
+    @responses.activate
+    def test_crawl_with_profiler(self):
+        self._add_site_responses()
+
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = CrawlProfiler(
+                wall_path=os.path.join(directory, "wall.txt"),
+                memory_path=os.path.join(directory, "memory.txt"),
+                memory_every_pages=2,
+            )
+            Crawler("http://www.example.com", workers=2, profiler=profiler).crawl()
+
+            self.assertTrue(os.path.exists(os.path.join(directory, "wall.txt")))
+            self.assertTrue(os.path.exists(os.path.join(directory, "memory.txt")))
+
+        snapshot_pages = [snapshot[0] for snapshot in profiler.memory_profiler.snapshots]
+        self.assertEqual(snapshot_pages[-1], len(TestCrawler.SITE))
+        self.assertEqual(snapshot_pages[0], 2)
+
+    @responses.activate
+    def test_crawl_skips_links_of_near_duplicates(self):
+        article = "<p>{}</p>".format(" ".join("word{}".format(i) for i in range(200)))
+        for path, body in (
+            ("/", '<a href="/archive.html">Archive</a>'),
+            ("/archive.html", article + '<a href="/archive-2.html">Next</a><a href="/print.html">Print</a>'),
+            ("/print.html", article + '<a href="/print-only.html">Next</a>'),
+            ("/archive-2.html", "<p>The second page</p>"),
+        ):
+            responses.add(responses.GET, "http://www.example.com{}".format(path), body=body, content_type="text/html")
+        page_fetcher = PageFetcher(near_duplicates=NearDuplicateDetector())
+
+        crawler = Crawler("http://www.example.com", page_fetcher=page_fetcher)
+        crawler.crawl()
+
+        self.assertEqual(len(crawler.site_map), 4)
+        self.assertFalse(crawler.site_map.link_already_visited(Link("http://www.example.com", "/print-only.html")))
+        self.assertEqual(crawler.site_map.near_duplicates(), [
+            (Link("http://www.example.com", "/print.html"), Link("http://www.example.com", "/archive.html")),
+        ])
+
+    @responses.activate
+    def test_crawl_with_max_depth(self):
+        self._add_site_responses()
+
+        crawler = Crawler("http://www.example.com", workers=2, frontier=Frontier(max_depth=2))
+        crawler.crawl()
+
+        self.assertEqual(set(self._site_map_summary(crawler)), {
+            "http://www.example.com",
+            "http://www.example.com/foo.html",
+            "http://www.example.com/bar.html",
+            "http://www.example.com/sub/baz.html",
+        })
+
+    @responses.activate
+    def test_crawl_with_max_pages(self):
+        self._add_site_responses()
+
+        crawler = Crawler("http://www.example.com", workers=2, frontier=Frontier(max_pages=3))
+        crawler.crawl()
+
+        self.assertEqual(len(crawler.site_map), 3)
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def test_crawl_with_prefix_budget(self):
+        self._add_site_responses()
+
+        crawler = Crawler("http://www.example.com", frontier=Frontier(prefix_budgets={"/sub/": 1}))
+        crawler.crawl()
+
+        self.assertEqual(set(self._site_map_summary(crawler)), {
+            "http://www.example.com",
+            "http://www.example.com/foo.html",
+            "http://www.example.com/bar.html",
+            "http://www.example.com/sub/baz.html",
+            "http://www.example.com/index.html",
+        })
+
+    @responses.activate
+    def test_crawl_in_score_order(self):
+        self._add_site_responses()
+
+        def deepest_path_first(link, depth):
+            return (-link.url.count("/"), link.url)
+
+        crawler = Crawler("http://www.example.com", frontier=Frontier(scorer=deepest_path_first))
+        crawler.crawl()
+
+        self.assertEqual([call.request.url for call in responses.calls][:3], [
+            "http://www.example.com/",
+            "http://www.example.com/bar.html",
+            "http://www.example.com/sub/baz.html",
+        ])
+
+    def _add_redirecting_site_responses(self):
+        for path, body in (
+            ("/", '<a href="/old.html">Old</a><a href="/legacy.php">Legacy</a><a href="/new.html">New</a>'),
+            ("/new.html", '<a href="/old.html">Old</a><a href="/">Home</a>'),
+        ):
+            responses.add(responses.GET, "http://www.example.com{}".format(path), body=body, content_type="text/html")
+        for path in ("/old.html", "/legacy.php"):
+            responses.add(
+                responses.GET,
+                "http://www.example.com{}".format(path),
+                status=301,
+                headers={"Location": "/new.html"},
+            )
+
+    @responses.activate
+    def test_crawl_records_aliases_of_redirects(self):
+        self._add_redirecting_site_responses()
+        pages = []
+
+        crawler = Crawler("http://www.example.com", on_page=pages.append)
+        crawler.crawl()
+
+        new_link = Link("http://www.example.com", "/new.html")
+        self.assertEqual(len(crawler.site_map), 2)
+        self.assertEqual([page.link for page in pages], [Link("http://www.example.com", "/"), new_link])
+        self.assertEqual(set(crawler.site_map.aliases()), {
+            (Link("http://www.example.com", "/old.html"), new_link),
+            (Link("http://www.example.com", "/legacy.php"), new_link),
+        })
+        self.assertEqual(crawler.site_map.page_for_link(Link("http://www.example.com", "/legacy.php")).link, new_link)
+
+    @responses.activate
+    def test_crawl_only_counts_links_fetched_against_max_pages(self):
+        self._add_redirecting_site_responses()
+        # /new.html is popped last, by when it has been visited through the redirects to it
+        frontier = Frontier(max_pages=4, scorer=lambda link, depth: link.url.endswith("/new.html"))
+
+        crawler = Crawler("http://www.example.com", frontier=frontier)
+        crawler.crawl()
+
+        self.assertEqual(len(responses.calls), 5)
+        self.assertEqual(frontier.popped, 3)
+        self.assertEqual(len(frontier), 0)
+
+    @responses.activate
+    def test_crawl_resolving_redirects_fetches_each_page_once(self):
+        self._add_redirecting_site_responses()
+
+        crawler = Crawler("http://www.example.com", resolve_redirects=True)
+        crawler.crawl()
+
+        requested_urls = [call.request.url for call in responses.calls]
+        self.assertEqual(len(requested_urls), 4)
+        self.assertEqual(requested_urls.count("http://www.example.com/new.html"), 1)
+        self.assertEqual(len(crawler.site_map), 2)
+        self.assertEqual(len(crawler.site_map.aliases()), 2)
+
+    @responses.activate
+    def test_crawl_into_crawl_store_records_aliases_of_redirects(self):
+        self._add_redirecting_site_responses()
+
+        with tempfile.TemporaryDirectory() as directory:
+            crawl_store = CrawlStore(os.path.join(directory, "crawl.sqlite"), "http://www.example.com")
+            crawler = Crawler("http://www.example.com", crawl_store=crawl_store, workers=2, resolve_redirects=True)
+            crawler.crawl()
+
+            new_link = Link("http://www.example.com", "/new.html")
+            self.assertEqual(len(crawl_store), 2)
+            self.assertEqual(set(crawl_store.aliases()), {
+                (Link("http://www.example.com", "/old.html"), new_link),
+                (Link("http://www.example.com", "/legacy.php"), new_link),
+            })
+            self.assertEqual(crawl_store.frontier_size(), 0)
+            crawl_store.close()
+
+    def test_init_with_crawl_store_and_frontier(self):
+        with self.assertRaises(ValueError):
+            Crawler("http://www.example.com", crawl_store=object(), frontier=Frontier())
+
+    def test_init_with_crawl_store_and_site_map(self):
+        with self.assertRaises(ValueError):
+            Crawler("http://www.example.com", crawl_store=object(), site_map=GraphSiteMap())
+
+    def test_init_with_no_workers(self):
+        with self.assertRaises(ValueError):
+            Crawler("http://www.example.com", workers=0)
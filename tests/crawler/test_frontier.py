@@ -0,0 +1,107 @@
+import unittest
+
+from crawler.frontier import Frontier
+from crawler.links.link import Link
+
+
+class TestFrontier(unittest.TestCase):
+    def link(self, path):
+        return Link("http://www.example.com", path)
+
+    def pop_all(self, frontier):
+        entries = []
+        entry = frontier.pop()
+        while entry is not None:
+            entries.append(entry)
+            entry = frontier.pop()
+
+        return entries
+
+    def test_pop_breadth_first(self):
+        frontier = Frontier()
+        frontier.push(self.link("/deep.html"), 2)
+        frontier.push(self.link("/a.html"), 1)
+        frontier.push(self.link("/b.html"), 1)
+
+        self.assertEqual(len(frontier), 3)
+        self.assertEqual(self.pop_all(frontier), [
+            (self.link("/a.html"), 1),
+            (self.link("/b.html"), 1),
+            (self.link("/deep.html"), 2),
+        ])
+        self.assertEqual(len(frontier), 0)
+        self.assertEqual(frontier.popped, 3)
+
+    def test_pop_by_score(self):
+        frontier = Frontier(scorer=lambda link, depth: -depth)
+        frontier.push(self.link("/a.html"), 1)
+        frontier.push(self.link("/deep.html"), 2)
+
+        self.assertEqual(frontier.pop(), (self.link("/deep.html"), 2))
+
+    def test_pop_empty(self):
+        self.assertIsNone(Frontier().pop())
+
+    def test_max_depth(self):
+        frontier = Frontier(max_depth=1)
+
+        self.assertTrue(frontier.push(self.link("/a.html"), 1))
+        self.assertFalse(frontier.push(self.link("/deep.html"), 2))
+        self.assertEqual(len(frontier), 1)
+        self.assertEqual(frontier.dropped, 1)
+
+    def test_max_pages(self):
+        frontier = Frontier(max_pages=2)
+        for path in ("/a.html", "/b.html", "/c.html"):
+            frontier.push(self.link(path), 1)
+
+        self.assertEqual(len(self.pop_all(frontier)), 2)
+        self.assertEqual(len(frontier), 1)
+
+    def test_prefix_budgets(self):
+        frontier = Frontier(prefix_budgets={"/blog/": 2, "/blog/archive": 1, "/": 4})
+        for path in ("/blog/a.html", "/blog/archive/1.html", "/blog/archive/2.html", "/blog/b.html",
+                     "/blog/c.html", "/blogroll.html", "/about.html", "/contact.html", "/team.html"):
+            frontier.push(self.link(path), 1)
+
+        self.assertEqual([link.url for link, _ in self.pop_all(frontier)], [
+            "http://www.example.com/blog/a.html",
+            "http://www.example.com/blog/archive/1.html",
+            "http://www.example.com/blog/b.html",
+            "http://www.example.com/blogroll.html",
+            "http://www.example.com/about.html",
+            "http://www.example.com/contact.html",
+            "http://www.example.com/team.html",
+        ])
+        self.assertEqual(frontier.dropped, 2)
+
+    def test_prefix_budget_of_root(self):
+        frontier = Frontier(prefix_budgets={"/": 1})
+        frontier.push(self.link("/"), 0)
+        frontier.push(self.link("/a.html"), 1)
+
+        self.assertEqual(self.pop_all(frontier), [(self.link("/"), 0)])
+
+    def test_pop_skipping(self):
+        frontier = Frontier(max_pages=2, prefix_budgets={"/blog": 1})
+        for path in ("/blog/a.html", "/blog/b.html", "/c.html", "/d.html"):
+            frontier.push(self.link(path), 1)
+
+        skipped = {self.link("/blog/a.html"), self.link("/c.html")}
+        entries = []
+        entry = frontier.pop(skip=skipped.__contains__)
+        while entry is not None:
+            entries.append(entry)
+            entry = frontier.pop(skip=skipped.__contains__)
+
+        self.assertEqual(entries, [(self.link("/blog/b.html"), 1), (self.link("/d.html"), 1)])
+        self.assertEqual(frontier.popped, 2)
+        self.assertEqual(frontier.dropped, 0)
+
+    def test_init_with_invalid_budgets(self):
+        with self.assertRaises(ValueError):
+            Frontier(max_depth=-1)
+        with self.assertRaises(ValueError):
+            Frontier(max_pages=0)
+        with self.assertRaises(ValueError):
+            Frontier(prefix_budgets={"/blog": -1})
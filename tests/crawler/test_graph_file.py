@@ -0,0 +1,125 @@
+import math
+import os
+import tempfile
+import unittest
+
+from crawler.graph_file import CrawlGraphFile, GraphFileError
+from crawler.graph_site_map import GraphSiteMap
+from crawler.links.link import Link
+from crawler.pages.page import Page
+from crawler.site_map import SiteMap
+
+
+class TestCrawlGraphFile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "crawl.graph")
+
+        index_link = Link("http://www.example.com", "/")
+        self.index_page = Page(index_link, None, out_links=[
+            Link(index_link.url, "/foo.html"),
+            Link(index_link.url, "https://www.example.com/café.html"),
+            Link(index_link.url, "http://www.example.net/"),
+            Link(index_link.url, "foo.html"),
+        ])
+        self.index_page.status_code = 200
+        self.index_page.body_size = 1234
+        self.index_page.fetch_time = 0.25
+        self.foo_page = Page(Link(index_link.url, "/foo.html"), None, out_links=[Link(index_link.url, "/")])
+        self.foo_page.status_code = 404
+        self.foo_page.body_size = 0
+        self.foo_page.fetch_time = 0.5
+        self.unfetched_page = Page(Link(index_link.url, "/café.html"), None, out_links=[])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, site_map):
+        for page in (self.index_page, self.foo_page, self.unfetched_page):
+            site_map.add_page(page)
+
+        return CrawlGraphFile.write(site_map, self.path)
+
+    def test_round_trip(self):
+        self.assertEqual(self._write(SiteMap()), (4, 3, 5))
+
+        with CrawlGraphFile(self.path) as graph:
+            self.assertEqual((graph.node_count, graph.page_count, graph.edge_count), (4, 3, 5))
+            self.assertEqual(list(graph.pages()), [
+                ("http://www.example.com", [
+                    "http://www.example.com/foo.html",
+                    "https://www.example.com/café.html",
+                    "http://www.example.net",
+                    "http://www.example.com/foo.html",
+                ]),
+                ("http://www.example.com/foo.html", ["http://www.example.com"]),
+                ("https://www.example.com/café.html", []),
+            ])
+            self.assertEqual(list(graph.page_nodes), [0, 1, 2])
+            self.assertEqual(list(graph.row_starts), [0, 4, 5, 5])
+            self.assertEqual(list(graph.out_links), [1, 2, 3, 1, 0])
+            self.assertEqual(list(graph.statuses), [200, 404, 0])
+            self.assertEqual(list(graph.body_sizes), [1234, 0, 0])
+            self.assertEqual(list(graph.fetch_times)[:2], [0.25, 0.5])
+            self.assertTrue(math.isnan(graph.fetch_times[2]))
+
+    def test_round_trip_graph_site_map(self):
+        self._write(GraphSiteMap())
+
+        with CrawlGraphFile(self.path) as graph:
+            self.assertEqual(list(graph.out_links), [1, 2, 3, 1, 0])
+            self.assertEqual(list(graph.statuses), [200, 404, 0])
+            self.assertEqual(list(graph.body_sizes), [1234, 0, 0])
+
+    def test_arrays_are_typed_views(self):
+        self._write(SiteMap())
+
+        with CrawlGraphFile(self.path) as graph:
+            self.assertEqual(
+                [(view.format, view.itemsize) for view in (
+                    graph.url_offsets, graph.page_nodes, graph.row_starts, graph.out_links, graph.statuses,
+                    graph.body_sizes, graph.fetch_times, graph.url_data,
+                )],
+                [("Q", 8), ("I", 4), ("Q", 8), ("I", 4), ("H", 2), ("Q", 8), ("d", 8), ("B", 1)],
+            )
+            self.assertTrue(graph.out_links.readonly)
+            self.assertEqual(graph.url(3), "http://www.example.net")
+            self.assertEqual(list(graph.out_link_ids(1)), [0])
+
+    def test_empty_site_map(self):
+        self.assertEqual(CrawlGraphFile.write(SiteMap(), self.path), (0, 0, 0))
+
+        with CrawlGraphFile(self.path) as graph:
+            self.assertEqual(list(graph.pages()), [])
+            self.assertEqual(list(graph.row_starts), [0])
+
+    def test_close_releases_file(self):
+        self._write(SiteMap())
+
+        graph = CrawlGraphFile(self.path)
+        out_links = graph.out_links
+        graph.close()
+
+        with self.assertRaises(ValueError):
+            out_links[0]
+
+    def test_not_a_graph(self):
+        with open(self.path, "wb") as graph_file:
+            graph_file.write(b"Page: http://www.example.com\n" * 10)
+
+        with self.assertRaises(GraphFileError):
+            CrawlGraphFile(self.path)
+
+    def test_empty_file(self):
+        open(self.path, "wb").close()
+
+        with self.assertRaises(GraphFileError):
+            CrawlGraphFile(self.path)
+
+    def test_truncated(self):
+        self._write(SiteMap())
+        with open(self.path, "r+b") as graph_file:
+            graph_file.truncate(os.path.getsize(self.path) - 1)
+
+        with self.assertRaises(GraphFileError):
+            CrawlGraphFile(self.path)
@@ -0,0 +1,140 @@
+import unittest
+
+from crawler.graph_site_map import GraphSiteMap
+from crawler.links.link import Link
+from crawler.pages.page import Page
+
+
+class TestGraphSiteMap(unittest.TestCase):
+    def setUp(self):
+        self.site_map = GraphSiteMap()
+        self.index_page = Page(Link("http://www.example.com", "/"), "<html></html>", out_links=[
+            Link("http://www.example.com/", "foo.html"),
+            Link("http://www.example.com/", "https://www.example.com/sub/bar.html"),
+            Link("http://www.example.com/", "http://www.example.net:8080/baz.html"),
+            Link("http://www.example.com/", "foo.html"),
+        ])
+        self.foo_page = Page(Link("http://www.example.com/", "foo.html"), "<html></html>", out_links=[
+            Link("http://www.example.com/foo.html", "/"),
+        ])
+
+    def test_link_already_visited(self):
+        self.site_map.add_page(self.index_page)
+
+        self.assertTrue(self.site_map.link_already_visited(Link("https://www.example.com", "/")))
+        self.assertFalse(self.site_map.link_already_visited(Link("http://www.example.com", "/foo.html")))
+        self.assertFalse(self.site_map.link_already_visited(Link("http://www.example.com", "/never-seen.html")))
+
+    def test_page_for_link(self):
+        self.site_map.add_page(self.index_page)
+
+        page = self.site_map.page_for_link(Link("http://www.example.com", "/"))
+
+        self.assertEqual(page.link, self.index_page.link)
+        self.assertEqual(page.link.url, "http://www.example.com")
+        self.assertEqual(page.out_links, self.index_page.out_links)
+        self.assertEqual(
+            [link.url for link in page.out_links],
+            [
+                "http://www.example.com/foo.html",
+                "https://www.example.com/sub/bar.html",
+                "http://www.example.net:8080/baz.html",
+                "http://www.example.com/foo.html",
+            ],
+        )
+
+    def test_page_for_link_keeps_in_crawled_domain(self):
+        self.site_map.add_page(self.index_page)
+
+        page = self.site_map.page_for_link(Link("http://www.example.com", "/"))
+
+        self.assertEqual([link.in_crawled_domain() for link in page.out_links], [True, True, False, True])
+        self.assertEqual(page.out_links[2].port, "8080")
+
+    def test_page_for_link_drops_page_text(self):
+        self.site_map.add_page(self.index_page)
+
+        self.assertIsNone(self.site_map.page_for_link(Link("http://www.example.com", "/"))._page_text)
+
+    def test_page_for_link_keeps_fetch_details(self):
+        self.index_page.status_code = 200
+        self.index_page.body_size = 1234
+        self.index_page.fetch_time = 0.25
+        self.site_map.add_page(self.index_page)
+        self.site_map.add_page(self.foo_page)
+
+        index_page = self.site_map.page_for_link(Link("http://www.example.com", "/"))
+        foo_page = self.site_map.page_for_link(Link("http://www.example.com", "/foo.html"))
+
+        self.assertEqual((index_page.status_code, index_page.body_size, index_page.fetch_time), (200, 1234, 0.25))
+        self.assertEqual((foo_page.status_code, foo_page.body_size, foo_page.fetch_time), (None, None, None))
+
+    def test_page_for_link_unknown_fetch_time(self):
+        self.index_page.status_code = 200
+        self.index_page.body_size = 1234
+        self.site_map.add_page(self.index_page)
+
+        index_page = self.site_map.page_for_link(Link("http://www.example.com", "/"))
+
+        self.assertEqual(index_page.status_code, 200)
+        self.assertIsNone(index_page.fetch_time)
+
+    def test_page_for_link_not_visited(self):
+        self.site_map.add_page(self.index_page)
+
+        with self.assertRaises(KeyError):
+            self.site_map.page_for_link(Link("http://www.example.com", "/foo.html"))
+
+    def test_all_pages(self):
+        self.site_map.add_page(self.index_page)
+        self.site_map.add_page(self.foo_page)
+
+        pages = list(self.site_map.all_pages())
+
+        self.assertEqual([page.link for page in pages], [self.index_page.link, self.foo_page.link])
+        self.assertEqual([page.out_links for page in pages], [self.index_page.out_links, self.foo_page.out_links])
+
+    def test_add_page_again(self):
+        self.site_map.add_page(self.index_page)
+        self.site_map.add_page(Page(self.index_page.link, None, out_links=[]))
+
+        self.assertEqual(len(self.site_map), 1)
+        self.assertEqual(self.site_map.page_for_link(self.index_page.link).out_links, [])
+
+    def test_duplicate_of(self):
+        duplicate_page = Page(Link("http://www.example.com", "/print.html"), None, out_links=[])
+        duplicate_page.duplicate_of = self.foo_page.link
+        self.site_map.add_page(self.foo_page)
+        self.site_map.add_page(duplicate_page)
+
+        self.assertEqual(self.site_map.duplicate_of(duplicate_page.link), self.foo_page.link)
+        self.assertIsNone(self.site_map.duplicate_of(self.foo_page.link))
+        self.assertIsNone(self.site_map.duplicate_of(Link("http://www.example.com", "/never-seen.html")))
+        self.assertEqual(self.site_map.near_duplicates(), [(duplicate_page.link, self.foo_page.link)])
+        self.assertEqual(self.site_map.page_for_link(duplicate_page.link).duplicate_of, self.foo_page.link)
+        self.assertIsNone(self.site_map.page_for_link(self.foo_page.link).duplicate_of)
+
+    def test_aliases(self):
+        old_link = Link("http://www.example.com", "/old.html")
+        other_link = Link("http://www.example.com", "/Old")
+        self.foo_page.aliases = [old_link]
+        self.site_map.add_page(self.foo_page)
+        self.site_map.add_aliases(self.foo_page.link, [other_link])
+
+        for alias_link in (old_link, other_link):
+            self.assertTrue(self.site_map.link_already_visited(alias_link))
+            self.assertEqual(self.site_map.page_for_link(alias_link).link, self.foo_page.link)
+            self.assertEqual(self.site_map.alias_of(alias_link), self.foo_page.link)
+        self.assertIsNone(self.site_map.alias_of(self.foo_page.link))
+        self.assertIsNone(self.site_map.alias_of(Link("http://www.example.com", "/never-seen.html")))
+        self.assertEqual(self.site_map.aliases(), [(old_link, self.foo_page.link), (other_link, self.foo_page.link)])
+        self.assertEqual(self.site_map.page_for_link(self.foo_page.link).aliases, [old_link, other_link])
+        self.assertEqual(len(self.site_map), 1)
+
+    def test_len(self):
+        self.assertEqual(len(self.site_map), 0)
+
+        self.site_map.add_page(self.index_page)
+        self.site_map.add_page(self.foo_page)
+
+        self.assertEqual(len(self.site_map), 2)
@@ -0,0 +1,184 @@
+import threading
+import time
+import unittest
+
+from crawler.host_scheduler import HostScheduler
+from crawler.links.link import Link
+from unittest.mock import patch
+
+
+class TestHostScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = HostScheduler(floor=1, ceiling=4)
+        self.link = Link("http://www.example.com", "/index.html")
+
+    def _request(self, latency=0.1, status_code=200, retry_after=None, link=None):
+        link = link or self.link
+        self.scheduler.acquire(link)
+        self.scheduler.release(link, latency, status_code, retry_after)
+
+    def _state(self, link=None):
+        return self.scheduler.host_states()[HostScheduler.host(link or self.link)]
+
+    def test_host(self):
+        self.assertEqual(HostScheduler.host(Link("http://WWW.example.com", "/")), ("www.example.com", 80))
+        self.assertEqual(HostScheduler.host(Link("https://www.example.com", "/")), ("www.example.com", 443))
+        self.assertEqual(HostScheduler.host(Link("http://www.example.com:8080", "/")), ("www.example.com", 8080))
+
+    def test_init_invalid_limits(self):
+        with self.assertRaises(ValueError):
+            HostScheduler(floor=0)
+        with self.assertRaises(ValueError):
+            HostScheduler(floor=4, ceiling=2)
+        with self.assertRaises(ValueError):
+            HostScheduler(decrease=1)
+
+    def test_starts_at_floor(self):
+        self.scheduler.acquire(self.link)
+
+        self.assertEqual(self._state().limit, 1)
+        self.assertEqual(self._state().in_flight, 1)
+
+    def test_additive_increase_up_to_ceiling(self):
+        self._request()
+        self.assertEqual(self._state().limit, 2)
+        self._request()
+        self.assertEqual(self._state().limit, 2.5)
+
+        for _ in range(100):
+            self._request()
+
+        self.assertEqual(self._state().limit, 4)
+        self.assertEqual(self._state().requests, 102)
+        self.assertEqual(self._state().errors, 0)
+
+    def test_multiplicative_decrease_when_throttled(self):
+        for _ in range(100):
+            self._request()
+
+        self._request(status_code=429)
+        self.assertEqual(self._state().limit, 2)
+        self.assertEqual(self._state().errors, 1)
+        self.assertGreater(self._state().error_rate, 0)
+
+    def test_decreases_once_per_round_trip(self):
+        for _ in range(100):
+            self._request(latency=10)
+
+        self._request(latency=10, status_code=503)
+        self._request(latency=10, status_code=503)
+
+        self.assertEqual(self._state().limit, 2)
+
+    def test_decrease_stops_at_floor(self):
+        with patch("crawler.host_scheduler.time.monotonic", side_effect=range(1000, 2000, 10)):
+            for _ in range(10):
+                self._request(status_code=None)
+
+        self.assertEqual(self._state().limit, 1)
+
+    def test_decrease_when_latency_rises(self):
+        for _ in range(100):
+            self._request(latency=0.01)
+
+        with patch("crawler.host_scheduler.time.monotonic", side_effect=range(1000, 2000, 10)):
+            for _ in range(5):
+                self._request(latency=1)
+
+        self.assertEqual(self._state().baseline_latency, 0.01)
+        self.assertLess(self._state().limit, 4)
+
+    def test_host_limits(self):
+        scheduler = HostScheduler(floor=1, ceiling=4, host_limits={("www.example.net", 80): (2, 3)})
+        link = Link("http://www.example.net", "/")
+
+        scheduler.acquire(link)
+        state = scheduler.host_states()[("www.example.net", 80)]
+        self.assertEqual((state.floor, state.ceiling, state.limit), (2, 3, 2))
+
+    def test_hosts_limited_separately(self):
+        other_link = Link("http://www.example.com:8080", "/index.html")
+
+        self.scheduler.acquire(self.link)
+        self.scheduler.acquire(other_link)
+
+        self.assertEqual(self._state().in_flight, 1)
+        self.assertEqual(self._state(other_link).in_flight, 1)
+
+    def test_acquire_waits_for_slot(self):
+        acquired = threading.Event()
+        self.scheduler.acquire(self.link)
+
+        def acquire():
+            self.scheduler.acquire(self.link)
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+
+        self.scheduler.release(self.link, 0.1, 200)
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+
+    def test_acquire_honours_retry_after(self):
+        start = time.monotonic()
+        self._request(status_code=429, retry_after="1")
+        self.scheduler.acquire(self.link)
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.9)
+
+    def test_retry_after_capped(self):
+        scheduler = HostScheduler(max_retry_after=0.1)
+        scheduler.acquire(self.link)
+        scheduler.release(self.link, 0.1, 503, "3600")
+
+        start = time.monotonic()
+        scheduler.acquire(self.link)
+
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_back_off(self):
+        scheduler = HostScheduler(retry_backoff=0.1, max_retry_after=0.3)
+
+        for attempt, delay in ((0, 0.1), (1, 0.2), (3, 0.3)):
+            with self.subTest(attempt=attempt):
+                start = time.monotonic()
+                scheduler.back_off(self.link, attempt)
+                scheduler.acquire(self.link)
+                scheduler.release(self.link, 0.1, 200)
+
+                self.assertGreaterEqual(time.monotonic() - start, delay - 0.01)
+                self.assertLess(time.monotonic() - start, delay + 0.5)
+
+    def test_retry_after_seconds(self):
+        self.assertEqual(HostScheduler._retry_after_seconds(" 120 "), 120)
+        self.assertIsNone(HostScheduler._retry_after_seconds("soon"))
+        self.assertEqual(HostScheduler._retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+
+        with patch("crawler.host_scheduler.time.time", return_value=1445412420):
+            self.assertEqual(HostScheduler._retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT"), 60)
+
+    def test_slot(self):
+        with self.scheduler.slot(self.link) as record:
+            self.assertEqual(self._state().in_flight, 1)
+            record(0.5, 200)
+
+        self.assertEqual(self._state().in_flight, 0)
+        self.assertEqual(self._state().latency, 0.5)
+        self.assertEqual(self._state().errors, 0)
+
+    def test_slot_failed_request(self):
+        with self.assertRaises(ConnectionError):
+            with self.scheduler.slot(self.link):
+                raise ConnectionError()
+
+        self.assertEqual(self._state().in_flight, 0)
+        self.assertEqual(self._state().errors, 1)
+
+    def test_should_retry(self):
+        self.assertTrue(self.scheduler.should_retry(429, 0))
+        self.assertTrue(self.scheduler.should_retry(503, 2))
+        self.assertFalse(self.scheduler.should_retry(503, 3))
+        self.assertFalse(self.scheduler.should_retry(500, 0))
+        self.assertFalse(self.scheduler.should_retry(200, 0))
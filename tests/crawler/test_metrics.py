@@ -0,0 +1,182 @@
+import io
+import os
+import requests
+import tempfile
+import unittest
+
+from crawler.links.link import Link
+from crawler.metrics import CrawlMetrics, Counter, Histogram, MetricsReporter, MetricsServer
+from crawler.pages.page import Page
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestHistogram(unittest.TestCase):
+    def test_observe(self):
+        histogram = Histogram(buckets=(0.1, 1.0, 10.0))
+        for value in (0.05, 0.1, 0.5, 2.0, 20.0):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.count, 5)
+        self.assertAlmostEqual(histogram.sum, 22.65)
+        # A value on a bucket's upper bound is in that bucket, as in Prometheus
+        self.assertEqual(histogram.cumulative_counts(), [2, 3, 4, 5])
+
+    def test_quantile(self):
+        histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+        for value in (0.5, 1.5, 1.5, 3.0):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.quantile(0.25), 1.0)
+        self.assertEqual(histogram.quantile(0.5), 1.5)
+        self.assertEqual(histogram.quantile(1.0), 4.0)
+
+    def test_quantile_without_observations(self):
+        self.assertIsNone(Histogram().quantile(0.5))
+
+    def test_quantile_beyond_the_last_bucket(self):
+        histogram = Histogram(buckets=(1.0,))
+        histogram.observe(5.0)
+
+        self.assertEqual(histogram.quantile(0.99), 1.0)
+
+    def test_quantile_bounds(self):
+        histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+        for value in (1.5, 3.0):
+            histogram.observe(value)
+
+        # The leading empty bucket is skipped
+        self.assertEqual(histogram.quantile(0.0), 1.0)
+        self.assertEqual(histogram.quantile(1.0), 4.0)
+
+    def test_quantile_with_one_observation(self):
+        histogram = Histogram()
+        histogram.observe(0.3)
+
+        # It falls in the (0.25, 0.5] bucket
+        for q, expected in ((0.0, 0.25), (0.5, 0.375), (1.0, 0.5)):
+            with self.subTest(q=q):
+                self.assertEqual(histogram.quantile(q), expected)
+
+
+class TestCrawlMetrics(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.metrics = CrawlMetrics(clock=self.clock)
+
+    def crawl_pages(self, count, body_size):
+        for i in range(count):
+            page = Page(Link("http://www.example.com", "/page-{}.html".format(i)), None, out_links=[])
+            page.body_size = body_size
+            self.metrics.page_crawled(page)
+
+    def test_page_crawled(self):
+        self.crawl_pages(3, 1000)
+        self.metrics.page_crawled(Page(Link("http://www.example.com", "/skipped.pdf"), None, out_links=[]))
+
+        self.assertEqual(self.metrics.pages.value, 4)
+        self.assertEqual(self.metrics.bytes.value, 3000)
+
+    def test_rates(self):
+        self.crawl_pages(50, 2048)
+        self.clock.now += 10
+
+        self.assertEqual(self.metrics.pages_per_second(), 5.0)
+        self.assertEqual(self.metrics.bytes_per_second(), 10240.0)
+
+    def test_progress_line(self):
+        self.crawl_pages(300, 1024)
+        self.metrics.frontier.set(1200)
+        self.clock.now += 60
+
+        self.assertEqual(
+            self.metrics.progress_line(),
+            "300 pages in 0:01:00, 5.0 pages/s, 5.0 KiB/s, 1,200 in the frontier, ETA 0:04:00",
+        )
+
+    def test_progress_line_before_any_pages(self):
+        self.assertTrue(self.metrics.progress_line().endswith("ETA unknown"))
+
+    def test_write_prometheus(self):
+        self.crawl_pages(2, 500)
+        self.metrics.frontier.set(7)
+        self.metrics.observe("parse", 0.003)
+        self.metrics.observe("parse", 0.2)
+        self.clock.now += 4
+
+        output = io.StringIO()
+        self.metrics.write_prometheus(output)
+        lines = output.getvalue().splitlines()
+
+        self.assertIn("# TYPE crawler_stage_seconds histogram", lines)
+        self.assertIn('crawler_stage_seconds_bucket{stage="parse",le="0.0025"} 0', lines)
+        self.assertIn('crawler_stage_seconds_bucket{stage="parse",le="0.005"} 1', lines)
+        self.assertIn('crawler_stage_seconds_bucket{stage="parse",le="+Inf"} 2', lines)
+        self.assertIn('crawler_stage_seconds_sum{stage="parse"} 0.203', lines)
+        self.assertIn('crawler_stage_seconds_count{stage="parse"} 2', lines)
+        self.assertIn('crawler_stage_seconds_count{stage="connect"} 0', lines)
+        self.assertIn("# TYPE crawler_pages_total counter", lines)
+        self.assertIn("crawler_pages_total 2", lines)
+        self.assertIn("crawler_bytes_total 1000", lines)
+        self.assertIn("crawler_frontier_size 7", lines)
+        self.assertIn("crawler_pages_per_second 0.5", lines)
+
+    def test_write_textfile(self):
+        self.crawl_pages(1, 10)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "crawler.prom")
+            self.metrics.write_textfile(path)
+
+            with open(path) as textfile:
+                self.assertIn("crawler_pages_total 1\n", textfile.read())
+            self.assertEqual(os.listdir(directory), ["crawler.prom"])
+
+
+class TestMetricsReporter(unittest.TestCase):
+    def test_stop_reports(self):
+        metrics = CrawlMetrics()
+        progress = io.StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "crawler.prom")
+            reporter = MetricsReporter(metrics, interval=60, textfile=path, progress=progress)
+            reporter.start()
+            metrics.pages.inc()
+            reporter.stop()
+
+            self.assertTrue(os.path.exists(path))
+        self.assertTrue(progress.getvalue().startswith("1 pages in"))
+
+
+class TestMetricsServer(unittest.TestCase):
+    def test_serves_metrics(self):
+        metrics = CrawlMetrics()
+        metrics.pages.inc(3)
+        server = MetricsServer(metrics)
+        server.start()
+        try:
+            url = "http://{}:{}".format(*server.server_address[:2])
+            response = requests.get(url + "/metrics")
+            missing = requests.get(url + "/")
+        finally:
+            server.close()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Type"], MetricsServer.CONTENT_TYPE)
+        self.assertIn("crawler_pages_total 3\n", response.text)
+        self.assertEqual(missing.status_code, 404)
+
+
+class TestCounter(unittest.TestCase):
+    def test_inc(self):
+        counter = Counter()
+        counter.inc()
+        counter.inc(5)
+
+        self.assertEqual(counter.value, 6)
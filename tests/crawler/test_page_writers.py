@@ -0,0 +1,103 @@
+import io
+import json
+import unittest
+
+from crawler.links.link import Link
+from crawler.page_writers import CsvPageWriter, JsonLinesPageWriter, TextPageWriter
+from crawler.pages.page import Page
+
+
+class TestPageWriters(unittest.TestCase):
+    def setUp(self):
+        self.output = io.StringIO()
+        link = Link("http://www.example.com", "/index.html")
+        self.page = Page(link, None, out_links=[
+            Link(link.url, "/foo.html"),
+            Link(link.url, "http://www.example.net/bar,baz.html"),
+            Link(link.url, "foo.html"),
+        ])
+        self.empty_page = Page(Link("http://www.example.com", "/empty.html"), None, out_links=[])
+
+    def test_text(self):
+        writer = TextPageWriter(self.output)
+        writer.write(self.empty_page)
+
+        self.assertEqual(self.output.getvalue(), "Page: http://www.example.com/empty.html\n    Outbound Links:\n\n\n\n")
+
+        writer.write(self.page)
+        lines = self.output.getvalue().split("\n")[5:]
+        self.assertEqual(lines[:2], ["Page: http://www.example.com/index.html", "    Outbound Links:"])
+        self.assertEqual(sorted(lines[2:4]), [
+            "        http://www.example.com/foo.html",
+            "        http://www.example.net/bar,baz.html",
+        ])
+        self.assertEqual(lines[4:], ["", "", "", ""])
+
+    def test_text_near_duplicate(self):
+        self.empty_page.duplicate_of = self.page.link
+        TextPageWriter(self.output).write(self.empty_page)
+
+        self.assertEqual(self.output.getvalue().split("\n")[:3], [
+            "Page: http://www.example.com/empty.html",
+            "    Near Duplicate Of: http://www.example.com/index.html",
+            "    Outbound Links:",
+        ])
+
+    def test_text_redirected_from(self):
+        self.empty_page.aliases = [
+            Link("http://www.example.com", "/old.html"),
+            Link("http://www.example.com", "/Old"),
+        ]
+        TextPageWriter(self.output).write(self.empty_page)
+
+        self.assertEqual(self.output.getvalue().split("\n")[:4], [
+            "Page: http://www.example.com/empty.html",
+            "    Redirected From: http://www.example.com/old.html",
+            "    Redirected From: http://www.example.com/Old",
+            "    Outbound Links:",
+        ])
+
+    def test_jsonl(self):
+        writer = JsonLinesPageWriter(self.output)
+        writer.write(self.page)
+        writer.write(self.empty_page)
+
+        self.assertEqual([json.loads(line) for line in self.output.getvalue().splitlines()], [
+            {
+                "url": "http://www.example.com/index.html",
+                "out_links": ["http://www.example.com/foo.html", "http://www.example.net/bar,baz.html"],
+            },
+            {"url": "http://www.example.com/empty.html", "out_links": []},
+        ])
+
+    def test_jsonl_near_duplicate(self):
+        self.empty_page.duplicate_of = self.page.link
+        JsonLinesPageWriter(self.output).write(self.empty_page)
+
+        self.assertEqual(json.loads(self.output.getvalue()), {
+            "url": "http://www.example.com/empty.html",
+            "out_links": [],
+            "duplicate_of": "http://www.example.com/index.html",
+        })
+
+    def test_jsonl_redirected_from(self):
+        self.empty_page.aliases = [Link("http://www.example.com", "/old.html")]
+        JsonLinesPageWriter(self.output).write(self.empty_page)
+
+        self.assertEqual(json.loads(self.output.getvalue()), {
+            "url": "http://www.example.com/empty.html",
+            "out_links": [],
+            "redirected_from": ["http://www.example.com/old.html"],
+        })
+
+    def test_csv(self):
+        writer = CsvPageWriter(self.output)
+        writer.write(self.page)
+        writer.write(self.empty_page)
+
+        self.assertEqual(self.output.getvalue().splitlines(), [
+            "page,out_link",
+            "http://www.example.com/index.html,http://www.example.com/foo.html",
+            'http://www.example.com/index.html,"http://www.example.net/bar,baz.html"',
+            "http://www.example.com/empty.html,",
+        ])
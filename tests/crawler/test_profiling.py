@@ -0,0 +1,170 @@
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import unittest
+
+from crawler.links.link import Link
+from crawler.pages.page import Page
+from crawler.profiling import CrawlProfiler, MemoryProfiler, SamplingProfiler
+
+
+def busy_loop(stopped):
+    while not stopped.is_set():
+        sum(range(1000))
+
+
+def waiting(stopped):
+    stopped.wait()
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_charges_busy_thread(self):
+        stopped = threading.Event()
+        thread = threading.Thread(target=busy_loop, args=(stopped,))
+        thread.start()
+        profiler = SamplingProfiler(interval=0.001)
+        try:
+            profiler.start()
+            time.sleep(0.2)
+            profiler.stop()
+        finally:
+            stopped.set()
+            thread.join()
+
+        self.assertGreater(profiler.samples, 0)
+        functions = {function: total_seconds for function, _, total_seconds in profiler.functions()}
+        busy_loop_function = [function for function in functions if function.endswith("(busy_loop)")]
+        self.assertEqual(len(busy_loop_function), 1)
+        self.assertGreater(functions[busy_loop_function[0]], 0)
+
+    def test_charges_waiting_thread_where_it_waits(self):
+        stopped = threading.Event()
+        thread = threading.Thread(target=waiting, args=(stopped,))
+        thread.start()
+        profiler = SamplingProfiler(interval=0.001)
+        try:
+            profiler.start()
+            time.sleep(0.1)
+            profiler.stop()
+        finally:
+            stopped.set()
+            thread.join()
+
+        functions = {function: total_seconds for function, _, total_seconds in profiler.functions()}
+        waiting_function = [function for function in functions if function.endswith("(waiting)")]
+        self.assertEqual(len(waiting_function), 1)
+        # Charged wall clock time, about the whole time sampled, though the thread used no CPU
+        self.assertGreater(functions[waiting_function[0]], 0.05)
+
+    def test_sample_without_start(self):
+        stopped = threading.Event()
+        thread = threading.Thread(target=waiting, args=(stopped,))
+        thread.start()
+        profiler = SamplingProfiler(interval=0.5)
+        try:
+            profiler.sample()
+        finally:
+            stopped.set()
+            thread.join()
+
+        functions = {function: total_seconds for function, _, total_seconds in profiler.functions()}
+        waiting_function = [function for function in functions if function.endswith("(waiting)")]
+        self.assertEqual(functions[waiting_function[0]], 0.5)
+
+    def test_write(self):
+        profiler = SamplingProfiler()
+        profiler._charge(sys._getframe(), 0.5)
+
+        output = io.StringIO()
+        profiler.write(output, limit=1)
+        lines = output.getvalue().splitlines()
+
+        self.assertTrue(lines[0].startswith("# Wall clock profile:"))
+        self.assertEqual(len(lines), 3)
+        self.assertIn("(test_write)", lines[2])
+        self.assertIn("100.0%", lines[2])
+
+    def test_relative_path(self):
+        directory = os.path.abspath(sys.path[-1])
+        filename = os.path.join(directory, "package", "module.py")
+
+        self.assertEqual(SamplingProfiler._relative_path(filename), os.path.join("package", "module.py"))
+
+    def test_relative_path_outside_sys_path(self):
+        self.assertEqual(SamplingProfiler._relative_path("<string>"), "<string>")
+
+    def test_init_with_no_interval(self):
+        with self.assertRaises(ValueError):
+            SamplingProfiler(interval=0)
+
+
+class TestMemoryProfiler(unittest.TestCase):
+    def page(self, i):
+        return Page(Link("http://www.example.com", "/page-{}.html".format(i)), None, out_links=[])
+
+    def test_snapshots_every_pages(self):
+        profiler = MemoryProfiler(every_pages=2, top=5)
+        profiler.start()
+        for i in range(5):
+            profiler.page_crawled(self.page(i))
+        profiler.stop()
+
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual([snapshot[0] for snapshot in profiler.snapshots], [2, 4, 5])
+        for _, _, _, sites in profiler.snapshots:
+            self.assertLessEqual(len(sites), 5)
+
+    def test_stop_after_snapshot(self):
+        profiler = MemoryProfiler(every_pages=2)
+        profiler.start()
+        for i in range(2):
+            profiler.page_crawled(self.page(i))
+        profiler.stop()
+
+        self.assertEqual([snapshot[0] for snapshot in profiler.snapshots], [2])
+
+    def test_write(self):
+        profiler = MemoryProfiler(every_pages=1, top=3)
+        profiler.start()
+        retained = [bytearray(100000)]
+        profiler.stop()
+
+        output = io.StringIO()
+        profiler.write(output)
+        text = output.getvalue()
+
+        self.assertTrue(text.startswith("# Memory profile:"))
+        self.assertIn("== After 0 pages:", text)
+        self.assertIn("retained = [bytearray(100000)]", text)
+        self.assertEqual(len(retained[0]), 100000)
+
+    def test_init_with_no_pages(self):
+        with self.assertRaises(ValueError):
+            MemoryProfiler(every_pages=0)
+
+
+class TestCrawlProfiler(unittest.TestCase):
+    def test_writes_profiles(self):
+        with tempfile.TemporaryDirectory() as directory:
+            wall_path = os.path.join(directory, "wall.txt")
+            memory_path = os.path.join(directory, "memory.txt")
+
+            with CrawlProfiler(wall_path=wall_path, memory_path=memory_path) as profiler:
+                profiler.page_crawled(Page(Link("http://www.example.com", "/"), None, out_links=[]))
+
+            with open(wall_path) as wall_profile:
+                self.assertTrue(wall_profile.read().startswith("# Wall clock profile:"))
+            with open(memory_path) as memory_profile:
+                self.assertTrue(memory_profile.read().startswith("# Memory profile:"))
+
+    def test_without_paths(self):
+        profiler = CrawlProfiler()
+
+        self.assertIsNone(profiler.sampling_profiler)
+        self.assertIsNone(profiler.memory_profiler)
+        with profiler:
+            profiler.page_crawled(Page(Link("http://www.example.com", "/"), None, out_links=[]))
@@ -1,2 +1,65 @@
-# TODO - I'm running very short of time in this take home test and this class is simple so I chose to not write the
-# tests in this instance. This is not a practice I would do in production!
+import unittest
+
+from crawler.links.link import Link
+from crawler.pages.page import Page
+from crawler.site_map import SiteMap
+
+
+class TestSiteMap(unittest.TestCase):
+    def setUp(self):
+        self.site_map = SiteMap()
+        self.page = Page(Link("http://www.example.com", "/"), None, out_links=[
+            Link("http://www.example.com/", "foo.html"),
+        ])
+
+    def test_link_already_visited(self):
+        self.site_map.add_page(self.page)
+
+        self.assertTrue(self.site_map.link_already_visited(Link("https://www.example.com", "/")))
+        self.assertFalse(self.site_map.link_already_visited(Link("http://www.example.com", "/foo.html")))
+
+    def test_page_for_link(self):
+        self.site_map.add_page(self.page)
+
+        self.assertIs(self.site_map.page_for_link(Link("http://www.example.com", "/")), self.page)
+
+    def test_all_pages(self):
+        self.site_map.add_page(self.page)
+
+        self.assertEqual(list(self.site_map.all_pages()), [self.page])
+
+    def test_duplicate_of(self):
+        canonical_link = Link("http://www.example.com", "/")
+        duplicate_page = Page(Link("http://www.example.com", "/print.html"), None, out_links=[])
+        duplicate_page.duplicate_of = canonical_link
+        self.site_map.add_page(self.page)
+        self.site_map.add_page(duplicate_page)
+
+        self.assertEqual(self.site_map.duplicate_of(duplicate_page.link), canonical_link)
+        self.assertIsNone(self.site_map.duplicate_of(self.page.link))
+        self.assertEqual(self.site_map.near_duplicates(), [(duplicate_page.link, canonical_link)])
+
+    def test_aliases(self):
+        page = Page(Link("http://www.example.com", "/new.html"), None, out_links=[])
+        page.aliases = [Link("http://www.example.com", "/old.html")]
+        self.site_map.add_page(page)
+        self.site_map.add_aliases(page.link, [Link("http://www.example.com", "/Old")])
+
+        for alias in ("/old.html", "/Old"):
+            alias_link = Link("http://www.example.com", alias)
+            self.assertTrue(self.site_map.link_already_visited(alias_link))
+            self.assertIs(self.site_map.page_for_link(alias_link), page)
+            self.assertEqual(self.site_map.alias_of(alias_link), page.link)
+        self.assertIsNone(self.site_map.alias_of(page.link))
+        self.assertEqual(self.site_map.aliases(), [
+            (Link("http://www.example.com", "/old.html"), page.link),
+            (Link("http://www.example.com", "/Old"), page.link),
+        ])
+        self.assertEqual(len(self.site_map), 1)
+
+    def test_len(self):
+        self.assertEqual(len(self.site_map), 0)
+
+        self.site_map.add_page(self.page)
+
+        self.assertEqual(len(self.site_map), 1)
@@ -0,0 +1,147 @@
+import gzip
+import requests
+import responses
+import unittest
+
+from crawler.links.link import Link
+from crawler.sitemap_seeder import SitemapSeeder
+
+
+class TestSitemapSeeder(unittest.TestCase):
+    SITEMAP = """<?xml version="1.0" encoding="UTF-8"?>
+        <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+            <url><loc>http://www.example.com/foo.html</loc><lastmod>2020-01-01</lastmod></url>
+            <url>
+                <loc> http://www.example.com/sub/deep/bar.html </loc>
+            </url>
+            <url><loc>http://www.example.net/external.html</loc></url>
+            <url><loc>mailto:someone@example.com</loc></url>
+        </urlset>
+    """
+    SITEMAP_INDEX = """<?xml version="1.0" encoding="UTF-8"?>
+        <sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+            <sitemap><loc>http://www.example.com/sitemap-pages.xml</loc></sitemap>
+            <sitemap><loc>http://www.example.com/sitemap-more.xml.gz</loc></sitemap>
+            <sitemap><loc>http://www.example.com/sitemap-pages.xml</loc></sitemap>
+        </sitemapindex>
+    """
+    MORE_SITEMAP = """<?xml version="1.0" encoding="UTF-8"?>
+        <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+            <url><loc>http://www.example.com/more.html</loc></url>
+        </urlset>
+    """
+
+    def setUp(self):
+        self.start_link = Link("http://www.example.com", "/")
+
+    def _seed_urls(self, seeder):
+        return [link.url for link in seeder.seed_links(self.start_link)]
+
+    @responses.activate
+    def test_seed_links_from_robots(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/robots.txt",
+            body="User-agent: *\nDisallow: /private\n\nSitemap: http://www.example.com/sitemap-index.xml # All of it\n",
+        )
+        responses.add(responses.GET, "http://www.example.com/sitemap-index.xml", body=TestSitemapSeeder.SITEMAP_INDEX)
+        responses.add(responses.GET, "http://www.example.com/sitemap-pages.xml", body=TestSitemapSeeder.SITEMAP)
+        responses.add(
+            responses.GET,
+            "http://www.example.com/sitemap-more.xml.gz",
+            body=gzip.compress(TestSitemapSeeder.MORE_SITEMAP.encode()),
+            content_type="application/x-gzip",
+        )
+        seeder = SitemapSeeder(chunk_size=16)
+
+        self.assertEqual(self._seed_urls(seeder), [
+            "http://www.example.com/foo.html",
+            "http://www.example.com/sub/deep/bar.html",
+            "http://www.example.com/more.html",
+        ])
+        self.assertEqual(seeder.sitemaps_fetched, 3)
+        self.assertEqual(seeder.urls_found, 5)
+
+    @responses.activate
+    def test_seed_links_links_found_on_start_page(self):
+        responses.add(responses.GET, "http://www.example.com/robots.txt", status=404)
+        responses.add(responses.GET, "http://www.example.com/sitemap.xml", body=TestSitemapSeeder.SITEMAP)
+
+        seed_link = next(SitemapSeeder().seed_links(self.start_link))
+
+        self.assertEqual(seed_link.base_page.url, self.start_link.url)
+        self.assertEqual(seed_link, Link("http://www.example.com", "/foo.html"))
+
+    @responses.activate
+    def test_seed_links_default_sitemap(self):
+        responses.add(responses.GET, "http://www.example.com/robots.txt", body="User-agent: *\nDisallow:\n")
+        responses.add(responses.GET, "http://www.example.com/sitemap.xml", body=TestSitemapSeeder.SITEMAP)
+
+        self.assertEqual(self._seed_urls(SitemapSeeder()), [
+            "http://www.example.com/foo.html",
+            "http://www.example.com/sub/deep/bar.html",
+        ])
+
+    @responses.activate
+    def test_seed_links_no_sitemap(self):
+        responses.add(responses.GET, "http://www.example.com/robots.txt", status=404)
+        responses.add(responses.GET, "http://www.example.com/sitemap.xml", status=404)
+
+        self.assertEqual(self._seed_urls(SitemapSeeder()), [])
+
+    @responses.activate
+    def test_seed_links_connection_error(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/robots.txt",
+            body=requests.exceptions.ConnectionError("Refused"),
+        )
+        responses.add(
+            responses.GET,
+            "http://www.example.com/sitemap.xml",
+            body=requests.exceptions.ConnectionError("Refused"),
+        )
+
+        self.assertEqual(self._seed_urls(SitemapSeeder()), [])
+
+    @responses.activate
+    def test_seed_links_invalid_sitemap(self):
+        responses.add(responses.GET, "http://www.example.com/robots.txt", status=404)
+        responses.add(
+            responses.GET,
+            "http://www.example.com/sitemap.xml",
+            body=TestSitemapSeeder.SITEMAP.replace("</urlset>", "<url><loc>http://www.example.com/broken"),
+        )
+
+        self.assertEqual(self._seed_urls(SitemapSeeder()), [
+            "http://www.example.com/foo.html",
+            "http://www.example.com/sub/deep/bar.html",
+        ])
+
+    @responses.activate
+    def test_seed_links_max_sitemaps(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/robots.txt",
+            body="Sitemap: http://www.example.com/sitemap-index.xml\n",
+        )
+        responses.add(responses.GET, "http://www.example.com/sitemap-index.xml", body=TestSitemapSeeder.SITEMAP_INDEX)
+        responses.add(responses.GET, "http://www.example.com/sitemap-pages.xml", body=TestSitemapSeeder.SITEMAP)
+        seeder = SitemapSeeder(max_sitemaps=2)
+
+        self.assertEqual(len(self._seed_urls(seeder)), 2)
+        self.assertEqual(seeder.sitemaps_fetched, 2)
+
+    @responses.activate
+    def test_seed_links_with_timeout(self):
+        responses.add(responses.GET, "http://www.example.com/robots.txt", body="User-agent: *\nDisallow:\n")
+        responses.add(responses.GET, "http://www.example.com/sitemap.xml", body=TestSitemapSeeder.SITEMAP)
+
+        self._seed_urls(SitemapSeeder(timeout=2.5))
+
+        self.assertEqual([call.request.req_kwargs["timeout"] for call in responses.calls], [2.5, 2.5])
+
+    def test_init_with_headers(self):
+        seeder = SitemapSeeder(headers={"User-Agent": "crawler"})
+
+        self.assertEqual(seeder._session.headers["User-Agent"], "crawler")